@@ -67,8 +67,32 @@ DEFAULT_THINKING_MODE_THINKDEEP = os.getenv("DEFAULT_THINKING_MODE_THINKDEEP", "
 DEFAULT_CONSENSUS_TIMEOUT = 120.0  # 每个模型 2 分钟
 DEFAULT_CONSENSUS_MAX_INSTANCES_PER_COMBINATION = 2
 
-# 注意：共识工具现在使用顺序处理以兼容 MCP
-# 并发处理已被移除以避免异步模式违规
+# 注意：共识工具默认按步骤顺序咨询模型
+# 在第 1 步设置 parallel=true 可同时咨询所有模型，每个模型受 DEFAULT_CONSENSUS_TIMEOUT 限制
+
+# 提供者调用执行配置
+# 提供者的 generate_content 是同步调用，工具通过 ProviderExecutor 将其放到
+# 有界线程池中执行，避免单个慢速模型调用阻塞整个 stdio 事件循环
+# PROVIDER_MAX_WORKERS：执行提供者调用的线程池大小（所有提供者共享）
+PROVIDER_MAX_WORKERS = int(os.getenv("PROVIDER_MAX_WORKERS", "16"))
+
+# PROVIDER_CONCURRENCY_LIMIT：每个提供者同时进行中的调用数上限
+# 超出的调用会在事件循环上排队等待，而不是占用线程
+PROVIDER_CONCURRENCY_LIMIT = int(os.getenv("PROVIDER_CONCURRENCY_LIMIT", "4"))
+
+# 提供者 HTTP 连接池配置
+# OpenAI 兼容提供者按 base URL 共享一个连接池，复用 keep-alive 连接以避免重复 TLS 握手
+# PROVIDER_MAX_CONNECTIONS：每个连接池的最大连接数
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100"))
+
+# PROVIDER_MAX_KEEPALIVE_CONNECTIONS：每个连接池保留的空闲 keep-alive 连接数
+PROVIDER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+# PROVIDER_KEEPALIVE_EXPIRY：空闲连接保留的秒数
+PROVIDER_KEEPALIVE_EXPIRY = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "30"))
+
+# PROVIDER_HTTP2：在端点支持时使用 HTTP/2（需要安装 h2 包，否则自动回退到 HTTP/1.1）
+PROVIDER_HTTP2 = os.getenv("PROVIDER_HTTP2", "true").lower() == "true"
 
 # MCP 协议传输限制
 #
@@ -148,6 +172,18 @@ LOCALE = os.getenv("LOCALE", "")
 # 为无状态 MCP 环境提供简单的内存对话线程
 # 对话仅在 Claude 会话期间持续
 
+# CONVERSATION_STORAGE_BACKEND：对话线程的存储后端
+# "memory"（默认）：进程内存储，重启后丢失
+# "sqlite"：持久化 SQLite（WAL）数据库，可在同一主机的多个服务器进程间共享
+# "redis"：Redis 协议服务器（需要安装 redis 包），可跨主机共享
+CONVERSATION_STORAGE_BACKEND = os.getenv("CONVERSATION_STORAGE_BACKEND", "memory").lower()
+
+# CONVERSATION_STORAGE_PATH：sqlite 后端使用的数据库文件
+CONVERSATION_STORAGE_PATH = os.getenv("CONVERSATION_STORAGE_PATH", os.path.join(".XTOOL_memory", "conversations.db"))
+
+# CONVERSATION_REDIS_URL：redis 后端的连接地址
+CONVERSATION_REDIS_URL = os.getenv("CONVERSATION_REDIS_URL", "redis://localhost:6379/0")
+
 # 增强内存系统配置
 # ENABLE_ENHANCED_MEMORY：增强内存功能的主开关
 # 启用后，向对话系统添加三层内存（全局、项目、会话）
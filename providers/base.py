@@ -1,13 +1,27 @@
 """Base model provider interface and data classes."""
 
 import logging
+import threading
+import time
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Set by ProviderExecutor inside its worker threads: the executor owns the retry
+# loop (with asyncio.sleep back-off), so providers make a single attempt per call.
+_executor_owns_retries: ContextVar[bool] = ContextVar("executor_owns_retries", default=False)
+
+# Cancellation signal for the call currently running in this worker thread
+_call_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("call_cancel_event", default=None)
+
+
+class ProviderCallCancelledError(RuntimeError):
+    """Raised inside a provider call when the awaiting task has been cancelled."""
+
 
 class ProviderType(Enum):
     """Supported model provider types."""
@@ -196,6 +210,13 @@ class ModelProvider(ABC):
     # All concrete providers must define their supported models
     SUPPORTED_MODELS: dict[str, Any] = {}
 
+    # Whether agenerate_content is natively async (otherwise it runs on the executor's threads)
+    SUPPORTS_NATIVE_ASYNC = False
+
+    # Retry policy shared by the sync retry loops and ProviderExecutor
+    MAX_RETRIES = 4  # Total of 4 attempts
+    RETRY_DELAYS = [1, 3, 5, 8]  # Progressive delays: 1s, 3s, 5s, 8s
+
     def __init__(self, api_key: str, **kwargs):
         """Initialize the provider with API key and optional configuration."""
         self.api_key = api_key
@@ -231,6 +252,55 @@ class ModelProvider(ABC):
         """
         pass
 
+    async def agenerate_content(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: Optional[int] = None,
+        **kwargs,
+    ) -> ModelResponse:
+        """Async variant of generate_content that never blocks the event loop.
+
+        The default implementation runs generate_content on the shared
+        ProviderExecutor thread pool. Providers with a native async client
+        override this and set SUPPORTS_NATIVE_ASYNC.
+        """
+        from .executor import get_provider_executor
+
+        return await get_provider_executor().run_blocking(
+            self,
+            prompt=prompt,
+            model_name=model_name,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            **kwargs,
+        )
+
+    def _get_retry_attempts(self) -> int:
+        """Number of attempts the provider's own retry loop should make.
+
+        Calls dispatched through ProviderExecutor retry on the event loop
+        instead, so the worker thread only makes a single attempt.
+        """
+        return 1 if _executor_owns_retries.get() else self.MAX_RETRIES
+
+    def _raise_if_cancelled(self) -> None:
+        """Abort the current call if the awaiting task has been cancelled."""
+        cancel_event = _call_cancel_event.get()
+        if cancel_event is not None and cancel_event.is_set():
+            raise ProviderCallCancelledError("Provider call cancelled")
+
+    def _sleep_before_retry(self, delay: float) -> None:
+        """Wait between retry attempts, waking early if the call is cancelled."""
+        cancel_event = _call_cancel_event.get()
+        if cancel_event is None:
+            time.sleep(delay)
+        elif cancel_event.wait(delay):
+            raise ProviderCallCancelledError("Provider call cancelled")
+
     @abstractmethod
     def count_tokens(self, text: str, model_name: str) -> int:
         """Count tokens for the given text using the specified model's tokenizer."""
@@ -346,6 +416,13 @@ class ModelProvider(ABC):
         Returns:
             Resolved model name
         """
+        # Names compiled into the registry's routing table resolve without scanning
+        from .registry import ModelProviderRegistry
+
+        route = ModelProviderRegistry.get_compiled_route(model_name)
+        if route is not None and route.provider is self:
+            return route.model_name
+
         # Get model configurations from the hook method
         model_configs = self.get_model_configurations()
 
@@ -3,11 +3,11 @@
 import logging
 import os
 import threading
-import time
 from typing import Optional
 
 from .base import (
     ModelCapabilities,
+    ModelProvider,
     ModelResponse,
     ProviderType,
     create_temperature_constraint,
@@ -26,6 +26,9 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
     FRIENDLY_NAME = "DIAL"
 
+    # Deployment routing uses per-deployment sync clients, so async calls go through the executor
+    SUPPORTS_NATIVE_ASYNC = False
+
     # Retry configuration for API calls
     MAX_RETRIES = 4
     RETRY_DELAYS = [1, 3, 5, 8]  # seconds
@@ -237,6 +240,8 @@ class DIALModelProvider(OpenAICompatibleProvider):
         # Create a SINGLE shared httpx client for the provider instance
         import httpx
 
+        from .http_pool import get_pool_limits, http2_enabled
+
         # Create custom event hooks to remove Authorization header
         def remove_auth_header(request):
             """Remove Authorization header that OpenAI client adds."""
@@ -254,11 +259,8 @@ class DIALModelProvider(OpenAICompatibleProvider):
             verify=True,
             follow_redirects=True,
             headers=self.DEFAULT_HEADERS.copy(),  # Include DIAL headers including Api-Key
-            limits=httpx.Limits(
-                max_keepalive_connections=5,
-                max_connections=10,
-                keepalive_expiry=30.0,
-            ),
+            limits=get_pool_limits(),
+            http2=http2_enabled(),
             event_hooks={"request": [remove_auth_header]},
         )
 
@@ -370,6 +372,10 @@ class DIALModelProvider(OpenAICompatibleProvider):
 
         return self._deployment_clients[deployment]
 
+    async def agenerate_content(self, prompt: str, model_name: str, **kwargs) -> ModelResponse:
+        """Async generation runs the deployment-routed sync path on the provider executor."""
+        return await ModelProvider.agenerate_content(self, prompt, model_name, **kwargs)
+
     def generate_content(
         self,
         prompt: str,
@@ -391,11 +397,13 @@ class DIALModelProvider(OpenAICompatibleProvider):
             system_prompt: Optional system prompt
             temperature: Sampling temperature
             max_output_tokens: Maximum tokens to generate
-            **kwargs: Additional provider-specific parameters
+            **kwargs: Additional provider-specific parameters (stream_callback streams text deltas)
 
         Returns:
             ModelResponse with generated content and metadata
         """
+        stream_callback = kwargs.pop("stream_callback", None)
+
         # Validate model name against allow-list
         if not self.validate_model_name(model_name):
             raise ValueError(f"Model '{model_name}' not in allowed models list. Allowed models: {self.allowed_models}")
@@ -458,17 +466,30 @@ class DIALModelProvider(OpenAICompatibleProvider):
                     continue
                 completion_params[key] = value
 
+        streaming = self._enable_streaming(completion_params, stream_callback)
+
         # DIAL-specific: Get cached client for deployment endpoint
         deployment_client = self._get_deployment_client(resolved_model)
 
         # Retry logic with progressive delays
         last_exception = None
+        max_retries = self._get_retry_attempts()
 
-        for attempt in range(self.MAX_RETRIES):
+        for attempt in range(max_retries):
+            self._raise_if_cancelled()
+            stream_state = self._new_stream_state()
             try:
                 # Generate completion using deployment-specific client
                 response = deployment_client.chat.completions.create(**completion_params)
 
+                if streaming:
+                    for chunk in response:
+                        self._raise_if_cancelled()
+                        text = self._apply_stream_chunk(stream_state, chunk)
+                        if text and stream_callback:
+                            stream_callback(text)
+                    return self._build_streamed_response(stream_state, model_name)
+
                 # Extract content and usage
                 content = response.choices[0].message.content
                 usage = self._extract_usage(response)
@@ -493,23 +514,19 @@ class DIALModelProvider(OpenAICompatibleProvider):
                 # Check if this is a retryable error
                 is_retryable = self._is_error_retryable(e)
 
-                if not is_retryable:
-                    # Non-retryable error, raise immediately
+                if not is_retryable or stream_state["parts"]:
+                    # Non-retryable error (or text already streamed), raise immediately
                     raise ValueError(f"DIAL API error for model {model_name}: {str(e)}")
 
                 # If this isn't the last attempt and error is retryable, wait and retry
-                if attempt < self.MAX_RETRIES - 1:
+                if attempt < max_retries - 1:
                     delay = self.RETRY_DELAYS[attempt]
-                    logger.info(
-                        f"DIAL API error (attempt {attempt + 1}/{self.MAX_RETRIES}), retrying in {delay}s: {str(e)}"
-                    )
-                    time.sleep(delay)
+                    logger.info(f"DIAL API error (attempt {attempt + 1}/{max_retries}), retrying in {delay}s: {str(e)}")
+                    self._sleep_before_retry(delay)
                     continue
 
         # All retries exhausted
-        raise ValueError(
-            f"DIAL API error for model {model_name} after {self.MAX_RETRIES} attempts: {str(last_exception)}"
-        )
+        raise ValueError(f"DIAL API error for model {model_name} after {max_retries} attempts: {str(last_exception)}")
 
     def _supports_vision(self, model_name: str) -> bool:
         """Check if the model supports vision (image processing).
@@ -545,11 +562,7 @@ class DIALModelProvider(OpenAICompatibleProvider):
             except Exception as e:
                 logger.warning(f"Error closing shared HTTP client: {e}")
 
-        # Also close the client created by the superclass (OpenAICompatibleProvider)
-        # as it holds its own httpx.Client instance that is not used by DIAL's generate_content
-        if hasattr(self, "client") and self.client and hasattr(self.client, "close"):
-            try:
-                self.client.close()
-                logger.debug("Closed superclass's OpenAI client")
-            except Exception as e:
-                logger.warning(f"Error closing superclass's OpenAI client: {e}")
+        # Drop the client created by the superclass (OpenAICompatibleProvider) without
+        # closing it: its transport is the process-wide pooled client from http_pool,
+        # shared with every other provider talking to the same endpoint
+        self._client = None
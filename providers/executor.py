@@ -0,0 +1,209 @@
+"""Async execution layer for blocking provider calls.
+
+Provider ``generate_content`` implementations are synchronous (HTTP SDK calls
+plus retry back-off). Calling them straight from an ``async`` tool handler
+freezes the whole stdio server until the model answers, so tools dispatch them
+through ``ProviderExecutor`` instead:
+
+- calls run on a bounded, shared thread pool (``PROVIDER_MAX_WORKERS``)
+- each provider has its own concurrency limit (``PROVIDER_CONCURRENCY_LIMIT``);
+  calls beyond the limit wait on the event loop instead of holding a thread
+- retries happen on the event loop with ``asyncio.sleep`` back-off, the
+  worker thread only makes a single attempt
+- cancelling the awaiting task drops calls that have not started yet and
+  signals running calls to abort at their next checkpoint
+
+Providers that set ``SUPPORTS_NATIVE_ASYNC`` (the OpenAI-compatible family)
+skip the thread pool entirely: their ``agenerate_content`` awaits an async
+HTTP client and only borrows the per-provider concurrency slot.
+"""
+
+import asyncio
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from .base import (
+    ModelProvider,
+    ModelResponse,
+    ProviderCallCancelledError,
+    _call_cancel_event,
+    _executor_owns_retries,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderExecutor:
+    """Runs provider calls off the event loop with bounded concurrency."""
+
+    def __init__(self, max_workers: Optional[int] = None, per_provider_limit: Optional[int] = None):
+        from config import PROVIDER_CONCURRENCY_LIMIT, PROVIDER_MAX_WORKERS
+
+        self.max_workers = max(1, max_workers or PROVIDER_MAX_WORKERS)
+        self.per_provider_limit = max(1, per_provider_limit or PROVIDER_CONCURRENCY_LIMIT)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="provider-call")
+        # asyncio.Semaphore binds to the loop it is first used on, so keep one set per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Any, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def provider_slot(self, provider) -> asyncio.Semaphore:
+        """Get the concurrency-limiting semaphore for a provider on the running loop."""
+        loop = asyncio.get_running_loop()
+        try:
+            key = provider.get_provider_type()
+        except Exception:
+            key = type(provider).__name__
+
+        with self._lock:
+            loop_semaphores = self._semaphores.setdefault(loop, {})
+            if key not in loop_semaphores:
+                loop_semaphores[key] = asyncio.Semaphore(self.per_provider_limit)
+            return loop_semaphores[key]
+
+    @staticmethod
+    def _run_single_attempt(provider, cancel_event: threading.Event, kwargs: dict) -> ModelResponse:
+        """Worker-thread entry point: one provider attempt with cancellation wired in."""
+        retries_token = _executor_owns_retries.set(True)
+        cancel_token = _call_cancel_event.set(cancel_event)
+        try:
+            if cancel_event.is_set():
+                raise ProviderCallCancelledError("Provider call cancelled")
+            return provider.generate_content(**kwargs)
+        finally:
+            _call_cancel_event.reset(cancel_token)
+            _executor_owns_retries.reset(retries_token)
+
+    @staticmethod
+    def _retry_policy(provider) -> tuple[int, list[float]]:
+        """Attempts and back-off delays for a provider (mocks and foreign objects get one attempt)."""
+        max_retries = getattr(provider, "MAX_RETRIES", None)
+        retry_delays = getattr(provider, "RETRY_DELAYS", None)
+        if not isinstance(provider, ModelProvider) or not isinstance(max_retries, int) or not retry_delays:
+            return 1, []
+        return max_retries, list(retry_delays)
+
+    @staticmethod
+    def _is_retryable(provider, error: Exception) -> bool:
+        """Check retryability against the underlying API error, not the provider's wrapper."""
+        check = getattr(type(provider), "_is_error_retryable", None)
+        if check is None:
+            return False
+        root_error = error.__cause__ or error
+        try:
+            return check(provider, root_error) is True
+        except Exception:
+            return False
+
+    async def generate_content(self, provider, **kwargs) -> ModelResponse:
+        """Generate content without blocking the event loop.
+
+        Uses the provider's native async path when it has one, otherwise runs
+        provider.generate_content on the thread pool.
+
+        Args:
+            provider: Provider instance to call
+            **kwargs: Arguments forwarded to the provider
+
+        Returns:
+            ModelResponse from the provider
+        """
+        if isinstance(provider, ModelProvider) and getattr(type(provider), "SUPPORTS_NATIVE_ASYNC", False) is True:
+            return await provider.agenerate_content(**kwargs)
+        return await self.run_blocking(provider, **kwargs)
+
+    async def run_blocking(self, provider, **kwargs) -> ModelResponse:
+        """Run provider.generate_content(**kwargs) on the thread pool.
+
+        A stream_callback in kwargs is re-dispatched onto the event loop, so
+        it is always called on the loop thread even though the provider runs
+        in a worker.
+
+        Args:
+            provider: Provider instance to call
+            **kwargs: Arguments forwarded to provider.generate_content
+
+        Returns:
+            ModelResponse from the provider
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self.provider_slot(provider)
+        max_retries, retry_delays = self._retry_policy(provider)
+        model_name = kwargs.get("model_name", "unknown")
+        last_exception = None
+
+        streamed = False
+        stream_callback = kwargs.get("stream_callback")
+        if stream_callback is not None:
+
+            def forward_chunk(text: str) -> None:
+                nonlocal streamed
+                streamed = True
+                loop.call_soon_threadsafe(stream_callback, text)
+
+            kwargs = {**kwargs, "stream_callback": forward_chunk}
+
+        for attempt in range(max_retries):
+            cancel_event = threading.Event()
+            try:
+                async with semaphore:
+                    return await loop.run_in_executor(
+                        self._pool, self._run_single_attempt, provider, cancel_event, kwargs
+                    )
+            except asyncio.CancelledError:
+                # Queued work is dropped by the future's cancellation; running work sees the event
+                cancel_event.set()
+                raise
+            except Exception as e:
+                last_exception = e
+
+                # Never retry once text has been streamed to the caller
+                if attempt == max_retries - 1 or not self._is_retryable(provider, e) or streamed:
+                    break
+
+                delay = retry_delays[min(attempt, len(retry_delays) - 1)]
+                logger.warning(
+                    f"Provider call for model {model_name} failed, attempt {attempt + 1}/{max_retries}: {e}. "
+                    f"Retrying in {delay}s..."
+                )
+                await asyncio.sleep(delay)
+
+        if attempt == 0:
+            # Single attempt: surface the provider's own error unchanged
+            raise last_exception
+
+        root_error = last_exception.__cause__ or last_exception
+        error_msg = f"Provider API error for model {model_name} after {attempt + 1} attempts: {root_error}"
+        logger.error(error_msg)
+        raise RuntimeError(error_msg) from root_error
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop accepting work and release the worker threads."""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[ProviderExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_provider_executor() -> ProviderExecutor:
+    """Get the process-wide provider executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProviderExecutor()
+    return _executor
+
+
+def shutdown_provider_executor(wait: bool = False) -> None:
+    """Shut down the process-wide provider executor (used on server shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
@@ -3,7 +3,6 @@
 import base64
 import logging
 import os
-import time
 from typing import Optional
 
 from google import genai
@@ -158,7 +157,13 @@ class GeminiModelProvider(ModelProvider):
         images: Optional[list[str]] = None,
         **kwargs,
     ) -> ModelResponse:
-        """Generate content using Gemini model."""
+        """Generate content using Gemini model.
+
+        Pass stream_callback(text) to stream; it receives each text delta and the
+        full response is still returned at the end.
+        """
+        stream_callback = kwargs.pop("stream_callback", None)
+
         # Validate parameters
         resolved_name = self._resolve_model_name(model_name)
         self.validate_parameters(model_name, temperature)
@@ -256,25 +261,44 @@ class GeminiModelProvider(ModelProvider):
                 generation_config.thinking_config = types.ThinkingConfig(thinking_budget=actual_thinking_budget)
 
         # Retry logic with progressive delays
-        max_retries = 4  # Total of 4 attempts
-        retry_delays = [1, 3, 5, 8]  # Progressive delays: 1s, 3s, 5s, 8s
+        max_retries = self._get_retry_attempts()
+        retry_delays = self.RETRY_DELAYS
 
         last_exception = None
 
         for attempt in range(max_retries):
+            self._raise_if_cancelled()
+            streamed_parts = []
             try:
-                # Generate content
-                response = self.client.models.generate_content(
-                    model=resolved_name,
-                    contents=contents,
-                    config=generation_config,
-                )
+                if stream_callback is not None:
+                    response = None
+                    for chunk in self.client.models.generate_content_stream(
+                        model=resolved_name,
+                        contents=contents,
+                        config=generation_config,
+                    ):
+                        self._raise_if_cancelled()
+                        # Usage and finish reason arrive on the last chunk
+                        response = chunk
+                        text = chunk.text
+                        if text:
+                            streamed_parts.append(text)
+                            stream_callback(text)
+                    content = "".join(streamed_parts)
+                else:
+                    # Generate content
+                    response = self.client.models.generate_content(
+                        model=resolved_name,
+                        contents=contents,
+                        config=generation_config,
+                    )
+                    content = response.text
 
                 # Extract usage information if available
-                usage = self._extract_usage(response)
+                usage = self._extract_usage(response) if response is not None else {}
 
                 return ModelResponse(
-                    content=response.text,
+                    content=content,
                     usage=usage,
                     model_name=resolved_name,
                     friendly_name="Gemini",
@@ -282,8 +306,11 @@ class GeminiModelProvider(ModelProvider):
                     metadata={
                         "thinking_mode": thinking_mode if capabilities.supports_extended_thinking else None,
                         "finish_reason": (
-                            getattr(response.candidates[0], "finish_reason", "STOP") if response.candidates else "STOP"
+                            getattr(response.candidates[0], "finish_reason", "STOP")
+                            if response is not None and response.candidates
+                            else "STOP"
                         ),
+                        "streamed": stream_callback is not None,
                     },
                 )
 
@@ -293,8 +320,9 @@ class GeminiModelProvider(ModelProvider):
                 # Check if this is a retryable error using structured error codes
                 is_retryable = self._is_error_retryable(e)
 
-                # If this is the last attempt or not retryable, give up
-                if attempt == max_retries - 1 or not is_retryable:
+                # If this is the last attempt or not retryable, give up.
+                # Never retry once text has been streamed to the caller.
+                if attempt == max_retries - 1 or not is_retryable or streamed_parts:
                     break
 
                 # Get progressive delay
@@ -304,7 +332,7 @@ class GeminiModelProvider(ModelProvider):
                 logger.warning(
                     f"Gemini API error for model {resolved_name}, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay}s..."
                 )
-                time.sleep(delay)
+                self._sleep_before_retry(delay)
 
         # If we get here, all retries failed
         actual_attempts = attempt + 1  # Convert from 0-based index to human-readable count
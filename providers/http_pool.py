@@ -0,0 +1,143 @@
+"""Shared HTTP connection pools for OpenAI-compatible providers.
+
+Every provider used to build its own ``httpx.Client`` on first use, so each
+provider instance paid its own TLS handshakes and nothing tuned keep-alive.
+This module hands out one pooled client per base URL (and timeout profile):
+
+- sync ``httpx.Client`` instances are process-wide
+- async ``httpx.AsyncClient`` instances are per event loop, because their
+  connections are bound to the loop that opened them
+- pool sizes come from ``PROVIDER_MAX_CONNECTIONS`` and friends
+- HTTP/2 is offered when ``PROVIDER_HTTP2`` is on and the optional ``h2``
+  package is installed; the endpoint still decides via ALPN
+"""
+
+import logging
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Proxy variables are stripped while clients are built, matching the historic
+# provider behaviour (httpx would otherwise route model traffic through them)
+PROXY_ENV_VARS = ["HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"]
+
+_lock = threading.Lock()
+_sync_clients: dict[tuple, httpx.Client] = {}
+_async_clients: "weakref.WeakKeyDictionary[object, dict[tuple, httpx.AsyncClient]]" = weakref.WeakKeyDictionary()
+
+
+def http2_enabled() -> bool:
+    """Whether pooled clients should offer HTTP/2."""
+    from config import PROVIDER_HTTP2
+
+    if not PROVIDER_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_pool_limits() -> httpx.Limits:
+    """Connection pool limits shared by all provider clients."""
+    from config import PROVIDER_KEEPALIVE_EXPIRY, PROVIDER_MAX_CONNECTIONS, PROVIDER_MAX_KEEPALIVE_CONNECTIONS
+
+    return httpx.Limits(
+        max_connections=PROVIDER_MAX_CONNECTIONS,
+        max_keepalive_connections=PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY,
+    )
+
+
+@contextmanager
+def without_proxy_env():
+    """Temporarily remove proxy environment variables while building a client."""
+    original_env = {var: os.environ.pop(var) for var in PROXY_ENV_VARS if var in os.environ}
+    try:
+        yield
+    finally:
+        os.environ.update(original_env)
+
+
+def _pool_key(base_url: Optional[str], timeout: httpx.Timeout) -> tuple:
+    """Pool identity: one pool per endpoint and timeout profile."""
+    return (base_url or "default", timeout.connect, timeout.read, timeout.write, timeout.pool)
+
+
+def get_http_client(base_url: Optional[str], timeout: httpx.Timeout) -> httpx.Client:
+    """Get the shared sync client for an endpoint, creating it on first use.
+
+    Args:
+        base_url: Provider base URL (None for the SDK default endpoint)
+        timeout: Timeout profile for the endpoint
+
+    Returns:
+        Pooled httpx.Client shared by every provider talking to base_url
+    """
+    key = _pool_key(base_url, timeout)
+    with _lock:
+        client = _sync_clients.get(key)
+        if client is None or client.is_closed:
+            with without_proxy_env():
+                client = httpx.Client(
+                    timeout=timeout,
+                    follow_redirects=True,
+                    limits=get_pool_limits(),
+                    http2=http2_enabled(),
+                )
+            _sync_clients[key] = client
+            logger.debug(f"Created pooled HTTP client for {key[0]} (http2={http2_enabled()})")
+        return client
+
+
+def get_async_http_client(base_url: Optional[str], timeout: httpx.Timeout) -> httpx.AsyncClient:
+    """Get the shared async client for an endpoint on the running event loop.
+
+    Args:
+        base_url: Provider base URL (None for the SDK default endpoint)
+        timeout: Timeout profile for the endpoint
+
+    Returns:
+        Pooled httpx.AsyncClient shared by every provider talking to base_url
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    key = _pool_key(base_url, timeout)
+    with _lock:
+        loop_clients = _async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None or client.is_closed:
+            with without_proxy_env():
+                client = httpx.AsyncClient(
+                    timeout=timeout,
+                    follow_redirects=True,
+                    limits=get_pool_limits(),
+                    http2=http2_enabled(),
+                )
+            loop_clients[key] = client
+            logger.debug(f"Created pooled async HTTP client for {key[0]} (http2={http2_enabled()})")
+        return client
+
+
+def close_http_clients() -> None:
+    """Close all pooled sync clients.
+
+    Async pools are not closed here: their connections belong to the event
+    loop that opened them. They are only dropped from the pool, unclosed,
+    once that loop is garbage collected.
+    """
+    with _lock:
+        for client in _sync_clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _sync_clients.clear()
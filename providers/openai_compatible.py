@@ -1,15 +1,16 @@
 """Base class for OpenAI-compatible API providers."""
 
+import asyncio
 import base64
 import ipaddress
 import logging
 import os
-import time
+import weakref
 from abc import abstractmethod
 from typing import Optional
 from urllib.parse import urlparse
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 from .base import (
     ModelCapabilities,
@@ -31,6 +32,13 @@ class OpenAICompatibleProvider(ModelProvider):
     DEFAULT_HEADERS = {}
     FRIENDLY_NAME = "OpenAI Compatible"
 
+    # agenerate_content talks to the API through AsyncOpenAI instead of a worker thread
+    SUPPORTS_NATIVE_ASYNC = True
+
+    # Whether streamed requests may send stream_options={"include_usage": True};
+    # some OpenAI-compatible servers reject the parameter, so it is opt-in
+    SUPPORTS_STREAM_USAGE = False
+
     def __init__(self, api_key: str, base_url: str = None, **kwargs):
         """Initialize the provider with API key and optional base URL.
 
@@ -41,6 +49,8 @@ class OpenAICompatibleProvider(ModelProvider):
         """
         super().__init__(api_key, **kwargs)
         self._client = None
+        # AsyncOpenAI clients are bound to the event loop their pooled connections live on
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
         self.base_url = base_url
         self.organization = kwargs.get("organization")
         self.allowed_models = self._parse_allowed_models()
@@ -193,58 +203,49 @@ class OpenAICompatibleProvider(ModelProvider):
                 raise
             raise ValueError(f"Invalid base URL '{self.base_url}': {str(e)}")
 
-    @property
-    def client(self):
-        """Lazy initialization of OpenAI client with security checks and timeout configuration."""
-        if self._client is None:
-            import os
+    def _build_client_kwargs(self, http_client) -> dict:
+        """Build keyword arguments shared by the sync and async OpenAI clients."""
+        client_kwargs = {
+            "api_key": self.api_key,
+            "http_client": http_client,
+        }
 
-            import httpx
+        if self.base_url:
+            client_kwargs["base_url"] = self.base_url
 
-            # Temporarily disable proxy environment variables to prevent httpx from detecting them
-            original_env = {}
-            proxy_env_vars = ["HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"]
+        if self.organization:
+            client_kwargs["organization"] = self.organization
 
-            for var in proxy_env_vars:
-                if var in os.environ:
-                    original_env[var] = os.environ[var]
-                    del os.environ[var]
+        # Add default headers if any
+        if self.DEFAULT_HEADERS:
+            client_kwargs["default_headers"] = self.DEFAULT_HEADERS.copy()
 
-            try:
-                # Create a custom httpx client that explicitly avoids proxy parameters
-                timeout_config = (
-                    self.timeout_config
-                    if hasattr(self, "timeout_config") and self.timeout_config
-                    else httpx.Timeout(30.0)
-                )
+        return client_kwargs
 
-                # Create httpx client with minimal config to avoid proxy conflicts
-                # Note: proxies parameter was removed in httpx 0.28.0
-                http_client = httpx.Client(
-                    timeout=timeout_config,
-                    follow_redirects=True,
-                )
+    def _get_timeout_config(self):
+        """Timeout profile for this provider's HTTP clients."""
+        import httpx
 
-                # Keep client initialization minimal to avoid proxy parameter conflicts
-                client_kwargs = {
-                    "api_key": self.api_key,
-                    "http_client": http_client,
-                }
+        return self.timeout_config if hasattr(self, "timeout_config") and self.timeout_config else httpx.Timeout(30.0)
 
-                if self.base_url:
-                    client_kwargs["base_url"] = self.base_url
+    @property
+    def client(self):
+        """Lazy initialization of OpenAI client with security checks and timeout configuration.
 
-                if self.organization:
-                    client_kwargs["organization"] = self.organization
+        The underlying httpx client comes from the shared pool for this base URL,
+        so providers pointing at the same endpoint reuse keep-alive connections.
+        """
+        if self._client is None:
+            from .http_pool import get_http_client, without_proxy_env
 
-                # Add default headers if any
-                if self.DEFAULT_HEADERS:
-                    client_kwargs["default_headers"] = self.DEFAULT_HEADERS.copy()
+            try:
+                timeout_config = self._get_timeout_config()
+                http_client = get_http_client(self.base_url, timeout_config)
 
-                logging.debug(f"OpenAI client initialized with custom httpx client and timeout: {timeout_config}")
+                logging.debug(f"OpenAI client initialized with pooled httpx client and timeout: {timeout_config}")
 
-                # Create OpenAI client with custom httpx client
-                self._client = OpenAI(**client_kwargs)
+                # Create OpenAI client with the pooled httpx client
+                self._client = OpenAI(**self._build_client_kwargs(http_client))
 
             except Exception as e:
                 # If all else fails, try absolute minimal client without custom httpx
@@ -253,17 +254,27 @@ class OpenAICompatibleProvider(ModelProvider):
                     minimal_kwargs = {"api_key": self.api_key}
                     if self.base_url:
                         minimal_kwargs["base_url"] = self.base_url
-                    self._client = OpenAI(**minimal_kwargs)
+                    with without_proxy_env():
+                        self._client = OpenAI(**minimal_kwargs)
                 except Exception as fallback_error:
                     logging.error(f"Even minimal OpenAI client creation failed: {fallback_error}")
                     raise
-            finally:
-                # Restore original proxy environment variables
-                for var, value in original_env.items():
-                    os.environ[var] = value
 
         return self._client
 
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client for the running event loop, backed by the shared async pool."""
+        from .http_pool import get_async_http_client
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            http_client = get_async_http_client(self.base_url, self._get_timeout_config())
+            client = AsyncOpenAI(**self._build_client_kwargs(http_client))
+            self._async_clients[loop] = client
+        return client
+
     def _generate_with_responses_endpoint(
         self,
         model_name: str,
@@ -306,11 +317,12 @@ class OpenAICompatibleProvider(ModelProvider):
         # Remove unsupported chat completion parameters that may cause API errors
 
         # Retry logic with progressive delays
-        max_retries = 4
-        retry_delays = [1, 3, 5, 8]
+        max_retries = self._get_retry_attempts()
+        retry_delays = self.RETRY_DELAYS
         last_exception = None
 
         for attempt in range(max_retries):
+            self._raise_if_cancelled()
             try:  # Log the exact payload being sent for debugging
                 import json
 
@@ -373,7 +385,7 @@ class OpenAICompatibleProvider(ModelProvider):
                     logging.warning(
                         f"Retryable error for o3-pro responses endpoint, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay}s..."
                     )
-                    time.sleep(delay)
+                    self._sleep_before_retry(delay)
                 else:
                     break
 
@@ -401,11 +413,99 @@ class OpenAICompatibleProvider(ModelProvider):
             system_prompt: Optional system prompt for model behavior
             temperature: Sampling temperature
             max_output_tokens: Maximum tokens to generate
-            **kwargs: Additional provider-specific parameters
+            **kwargs: Additional provider-specific parameters. Pass stream=True or a
+                stream_callback(text) to stream; the callback receives each text delta
+                and the full response is still returned at the end.
 
         Returns:
             ModelResponse with generated content and metadata
         """
+        stream_callback = kwargs.pop("stream_callback", None)
+
+        completion_params, messages, resolved_model = self._prepare_completion_request(
+            prompt, model_name, system_prompt, temperature, max_output_tokens, images, **kwargs
+        )
+
+        # Check if this is o3-pro and needs the responses endpoint
+        if resolved_model == "o3-pro-2025-06-10":
+            # This model requires the /v1/responses endpoint
+            # If it fails, we should not fall back to chat/completions
+            return self._generate_with_responses_endpoint(
+                model_name=resolved_model,
+                messages=messages,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                **kwargs,
+            )
+
+        streaming = self._enable_streaming(completion_params, stream_callback)
+
+        # Retry logic with progressive delays
+        max_retries = self._get_retry_attempts()
+        retry_delays = self.RETRY_DELAYS
+
+        last_exception = None
+
+        for attempt in range(max_retries):
+            self._raise_if_cancelled()
+            stream_state = self._new_stream_state()
+            try:
+                # Generate completion
+                response = self.client.chat.completions.create(**completion_params)
+
+                if streaming:
+                    for chunk in response:
+                        self._raise_if_cancelled()
+                        text = self._apply_stream_chunk(stream_state, chunk)
+                        if text and stream_callback:
+                            stream_callback(text)
+                    return self._build_streamed_response(stream_state, model_name)
+
+                return self._build_chat_response(response, model_name)
+
+            except Exception as e:
+                last_exception = e
+
+                # Check if this is a retryable error using structured error codes
+                is_retryable = self._is_error_retryable(e)
+
+                # If this is the last attempt or not retryable, give up.
+                # Never retry once text has been streamed to the caller.
+                if attempt == max_retries - 1 or not is_retryable or stream_state["parts"]:
+                    break
+
+                # Get progressive delay
+                delay = retry_delays[attempt]
+
+                # Log retry attempt
+                logging.warning(
+                    f"{self.FRIENDLY_NAME} error for model {model_name}, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay}s..."
+                )
+                self._sleep_before_retry(delay)
+
+        # If we get here, all retries failed
+        actual_attempts = attempt + 1  # Convert from 0-based index to human-readable count
+        error_msg = f"{self.FRIENDLY_NAME} API error for model {model_name} after {actual_attempts} attempt{'s' if actual_attempts > 1 else ''}: {str(last_exception)}"
+        logging.error(error_msg)
+        raise RuntimeError(error_msg) from last_exception
+
+    def _prepare_completion_request(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_output_tokens: Optional[int],
+        images: Optional[list[str]],
+        **kwargs,
+    ) -> tuple[dict, list, str]:
+        """Validate inputs and build chat completion parameters.
+
+        Shared by generate_content and agenerate_content.
+
+        Returns:
+            Tuple of (completion_params, messages, resolved_model)
+        """
         # Validate model name against allow-list
         if not self.validate_model_name(model_name):
             raise ValueError(f"Model '{model_name}' not in allowed models list. Allowed models: {self.allowed_models}")
@@ -480,68 +580,180 @@ class OpenAICompatibleProvider(ModelProvider):
                     continue  # Skip unsupported parameters for reasoning models
                 completion_params[key] = value
 
-        # Check if this is o3-pro and needs the responses endpoint
+        return completion_params, messages, resolved_model
+
+    def _enable_streaming(self, completion_params: dict, stream_callback) -> bool:
+        """Switch the request to streaming when asked for via stream=True or a stream_callback.
+
+        Returns:
+            True if the response must be consumed as a chunk stream
+        """
+        if stream_callback is not None:
+            completion_params["stream"] = True
+        if completion_params.get("stream"):
+            if self.SUPPORTS_STREAM_USAGE:
+                # Ask for a final usage chunk so the assembled ModelResponse keeps token counts
+                completion_params["stream_options"] = {"include_usage": True}
+            return True
+        return False
+
+    @staticmethod
+    def _new_stream_state() -> dict:
+        """Accumulator for one streamed chat completion."""
+        return {"parts": [], "usage": {}, "finish_reason": None, "model": None, "id": "", "created": 0}
+
+    def _apply_stream_chunk(self, state: dict, chunk) -> str:
+        """Fold one streamed chunk into state.
+
+        Returns:
+            The text delta carried by the chunk (may be empty)
+        """
+        if getattr(chunk, "usage", None):
+            state["usage"] = self._extract_usage(chunk)
+        if state["model"] is None:
+            state["model"] = getattr(chunk, "model", None)
+            state["id"] = getattr(chunk, "id", "")
+            state["created"] = getattr(chunk, "created", 0)
+
+        if not getattr(chunk, "choices", None):
+            return ""
+
+        choice = chunk.choices[0]
+        if getattr(choice, "finish_reason", None):
+            state["finish_reason"] = choice.finish_reason
+
+        delta = getattr(choice, "delta", None)
+        text = getattr(delta, "content", None) or ""
+        if text:
+            state["parts"].append(text)
+        return text
+
+    def _build_streamed_response(self, state: dict, model_name: str) -> ModelResponse:
+        """Assemble the full ModelResponse once a stream has been consumed."""
+        return ModelResponse(
+            content="".join(state["parts"]),
+            usage=state["usage"],
+            model_name=model_name,
+            friendly_name=self.FRIENDLY_NAME,
+            provider=self.get_provider_type(),
+            metadata={
+                "finish_reason": state["finish_reason"],
+                "model": state["model"] or model_name,
+                "id": state["id"],
+                "created": state["created"],
+                "streamed": True,
+            },
+        )
+
+    def _build_chat_response(self, response, model_name: str) -> ModelResponse:
+        """Convert a chat completion response into a ModelResponse."""
+        # Extract content and usage
+        content = response.choices[0].message.content
+        usage = self._extract_usage(response)
+
+        return ModelResponse(
+            content=content,
+            usage=usage,
+            model_name=model_name,
+            friendly_name=self.FRIENDLY_NAME,
+            provider=self.get_provider_type(),
+            metadata={
+                "finish_reason": response.choices[0].finish_reason,
+                "model": response.model,  # Actual model used
+                "id": response.id,
+                "created": response.created,
+            },
+        )
+
+    async def agenerate_content(
+        self,
+        prompt: str,
+        model_name: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_output_tokens: Optional[int] = None,
+        images: Optional[list[str]] = None,
+        **kwargs,
+    ) -> ModelResponse:
+        """Generate content with the native async client.
+
+        Uses the shared async connection pool for this base URL. Retries back
+        off with asyncio.sleep and cancelling the awaiting task aborts the
+        in-flight HTTP request. Passing stream_callback(text) streams the
+        response, calling it with each text delta on the event loop.
+
+        Args:
+            prompt: User prompt to send to the model
+            model_name: Name of the model (or alias) to use
+            system_prompt: Optional system prompt for model behavior
+            temperature: Sampling temperature
+            max_output_tokens: Maximum tokens to generate
+            **kwargs: Additional provider-specific parameters
+
+        Returns:
+            ModelResponse with generated content and metadata
+        """
+        from .executor import get_provider_executor
+
+        # Subclasses resolve aliases in generate_content before calling up; do the same here
+        model_name = self._resolve_model_name(model_name)
+
+        stream_callback = kwargs.pop("stream_callback", None)
+
+        completion_params, messages, resolved_model = self._prepare_completion_request(
+            prompt, model_name, system_prompt, temperature, max_output_tokens, images, **kwargs
+        )
+
         if resolved_model == "o3-pro-2025-06-10":
-            # This model requires the /v1/responses endpoint
-            # If it fails, we should not fall back to chat/completions
-            return self._generate_with_responses_endpoint(
-                model_name=resolved_model,
-                messages=messages,
+            # The /v1/responses endpoint stays on the blocking path (and does not stream)
+            return await get_provider_executor().run_blocking(
+                self,
+                prompt=prompt,
+                model_name=model_name,
+                system_prompt=system_prompt,
                 temperature=temperature,
                 max_output_tokens=max_output_tokens,
+                images=images,
                 **kwargs,
             )
 
-        # Retry logic with progressive delays
-        max_retries = 4  # Total of 4 attempts
-        retry_delays = [1, 3, 5, 8]  # Progressive delays: 1s, 3s, 5s, 8s
+        streaming = self._enable_streaming(completion_params, stream_callback)
 
+        executor = get_provider_executor()
+        max_retries = self.MAX_RETRIES
         last_exception = None
 
         for attempt in range(max_retries):
+            stream_state = self._new_stream_state()
             try:
-                # Generate completion
-                response = self.client.chat.completions.create(**completion_params)
+                async with executor.provider_slot(self):
+                    response = await self.async_client.chat.completions.create(**completion_params)
 
-                # Extract content and usage
-                content = response.choices[0].message.content
-                usage = self._extract_usage(response)
+                    if streaming:
+                        async for chunk in response:
+                            text = self._apply_stream_chunk(stream_state, chunk)
+                            if text and stream_callback:
+                                stream_callback(text)
+                        return self._build_streamed_response(stream_state, model_name)
 
-                return ModelResponse(
-                    content=content,
-                    usage=usage,
-                    model_name=model_name,
-                    friendly_name=self.FRIENDLY_NAME,
-                    provider=self.get_provider_type(),
-                    metadata={
-                        "finish_reason": response.choices[0].finish_reason,
-                        "model": response.model,  # Actual model used
-                        "id": response.id,
-                        "created": response.created,
-                    },
-                )
+                return self._build_chat_response(response, model_name)
 
             except Exception as e:
                 last_exception = e
 
-                # Check if this is a retryable error using structured error codes
-                is_retryable = self._is_error_retryable(e)
-
-                # If this is the last attempt or not retryable, give up
-                if attempt == max_retries - 1 or not is_retryable:
+                # If this is the last attempt or not retryable, give up.
+                # Never retry once text has been streamed to the caller.
+                if attempt == max_retries - 1 or not self._is_error_retryable(e) or stream_state["parts"]:
                     break
 
-                # Get progressive delay
-                delay = retry_delays[attempt]
-
-                # Log retry attempt
+                delay = self.RETRY_DELAYS[attempt]
                 logging.warning(
                     f"{self.FRIENDLY_NAME} error for model {model_name}, attempt {attempt + 1}/{max_retries}: {str(e)}. Retrying in {delay}s..."
                 )
-                time.sleep(delay)
+                await asyncio.sleep(delay)
 
         # If we get here, all retries failed
-        actual_attempts = attempt + 1  # Convert from 0-based index to human-readable count
+        actual_attempts = attempt + 1
         error_msg = f"{self.FRIENDLY_NAME} API error for model {model_name} after {actual_attempts} attempt{'s' if actual_attempts > 1 else ''}: {str(last_exception)}"
         logging.error(error_msg)
         raise RuntimeError(error_msg) from last_exception
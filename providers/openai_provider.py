@@ -17,6 +17,9 @@ logger = logging.getLogger(__name__)
 class OpenAIModelProvider(OpenAICompatibleProvider):
     """Official OpenAI API provider (api.openai.com)."""
 
+    # api.openai.com reports usage at the end of a stream when asked to
+    SUPPORTS_STREAM_USAGE = True
+
     # Model configurations using ModelCapabilities objects
     SUPPORTED_MODELS = {
         "o3": ModelCapabilities(
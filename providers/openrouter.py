@@ -23,6 +23,9 @@ class OpenRouterProvider(OpenAICompatibleProvider):
 
     FRIENDLY_NAME = "OpenRouter"
 
+    # OpenRouter accepts stream_options and reports usage in the final chunk
+    SUPPORTS_STREAM_USAGE = True
+
     # Custom headers required by OpenRouter
     DEFAULT_HEADERS = {
         "HTTP-Referer": os.getenv("OPENROUTER_REFERER", "https://github.com/BeehiveInnovations/xtool_mcp_server"),
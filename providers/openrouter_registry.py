@@ -25,6 +25,7 @@ class OpenRouterModelRegistry:
         """
         self.alias_map: dict[str, str] = {}  # alias -> model_name
         self.model_map: dict[str, ModelCapabilities] = {}  # model_name -> config
+        self._loaded = False
 
         # Determine config path
         if config_path:
@@ -46,6 +47,13 @@ class OpenRouterModelRegistry:
 
     def reload(self) -> None:
         """Reload configuration from disk."""
+        if self._loaded:
+            # Routes compiled from the previous configuration are stale now
+            from .registry import ModelProviderRegistry
+
+            ModelProviderRegistry.invalidate_routing_table()
+        self._loaded = True
+
         try:
             configs = self._read_config()
             self._build_maps(configs)
@@ -2,19 +2,39 @@
 
 import logging
 import os
+import threading
 from typing import TYPE_CHECKING, Optional
 
 from .base import ModelProvider, ProviderType
+from .routing import ModelRoute, ModelRoutingTable
 
 if TYPE_CHECKING:
     from tools.models import ToolModelCategory
 
 
 class ModelProviderRegistry:
-    """Registry for managing model providers."""
+    """Registry for managing model providers.
+
+    Once build_routing_table() has been called (configure_providers does so at
+    startup), model resolution, the available model map and the auto mode
+    fallback choices are answered from a precompiled ModelRoutingTable. The
+    table is dropped whenever providers are registered, removed or recreated
+    or the OpenRouter model registry reloads, recompiled when the restriction
+    service is replaced, and rebuilt lazily on next use.
+    """
 
     _instance = None
 
+    # Provider priority order: native APIs first, then custom endpoints, then catch-all providers
+    PROVIDER_PRIORITY_ORDER = [
+        ProviderType.GOOGLE,  # Direct Gemini access
+        ProviderType.OPENAI,  # Direct OpenAI access
+        ProviderType.XAI,  # Direct X.AI GROK access
+        ProviderType.DIAL,  # DIAL unified API access
+        ProviderType.CUSTOM,  # Local/self-hosted models
+        ProviderType.OPENROUTER,  # Catch-all for cloud models
+    ]
+
     def __new__(cls):
         """Singleton pattern for registry."""
         if cls._instance is None:
@@ -23,6 +43,11 @@ class ModelProviderRegistry:
             # Initialize instance dictionaries on first creation
             cls._instance._providers = {}
             cls._instance._initialized_providers = {}
+            cls._instance._routing_table = None
+            cls._instance._routing_enabled = False
+            cls._instance._routing_compiling = False
+            cls._instance._routing_lock = threading.RLock()
+            cls._instance._config_version = 0
             logging.debug(f"REGISTRY: Created instance {cls._instance}")
         return cls._instance
 
@@ -36,6 +61,7 @@ class ModelProviderRegistry:
         """
         instance = cls()
         instance._providers[provider_type] = provider_class
+        cls.invalidate_routing_table()
 
     @classmethod
     def get_provider(cls, provider_type: ProviderType, force_new: bool = False) -> Optional[ModelProvider]:
@@ -90,6 +116,8 @@ class ModelProviderRegistry:
 
         # Cache the instance
         instance._initialized_providers[provider_type] = provider
+        if force_new:
+            cls.invalidate_routing_table()
 
         return provider
 
@@ -110,23 +138,27 @@ class ModelProviderRegistry:
         """
         logging.debug(f"get_provider_for_model called with model_name='{model_name}'")
 
-        # Define explicit provider priority order
-        # Native APIs first, then custom endpoints, then catch-all providers
-        PROVIDER_PRIORITY_ORDER = [
-            ProviderType.GOOGLE,  # Direct Gemini access
-            ProviderType.OPENAI,  # Direct OpenAI access
-            ProviderType.XAI,  # Direct X.AI GROK access
-            ProviderType.DIAL,  # DIAL unified API access
-            ProviderType.CUSTOM,  # Local/self-hosted models
-            ProviderType.OPENROUTER,  # Catch-all for cloud models
-        ]
+        table = cls.get_routing_table()
+        if table is None:
+            return cls._find_provider_for_model(model_name)
 
+        found, route = table.lookup(model_name)
+        if not found:
+            # Not a configured name or alias (e.g. a local or OpenRouter catch-all model)
+            provider = cls._find_provider_for_model(model_name)
+            route = cls._make_route(provider, model_name) if provider else None
+            table.remember(model_name, route)
+        return route.provider if route else None
+
+    @classmethod
+    def _find_provider_for_model(cls, model_name: str) -> Optional[ModelProvider]:
+        """Ask each registered provider in priority order whether it accepts model_name."""
         # Check providers in priority order
         instance = cls()
         logging.debug(f"Registry instance: {instance}")
         logging.debug(f"Available providers in registry: {list(instance._providers.keys())}")
 
-        for provider_type in PROVIDER_PRIORITY_ORDER:
+        for provider_type in cls.PROVIDER_PRIORITY_ORDER:
             if provider_type in instance._providers:
                 logging.debug(f"Found {provider_type} in registry")
                 # Get or create provider instance
@@ -158,6 +190,15 @@ class ModelProviderRegistry:
         Returns:
             Dict mapping model names to provider types
         """
+        if respect_restrictions:
+            table = cls.get_routing_table()
+            if table is not None:
+                return dict(table.available_models)
+        return cls._collect_available_models(respect_restrictions)
+
+    @classmethod
+    def _collect_available_models(cls, respect_restrictions: bool) -> dict[str, ProviderType]:
+        """Query every registered provider for its models (see get_available_models)."""
         # Import here to avoid circular imports
         from utils.model_restrictions import get_restriction_service
 
@@ -259,11 +300,20 @@ class ModelProviderRegistry:
         Returns:
             Model name string for fallback use
         """
-        # Import here to avoid circular import
-        from tools.models import ToolModelCategory
+        table = cls.get_routing_table()
+        if table is not None and tool_category in table.fallbacks:
+            return table.fallbacks[tool_category]
 
         # Get available models respecting restrictions
-        available_models = cls.get_available_models(respect_restrictions=True)
+        return cls._select_fallback_model(tool_category, cls.get_available_models(respect_restrictions=True))
+
+    @classmethod
+    def _select_fallback_model(
+        cls, tool_category: Optional["ToolModelCategory"], available_models: dict[str, ProviderType]
+    ) -> str:
+        """Pick the fallback model for a tool category from the available models."""
+        # Import here to avoid circular import
+        from tools.models import ToolModelCategory
 
         # Group by provider
         openai_models = [m for m, p in available_models.items() if p == ProviderType.OPENAI]
@@ -435,11 +485,125 @@ class ModelProviderRegistry:
                 available.append(provider_type)
         return available
 
+    @classmethod
+    def build_routing_table(cls) -> ModelRoutingTable:
+        """Compile the routing table and answer model resolution from it from now on."""
+        instance = cls()
+        with instance._routing_lock:
+            instance._routing_enabled = True
+            instance._routing_table = None
+            return cls.get_routing_table()
+
+    @classmethod
+    def get_routing_table(cls) -> Optional[ModelRoutingTable]:
+        """Current routing table, recompiled if it was invalidated.
+
+        Returns None until build_routing_table() has been called, and while
+        the table is being compiled (lookups then take the dynamic path).
+        """
+        instance = cls()
+        if not instance._routing_enabled:
+            return None
+
+        from utils.model_restrictions import get_restriction_service
+
+        restriction_service = get_restriction_service()
+        table = instance._routing_table
+        if table is not None and table.restriction_service is restriction_service:
+            return table
+
+        with instance._routing_lock:
+            table = instance._routing_table
+            if table is None or table.restriction_service is not restriction_service:
+                if instance._routing_compiling:
+                    return None
+                instance._routing_compiling = True
+                try:
+                    table = cls._compile_routing_table(restriction_service)
+                finally:
+                    instance._routing_compiling = False
+                instance._routing_table = table
+            return table
+
+    @classmethod
+    def invalidate_routing_table(cls) -> None:
+        """Drop the routing table; it is recompiled on next use."""
+        instance = cls()
+        instance._routing_table = None
+        instance._config_version += 1
+
+    @classmethod
+    def get_configuration_version(cls) -> int:
+        """Counter bumped whenever the provider or model configuration changes.
+
+        Restriction changes are not counted; callers caching derived data also
+        compare the restriction service (see ModelRoutingTable).
+        """
+        return cls()._config_version
+
+    @classmethod
+    def get_compiled_route(cls, model_name: str) -> Optional[ModelRoute]:
+        """Route of a name already in the routing table, without compiling or validating."""
+        table = cls()._routing_table
+        if table is None:
+            return None
+        return table.routes.get(model_name.lower())
+
+    @classmethod
+    def _make_route(cls, provider: ModelProvider, model_name: str, capabilities=None) -> ModelRoute:
+        return ModelRoute(
+            provider.get_provider_type(), provider, provider._resolve_model_name(model_name), capabilities
+        )
+
+    @classmethod
+    def _compile_routing_table(cls, restriction_service) -> ModelRoutingTable:
+        """Resolve every configured model name and alias, the available models and fallbacks."""
+        from tools.models import ToolModelCategory
+
+        table = ModelRoutingTable(restriction_service)
+        instance = cls()
+
+        for provider_type in cls.PROVIDER_PRIORITY_ORDER:
+            if provider_type not in instance._providers:
+                continue
+            provider = cls.get_provider(provider_type)
+            if not provider:
+                continue
+
+            configs = provider.get_model_configurations()
+            names = {model_name: model_name for model_name in configs}
+            for model_name, aliases in provider.get_all_model_aliases().items():
+                for alias in aliases:
+                    names.setdefault(alias, model_name)
+
+            for name, model_name in names.items():
+                key = name.lower()
+                if key in table.routes:
+                    continue
+                # Same decision as the dynamic lookup: first provider in priority order that accepts it
+                owner = cls._find_provider_for_model(name)
+                if owner is None:
+                    table.routes[key] = None
+                elif owner is provider:
+                    table.routes[key] = ModelRoute(provider_type, provider, model_name, configs.get(model_name))
+                else:
+                    table.routes[key] = cls._make_route(owner, name)
+
+        table.available_models = cls._collect_available_models(respect_restrictions=True)
+        for tool_category in [None, *ToolModelCategory]:
+            table.fallbacks[tool_category] = cls._select_fallback_model(tool_category, table.available_models)
+
+        logging.debug(
+            f"Compiled model routing table: {len(table.routes)} names, {len(table.available_models)} available models"
+        )
+        return table
+
     @classmethod
     def clear_cache(cls) -> None:
         """Clear cached provider instances."""
         instance = cls()
         instance._initialized_providers.clear()
+        cls.invalidate_routing_table()
 
     @classmethod
     def unregister_provider(cls, provider_type: ProviderType) -> None:
@@ -447,3 +611,4 @@ class ModelProviderRegistry:
         instance = cls()
         instance._providers.pop(provider_type, None)
         instance._initialized_providers.pop(provider_type, None)
+        cls.invalidate_routing_table()
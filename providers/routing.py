@@ -0,0 +1,54 @@
+"""Precompiled model routing table used by ModelProviderRegistry."""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .base import ModelCapabilities, ModelProvider, ProviderType
+
+# Dynamically resolved names (not in any provider's configuration) remembered per table
+MAX_DYNAMIC_ROUTES = 256
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Provider and canonical model a model name or alias routes to."""
+
+    provider_type: ProviderType
+    provider: ModelProvider
+    model_name: str
+    capabilities: Optional[ModelCapabilities] = None
+
+
+@dataclass
+class ModelRoutingTable:
+    """Routing decisions compiled from the registered providers.
+
+    The table is only valid for the restriction service it was compiled
+    with; ModelProviderRegistry recompiles it when the service is replaced
+    and drops it when providers or the OpenRouter registry change.
+    """
+
+    restriction_service: Any
+    # Lowercase model name or alias -> route (None when no provider accepts it)
+    routes: dict[str, Optional[ModelRoute]] = field(default_factory=dict)
+    # Model names and aliases available after restrictions -> provider type
+    available_models: dict[str, ProviderType] = field(default_factory=dict)
+    # Tool category (None for no category) -> preferred fallback model
+    fallbacks: dict[Any, str] = field(default_factory=dict)
+    _dynamic_routes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def lookup(self, model_name: str) -> tuple[bool, Optional[ModelRoute]]:
+        """Return (found, route) for a model name or alias."""
+        key = model_name.lower()
+        route = self.routes.get(key)
+        return route is not None or key in self.routes, route
+
+    def remember(self, model_name: str, route: Optional[ModelRoute]) -> None:
+        """Record the route of a name resolved outside the compiled aliases."""
+        with self._lock:
+            if self._dynamic_routes >= MAX_DYNAMIC_ROUTES:
+                return
+            self._dynamic_routes += 1
+            self.routes.setdefault(model_name.lower(), route)
@@ -54,7 +54,6 @@ from mcp.types import (  # noqa: E402
     ServerCapabilities,
     TextContent,
     Tool,
-    ToolAnnotations,
     ToolsCapability,
 )
 
@@ -85,14 +84,28 @@ from tools import (  # noqa: E402
     XtoolAdvisorTool,
 )
 from tools.models import ToolOutput  # noqa: E402
+from tools.shared.schema_cache import ToolSchemaCache  # noqa: E402
+from utils.logging_pipeline import (  # noqa: E402
+    DebugSamplingFilter,
+    LoggingPipeline,
+    apply_logger_levels,
+    parse_log_levels,
+    parse_sampling_rates,
+)
+from utils.progress import ProgressReporter, progress_reporting  # noqa: E402
 
 # Import monitoring tools directly
 # from tools.workflow_monitor import WorkflowMonitorTool  # noqa: E402
 # from tools.file_optimization_monitor import FileOptimizationMonitorTool  # noqa: E402
 
 # Configure logging for server operations
-# Can be controlled via LOG_LEVEL environment variable (DEBUG, INFO, WARNING, ERROR)
-log_level = os.getenv("LOG_LEVEL", "DEBUG").upper()
+# LOG_LEVEL sets the default level (DEBUG, INFO, WARNING, ERROR); LOG_LEVELS overrides it
+# per subsystem and LOG_DEBUG_SAMPLING thins out chatty DEBUG loggers (see utils.logging_pipeline)
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+root_level = getattr(logging, log_level, logging.INFO)
+subsystem_levels = parse_log_levels(os.getenv("LOG_LEVELS"))
+# Handlers must let through whatever the most verbose configured logger emits
+handler_level = min([root_level, *subsystem_levels.values()])
 
 # Create timezone-aware formatter
 
@@ -118,17 +131,19 @@ root_logger.handlers.clear()
 
 # Create and configure stderr handler explicitly
 stderr_handler = logging.StreamHandler(sys.stderr)
-stderr_handler.setLevel(getattr(logging, log_level, logging.INFO))
+stderr_handler.setLevel(handler_level)
 stderr_handler.setFormatter(LocalTimeFormatter(log_format))
-root_logger.addHandler(stderr_handler)
+log_handlers = [stderr_handler]
 
 # Note: MCP stdio_server interferes with stderr during tool execution
 # All logs are properly written to logs/mcp_server.log for monitoring
 
-# Set root logger level
-root_logger.setLevel(getattr(logging, log_level, logging.INFO))
+# Set root logger level and per-subsystem overrides
+root_logger.setLevel(root_level)
+apply_logger_levels(subsystem_levels)
 
 # Add rotating file handler for local log monitoring
+log_dir = None
 
 try:
     # Create logs directory in project root
@@ -143,11 +158,13 @@ try:
         backupCount=5,  # Keep 10 rotated files (100MB total)
         encoding="utf-8",
     )
-    file_handler.setLevel(getattr(logging, log_level, logging.INFO))
+    file_handler.setLevel(handler_level)
     file_handler.setFormatter(LocalTimeFormatter(log_format))
-    logging.getLogger().addHandler(file_handler)
+    log_handlers.append(file_handler)
 
     # Create a special logger for MCP activity tracking with size-based rotation
+    # Its records reach the pipeline through the root logger; the name filter
+    # keeps everything else out of the activity log
     mcp_logger = logging.getLogger("mcp_activity")
     mcp_file_handler = RotatingFileHandler(
         log_dir / "mcp_activity.log",
@@ -157,18 +174,26 @@ try:
     )
     mcp_file_handler.setLevel(logging.INFO)
     mcp_file_handler.setFormatter(LocalTimeFormatter("%(asctime)s - %(message)s"))
-    mcp_logger.addHandler(mcp_file_handler)
+    mcp_file_handler.addFilter(logging.Filter("mcp_activity"))
+    log_handlers.append(mcp_file_handler)
     mcp_logger.setLevel(logging.INFO)
     # Ensure MCP activity also goes to stderr
     mcp_logger.propagate = True
 
+except Exception as e:
+    log_dir = None
+    print(f"Warning: Could not set up file logging: {e}", file=sys.stderr)
+
+# Handlers run on the listener thread; log calls only enqueue records
+logging_pipeline = LoggingPipeline(
+    log_handlers, filters=[DebugSamplingFilter(parse_sampling_rates(os.getenv("LOG_DEBUG_SAMPLING")))]
+).install(root_logger)
+
+if log_dir is not None:
     # Log setup info directly to root logger since logger isn't defined yet
     logging.info(f"Logging to: {log_dir / 'mcp_server.log'}")
     logging.info(f"Process PID: {os.getpid()}")
 
-except Exception as e:
-    print(f"Warning: Could not set up file logging: {e}", file=sys.stderr)
-
 logger = logging.getLogger(__name__)
 
 # Create the MCP server instance with a unique name identifier
@@ -296,6 +321,9 @@ TOOLS = {
 }
 TOOLS = filter_disabled_tools(TOOLS)
 
+# MCP Tool objects for TOOLS, cached per provider/model configuration
+TOOL_SCHEMA_CACHE = ToolSchemaCache(TOOLS)
+
 # Rich prompt templates for all tools
 PROMPT_TEMPLATES = {
     "chat": {
@@ -421,7 +449,9 @@ def configure_providers():
     from providers.base import ProviderType
     from providers.custom import CustomProvider
     from providers.dial import DIALModelProvider
+    from providers.executor import shutdown_provider_executor
     from providers.gemini import GeminiModelProvider
+    from providers.http_pool import close_http_clients
     from providers.openai_provider import OpenAIModelProvider
     from providers.openrouter import OpenRouterProvider
     from providers.xai import XAIModelProvider
@@ -561,6 +591,8 @@ def configure_providers():
                     except Exception:
                         # Logger might be closed during shutdown
                         pass
+            shutdown_provider_executor()
+            close_http_clients()
         except Exception:
             # Silently ignore any errors during cleanup
             pass
@@ -592,6 +624,9 @@ def configure_providers():
     else:
         logger.info("No model restrictions configured - all models allowed")
 
+    # Resolve every model name, alias and fallback choice once; requests then route with dict lookups
+    ModelProviderRegistry.build_routing_table()
+
     # Check if auto mode has any models available after restrictions
     from config import IS_AUTO_MODE
 
@@ -623,31 +658,57 @@ async def handle_list_tools() -> list[Tool]:
         List of Tool objects representing all available tools
     """
     logger.debug("MCP client requested tool list")
-    tools = []
-
-    # Add all registered AI-powered tools from the TOOLS registry
-    for tool in TOOLS.values():
-        # Get optional annotations from the tool
-        annotations = tool.get_annotations()
-        tool_annotations = ToolAnnotations(**annotations) if annotations else None
-
-        tools.append(
-            Tool(
-                name=tool.name,
-                description=tool.description,
-                inputSchema=tool.get_input_schema(),
-                annotations=tool_annotations,
-            )
-        )
+
+    # Schemas are built once per provider/model configuration (see ToolSchemaCache)
+    tools = TOOL_SCHEMA_CACHE.get_tools()
 
     # Log cache efficiency info
     if os.getenv("OPENROUTER_API_KEY") and os.getenv("OPENROUTER_API_KEY") != "your_openrouter_api_key_here":
         logger.debug("OpenRouter registry cache used efficiently across all tool schemas")
 
-    logger.debug(f"Returning {len(tools)} tools to MCP client")
+    logger.debug(f"Returning {len(tools)} tools to MCP client (schema version {TOOL_SCHEMA_CACHE.version})")
     return tools
 
 
+async def _notify_tool_list_changed() -> None:
+    """
+    Tell the client to re-list tools if the model configuration changed.
+
+    Tool schemas embed the available models, so a configuration change (e.g.
+    a provider being registered or the OpenRouter registry reloading) makes
+    the tool list the client holds outdated.
+    """
+    if not TOOL_SCHEMA_CACHE.refresh():
+        return
+    logger.info(f"Model configuration changed - tool schemas rebuilt (version {TOOL_SCHEMA_CACHE.version})")
+    try:
+        await server.request_context.session.send_tool_list_changed()
+    except LookupError:
+        # Not inside a client request (e.g. called from tests)
+        pass
+
+
+def _create_progress_reporter() -> Optional[ProgressReporter]:
+    """
+    Create a progress reporter for the current tool call.
+
+    Streaming progress is only sent when the client asked for it by including a
+    progressToken in the request metadata.
+
+    Returns:
+        ProgressReporter bound to the client session, or None
+    """
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+
+    progress_token = ctx.meta.progressToken if ctx.meta else None
+    if progress_token is None:
+        return None
+    return ProgressReporter(ctx.session, progress_token, related_request_id=ctx.request_id)
+
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
     """
@@ -745,6 +806,7 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         # Resolve model before passing to tool - this ensures consistent model handling
         # NOTE: Consensus tool is exempt as it handles multiple models internally
         from providers.registry import ModelProviderRegistry
+        from utils.file_manifest import FileManifest, file_manifest_scope
         from utils.file_utils import check_total_file_size
         from utils.model_context import ModelContext
 
@@ -764,7 +826,8 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         if not tool.requires_model():
             logger.debug(f"Tool {name} doesn't require model resolution - skipping model validation")
             # Execute tool directly without model context
-            return await tool.execute(arguments)
+            async with progress_reporting(_create_progress_reporter()):
+                return await tool.execute(arguments)
 
         # Handle auto mode at MCP boundary - resolve to specific model
         if model_name.lower() == "auto":
@@ -808,18 +871,30 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[TextCon
         if model_option:
             logger.debug(f"Model option stored in context: '{model_option}'")
 
-        # EARLY FILE SIZE VALIDATION AT MCP BOUNDARY
-        # Check file sizes before tool execution using resolved model
-        if "files" in arguments and arguments["files"]:
-            logger.debug(f"Checking file sizes for {len(arguments['files'])} files with model {model_name}")
-            file_size_check = check_total_file_size(arguments["files"], model_name)
-            if file_size_check:
-                logger.warning(f"File size check failed for {name} with model {model_name}")
-                return [TextContent(type="text", text=ToolOutput(**file_size_check).model_dump_json())]
-
-        # Execute tool with pre-resolved model context
-        result = await tool.execute(arguments)
+        # Expand and stat the requested files once for the whole call; the size check
+        # below, the tool's file deduplication and its file reading all read from this
+        # manifest. Workflow tools name their files in relevant_files. The tree walk
+        # runs in a worker thread to keep the event loop free.
+        manifest_paths = list(
+            dict.fromkeys(path for key in ("files", "relevant_files") for path in arguments.get(key) or [])
+        )
+        manifest = await asyncio.to_thread(FileManifest.build, manifest_paths) if manifest_paths else None
+
+        with file_manifest_scope(manifest):
+            # EARLY FILE SIZE VALIDATION AT MCP BOUNDARY
+            # Check file sizes before tool execution using resolved model
+            if "files" in arguments and arguments["files"]:
+                logger.debug(f"Checking file sizes for {len(arguments['files'])} files with model {model_name}")
+                file_size_check = check_total_file_size(arguments["files"], model_name)
+                if file_size_check:
+                    logger.warning(f"File size check failed for {name} with model {model_name}")
+                    return [TextContent(type="text", text=ToolOutput(**file_size_check).model_dump_json())]
+
+            # Execute tool with pre-resolved model context, streaming progress if requested
+            async with progress_reporting(_create_progress_reporter()):
+                result = await tool.execute(arguments)
         logger.info(f"Tool '{name}' execution completed")
+        await _notify_tool_list_changed()
 
         # Log completion to activity file
         try:
@@ -1005,16 +1080,16 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     continuation_id = arguments["continuation_id"]
 
     # Get thread context from storage
-    logger.debug(f"[CONVERSATION_DEBUG] Looking up thread {continuation_id} in storage")
+    logger.debug("[CONVERSATION_DEBUG] Looking up thread %s in storage", continuation_id)
     context = get_thread(continuation_id)
     if not context:
         logger.warning(f"Thread not found: {continuation_id}")
-        logger.debug(f"[CONVERSATION_DEBUG] Thread {continuation_id} not found in storage or expired")
+        logger.debug("[CONVERSATION_DEBUG] Thread %s not found in storage or expired", continuation_id)
 
         # Log to activity file for monitoring
         try:
             mcp_activity_logger = logging.getLogger("mcp_activity")
-            mcp_activity_logger.info(f"CONVERSATION_ERROR: Thread {continuation_id} not found or expired")
+            mcp_activity_logger.info("CONVERSATION_ERROR: Thread %s not found or expired", continuation_id)
         except Exception:
             pass
 
@@ -1033,20 +1108,20 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     if user_prompt:
         # Capture files referenced in this turn
         user_files = arguments.get("files", [])
-        logger.debug(f"[CONVERSATION_DEBUG] Adding user turn to thread {continuation_id}")
+        logger.debug("[CONVERSATION_DEBUG] Adding user turn to thread %s", continuation_id)
         from utils.token_utils import estimate_tokens
 
         user_prompt_tokens = estimate_tokens(user_prompt)
         logger.debug(
-            f"[CONVERSATION_DEBUG] User prompt length: {len(user_prompt)} chars (~{user_prompt_tokens:,} tokens)"
+            "[CONVERSATION_DEBUG] User prompt length: %s chars (~%d tokens)", len(user_prompt), user_prompt_tokens
         )
-        logger.debug(f"[CONVERSATION_DEBUG] User files: {user_files}")
+        logger.debug("[CONVERSATION_DEBUG] User files: %s", user_files)
         success = add_turn(continuation_id, "user", user_prompt, files=user_files)
         if not success:
             logger.warning(f"Failed to add user turn to thread {continuation_id}")
             logger.debug("[CONVERSATION_DEBUG] Failed to add user turn - thread may be at turn limit or expired")
         else:
-            logger.debug(f"[CONVERSATION_DEBUG] Successfully added user turn to thread {continuation_id}")
+            logger.debug("[CONVERSATION_DEBUG] Successfully added user turn to thread %s", continuation_id)
 
     # Create model context early to use for history building
     from utils.model_context import ModelContext
@@ -1058,31 +1133,33 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
         for turn in reversed(context.turns):
             if turn.role == "assistant" and turn.model_name:
                 arguments["model"] = turn.model_name
-                logger.debug(f"[CONVERSATION_DEBUG] Using model from previous turn: {turn.model_name}")
+                logger.debug("[CONVERSATION_DEBUG] Using model from previous turn: %s", turn.model_name)
                 break
 
     model_context = ModelContext.from_arguments(arguments)
 
     # Build conversation history with model-specific limits
-    logger.debug(f"[CONVERSATION_DEBUG] Building conversation history for thread {continuation_id}")
-    logger.debug(f"[CONVERSATION_DEBUG] Thread has {len(context.turns)} turns, tool: {context.tool_name}")
-    logger.debug(f"[CONVERSATION_DEBUG] Using model: {model_context.model_name}")
+    logger.debug("[CONVERSATION_DEBUG] Building conversation history for thread %s", continuation_id)
+    logger.debug("[CONVERSATION_DEBUG] Thread has %s turns, tool: %s", len(context.turns), context.tool_name)
+    logger.debug("[CONVERSATION_DEBUG] Using model: %s", model_context.model_name)
     conversation_history, conversation_tokens = build_conversation_history(context, model_context)
-    logger.debug(f"[CONVERSATION_DEBUG] Conversation history built: {conversation_tokens:,} tokens")
+    logger.debug("[CONVERSATION_DEBUG] Conversation history built: %d tokens", conversation_tokens)
     logger.debug(
-        f"[CONVERSATION_DEBUG] Conversation history length: {len(conversation_history)} chars (~{conversation_tokens:,} tokens)"
+        "[CONVERSATION_DEBUG] Conversation history length: %s chars (~%d tokens)",
+        len(conversation_history),
+        conversation_tokens,
     )
 
     # Add dynamic follow-up instructions based on turn count
     follow_up_instructions = get_follow_up_instructions(len(context.turns))
-    logger.debug(f"[CONVERSATION_DEBUG] Follow-up instructions added for turn {len(context.turns)}")
+    logger.debug("[CONVERSATION_DEBUG] Follow-up instructions added for turn %s", len(context.turns))
 
     # All tools now use standardized 'prompt' field
     original_prompt = arguments.get("prompt", "")
     logger.debug("[CONVERSATION_DEBUG] Extracting user input from 'prompt' field")
     original_prompt_tokens = estimate_tokens(original_prompt) if original_prompt else 0
     logger.debug(
-        f"[CONVERSATION_DEBUG] User input length: {len(original_prompt)} chars (~{original_prompt_tokens:,} tokens)"
+        "[CONVERSATION_DEBUG] User input length: %s chars (~%d tokens)", len(original_prompt), original_prompt_tokens
     )
 
     # Merge original context with new prompt and follow-up instructions
@@ -1114,33 +1191,35 @@ async def reconstruct_thread_context(arguments: dict[str, Any]) -> dict[str, Any
     enhanced_arguments["_model_context"] = model_context  # Pass context for use in tools
 
     logger.debug("[CONVERSATION_DEBUG] Token budget calculation:")
-    logger.debug(f"[CONVERSATION_DEBUG]   Model: {model_context.model_name}")
-    logger.debug(f"[CONVERSATION_DEBUG]   Total capacity: {token_allocation.total_tokens:,}")
-    logger.debug(f"[CONVERSATION_DEBUG]   Content allocation: {token_allocation.content_tokens:,}")
-    logger.debug(f"[CONVERSATION_DEBUG]   Conversation tokens: {conversation_tokens:,}")
-    logger.debug(f"[CONVERSATION_DEBUG]   Remaining tokens: {remaining_tokens:,}")
+    logger.debug("[CONVERSATION_DEBUG]   Model: %s", model_context.model_name)
+    logger.debug("[CONVERSATION_DEBUG]   Total capacity: %d", token_allocation.total_tokens)
+    logger.debug("[CONVERSATION_DEBUG]   Content allocation: %d", token_allocation.content_tokens)
+    logger.debug("[CONVERSATION_DEBUG]   Conversation tokens: %d", conversation_tokens)
+    logger.debug("[CONVERSATION_DEBUG]   Remaining tokens: %d", remaining_tokens)
 
     # Merge original context parameters (files, etc.) with new request
     if context.initial_context:
-        logger.debug(f"[CONVERSATION_DEBUG] Merging initial context with {len(context.initial_context)} parameters")
+        logger.debug("[CONVERSATION_DEBUG] Merging initial context with %s parameters", len(context.initial_context))
         for key, value in context.initial_context.items():
             if key not in enhanced_arguments and key not in ["temperature", "thinking_mode", "model"]:
                 enhanced_arguments[key] = value
-                logger.debug(f"[CONVERSATION_DEBUG] Merged initial context param: {key}")
+                logger.debug("[CONVERSATION_DEBUG] Merged initial context param: %s", key)
 
-    logger.info(f"Reconstructed context for thread {continuation_id} (turn {len(context.turns)})")
-    logger.debug(f"[CONVERSATION_DEBUG] Final enhanced arguments keys: {list(enhanced_arguments.keys())}")
+    logger.info("Reconstructed context for thread %s (turn %s)", continuation_id, len(context.turns))
+    logger.debug("[CONVERSATION_DEBUG] Final enhanced arguments keys: %s", list(enhanced_arguments.keys()))
 
     # Debug log files in the enhanced arguments for file tracking
     if "files" in enhanced_arguments:
-        logger.debug(f"[CONVERSATION_DEBUG] Final files in enhanced arguments: {enhanced_arguments['files']}")
+        logger.debug("[CONVERSATION_DEBUG] Final files in enhanced arguments: %s", enhanced_arguments["files"])
 
     # Log to activity file for monitoring
     try:
         mcp_activity_logger = logging.getLogger("mcp_activity")
         mcp_activity_logger.info(
-            f"CONVERSATION_CONTINUATION: Thread {continuation_id} turn {len(context.turns)} - "
-            f"{len(context.turns)} previous turns loaded"
+            "CONVERSATION_CONTINUATION: Thread %s turn %s - %s previous turns loaded",
+            continuation_id,
+            len(context.turns),
+            len(context.turns),
         )
     except Exception:
         pass
@@ -1318,6 +1397,11 @@ async def main():
     # Log startup message
     logger.info("xtool MCP Server starting up...")
     logger.info(f"Log level: {log_level}")
+    if subsystem_levels:
+        logger.info(
+            "Subsystem log levels: "
+            + ", ".join(f"{name}={logging.getLevelName(level)}" for name, level in subsystem_levels.items())
+        )
 
     # Log current model mode
     from config import IS_AUTO_MODE
@@ -1345,7 +1429,7 @@ async def main():
                 server_name="zen",
                 server_version=__version__,
                 capabilities=ServerCapabilities(
-                    tools=ToolsCapability(),  # Advertise tool support capability
+                    tools=ToolsCapability(listChanged=True),  # Advertise tool support capability
                     prompts=PromptsCapability(),  # Advertise prompt support capability
                 ),
             ),
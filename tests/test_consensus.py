@@ -2,7 +2,9 @@
 Tests for the Consensus tool using WorkflowTool architecture.
 """
 
-from unittest.mock import Mock
+import json
+import time
+from unittest.mock import Mock, patch
 
 import pytest
 
@@ -331,6 +333,100 @@ class TestConsensusTool:
         result = tool.customize_workflow_response(response_data, request)
         assert result["consensus_workflow_status"] == "ready_for_synthesis"
 
+    @pytest.mark.asyncio
+    async def test_parallel_consensus_keeps_partial_results(self):
+        """Parallel mode consults all models at once and keeps results from those that answered."""
+        from providers.base import ProviderType
+
+        tool = ConsensusTool()
+
+        def generate_content(**kwargs):
+            if kwargs["model_name"] == "slow":
+                time.sleep(0.5)
+            if kwargs["model_name"] == "broken":
+                raise RuntimeError("API unavailable")
+            return Mock(content=f"verdict from {kwargs['model_name']}")
+
+        provider = Mock()
+        provider.get_provider_type.return_value = ProviderType.GOOGLE
+        provider.generate_content.side_effect = generate_content
+
+        arguments = {
+            "step": "Should we adopt the proposal?",
+            "step_number": 1,
+            "total_steps": 3,
+            "next_step_required": True,
+            "findings": "Initial analysis",
+            "models": [
+                {"model": "flash", "stance": "for"},
+                {"model": "slow", "stance": "against"},
+                {"model": "broken", "stance": "neutral"},
+            ],
+            "parallel": True,
+            "model_timeout": 0.2,
+        }
+
+        with patch.object(tool, "get_model_provider", return_value=provider):
+            result = await tool.execute_workflow(arguments)
+
+        response = json.loads(result[0].text)
+        assert response["status"] == "consensus_workflow_complete"
+        assert response["consensus_complete"] is True
+        assert response["next_step_required"] is False
+
+        statuses = {r["model"]: r["status"] for r in response["accumulated_responses"]}
+        assert statuses == {"flash": "success", "slow": "timeout", "broken": "error"}
+        assert response["accumulated_responses"][0]["verdict"] == "verdict from flash"
+
+        summary = response["complete_consensus"]
+        assert summary["total_responses"] == 3
+        assert summary["successful_responses"] == 1
+        assert summary["failed_models"] == ["slow:against", "broken:neutral"]
+
+    @pytest.mark.asyncio
+    async def test_sequential_run_gets_its_own_session(self):
+        """Step 1 without continuation_id is keyed by a new thread, and the session is released when complete."""
+        from providers.base import ProviderType
+
+        tool = ConsensusTool()
+        provider = Mock()
+        provider.get_provider_type.return_value = ProviderType.GOOGLE
+        provider.generate_content.return_value = Mock(content="verdict")
+
+        step1 = {
+            "step": "Should we adopt the proposal?",
+            "step_number": 1,
+            "total_steps": 2,
+            "next_step_required": True,
+            "findings": "Initial analysis",
+            "models": [{"model": "flash", "stance": "for"}, {"model": "o3", "stance": "against"}],
+        }
+
+        with patch.object(tool, "get_model_provider", return_value=provider):
+            with patch("tools.consensus.create_thread", return_value="thread-1"):
+                first = json.loads((await tool.execute(step1))[0].text)
+            assert first["continuation_id"] == "thread-1"
+            assert tool.get_workflow_session("thread-1").state["models_to_consult"] == step1["models"]
+
+            # Follow the instructions: only the fields listed in next_steps, plus the required ones
+            listed = dict(line[2:].split(": ", 1) for line in first["next_steps"].splitlines() if line.startswith("- "))
+            assert listed["continuation_id"] == "thread-1"
+            step2 = {"step": "Second opinion", "total_steps": 2, "next_step_required": False}
+            step2.update(listed, step_number=int(listed["step_number"]))
+            second = json.loads((await tool.execute(step2))[0].text)
+
+        assert second["consensus_complete"] is True
+        assert second["complete_consensus"]["total_responses"] == 2
+        assert tool.get_workflow_session("thread-1") is None
+
+    def test_parallel_fields_in_schema(self):
+        """Parallel mode options are exposed in the input schema."""
+        schema = ConsensusTool().get_input_schema()
+        assert schema["properties"]["parallel"]["type"] == "boolean"
+        assert schema["properties"]["model_timeout"]["type"] == "number"
+        # Same bound as the request model (gt=0), so sub-second timeouts validate
+        assert schema["properties"]["model_timeout"]["exclusiveMinimum"] == 0
+
 
 if __name__ == "__main__":
     import unittest
@@ -756,5 +756,125 @@ class TestConversationFlow:
                 assert large_file in history
 
 
+class TestAppendOnlyTurnLog:
+    """Test the header + append-only turn log thread layout"""
+
+    @pytest.fixture
+    def storage(self):
+        from utils.storage_backend import InMemoryStorage
+
+        storage = InMemoryStorage()
+        with patch("utils.conversation_memory.get_storage", return_value=storage):
+            yield storage
+        storage.shutdown()
+
+    def test_add_turn_serializes_only_new_turn(self, storage):
+        """The header stays small while turns accumulate in the log"""
+        thread_id = create_thread("chat", {"prompt": "start"})
+        for i in range(5):
+            assert add_turn(thread_id, "user" if i % 2 == 0 else "assistant", "x" * 1000 + str(i))
+
+        header = ThreadContext.model_validate_json(storage.get(f"thread:{thread_id}"))
+        assert header.turns == []
+        assert header.logged_turns == 5
+        assert len(storage.lrange(f"thread_turns:{thread_id}")) == 5
+
+        context = get_thread(thread_id)
+        assert [turn.content[-1] for turn in context.turns] == ["0", "1", "2", "3", "4"]
+
+    def test_turn_limit_counts_logged_turns(self, storage):
+        thread_id = create_thread("chat", {"prompt": "start"})
+        for i in range(MAX_CONVERSATION_TURNS):
+            assert add_turn(thread_id, "user", f"turn {i}")
+
+        assert add_turn(thread_id, "user", "one too many") is False
+
+    def test_get_thread_turns_tail(self, storage):
+        """Readers can fetch the last N turns or a byte-bounded tail"""
+        from utils.conversation_memory import get_thread_turns
+
+        thread_id = create_thread("chat", {"prompt": "start"})
+        for i in range(6):
+            add_turn(thread_id, "user", f"turn {i}")
+
+        assert [turn.content for turn in get_thread_turns(thread_id, last_n=2)] == ["turn 4", "turn 5"]
+
+        one_turn_bytes = len(storage.lrange(f"thread_turns:{thread_id}", -1, -1)[0].encode("utf-8"))
+        tail = get_thread_turns(thread_id, max_bytes=one_turn_bytes * 3 + 1)
+        assert [turn.content for turn in tail] == ["turn 3", "turn 4", "turn 5"]
+
+    def test_legacy_inline_turns_are_preserved(self, storage):
+        """Threads stored with inline turns keep them and append new turns to the log"""
+        test_uuid = "12345678-1234-1234-1234-123456789012"
+        legacy = ThreadContext(
+            thread_id=test_uuid,
+            created_at="2023-01-01T00:00:00Z",
+            last_updated_at="2023-01-01T00:01:00Z",
+            tool_name="chat",
+            turns=[ConversationTurn(role="user", content="inline", timestamp="2023-01-01T00:00:00Z")],
+            initial_context={},
+        )
+        storage.setex(f"thread:{test_uuid}", CONVERSATION_TIMEOUT_SECONDS, legacy.model_dump_json())
+
+        assert add_turn(test_uuid, "assistant", "logged")
+
+        context = get_thread(test_uuid)
+        assert [turn.content for turn in context.turns] == ["inline", "logged"]
+
+
+class TestThreadCache:
+    """Test the per-process cache of validated threads"""
+
+    @pytest.fixture
+    def storage(self):
+        from utils.conversation_memory import invalidate_thread_cache
+        from utils.storage_backend import InMemoryStorage
+
+        invalidate_thread_cache()
+        storage = InMemoryStorage()
+        with patch("utils.conversation_memory.get_storage", return_value=storage):
+            yield storage
+        storage.shutdown()
+        invalidate_thread_cache()
+
+    def test_repeated_reads_skip_validation(self, storage):
+        thread_id = create_thread("chat", {"prompt": "start"})
+        add_turn(thread_id, "user", "hello")
+        get_thread(thread_id)
+
+        with patch.object(ThreadContext, "model_validate_json", side_effect=AssertionError("re-validated")):
+            context = get_thread(thread_id)
+
+        assert [turn.content for turn in context.turns] == ["hello"]
+
+    def test_add_turn_invalidates(self, storage):
+        thread_id = create_thread("chat", {"prompt": "start"})
+        assert get_thread(thread_id).turns == []
+
+        add_turn(thread_id, "user", "hello")
+
+        assert [turn.content for turn in get_thread(thread_id).turns] == ["hello"]
+
+    def test_write_from_other_process_is_detected(self, storage):
+        """A changed header in storage makes the cached entry stale"""
+        thread_id = create_thread("chat", {"prompt": "start"})
+        get_thread(thread_id)
+
+        header = ThreadContext.model_validate_json(storage.get(f"thread:{thread_id}"))
+        header.tool_name = "debug"
+        storage.setex(f"thread:{thread_id}", CONVERSATION_TIMEOUT_SECONDS, header.model_dump_json())
+
+        assert get_thread(thread_id).tool_name == "debug"
+
+    def test_callers_get_their_own_turns_list(self, storage):
+        thread_id = create_thread("chat", {"prompt": "start"})
+        add_turn(thread_id, "user", "hello")
+
+        first = get_thread(thread_id)
+        first.turns.append(ConversationTurn(role="user", content="local only", timestamp="2023-01-01T00:00:00Z"))
+
+        assert len(get_thread(thread_id).turns) == 1
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
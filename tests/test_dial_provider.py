@@ -266,8 +266,9 @@ class TestDIALProvider:
         # Assert that the shared httpx client's close method was called
         mock_shared_http_client.close.assert_called_once()
 
-        # Assert that the superclass client's close method was called
-        mock_superclass_client.close.assert_called_once()
+        # The superclass client uses the process-wide pooled transport: dropped, not closed
+        mock_superclass_client.close.assert_not_called()
+        assert provider._client is None
 
         # Assert that the deployment clients cache is cleared
         assert not provider._deployment_clients
@@ -210,8 +210,17 @@ def helper_function():
             redis_storage[key] = value
             return True
 
+        def mock_rpush_with_ttl(key, ttl, value):
+            redis_storage.setdefault(key, []).append(value)
+            return len(redis_storage[key])
+
+        def mock_lrange(key, start=0, end=-1):
+            return list(redis_storage.get(key, []))
+
         mock_client.get.side_effect = mock_get
         mock_client.setex.side_effect = mock_setex
+        mock_client.rpush_with_ttl.side_effect = mock_rpush_with_ttl
+        mock_client.lrange.side_effect = mock_lrange
         mock_storage.return_value = mock_client
 
         directory = temp_directory_with_files["directory"]
@@ -251,8 +260,17 @@ def helper_function():
             redis_storage[key] = value
             return True
 
+        def mock_rpush_with_ttl(key, ttl, value):
+            redis_storage.setdefault(key, []).append(value)
+            return len(redis_storage[key])
+
+        def mock_lrange(key, start=0, end=-1):
+            return list(redis_storage.get(key, []))
+
         mock_client.get.side_effect = mock_get
         mock_client.setex.side_effect = mock_setex
+        mock_client.rpush_with_ttl.side_effect = mock_rpush_with_ttl
+        mock_client.lrange.side_effect = mock_lrange
         mock_storage.return_value = mock_client
 
         directory = temp_directory_with_files["directory"]
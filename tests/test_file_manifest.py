@@ -0,0 +1,118 @@
+"""Tests for the request-scoped file manifest."""
+
+from unittest.mock import patch
+
+import pytest
+
+from utils import file_utils
+from utils.file_manifest import FileManifest, current_file_manifest, file_manifest_scope
+from utils.file_utils import estimate_file_tokens, expand_paths, read_files
+from utils.file_walker import clear_tree_indexes
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    clear_tree_indexes()
+    yield
+    clear_tree_indexes()
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("print('app')\n" * 10)
+    (tmp_path / "src" / "util.py").write_text("x = 1\n")
+    (tmp_path / "README.md").write_text("# readme\n")
+    return tmp_path
+
+
+def _counting_walker():
+    calls = []
+    walk_files = file_utils.walk_files
+
+    def walker(root, *args, **kwargs):
+        calls.append(root)
+        return walk_files(root, *args, **kwargs)
+
+    return calls, walker
+
+
+class TestFileManifest:
+    def test_scope_is_restored(self):
+        manifest = FileManifest()
+        with file_manifest_scope(manifest):
+            assert current_file_manifest() is manifest
+        assert current_file_manifest() is None
+
+    def test_directories_are_walked_once_per_request(self, project):
+        paths = [str(project / "src"), str(project / "README.md")]
+        calls, walker = _counting_walker()
+
+        with patch("utils.file_utils.walk_files", side_effect=walker):
+            manifest = FileManifest.build(paths)
+            with file_manifest_scope(manifest):
+                first = expand_paths(paths)
+                second = expand_paths(paths)
+
+        assert calls == [str(project / "src")]
+        assert first == second == expand_paths(paths)
+        assert len(manifest) == 4
+
+    def test_entries_reuse_validation_and_stat(self, project):
+        file_path = str(project / "src" / "app.py")
+        manifest = FileManifest.build([file_path, str(project / "src")])
+
+        with patch("utils.file_utils.resolve_and_validate_path") as resolve:
+            with file_manifest_scope(manifest):
+                assert estimate_file_tokens(file_path) == manifest.entry(file_path).estimated_tokens
+                assert estimate_file_tokens(str(project / "src")) == 0
+        resolve.assert_not_called()
+
+        with file_manifest_scope(manifest):
+            assert manifest.entry(str(project / "missing.py")) is None
+        assert manifest.cached_entry(str(project / "missing.py")) is None
+
+    def test_read_files_output_is_unchanged(self, project):
+        paths = [str(project / "src"), str(project / "README.md"), str(project / "missing.py")]
+        expected = read_files(paths)
+
+        with file_manifest_scope(FileManifest.build(paths)):
+            assert read_files(paths) == expected
+
+    def test_deduplication_uses_manifest_expansions(self, project):
+        from tools.chat import ChatTool
+
+        tool = ChatTool()
+        src, readme = str(project / "src"), str(project / "README.md")
+        app, util = str(project / "src" / "app.py"), str(project / "src" / "util.py")
+
+        with patch.object(tool, "get_conversation_embedded_files", return_value=[app, readme]):
+            # Without a manifest only exact requested paths are compared
+            assert tool.filter_new_files([src, readme], "thread-1") == [src]
+
+            with file_manifest_scope(FileManifest.build([src, readme])):
+                assert tool.filter_new_files([src, readme], "thread-1") == [util]
+
+
+class TestWorkflowManifest:
+    @pytest.mark.asyncio
+    async def test_relevant_files_directory_is_walked_once(self, project):
+        from server import handle_call_tool
+
+        src = str(project / "src")
+        arguments = {
+            "step": "Final analysis of the source tree",
+            "step_number": 1,
+            "total_steps": 1,
+            "next_step_required": False,
+            "findings": "Reviewed the sources",
+            "relevant_files": [src],
+            "use_assistant_model": False,
+        }
+        calls, walker = _counting_walker()
+
+        with patch("utils.file_utils.walk_files", side_effect=walker), patch("utils.conversation_memory.add_turn"):
+            result = await handle_call_tool("analyze", arguments)
+
+        assert '"status": "local_work_complete"' in result[0].text
+        assert calls == [src]
@@ -0,0 +1,195 @@
+"""Tests for the .gitignore-aware directory walker used by expand_paths."""
+
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils import file_utils
+from utils.file_utils import expand_paths
+from utils.file_walker import IgnoreRules, clear_tree_indexes, get_tree_index, walk_files
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    clear_tree_indexes()
+    yield
+    clear_tree_indexes()
+
+
+def _age(*paths):
+    """Move mtimes out of the racy window so cached listings are trusted."""
+    old = time.time() - 60
+    for path in paths:
+        os.utime(path, (old, old))
+
+
+def _relative(root, files):
+    return sorted(os.path.relpath(f, root).replace(os.sep, "/") for f in files)
+
+
+class TestIgnoreRules:
+    """Pattern semantics of the gitignore subset."""
+
+    def test_basic_patterns(self):
+        rules = IgnoreRules(["*.log", "build/", "/dist", "# comment", "", "docs/**/*.tmp"])
+
+        assert rules.match("app.log", False) is True
+        assert rules.match("sub/app.log", False) is True
+        assert rules.match("build", True) is True
+        assert rules.match("build", False) is None
+        assert rules.match("dist", True) is True
+        assert rules.match("sub/dist", True) is None
+        assert rules.match("docs/a/b/c.tmp", False) is True
+        assert rules.match("docs/c.tmp", False) is True
+        assert rules.match("app.py", False) is None
+
+    def test_negation_last_rule_wins(self):
+        rules = IgnoreRules(["*.log", "!keep.log"])
+
+        assert rules.match("drop.log", False) is True
+        assert rules.match("keep.log", False) is False
+
+    def test_character_class_and_escape(self):
+        rules = IgnoreRules(["file[0-9].py", "\\#notes", "\\!bang"])
+
+        assert rules.match("file1.py", False) is True
+        assert rules.match("filex.py", False) is None
+        assert rules.match("#notes", False) is True
+        assert rules.match("!bang", False) is True
+
+
+class TestWalkFiles:
+    """Walking with ignore files and directory pruning."""
+
+    def _make_tree(self, root):
+        (root / "src").mkdir()
+        (root / "src" / "main.py").write_text("print('main')")
+        (root / "src" / "debug.log").write_text("log")
+        (root / "src" / "keep.log").write_text("log")
+        (root / "build").mkdir()
+        (root / "build" / "out.py").write_text("generated")
+        (root / "vendor").mkdir()
+        (root / "vendor" / "lib.py").write_text("vendored")
+        (root / "vendor" / "patched.py").write_text("patched")
+        (root / ".hidden").mkdir()
+        (root / ".hidden" / "secret.py").write_text("hidden")
+        (root / ".gitignore").write_text("build/\n*.log\n!keep.log\nvendor/*\n")
+        (root / "vendor" / ".gitignore").write_text("!patched.py\n")
+
+    def test_gitignore_prunes_and_negates(self, tmp_path):
+        self._make_tree(tmp_path)
+
+        files = walk_files(str(tmp_path), respect_ignore_files=True)
+
+        assert _relative(tmp_path, files) == ["src/keep.log", "src/main.py", "vendor/patched.py"]
+
+    def test_ignore_files_can_be_disabled(self, tmp_path):
+        self._make_tree(tmp_path)
+
+        files = walk_files(str(tmp_path), respect_ignore_files=False)
+
+        assert _relative(tmp_path, files) == [
+            "build/out.py",
+            "src/debug.log",
+            "src/keep.log",
+            "src/main.py",
+            "vendor/lib.py",
+            "vendor/patched.py",
+        ]
+
+    def test_ancestor_gitignore_applies_inside_repository(self, tmp_path):
+        (tmp_path / ".git").mkdir()
+        (tmp_path / ".gitignore").write_text("generated/\n")
+        project = tmp_path / "pkg"
+        (project / "generated").mkdir(parents=True)
+        (project / "generated" / "schema.py").write_text("x")
+        (project / "api.py").write_text("x")
+
+        files = walk_files(str(project), respect_ignore_files=True)
+
+        assert _relative(project, files) == ["api.py"]
+
+    def test_skip_dir_callback_prunes_before_descending(self, tmp_path):
+        self._make_tree(tmp_path)
+        seen = []
+
+        def skip_dir(name, full_path):
+            seen.append(name)
+            return name == "src"
+
+        files = walk_files(str(tmp_path), skip_dir=skip_dir, respect_ignore_files=False)
+
+        assert "src/main.py" not in _relative(tmp_path, files)
+        assert ".hidden" not in seen
+
+    def test_unchanged_directories_are_not_rescanned(self, tmp_path):
+        self._make_tree(tmp_path)
+        directories = [tmp_path / name for name in ("src", "build", "vendor")] + [tmp_path]
+        _age(tmp_path / ".gitignore", tmp_path / "vendor" / ".gitignore", *directories)
+
+        first = walk_files(str(tmp_path), respect_ignore_files=True)
+        with patch("utils.file_walker.os.scandir", side_effect=AssertionError("rescanned")):
+            second = walk_files(str(tmp_path), respect_ignore_files=True)
+
+        assert first == second
+
+    def test_new_file_invalidates_directory(self, tmp_path):
+        self._make_tree(tmp_path)
+        _age(tmp_path / ".gitignore", tmp_path / "vendor" / ".gitignore", tmp_path / "src", tmp_path)
+        walk_files(str(tmp_path), respect_ignore_files=True)
+
+        (tmp_path / "src" / "new.py").write_text("x")
+        files = walk_files(str(tmp_path), respect_ignore_files=True)
+
+        assert "src/new.py" in _relative(tmp_path, files)
+
+    def test_gitignore_edit_is_picked_up(self, tmp_path):
+        self._make_tree(tmp_path)
+        _age(tmp_path / ".gitignore", tmp_path / "vendor" / ".gitignore", tmp_path / "src", tmp_path)
+        walk_files(str(tmp_path), respect_ignore_files=True)
+        listing = get_tree_index(str(tmp_path)).listing(str(tmp_path))
+        assert listing is not None and not listing.racy
+
+        # Editing in place does not change the directory mtime
+        (tmp_path / ".gitignore").write_text("build/\n*.log\n!keep.log\nvendor/*\nsrc/main.py\n")
+        files = walk_files(str(tmp_path), respect_ignore_files=True)
+
+        assert "src/main.py" not in _relative(tmp_path, files)
+
+
+class TestExpandPathsIgnoreFiles:
+    """expand_paths integration."""
+
+    def test_expand_paths_honors_gitignore(self, tmp_path):
+        (tmp_path / "app.py").write_text("x")
+        (tmp_path / "out").mkdir()
+        (tmp_path / "out" / "bundle.js").write_text("x")
+        (tmp_path / ".gitignore").write_text("out/\n")
+
+        with patch("utils.file_walker.RESPECT_GITIGNORE", True):
+            files = expand_paths([str(tmp_path)])
+
+        assert files == [str(tmp_path / "app.py")]
+
+    def test_explicit_file_is_included_even_if_ignored(self, tmp_path):
+        (tmp_path / "out").mkdir()
+        (tmp_path / "out" / "bundle.js").write_text("x")
+        (tmp_path / ".gitignore").write_text("out/\n")
+
+        with patch("utils.file_walker.RESPECT_GITIGNORE", True):
+            files = expand_paths([str(tmp_path / "out" / "bundle.js")])
+
+        assert files == [str(tmp_path / "out" / "bundle.js")]
+
+    def test_subdirectories_are_pruned_without_filesystem_checks(self, tmp_path):
+        for n in range(20):
+            (tmp_path / f"pkg{n}").mkdir()
+            (tmp_path / f"pkg{n}" / "mod.py").write_text("x")
+
+        with patch.object(file_utils, "is_mcp_directory", wraps=file_utils.is_mcp_directory) as check:
+            files = expand_paths([str(tmp_path)])
+
+        assert len(files) == 20
+        assert check.call_count == 1  # the walk root only
@@ -0,0 +1,95 @@
+"""Tests for the compiled keyword matcher used by thinking-pattern, thinking-mode and advisor routing."""
+
+import random
+import re
+
+import pytest
+
+from tools.xtool_advisor import XtoolAdvisorTool
+from utils.keyword_matcher import KeywordMatcher, PatternSet
+from utils.thinking_mode_manager import get_thinking_mode_manager
+from utils.thinking_patterns import thinking_registry
+
+TEXTS = [
+    "",
+    "Why does the system crash? Find the root cause of the feedback loop",
+    "为什么这个功能不工作，调用链的依赖关系是什么？需要深入理解架构设计和安全审计",
+    "Performance 性能优化 requires data-driven 数据 analysis; 假设 证据 本质",
+    "代码审查\n代码怎么样 review the code quality and best practices",
+]
+
+
+def _random_texts(alphabet, count=50):
+    rng = random.Random(7)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80))) for _ in range(count)]
+
+
+class TestKeywordMatcher:
+    def test_matches_substring_semantics(self):
+        keywords = ["he", "she", "his", "hers", "s", "安全", "安全审计", "审计", ""]
+        matcher = KeywordMatcher(keywords)
+
+        for text in TEXTS + _random_texts("hersi安全审计 ") + ["ushers", "安全审计报告"]:
+            assert matcher.find(text) == {keyword for keyword in keywords if keyword in text}
+
+    def test_pattern_set_only_searches_possible_patterns(self):
+        patterns = [r"为什么.*不工作", r".*报错", r"如何选择", r"a+b"]
+        pattern_set = PatternSet(patterns)
+        matcher = KeywordMatcher(pattern_set.required_literals())
+
+        assert pattern_set.required_literals() == {"为什么", "不工作", "报错", "如何选择"}
+        for text in ["为什么不工作", "不工作为什么", "为什么\n不工作", "又报错了", "aab 如何选择", ""]:
+            expected = [pattern for pattern in patterns if re.search(pattern, text)]
+            assert pattern_set.search(text, matcher.find(text)) == expected
+
+
+class TestRoutingEquivalence:
+    @pytest.mark.parametrize("text", TEXTS)
+    def test_thinking_patterns_score_like_matches_context(self, text):
+        found = thinking_registry._get_matcher().find(text.lower())
+
+        for pattern in thinking_registry.get_all_patterns():
+            assert pattern.score_matches(found) == pattern.matches_context(text)
+
+    @pytest.mark.parametrize("text", TEXTS)
+    def test_thinking_modes_keyword_scores(self, text):
+        manager = get_thinking_mode_manager()
+        scores = {}
+        for mode_type, mode in manager._modes.items():
+            score = sum(1 for keyword in mode.keywords if keyword in text.lower())
+            if score:
+                scores[mode_type] = score
+        expected = [mode_type for mode_type, _ in sorted(scores.items(), key=lambda x: x[1], reverse=True)]
+
+        assert [mode.type for mode in manager.get_modes_by_keywords(text)] == expected
+
+    @pytest.mark.parametrize("text", TEXTS)
+    def test_advisor_tool_scores(self, text):
+        advisor = XtoolAdvisorTool()
+        tool_scores = {}
+        for tool, config in advisor.TOOL_PATTERNS.items():
+            score = 2 * sum(1 for keyword in config["keywords"] if keyword in text.lower())
+            score += 3 * sum(1 for pattern in config["patterns"] if re.search(pattern, text.lower()))
+            if score:
+                tool_scores[tool] = score
+        expected = [tool for tool, _ in sorted(tool_scores.items(), key=lambda x: x[1], reverse=True)[:3]]
+
+        if expected:
+            assert advisor.analyze_query(text)[0] == expected
+
+    @pytest.mark.parametrize("text", TEXTS + ["请帮我定义一个函数", "构建 API 服务", "写一份季度总结"])
+    def test_advisor_code_development_detection(self, text):
+        advisor = XtoolAdvisorTool()
+        query = text.lower()
+        keywords = (
+            advisor.CODE_DEV_KEYWORDS
+            + advisor.LANGUAGE_KEYWORDS
+            + advisor.FRAMEWORK_KEYWORDS
+            + advisor.DEV_ACTIVITY_KEYWORDS
+        )
+        expected = any(keyword in query for keyword in keywords) or any(
+            all(word in query for word in pattern) for pattern in advisor.DEV_PATTERNS
+        )
+
+        assert advisor._detect_code_development(query) is expected
+        assert advisor.analyze_query(text)[2] is expected
@@ -0,0 +1,132 @@
+"""Tests for the queue-based logging pipeline and per-subsystem log configuration."""
+
+import logging
+import threading
+
+import pytest
+
+from utils.logging_pipeline import (
+    DebugSamplingFilter,
+    LoggingPipeline,
+    apply_logger_levels,
+    parse_log_levels,
+    parse_sampling_rates,
+)
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+
+@pytest.fixture
+def pipeline_logger():
+    log = logging.getLogger("test_logging_pipeline")
+    original = (log.level, log.propagate)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    yield log
+    log.setLevel(original[0])
+    log.propagate = original[1]
+
+
+class TestSettingsParsing:
+    def test_parse_log_levels(self):
+        levels = parse_log_levels(" utils.file_utils=debug, providers=WARNING,bogus,tools=LOUD,=INFO")
+
+        assert levels == {"utils.file_utils": logging.DEBUG, "providers": logging.WARNING}
+        assert parse_log_levels(None) == {}
+
+    def test_parse_sampling_rates(self):
+        rates = parse_sampling_rates("utils.file_utils=10,providers=1,tools=often")
+
+        assert rates == {"utils.file_utils": 10}
+
+    def test_apply_logger_levels(self):
+        log = logging.getLogger("test_logging_pipeline.levels")
+        try:
+            apply_logger_levels({"test_logging_pipeline.levels": logging.ERROR})
+            assert log.level == logging.ERROR
+        finally:
+            log.setLevel(logging.NOTSET)
+
+
+class TestDebugSamplingFilter:
+    @staticmethod
+    def _record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+    def test_keeps_one_in_n_debug_records(self):
+        sampler = DebugSamplingFilter({"utils": 3, "utils.file_utils": 5})
+
+        kept = [sampler.filter(self._record("utils.file_utils", logging.DEBUG)) for _ in range(10)]
+        assert kept.count(True) == 2
+
+        kept = [sampler.filter(self._record("utils.token_utils", logging.DEBUG)) for _ in range(9)]
+        assert kept.count(True) == 3
+
+    def test_other_records_always_pass(self):
+        sampler = DebugSamplingFilter({"utils": 100})
+
+        assert all(sampler.filter(self._record("providers.gemini", logging.DEBUG)) for _ in range(5))
+        assert all(sampler.filter(self._record("utils", logging.INFO)) for _ in range(5))
+        assert not all(sampler.filter(self._record("utils", logging.DEBUG)) for _ in range(5))
+
+
+class TestLoggingPipeline:
+    def test_handlers_run_on_listener_thread(self, pipeline_logger):
+        handler = RecordingHandler()
+        pipeline = LoggingPipeline([handler]).install(pipeline_logger)
+        try:
+            for i in range(20):
+                pipeline_logger.info("message %d", i)
+        finally:
+            pipeline.stop()
+
+        assert [record.getMessage() for record in handler.records] == [f"message {i}" for i in range(20)]
+        assert threading.get_ident() not in handler.threads
+        assert pipeline.queue_handler not in pipeline_logger.handlers
+
+    def test_handler_levels_and_filters_are_respected(self, pipeline_logger):
+        everything = RecordingHandler()
+        warnings = RecordingHandler(logging.WARNING)
+        activity = RecordingHandler()
+        activity.addFilter(logging.Filter("test_logging_pipeline.activity"))
+        pipeline = LoggingPipeline([everything, warnings, activity]).install(pipeline_logger)
+        try:
+            pipeline_logger.debug("debug")
+            pipeline_logger.warning("warning")
+            logging.getLogger("test_logging_pipeline.activity").info("tool call")
+        finally:
+            pipeline.stop()
+
+        assert [record.getMessage() for record in everything.records] == ["debug", "warning", "tool call"]
+        assert [record.getMessage() for record in warnings.records] == ["warning"]
+        assert [record.getMessage() for record in activity.records] == ["tool call"]
+
+    def test_sampled_records_are_dropped_before_the_queue(self, pipeline_logger):
+        handler = RecordingHandler()
+        sampler = DebugSamplingFilter({"test_logging_pipeline": 4})
+        pipeline = LoggingPipeline([handler], filters=[sampler]).install(pipeline_logger)
+        try:
+            for i in range(8):
+                pipeline_logger.debug("debug %d", i)
+            pipeline_logger.info("info")
+        finally:
+            pipeline.stop()
+
+        assert [record.getMessage() for record in handler.records] == ["debug 0", "debug 4", "info"]
+
+    def test_stop_tolerates_closed_streams(self, pipeline_logger, tmp_path):
+        stream = open(tmp_path / "log.txt", "w", encoding="utf-8")
+        pipeline = LoggingPipeline([logging.StreamHandler(stream)]).install(pipeline_logger)
+        # At interpreter exit the stream can be closed before the atexit hook runs
+        stream.close()
+
+        pipeline.stop()
@@ -0,0 +1,119 @@
+"""Tests for batched write-back of memory access statistics."""
+
+from unittest.mock import patch
+
+from utils import enhanced_memory
+from utils.enhanced_memory import EnhancedMemorySystem, MemoryItem, ProjectMemoryLayer
+from utils.memory_segments import SegmentStore
+
+
+def _stored_access_count(layer, item_id):
+    return SegmentStore(layer.storage_path).load()[item_id]["access_count"]
+
+
+def _layer(tmp_path, durability):
+    layer = ProjectMemoryLayer(tmp_path / "project", access_durability=durability)
+    for n in range(3):
+        layer.save_item(MemoryItem(id=f"m{n}", content=f"memory {n}", layer="project"))
+    return layer
+
+
+class TestAccessStatsBatching:
+    def test_reads_do_not_rewrite_items(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+
+        with patch.object(layer, "_persist_access", wraps=layer._persist_access) as persist:
+            for _ in range(5):
+                assert layer.get_item("m0").access_count > 0
+            layer.get_item("m1")
+
+        assert persist.call_count == 0
+        assert layer.get_item("m0").access_count == 6
+        assert _stored_access_count(layer, "m0") == 0
+        assert layer.get_statistics()["pending_access_updates"] == 2
+
+    def test_flush_writes_each_dirty_item_once(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+        for _ in range(4):
+            layer.get_item("m0")
+        layer.get_item("m2")
+
+        with patch.object(layer, "_persist_access", wraps=layer._persist_access) as persist:
+            assert layer.flush_access_stats() == 2
+
+        persist.assert_called_once()
+        assert sorted(persist.call_args.args[0]) == ["m0", "m2"]
+        assert _stored_access_count(layer, "m0") == 4
+        assert layer.flush_access_stats() == 0
+
+        reloaded = ProjectMemoryLayer(tmp_path / "project")
+        assert reloaded._memory_items["m0"].access_count == 4
+
+    def test_batched_flushes_when_batch_is_full(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+
+        with patch.object(enhanced_memory, "MEMORY_ACCESS_FLUSH_BATCH", 2):
+            layer.get_item("m0")
+            assert _stored_access_count(layer, "m0") == 0
+            layer.get_item("m1")
+
+        assert _stored_access_count(layer, "m0") == 1
+        assert _stored_access_count(layer, "m1") == 1
+
+    def test_batched_flushes_after_interval(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+        start = layer._last_access_flush
+
+        with patch("utils.enhanced_memory.time.monotonic", return_value=start + 3600):
+            layer.get_item("m0")
+
+        assert _stored_access_count(layer, "m0") == 1
+
+    def test_shutdown_level_only_flushes_explicitly(self, tmp_path):
+        layer = _layer(tmp_path, "shutdown")
+
+        with patch.object(enhanced_memory, "MEMORY_ACCESS_FLUSH_BATCH", 1):
+            layer.get_item("m0")
+
+        assert _stored_access_count(layer, "m0") == 0
+        layer.flush_access_stats()
+        assert _stored_access_count(layer, "m0") == 1
+
+    def test_immediate_level_writes_every_access(self, tmp_path):
+        layer = _layer(tmp_path, "immediate")
+
+        layer.get_item("m0")
+
+        assert _stored_access_count(layer, "m0") == 1
+        assert layer.get_statistics()["pending_access_updates"] == 0
+
+    def test_failed_writes_stay_pending(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+        layer.get_item("m0")
+
+        with patch.object(layer, "_persist_access", return_value=False):
+            assert layer.flush_access_stats() == 0
+
+        assert layer.flush_access_stats() == 1
+
+    def test_removed_items_are_not_flushed(self, tmp_path):
+        layer = _layer(tmp_path, "batched")
+        layer.get_item("m0")
+        layer.remove_item("m0")
+
+        assert layer.flush_access_stats() == 0
+        assert "m0" not in SegmentStore(layer.storage_path).load()
+
+
+class TestSystemFlush:
+    def test_system_flushes_all_layers(self, tmp_path):
+        system = EnhancedMemorySystem(tmp_path, access_durability="shutdown")
+        project_id = system.save_memory("project note", layer="project")
+        global_id = system.save_memory("global note", layer="global")
+
+        system.get_memory(project_id, layer="project")
+        system.get_memory(global_id, layer="global")
+
+        assert system.flush_access_stats() == 2
+        assert _stored_access_count(system.project_layer, project_id) == 1
+        assert _stored_access_count(system.global_layer, global_id) == 1
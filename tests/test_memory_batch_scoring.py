@@ -0,0 +1,92 @@
+"""Tests for batch scoring in memory lifecycle evaluation and advanced recall."""
+
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+from unittest.mock import patch
+
+import pytest
+
+from utils.memory_lifecycle import DecayCurve, MemoryLifecycleManager
+from utils.memory_recall_algorithms import FUZZY_MATCH_THRESHOLD, MemoryRecallEngine
+
+
+def _memories():
+    now = datetime.now(timezone.utc)
+    memories = []
+    for n, (days, importance, mem_type) in enumerate(
+        [
+            (0, "high", "bug"),
+            (20, "medium", "note"),
+            (90, "low", "security"),
+            (400, "medium", "general"),
+            (900, "high", "x"),
+        ]
+    ):
+        memories.append(
+            {
+                "content": f"memory {n} " + "details " * (n * 40),
+                "timestamp": (now - timedelta(days=days)).isoformat(),
+                "metadata": {
+                    "importance": importance,
+                    "type": mem_type,
+                    "tags": ["a", "b"][: n % 3],
+                    "access_count": n * 7,
+                    "reference_count": n,
+                    "last_accessed": (now - timedelta(days=n)).isoformat(),
+                },
+            }
+        )
+    memories.append({"content": "no timestamp", "timestamp": "invalid", "metadata": {}})
+    return memories
+
+
+class TestLifecycleBatchEvaluation:
+    @pytest.mark.parametrize(
+        "curve", [DecayCurve.LINEAR, DecayCurve.EXPONENTIAL, DecayCurve.LOGARITHMIC, DecayCurve.STEP, "none"]
+    )
+    def test_batch_matches_single_evaluation(self, curve):
+        manager = MemoryLifecycleManager()
+        manager.decay_curve = curve
+        memories = _memories()
+
+        assert manager.evaluate_memories(memories) == [manager.evaluate_memory_value(memory) for memory in memories]
+
+    def test_decay_uses_curve_and_weights(self):
+        manager = MemoryLifecycleManager()
+        manager.decay_curve = DecayCurve.STEP
+        memory = _memories()[4]
+
+        assert manager.apply_decay(memory) == pytest.approx(0.1)
+        assert manager.apply_decay(_memories()[-1]) == 0.5
+
+
+class TestRecallScoring:
+    def test_fuzzy_match_equals_exhaustive_ratio(self):
+        engine = MemoryRecallEngine.__new__(MemoryRecallEngine)
+        content_words = {"database", "databse", "errors", "request", "unrelated"}
+
+        for q_word in ["database", "error", "requests", "zzz"]:
+            ratios = [SequenceMatcher(None, q_word, c_word).ratio() for c_word in content_words]
+            expected = max([ratio for ratio in ratios if ratio > FUZZY_MATCH_THRESHOLD], default=0.0)
+            assert engine._best_fuzzy_match(q_word, content_words) == expected
+
+    def test_advanced_recall_scores_every_candidate(self):
+        engine = MemoryRecallEngine.__new__(MemoryRecallEngine)
+        context = {"tags": ["a"], "type": "bug", "layer": "project", "importance": "high"}
+        candidates = [
+            {"content": "database error in the api layer", "layer": "project", "metadata": {"type": "bug"}},
+            {"content": "unrelated note", "layer": "global", "metadata": {"tags": ["a"]}, "relevance_score": 0.9},
+            {"content": "indexed hit", "text_score": 1.0, "layer": "project", "metadata": {}},
+        ]
+        expected_semantic = [engine.semantic_keyword_match("database errors", c["content"]) for c in candidates[:2]]
+        expected_context = [engine.context_similarity(c, context) for c in candidates]
+
+        with patch("utils.memory_recall_algorithms.base_recall", return_value=candidates):
+            results = engine.advanced_recall(query="database errors", context=context, limit=10)
+
+        scores = {memory["content"]: memory["advanced_scores"] for memory in results}
+        assert [scores[c["content"]]["semantic"] for c in candidates] == expected_semantic + [1.0]
+        assert [scores[c["content"]]["context"] for c in candidates] == expected_context
+        assert [memory["relevance_score"] for memory in results] == sorted(
+            (memory["relevance_score"] for memory in results), reverse=True
+        )
@@ -0,0 +1,172 @@
+"""Tests for journaled persistence of the memory index."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from utils import conversation_memory
+from utils import intelligent_memory_retrieval as retrieval
+from utils.intelligent_memory_retrieval import (
+    MemoryIndex,
+    load_memory_index,
+    rebuild_memory_index,
+    save_memory_index,
+    verify_memory_index,
+)
+from utils.memory_store import close_memory_stores
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    close_memory_stores()
+    with patch.object(retrieval, "MEMORY_STORAGE_PATH", tmp_path), patch.object(
+        conversation_memory, "MEMORY_STORAGE_PATH", tmp_path
+    ), patch.object(conversation_memory, "ENABLE_ENHANCED_MEMORY", True):
+        with patch.object(retrieval, "_memory_index", None), patch.object(
+            retrieval, "_persisted_generation", None
+        ), patch.object(retrieval, "_journal_ops", 0):
+            yield tmp_path
+    close_memory_stores()
+
+
+def _add(index, key, tags=("python",), mem_type="bug", quality=0.8, layer="project"):
+    index.add_memory(
+        key, layer, {"tags": list(tags), "type": mem_type, "quality_score": quality}, "2024-05-01T10:00:00"
+    )
+
+
+def _journal_lines(directory):
+    return (directory / "memory_index.journal").read_text(encoding="utf-8").splitlines()
+
+
+def _state(index):
+    data = index.to_dict()
+    data.pop("last_updated")
+    return {
+        name: {k: sorted(v) for k, v in value.items()} if name.endswith("_index") else value
+        for name, value in data.items()
+    }
+
+
+class TestJournal:
+    def test_saves_append_only_changes(self, index_dir):
+        index = MemoryIndex()
+        for n in range(3):
+            _add(index, f"k{n}")
+        assert save_memory_index(index)
+        snapshot = (index_dir / "memory_index.json").read_text(encoding="utf-8")
+        assert len(_journal_lines(index_dir)) == 1  # header only
+
+        _add(index, "k3", tags=["rust"])
+        index.remove_memory("k0")
+        assert save_memory_index(index)
+
+        assert (index_dir / "memory_index.json").read_text(encoding="utf-8") == snapshot
+        entries = [json.loads(line) for line in _journal_lines(index_dir)[1:]]
+        assert [(entry["op"], entry["key"]) for entry in entries] == [("add", "k3"), ("remove", "k0")]
+
+    def test_load_replays_journal_over_snapshot(self, index_dir):
+        index = MemoryIndex()
+        _add(index, "a")
+        _add(index, "b", tags=["go"], mem_type="feature")
+        save_memory_index(index)
+        _add(index, "a", tags=["java"], quality=0.3)
+        index.remove_memory("b")
+        _add(index, "c")
+        save_memory_index(index)
+
+        loaded = load_memory_index()
+
+        assert _state(loaded) == _state(index)
+        assert loaded.search_by_tags(["python"]) == {"c"}
+        assert loaded.search_by_quality(0.3, 0.3) == {"a"}
+
+    def test_compaction_after_threshold(self, index_dir):
+        index = MemoryIndex()
+        save_memory_index(index)
+
+        with patch.object(retrieval, "MEMORY_INDEX_COMPACT_OPS", 3):
+            for n in range(3):
+                _add(index, f"k{n}")
+                save_memory_index(index)
+            assert len(_journal_lines(index_dir)) == 4
+
+            _add(index, "k3")
+            save_memory_index(index)
+
+        assert len(_journal_lines(index_dir)) == 1
+        snapshot = json.loads((index_dir / "memory_index.json").read_text(encoding="utf-8"))
+        assert sorted(snapshot["memory_metadata"]) == ["k0", "k1", "k2", "k3"]
+        assert _state(load_memory_index()) == _state(index)
+
+    def test_truncated_entry_is_ignored(self, index_dir):
+        index = MemoryIndex()
+        save_memory_index(index)
+        _add(index, "kept")
+        save_memory_index(index)
+        with open(index_dir / "memory_index.journal", "a", encoding="utf-8") as f:
+            f.write('{"op": "add", "key": "partial", "lay')
+
+        loaded = load_memory_index()
+        assert set(loaded.memory_metadata) == {"kept"}
+
+        # Entries journaled after the restart must not be lost behind the partial line
+        _add(loaded, "after")
+        save_memory_index(loaded)
+        assert set(load_memory_index().memory_metadata) == {"kept", "after"}
+
+    def test_failed_append_keeps_pending_changes(self, index_dir):
+        index = MemoryIndex()
+        save_memory_index(index)
+        _add(index, "a")
+
+        with patch("builtins.open", side_effect=OSError("disk full")):
+            assert not save_memory_index(index)
+        assert save_memory_index(index)
+
+        assert set(load_memory_index().memory_metadata) == {"a"}
+
+    def test_journal_of_older_snapshot_is_ignored(self, index_dir):
+        index = MemoryIndex()
+        save_memory_index(index)
+        _add(index, "a")
+        save_memory_index(index)
+        stale_journal = (index_dir / "memory_index.journal").read_text(encoding="utf-8")
+
+        index.remove_memory("a")
+        retrieval.compact_memory_index(index)
+        # Simulate a crash after the snapshot was replaced but before the journal was reset
+        (index_dir / "memory_index.journal").write_text(stale_journal, encoding="utf-8")
+
+        assert load_memory_index().memory_metadata == {}
+
+    def test_re_adding_a_key_drops_stale_entries(self):
+        index = MemoryIndex()
+        _add(index, "a", tags=["python"], quality=0.9)
+        _add(index, "a", tags=["rust"], quality=0.2)
+
+        assert index.search_by_tags(["python"]) == set()
+        assert index.search_by_quality(0.9, 0.9) == set()
+        assert index.search_by_tags(["rust"]) == {"a"}
+
+
+class TestVerification:
+    def test_verify_and_rebuild(self, index_dir):
+        conversation_memory.save_memory(
+            "stored", layer="project", metadata={"tags": ["db"], "type": "bug"}, key="stored"
+        )
+        conversation_memory.save_memory("other", layer="global", metadata={"type": "note"}, key="retyped")
+
+        index = retrieval.get_memory_index()
+        _add(index, "retyped", tags=[], mem_type="bug", layer="global")
+        _add(index, "gone")
+        _add(index, "session-only", layer="session")
+
+        assert verify_memory_index() == {"missing": ["stored"], "orphaned": ["gone"], "mismatched": ["retyped"]}
+
+        rebuilt = rebuild_memory_index(verify=True)
+
+        assert retrieval.get_memory_index() is rebuilt
+        assert verify_memory_index() == {"missing": [], "orphaned": [], "mismatched": []}
+        assert set(load_memory_index().memory_metadata) == {"stored", "retyped"}
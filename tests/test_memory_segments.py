@@ -0,0 +1,154 @@
+"""Tests for segment-file storage and lazy loading of memory layers."""
+
+import json
+from unittest.mock import patch
+
+from utils import enhanced_memory
+from utils.enhanced_memory import MemoryItem, ProjectMemoryLayer
+from utils.memory_segments import INDEX_FILE, SegmentStore
+
+
+def _meta(n):
+    return {"id": f"m{n}", "type": "note"}
+
+
+class TestSegmentStore:
+    def test_round_trip_and_metadata_only_update(self, tmp_path):
+        store = SegmentStore(tmp_path)
+        store.put("m0", _meta(0), {"content": "first"})
+        store.put("m0", {**_meta(0), "access_count": 3})
+
+        reopened = SegmentStore(tmp_path)
+        assert reopened.load() == {"m0": {"id": "m0", "type": "note", "access_count": 3}}
+        assert reopened.read_payload("m0") == {"content": "first"}
+
+    def test_delete_and_truncated_index_line(self, tmp_path):
+        store = SegmentStore(tmp_path)
+        store.put_many({f"m{n}": (_meta(n), {"content": f"c{n}"}) for n in range(3)})
+        assert store.delete("m1")
+        assert not store.delete("m1")
+        with open(tmp_path / INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write('{"id": "m2", "del')
+
+        reopened = SegmentStore(tmp_path)
+        assert sorted(reopened.load()) == ["m0", "m2"]
+        assert reopened.read_payload("m2") == {"content": "c2"}
+
+        # Records appended after the torn line must survive the next restart
+        reopened.put("m3", _meta(3), {"content": "c3"})
+        assert sorted(SegmentStore(tmp_path).load()) == ["m0", "m2", "m3"]
+
+    def test_segments_roll_over(self, tmp_path):
+        store = SegmentStore(tmp_path, max_segment_bytes=64)
+        for n in range(6):
+            store.put(f"m{n}", _meta(n), {"content": "x" * 30})
+
+        assert store.get_stats()["segments"] > 1
+        reopened = SegmentStore(tmp_path, max_segment_bytes=64)
+        reopened.load()
+        assert all(reopened.read_payload(f"m{n}") == {"content": "x" * 30} for n in range(6))
+
+    def test_compaction_drops_garbage(self, tmp_path):
+        store = SegmentStore(tmp_path)
+        for version in range(5):
+            store.put_many({f"m{n}": (_meta(n), {"content": f"v{version}"}) for n in range(4)})
+        store.delete("m3")
+        before = store.get_stats()
+
+        store.compact()
+
+        after = store.get_stats()
+        assert after["segment_bytes"] == after["live_bytes"] + after["items"]  # one newline per record
+        assert after["segment_bytes"] < before["segment_bytes"]
+        assert after["index_lines"] == 3
+        reopened = SegmentStore(tmp_path)
+        assert sorted(reopened.load()) == ["m0", "m1", "m2"]
+        assert reopened.read_payload("m2") == {"content": "v4"}
+
+
+def _fill(path, count):
+    layer = ProjectMemoryLayer(path)
+    for n in range(count):
+        layer.save_item(
+            MemoryItem(id=f"m{n}", content=f"memory item{n}", layer="project", type="even" if n % 2 == 0 else "odd")
+        )
+    return layer
+
+
+class TestLazyMemoryLayer:
+    def test_startup_reads_only_metadata(self, tmp_path):
+        _fill(tmp_path / "project", 10)
+
+        with patch.object(SegmentStore, "read_payload", side_effect=AssertionError("payload read")):
+            layer = ProjectMemoryLayer(tmp_path / "project")
+            stats = layer.get_statistics()
+            assert layer.cleanup_expired_items() == 0
+
+        assert stats["total_items"] == 10
+        assert stats["types"] == {"even": 5, "odd": 5}
+        assert stats["resident_items"] == 0
+
+    def test_search_materializes_only_results(self, tmp_path):
+        _fill(tmp_path / "project", 10)
+        layer = ProjectMemoryLayer(tmp_path / "project")
+
+        with patch.object(SegmentStore, "read_payload", wraps=layer._store.read_payload) as read:
+            results = layer.search_items(type_filter="odd", limit=2)
+
+        assert len(results) == 2
+        assert all(item.type == "odd" and item.content.startswith("memory") for item in results)
+        assert read.call_count == 2
+
+    def test_text_search_after_reload(self, tmp_path):
+        _fill(tmp_path / "project", 4)
+        layer = ProjectMemoryLayer(tmp_path / "project")
+        assert layer._text_index is None
+
+        assert [item.id for item in layer.search_items(query="memory item3")] == ["m3"]
+        layer.save_item(MemoryItem(id="m9", content="new memory item3", layer="project"))
+        assert {item.id for item in layer.search_items(query="memory item3")} == {"m3", "m9"}
+
+    def test_resident_items_are_bounded(self, tmp_path):
+        with patch.object(enhanced_memory, "MEMORY_RESIDENT_ITEMS", 3):
+            layer = _fill(tmp_path / "project", 10)
+            for n in range(10):
+                assert layer.get_item(f"m{n}").content == f"memory item{n}"
+
+        assert len(layer._resident) == 3
+        assert layer.get_item("m0").access_count == 2
+
+    def test_resave_replaces_metadata_indexes(self, tmp_path):
+        layer = _fill(tmp_path / "project", 2)
+        item = layer.get_item("m0")
+        item.type = "odd"
+        layer.save_item(item)
+
+        reloaded = ProjectMemoryLayer(tmp_path / "project")
+        assert {item.id for item in reloaded.search_items(type_filter="odd")} == {"m0", "m1"}
+        assert reloaded.search_items(type_filter="even") == []
+
+    def test_legacy_json_files_are_migrated(self, tmp_path):
+        path = tmp_path / "project"
+        path.mkdir()
+        legacy = MemoryItem(id="old", content={"note": "legacy"}, layer="project", tags=["kept"])
+        with open(path / "old.json", "w", encoding="utf-8") as f:
+            json.dump(legacy.to_dict(), f)
+
+        layer = ProjectMemoryLayer(path)
+
+        assert not (path / "old.json").exists()
+        assert layer._memory_items["old"].to_dict() == legacy.to_dict()
+        assert [item.id for item in ProjectMemoryLayer(path).search_items(tags=["kept"])] == ["old"]
+
+    def test_unreadable_legacy_files_are_kept(self, tmp_path):
+        path = tmp_path / "project"
+        path.mkdir()
+        (path / "a.json").write_text("{not json", encoding="utf-8")
+        for name in "bcde":
+            with open(path / f"{name}.json", "w", encoding="utf-8") as f:
+                json.dump(MemoryItem(id=name, content=name, layer="project").to_dict(), f)
+
+        layer = ProjectMemoryLayer(path)
+
+        assert sorted(layer._item_meta) == ["b", "c", "d", "e"]
+        assert [p.name for p in path.glob("*.json")] == ["a.json"]
@@ -0,0 +1,177 @@
+"""Tests for the key-level memory layer store."""
+
+import json
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from utils import conversation_memory
+from utils.intelligent_memory_retrieval import update_memory_access
+from utils.memory_store import MemoryLayerStore, close_memory_stores
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MemoryLayerStore(tmp_path / "layer.db")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def memory_dir(tmp_path):
+    close_memory_stores()
+    with patch.object(conversation_memory, "MEMORY_STORAGE_PATH", tmp_path), patch.object(
+        conversation_memory, "ENABLE_ENHANCED_MEMORY", True
+    ):
+        yield tmp_path
+    close_memory_stores()
+
+
+def _entry(timestamp, content="x"):
+    return {"content": content, "metadata": {}, "timestamp": timestamp, "layer": "project"}
+
+
+class TestMemoryLayerStore:
+    def test_put_get_delete(self, store):
+        store.put("a", _entry("2024-01-01", "first"))
+
+        assert store.get("a")["content"] == "first"
+        assert store.get("missing") is None
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+        assert store.count() == 0
+
+    def test_batch_is_atomic(self, store):
+        store.put("keep", _entry("2024-01-01"))
+
+        # The delete fails after the upsert already ran inside the transaction
+        with pytest.raises(sqlite3.Error):
+            store.apply({"new": _entry("2024-01-02")}, ["keep", object()])
+
+        assert store.keys() == ["keep"]
+
+    def test_trim_removes_oldest(self, store):
+        store.put_many({f"k{n}": _entry(f"2024-01-0{n}") for n in (3, 1, 2, 4)})
+
+        assert store.trim(2) == ["k1", "k2"]
+        assert store.keys() == ["k3", "k4"]
+        assert store.trim(2) == []
+
+    def test_replace_all_writes_only_changes(self, store):
+        store.put_many({"a": _entry("1"), "b": _entry("2"), "c": _entry("3")})
+
+        changed = store.replace_all({"a": _entry("1"), "b": _entry("2", "edited"), "d": _entry("4")})
+
+        assert changed == 3
+        assert dict(store.items()) == {"a": _entry("1"), "b": _entry("2", "edited"), "d": _entry("4")}
+
+    def test_legacy_json_is_imported_once(self, tmp_path):
+        legacy = tmp_path / "project_memory.json"
+        legacy.write_text(json.dumps({"old": _entry("2024-01-01")}))
+
+        store = MemoryLayerStore(tmp_path / "project_memory.db", legacy_json_path=legacy)
+        try:
+            assert store.get("old") == _entry("2024-01-01")
+            assert not legacy.exists()
+            assert (tmp_path / "project_memory.json.migrated").exists()
+        finally:
+            store.close()
+
+
+class TestFullTextSearch:
+    def test_index_follows_puts_and_deletes(self, store):
+        store.put_many(
+            {"a": _entry("1", "数据库连接超时"), "b": _entry("2", "payment bug"), "c": _entry("3", "bug bug")}
+        )
+
+        assert [key for key, _ in store.search("bug")] == ["c", "b"]
+        assert [key for key, _ in store.search("连接")] == ["a"]
+
+        store.put("c", _entry("3", "parser rewrite"))
+        store.delete("b")
+        assert store.search("bug") == []
+        assert [key for key, _ in store.search("parser")] == ["c"]
+
+        store.put_many({f"old{n}": _entry(f"0{n}", "bug") for n in range(3)})
+        store.trim(2)
+        assert store.search("bug") == []
+
+    def test_search_restricted_to_keys(self, store):
+        store.put_many({"a": _entry("1", "cache bug"), "b": _entry("2", "cache miss")})
+
+        assert [key for key, _ in store.search("cache", keys={"b"})] == ["b"]
+
+    def test_existing_database_is_indexed_on_open(self, tmp_path):
+        path = tmp_path / "layer.db"
+        store = MemoryLayerStore(path)
+        store.put("a", _entry("1", "legacy content"))
+        with store._transaction() as conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM store_meta WHERE name = 'text_index'")
+        store.close()
+
+        reopened = MemoryLayerStore(path)
+        try:
+            assert [key for key, _ in reopened.search("legacy")] == ["a"]
+        finally:
+            reopened.close()
+
+
+class TestConversationMemoryLayers:
+    def test_save_memory_writes_single_key(self, memory_dir):
+        key = conversation_memory.save_memory("hello", layer="project", key="k1")
+
+        with sqlite3.connect(str(memory_dir / "project_memory.db")) as conn:
+            rows = conn.execute("SELECT key, data FROM memories").fetchall()
+
+        assert key == "k1"
+        assert [(k, json.loads(d)["content"]) for k, d in rows] == [("k1", "hello")]
+        assert not (memory_dir / "project_memory.json").exists()
+
+    def test_save_memory_enforces_max_items(self, memory_dir):
+        with patch.dict(conversation_memory.MEMORY_LAYERS["project"], {"max_items": 2}):
+            for n in range(4):
+                conversation_memory.save_memory(f"item {n}", layer="project", key=f"k{n}")
+
+        assert list(conversation_memory._load_memory_layer("project")) == ["k2", "k3"]
+
+    def test_save_layer_keeps_whole_layer_semantics(self, memory_dir):
+        conversation_memory.save_memory("a", layer="global", key="a")
+        conversation_memory.save_memory("b", layer="global", key="b")
+
+        data = conversation_memory._load_memory_layer("global")
+        del data["a"]
+        data["c"] = _entry("2099-01-01", "c")
+        assert conversation_memory._save_memory_layer("global", data) is True
+
+        assert sorted(conversation_memory._load_memory_layer("global")) == ["b", "c"]
+
+    def test_update_memory_access_updates_one_entry(self, memory_dir):
+        conversation_memory.save_memory("a", layer="project", key="a")
+        conversation_memory.save_memory("b", layer="project", key="b")
+
+        with patch("utils.intelligent_memory_retrieval.save_memory_index"), patch.object(
+            MemoryLayerStore, "replace_all", side_effect=AssertionError("whole layer rewritten")
+        ):
+            update_memory_access("a", "project")
+
+        data = conversation_memory._load_memory_layer("project")
+        assert data["a"]["metadata"]["access_count"] == 1
+        assert "access_count" not in data["b"]["metadata"]
+
+    def test_recall_memory_ranks_query_matches(self, memory_dir):
+        conversation_memory.save_memory("cache bug", layer="project", key="once")
+        conversation_memory.save_memory("cache cache cache bug", layer="project", key="often")
+        conversation_memory.save_memory("unrelated note", layer="project", key="other")
+
+        results = conversation_memory.recall_memory(query="cache", layer="project")
+
+        assert [memory["key"] for memory in results] == ["often", "once"]
+
+    def test_recall_memory_without_index_terms_uses_substring_match(self, memory_dir):
+        conversation_memory.save_memory("rewrote the parser in C++", layer="project", key="cpp")
+        conversation_memory.save_memory("statistics in R", layer="project", key="r")
+
+        assert [m["key"] for m in conversation_memory.recall_memory(query="C++", layer="project")] == ["cpp"]
+        assert {m["key"] for m in conversation_memory.recall_memory(query="r", layer="project")} == {"cpp", "r"}
@@ -0,0 +1,85 @@
+"""Tests for the precompiled model routing table."""
+
+from unittest.mock import patch
+
+import pytest
+
+import utils.model_restrictions
+from providers.base import ProviderType
+from providers.gemini import GeminiModelProvider
+from providers.openai_provider import OpenAIModelProvider
+from providers.registry import ModelProviderRegistry
+from tools.models import ToolModelCategory
+
+MODEL_NAMES = ["flash", "FLASH", "pro", "gemini-2.5-pro", "o3", "O3-Mini", "mini", "o4-mini", "unknown-model"]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-gemini-key")
+    monkeypatch.setenv("OPENAI_API_KEY", "test-openai-key")
+    monkeypatch.delenv("OPENAI_ALLOWED_MODELS", raising=False)
+    monkeypatch.delenv("GOOGLE_ALLOWED_MODELS", raising=False)
+    original_instance = ModelProviderRegistry._instance
+    original_service = utils.model_restrictions._restriction_service
+    ModelProviderRegistry._instance = None
+    utils.model_restrictions._restriction_service = None
+
+    ModelProviderRegistry.register_provider(ProviderType.GOOGLE, GeminiModelProvider)
+    ModelProviderRegistry.register_provider(ProviderType.OPENAI, OpenAIModelProvider)
+    yield ModelProviderRegistry
+
+    ModelProviderRegistry._instance = original_instance
+    utils.model_restrictions._restriction_service = original_service
+
+
+def _routing(registry):
+    routes = {}
+    for name in MODEL_NAMES:
+        provider = registry.get_provider_for_model(name)
+        routes[name] = (provider.get_provider_type(), provider._resolve_model_name(name)) if provider else None
+    fallbacks = {category: registry.get_preferred_fallback_model(category) for category in [None, *ToolModelCategory]}
+    return routes, fallbacks, registry.get_available_models()
+
+
+@pytest.mark.no_mock_provider
+class TestModelRoutingTable:
+    def test_table_matches_dynamic_resolution(self, registry):
+        dynamic = _routing(registry)
+        registry.build_routing_table()
+
+        assert _routing(registry) == dynamic
+        assert dynamic[0]["FLASH"] == (ProviderType.GOOGLE, "gemini-2.5-flash")
+        assert dynamic[0]["unknown-model"] is None
+
+    def test_lookups_do_not_validate(self, registry):
+        registry.build_routing_table()
+
+        with patch.object(GeminiModelProvider, "validate_model_name") as gemini_validate:
+            with patch.object(OpenAIModelProvider, "validate_model_name") as openai_validate:
+                assert registry.get_provider_for_model("pro").get_provider_type() == ProviderType.GOOGLE
+                assert registry.get_provider_for_model("o3").get_provider_type() == ProviderType.OPENAI
+                assert registry.get_provider(ProviderType.GOOGLE)._resolve_model_name("pro") == "gemini-2.5-pro"
+
+        gemini_validate.assert_not_called()
+        openai_validate.assert_not_called()
+
+    def test_restriction_change_recompiles(self, registry, monkeypatch):
+        registry.build_routing_table()
+        assert registry.get_provider_for_model("o3") is not None
+
+        monkeypatch.setenv("OPENAI_ALLOWED_MODELS", "o4-mini")
+        utils.model_restrictions._restriction_service = None
+
+        assert registry.get_provider_for_model("o3") is None
+        assert registry.get_provider_for_model("o4-mini").get_provider_type() == ProviderType.OPENAI
+        assert registry.get_preferred_fallback_model(ToolModelCategory.FAST_RESPONSE) == "o4-mini"
+
+    def test_provider_changes_invalidate(self, registry):
+        table = registry.build_routing_table()
+
+        registry.unregister_provider(ProviderType.OPENAI)
+
+        assert registry.get_routing_table() is not table
+        assert registry.get_provider_for_model("o3") is None
+        assert ProviderType.OPENAI not in registry.get_available_models().values()
@@ -0,0 +1,175 @@
+"""Tests for write-behind persistence of workflow states."""
+
+import asyncio
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils.persistent_workflow_state import PersistentWorkflowStateManager, SQLiteStateBackend
+
+
+class CountingBackend(SQLiteStateBackend):
+    """SQLite backend that records every batch it writes."""
+
+    def __init__(self, db_path):
+        super().__init__(db_path)
+        self.batches = []
+
+    async def save_states(self, states):
+        self.batches.append(sorted(states))
+        return await super().save_states(states)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = CountingBackend(str(tmp_path / "workflow_states.db"))
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def manager(backend):
+    # Long interval: flushes happen only when the test asks for them
+    manager = PersistentWorkflowStateManager(backend=backend, flush_interval=3600)
+    yield manager
+    manager.shutdown()
+
+
+class TestSQLiteBatchSave:
+    @pytest.mark.asyncio
+    async def test_upsert_keeps_created_at_and_counts_writes(self, backend):
+        await backend.save_state("wf", {"step_number": 1})
+        await backend.save_states({"wf": {"step_number": 2}, "other": {"step_number": 1}})
+
+        with sqlite3.connect(str(backend.db_path)) as conn:
+            rows = dict(conn.execute("SELECT workflow_id, access_count FROM workflow_states").fetchall())
+            created, updated = conn.execute(
+                "SELECT created_at, updated_at FROM workflow_states WHERE workflow_id = 'wf'"
+            ).fetchone()
+
+        assert rows == {"wf": 2, "other": 1}
+        assert created <= updated
+        assert await backend.load_state("wf") == {"step_number": 2}
+
+
+class TestSQLiteConnectionReuse:
+    @pytest.mark.asyncio
+    async def test_connections_are_reused(self, tmp_path):
+        real_connect = sqlite3.connect
+        with patch("utils.persistent_workflow_state.sqlite3.connect", side_effect=real_connect) as connect:
+            backend = SQLiteStateBackend(str(tmp_path / "reuse.db"), reader_threads=2)
+            try:
+                for index in range(20):
+                    await backend.save_state(f"wf-{index}", {"step_number": index})
+                    assert await backend.load_state(f"wf-{index}") == {"step_number": index}
+                await backend.list_workflows()
+            finally:
+                backend.close()
+
+        # One writer connection plus at most one per reader thread
+        assert connect.call_count <= 3
+
+    @pytest.mark.asyncio
+    async def test_database_work_does_not_block_event_loop(self, backend):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        await backend._write(lambda conn: time.sleep(0.2))
+        task.cancel()
+
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_reads_run_while_writer_is_busy(self, backend):
+        await backend.save_state("wf", {"step_number": 1})
+
+        slow_write = asyncio.create_task(backend._write(lambda conn: time.sleep(0.3)))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        assert await backend.load_state("wf") == {"step_number": 1}
+        read_time = time.perf_counter() - start
+        await slow_write
+
+        assert read_time < 0.2
+
+    @pytest.mark.asyncio
+    async def test_read_survives_stopped_writer(self, backend):
+        await backend.save_state("wf", {"step_number": 1})
+        # The writer stops between the read and the access-count update (close() racing a load)
+        backend._writer.shutdown(wait=True)
+
+        assert await backend.load_state("wf") == {"step_number": 1}
+
+
+class TestWriteBehind:
+    @pytest.mark.asyncio
+    async def test_save_defers_persistence_until_flush(self, manager, backend):
+        assert await manager.save_state("wf", {"step_number": 1})
+
+        assert backend.batches == []
+        assert await manager.load_state("wf") == {"step_number": 1}
+        assert manager.get_sync_metrics()["backlog"] == 1
+
+        assert await manager.flush() == 1
+        assert backend.batches == [["wf"]]
+        assert await backend.load_state("wf") == {"step_number": 1}
+
+    @pytest.mark.asyncio
+    async def test_only_changed_workflows_are_written(self, manager, backend):
+        for index in range(5):
+            await manager.save_state(f"wf-{index}", {"step_number": 1})
+        await manager.flush()
+
+        await manager.save_state("wf-3", {"step_number": 2})
+        assert await manager.flush() == 1
+        assert await manager.flush() == 0
+
+        assert backend.batches == [[f"wf-{index}" for index in range(5)], ["wf-3"]]
+        metrics = manager.get_sync_metrics()
+        assert metrics["flush_count"] == 2
+        assert metrics["states_written"] == 6
+        assert metrics["last_batch_size"] == 1
+        assert metrics["max_batch_size"] == 5
+        assert metrics["backlog"] == 0
+        assert metrics["avg_flush_latency_ms"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_workflows_dirty(self, manager, backend):
+        await manager.save_state("wf", {"step_number": 1})
+
+        async def failing_save_states(states):
+            return False
+
+        original = backend.save_states
+        backend.save_states = failing_save_states
+        assert await manager.flush() == 0
+        assert manager.get_sync_metrics()["failed_flushes"] == 1
+        assert manager.get_sync_metrics()["backlog"] == 1
+
+        backend.save_states = original
+        assert await manager.flush() == 1
+
+    @pytest.mark.asyncio
+    async def test_deleted_workflows_are_not_flushed(self, manager, backend):
+        await manager.save_state("wf", {"step_number": 1})
+        await manager.delete_state("wf")
+
+        assert await manager.flush() == 0
+        assert backend.batches == []
+
+    @pytest.mark.asyncio
+    async def test_shutdown_flushes_backlog(self, manager, backend):
+        await manager.save_state("wf", {"step_number": 1})
+
+        manager.shutdown()
+
+        assert backend.batches == [["wf"]]
+        assert manager.get_sync_metrics()["backlog"] == 0
@@ -261,7 +261,8 @@ class TestPlannerTool:
         parsed_response = json.loads(response_text)
 
         assert parsed_response["metadata"]["branches"] == ["cloud-native-path"]
-        assert "cloud-native-path" in str(tool.branches)
+        session = tool.get_workflow_session("test-uuid-branch")
+        assert "cloud-native-path" in str(session.state["branches"])
 
     @pytest.mark.asyncio
     async def test_execute_with_revision(self):
@@ -295,9 +296,10 @@ class TestPlannerTool:
         assert parsed_response["metadata"]["is_step_revision"] is True
         assert parsed_response["metadata"]["revises_step_number"] == 2
 
-        # Check that step data was stored in history
-        assert len(tool.work_history) > 0
-        latest_step = tool.work_history[-1]
+        # Check that step data was stored in the continuation's history
+        work_history = tool.get_workflow_session("test-uuid-revision").state["work_history"]
+        assert len(work_history) > 0
+        latest_step = work_history[-1]
         assert latest_step["is_step_revision"] is True
         assert latest_step["revises_step_number"] == 2
 
@@ -372,15 +374,16 @@ class TestPlannerTool:
         }
 
         # Mock conversation memory functions
-        with patch("utils.conversation_memory.create_thread", return_value="test-uuid-history"):
+        with patch("tools.workflow.workflow_mixin.create_thread", return_value="test-uuid-history"):
             with patch("utils.conversation_memory.add_turn"):
                 await tool.execute(step1_args)
                 await tool.execute(step2_args)
 
-        # Should have tracked both steps
-        assert len(tool.work_history) == 2
-        assert tool.work_history[0]["step"] == "First step"
-        assert tool.work_history[1]["step"] == "Second step"
+        # Should have tracked both steps in the continuation's session
+        work_history = tool.get_workflow_session("test-uuid-history").state["work_history"]
+        assert len(work_history) == 2
+        assert work_history[0]["step"] == "First step"
+        assert work_history[1]["step"] == "Second step"
 
 
 # Integration test
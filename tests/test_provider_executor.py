@@ -0,0 +1,235 @@
+"""Tests for the async provider execution layer."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from providers.base import ModelResponse, ProviderType
+from providers.executor import ProviderExecutor
+from providers.openai_compatible import OpenAICompatibleProvider
+
+
+class _TestProvider(OpenAICompatibleProvider):
+    """Minimal concrete OpenAI-compatible provider for executor tests."""
+
+    FRIENDLY_NAME = "Test"
+
+    def get_capabilities(self, model_name):
+        return Mock()
+
+    def get_provider_type(self):
+        return ProviderType.CUSTOM
+
+    def validate_model_name(self, model_name):
+        return True
+
+
+def _response(content="ok"):
+    return ModelResponse(content=content, model_name="test-model", provider=ProviderType.CUSTOM)
+
+
+class TestProviderExecutor:
+    """Test ProviderExecutor scheduling, retries and cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_call_does_not_block_event_loop(self):
+        """A slow provider call leaves the event loop free for other work."""
+        provider = Mock()
+        provider.get_provider_type.return_value = ProviderType.GOOGLE
+        provider.generate_content.side_effect = lambda **kwargs: (time.sleep(0.3), _response())[1]
+        executor = ProviderExecutor(max_workers=2, per_provider_limit=2)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            for _ in range(5):
+                await asyncio.sleep(0.02)
+                ticks += 1
+
+        result, _ = await asyncio.gather(
+            executor.generate_content(provider, prompt="hi", model_name="test-model"), ticker()
+        )
+
+        assert result.content == "ok"
+        assert ticks == 5
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_per_provider_concurrency_limit(self):
+        """No more than per_provider_limit calls run at once for one provider."""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_call(**kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            return _response()
+
+        provider = Mock()
+        provider.get_provider_type.return_value = ProviderType.OPENAI
+        provider.generate_content.side_effect = slow_call
+        executor = ProviderExecutor(max_workers=8, per_provider_limit=2)
+
+        await asyncio.gather(*(executor.generate_content(provider, prompt="p", model_name="m") for _ in range(6)))
+
+        assert peak == 2
+        assert provider.generate_content.call_count == 6
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_retries_on_event_loop_with_single_worker_attempts(self):
+        """Retryable errors are retried with asyncio.sleep, one attempt per worker call."""
+        provider = _TestProvider("test-key")
+        mock_client = Mock()
+        completion = Mock()
+        completion.choices = [Mock(message=Mock(content="recovered"), finish_reason="stop")]
+        completion.usage = None
+        completion.model = "test-model"
+        completion.id = "id"
+        completion.created = 0
+        mock_client.chat.completions.create.side_effect = [Exception("503 Service Unavailable"), completion]
+        provider._client = mock_client
+
+        executor = ProviderExecutor(max_workers=1, per_provider_limit=1)
+        with (
+            patch("providers.executor.asyncio.sleep", new_callable=AsyncMock) as mock_sleep,
+            patch("time.sleep") as mock_time_sleep,
+        ):
+            result = await executor.run_blocking(provider, prompt="hi", model_name="test-model")
+
+        assert result.content == "recovered"
+        assert mock_client.chat.completions.create.call_count == 2
+        mock_sleep.assert_called_once_with(provider.RETRY_DELAYS[0])
+        mock_time_sleep.assert_not_called()
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_error_surfaces_provider_error(self):
+        """Non-retryable errors are raised once, unchanged."""
+        provider = _TestProvider("test-key")
+        mock_client = Mock()
+        mock_client.chat.completions.create.side_effect = Exception("invalid api key")
+        provider._client = mock_client
+
+        executor = ProviderExecutor(max_workers=1, per_provider_limit=1)
+        with pytest.raises(RuntimeError, match="after 1 attempt: invalid api key"):
+            await executor.run_blocking(provider, prompt="hi", model_name="test-model")
+
+        assert mock_client.chat.completions.create.call_count == 1
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancellation_reaches_running_call(self):
+        """Cancelling the awaiting task signals the worker-thread call."""
+        started = threading.Event()
+        observed_cancel = threading.Event()
+
+        class CancellableProvider(_TestProvider):
+            def generate_content(self, **kwargs):
+                started.set()
+                # Emulate a retry back-off inside the worker
+                try:
+                    self._sleep_before_retry(5)
+                except Exception:
+                    observed_cancel.set()
+                    raise
+                return _response()
+
+        provider = CancellableProvider("test-key")
+        executor = ProviderExecutor(max_workers=1, per_provider_limit=1)
+
+        task = asyncio.create_task(executor.run_blocking(provider, prompt="hi", model_name="test-model"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 2)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await asyncio.get_running_loop().run_in_executor(None, observed_cancel.wait, 2)
+        executor.shutdown()
+
+    def test_sync_path_keeps_provider_retries(self):
+        """Direct sync calls still use the provider's own retry loop."""
+        provider = _TestProvider("test-key")
+        assert provider._get_retry_attempts() == provider.MAX_RETRIES
+
+    @pytest.mark.asyncio
+    async def test_native_async_providers_skip_thread_pool(self):
+        """OpenAI-compatible providers are awaited directly through agenerate_content."""
+        provider = _TestProvider("test-key")
+        executor = ProviderExecutor(max_workers=1, per_provider_limit=1)
+
+        with patch.object(_TestProvider, "agenerate_content", new_callable=AsyncMock) as mock_agenerate:
+            mock_agenerate.return_value = _response("native")
+            result = await executor.generate_content(provider, prompt="hi", model_name="test-model")
+
+        assert result.content == "native"
+        mock_agenerate.assert_awaited_once_with(prompt="hi", model_name="test-model")
+        executor.shutdown()
+
+
+class TestNativeAsyncGeneration:
+    """Test the AsyncOpenAI-backed agenerate_content path."""
+
+    @staticmethod
+    def _completion(content):
+        completion = Mock()
+        completion.choices = [Mock(message=Mock(content=content), finish_reason="stop")]
+        completion.usage = Mock(prompt_tokens=3, completion_tokens=4, total_tokens=7)
+        completion.model = "test-model"
+        completion.id = "id"
+        completion.created = 0
+        return completion
+
+    @pytest.mark.asyncio
+    async def test_agenerate_content_uses_async_client(self):
+        """agenerate_content builds the same request and awaits the async client."""
+        provider = _TestProvider("test-key")
+        async_client = Mock()
+        async_client.chat.completions.create = AsyncMock(return_value=self._completion("async hello"))
+        provider._async_clients[asyncio.get_running_loop()] = async_client
+
+        result = await provider.agenerate_content(prompt="hi", model_name="test-model", system_prompt="sys")
+
+        assert result.content == "async hello"
+        assert result.usage["total_tokens"] == 7
+        call_kwargs = async_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["model"] == "test-model"
+        assert call_kwargs["messages"][0] == {"role": "system", "content": "sys"}
+
+    @pytest.mark.asyncio
+    async def test_agenerate_content_retries_with_asyncio_sleep(self):
+        """Retryable errors back off with asyncio.sleep on the native path."""
+        provider = _TestProvider("test-key")
+        async_client = Mock()
+        async_client.chat.completions.create = AsyncMock(
+            side_effect=[Exception("Connection reset"), self._completion("second try")]
+        )
+        provider._async_clients[asyncio.get_running_loop()] = async_client
+
+        with patch("providers.openai_compatible.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+            result = await provider.agenerate_content(prompt="hi", model_name="test-model")
+
+        assert result.content == "second try"
+        mock_sleep.assert_awaited_once_with(provider.RETRY_DELAYS[0])
+
+    @pytest.mark.asyncio
+    async def test_providers_share_pool_per_base_url(self):
+        """Providers pointing at the same endpoint share one async connection pool."""
+        first = _TestProvider("key-1", base_url="http://localhost:11434/v1")
+        second = _TestProvider("key-2", base_url="http://localhost:11434/v1")
+        other = _TestProvider("key-3", base_url="http://localhost:8080/v1")
+
+        assert first.async_client._client is second.async_client._client
+        assert first.async_client._client is not other.async_client._client
+        assert first.async_client.api_key == "key-1"
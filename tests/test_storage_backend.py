@@ -0,0 +1,218 @@
+"""Tests for the pluggable conversation storage backends."""
+
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from utils.conversation_memory import add_turn, create_thread, get_thread_chain
+from utils.storage_backend import InMemoryStorage, RedisStorage, SQLiteStorage, _create_storage_backend
+
+
+class FakeRedis:
+    """Local stand-in for a Redis client (string values, TTL in seconds)."""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        return None
+
+    def setex(self, key, ttl, value):
+        self.round_trips += 1
+        self.data[key] = (value.encode("utf-8"), time.time() + ttl)
+
+    def get(self, key):
+        self.round_trips += 1
+        return self._live(key)
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self._live(key) for key in keys]
+
+    def delete(self, key):
+        self.round_trips += 1
+        self.data.pop(key, None)
+
+    def lrange(self, key, start, end):
+        self.round_trips += 1
+        items = self._live(key) or []
+        return items[start : end + 1 if end != -1 else None]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def setex(self, key, ttl, value):
+        self.commands.append(("setex", key, ttl, value))
+
+    def rpush(self, key, value):
+        self.commands.append(("rpush", key, value))
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+
+    def lrange(self, key, start, end):
+        self.commands.append(("lrange", key, start, end))
+
+    def execute(self):
+        self.redis.round_trips += 1
+        data = self.redis.data
+        results = []
+        for command, key, *args in self.commands:
+            if command == "setex":
+                data[key] = (args[1].encode("utf-8"), time.time() + args[0])
+                results.append(True)
+            elif command == "rpush":
+                items = self.redis._live(key) or []
+                items.append(args[0].encode("utf-8"))
+                data[key] = (items, data.get(key, (None, time.time() + 3600))[1])
+                results.append(len(items))
+            elif command == "expire":
+                data[key] = (data[key][0], time.time() + args[0])
+                results.append(True)
+            else:
+                items = self.redis._live(key) or []
+                results.append(items[args[0] : args[1] + 1 if args[1] != -1 else None])
+        return results
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def storage(request, tmp_path):
+    if request.param == "memory":
+        backend = InMemoryStorage()
+    elif request.param == "sqlite":
+        backend = SQLiteStorage(str(tmp_path / "conversations.db"))
+    else:
+        backend = RedisStorage(client=FakeRedis())
+    yield backend
+    backend.shutdown()
+
+
+class TestStorageBackends:
+    """Behaviour shared by every backend."""
+
+    def test_setex_and_get(self, storage):
+        storage.setex("thread:a", 60, "value-a")
+        assert storage.get("thread:a") == "value-a"
+        assert storage.get("thread:missing") is None
+
+    def test_expired_values_are_hidden(self, storage):
+        storage.setex("thread:a", 60, "value-a")
+        with patch("time.time", return_value=time.time() + 120):
+            assert storage.get("thread:a") is None
+
+    def test_mget_and_mset(self, storage):
+        storage.mset({"k1": "v1", "k2": "v2"}, 60)
+        assert storage.mget(["k1", "missing", "k2"]) == ["v1", None, "v2"]
+        assert storage.mget([]) == []
+
+    def test_delete(self, storage):
+        storage.setex("k1", 60, "v1")
+        storage.delete("k1")
+        assert storage.get("k1") is None
+
+    def test_rpush_and_lrange(self, storage):
+        assert storage.rpush_with_ttl("log", 60, "a") == 1
+        assert storage.rpush_with_ttl("log", 60, "b") == 2
+        assert storage.rpush_with_ttl("log", 60, "c") == 3
+
+        assert storage.lrange("log") == ["a", "b", "c"]
+        assert storage.lrange("log", -2, -1) == ["b", "c"]
+        assert storage.lrange("log", 0, 0) == ["a"]
+        assert storage.lrange("missing") == []
+        assert storage.mlrange(["log", "missing"]) == [["a", "b", "c"], []]
+
+    def test_expired_lists_are_hidden(self, storage):
+        storage.rpush_with_ttl("log", 60, "a")
+        with patch("time.time", return_value=time.time() + 120):
+            assert storage.lrange("log") == []
+
+
+class TestSQLiteStorage:
+    """SQLite-specific durability."""
+
+    def test_data_is_shared_between_instances(self, tmp_path):
+        """A second connection (e.g. another server process) sees the same threads."""
+        path = str(tmp_path / "shared.db")
+        writer = SQLiteStorage(path)
+        reader = SQLiteStorage(path)
+        try:
+            writer.setex("thread:shared", 60, "payload")
+            assert reader.get("thread:shared") == "payload"
+        finally:
+            writer.shutdown()
+            reader.shutdown()
+
+    def test_cleanup_purges_expired_rows(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / "cleanup.db"))
+        try:
+            storage.setex("old", 1, "v")
+            with patch("time.time", return_value=time.time() + 10):
+                storage._cleanup_expired()
+            count = storage._conn.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+            assert count == 0
+        finally:
+            storage.shutdown()
+
+    def test_failed_delete_rolls_back(self, tmp_path):
+        storage = SQLiteStorage(str(tmp_path / "rollback.db"))
+        try:
+            storage.setex("k", 60, "v")
+            storage._conn.execute("DROP TABLE list_items")
+
+            with pytest.raises(sqlite3.OperationalError):
+                storage.delete("k")
+
+            assert not storage._conn.in_transaction
+            assert storage.get("k") == "v"
+            storage.setex("k2", 60, "v2")
+            assert storage.get("k2") == "v2"
+        finally:
+            storage.shutdown()
+
+
+class TestBackendSelection:
+    def test_unknown_backend_falls_back_to_memory(self):
+        backend = _create_storage_backend("bogus")
+        assert isinstance(backend, InMemoryStorage)
+        backend.shutdown()
+
+    def test_sqlite_backend_selected(self, tmp_path):
+        with patch("config.CONVERSATION_STORAGE_PATH", str(tmp_path / "db.sqlite")):
+            backend = _create_storage_backend("sqlite")
+        assert isinstance(backend, SQLiteStorage)
+        backend.shutdown()
+
+
+class TestBatchedThreadChain:
+    def test_chain_uses_batched_reads(self):
+        """get_thread_chain fetches all ancestors with batched reads instead of one read per thread."""
+        fake = FakeRedis()
+        storage = RedisStorage(client=fake)
+
+        with patch("utils.conversation_memory.get_storage", return_value=storage):
+            thread_a = create_thread("tool_a", {"data": "a"})
+            thread_b = create_thread("tool_b", {"data": "b"}, parent_thread_id=thread_a)
+            thread_c = create_thread("tool_c", {"data": "c"}, parent_thread_id=thread_b)
+            assert add_turn(thread_a, "user", "first")
+            assert add_turn(thread_b, "user", "second")
+            assert add_turn(thread_c, "user", "third")
+
+            fake.round_trips = 0
+            chain = get_thread_chain(thread_c)
+
+        assert [thread.thread_id for thread in chain] == [thread_a, thread_b, thread_c]
+        assert [thread.turns[0].content for thread in chain] == ["first", "second", "third"]
+        # Start header + its turn log, then ancestor headers (mget) + ancestor logs (pipeline)
+        assert fake.round_trips == 4
@@ -0,0 +1,257 @@
+"""Tests for streamed provider output and MCP progress reporting."""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from providers.base import ModelResponse, ProviderType
+from providers.executor import ProviderExecutor
+from providers.openai_compatible import OpenAICompatibleProvider
+from utils.progress import ProgressReporter, get_progress_reporter, progress_reporting
+
+
+class _TestProvider(OpenAICompatibleProvider):
+    """Minimal concrete OpenAI-compatible provider for streaming tests."""
+
+    FRIENDLY_NAME = "Test"
+    SUPPORTS_STREAM_USAGE = True
+
+    def get_capabilities(self, model_name):
+        return Mock()
+
+    def get_provider_type(self):
+        return ProviderType.CUSTOM
+
+    def validate_model_name(self, model_name):
+        return True
+
+
+def _chunk(text=None, finish_reason=None, usage=None):
+    """Build a chat.completion.chunk-like object."""
+    chunk = Mock()
+    chunk.model = "test-model"
+    chunk.id = "chunk-id"
+    chunk.created = 1
+    chunk.usage = usage
+    if text is None and finish_reason is None:
+        chunk.choices = []
+    else:
+        chunk.choices = [Mock(delta=Mock(content=text), finish_reason=finish_reason)]
+    return chunk
+
+
+def _stream_chunks():
+    return [
+        _chunk("Hel"),
+        _chunk("lo"),
+        _chunk(" world", finish_reason="stop"),
+        _chunk(usage=Mock(prompt_tokens=5, completion_tokens=3, total_tokens=8)),
+    ]
+
+
+class _AsyncStream:
+    """Async iterator over pre-built chunks, like openai.AsyncStream."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+class TestStreamAssembly:
+    """Test that streamed chunks are assembled into a full ModelResponse."""
+
+    def test_sync_stream_callback_receives_deltas(self):
+        """generate_content streams deltas to the callback and returns the joined text."""
+        provider = _TestProvider("test-key")
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = iter(_stream_chunks())
+        provider._client = mock_client
+        received = []
+
+        result = provider.generate_content(prompt="hi", model_name="test-model", stream_callback=received.append)
+
+        assert received == ["Hel", "lo", " world"]
+        assert result.content == "Hello world"
+        assert result.usage["total_tokens"] == 8
+        assert result.metadata["finish_reason"] == "stop"
+        assert result.metadata["streamed"] is True
+        call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["stream"] is True
+        assert call_kwargs["stream_options"] == {"include_usage": True}
+        assert "stream_callback" not in call_kwargs
+
+    def test_stream_flag_without_callback_is_assembled(self):
+        """stream=True without a callback no longer reads message.content from a stream."""
+        provider = _TestProvider("test-key")
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = iter(_stream_chunks())
+        provider._client = mock_client
+
+        result = provider.generate_content(prompt="hi", model_name="test-model", stream=True)
+
+        assert result.content == "Hello world"
+
+    def test_stream_options_only_where_supported(self):
+        """Endpoints that may reject stream_options do not get it."""
+
+        class _PlainProvider(_TestProvider):
+            SUPPORTS_STREAM_USAGE = False
+
+        provider = _PlainProvider("test-key")
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = iter(_stream_chunks())
+        provider._client = mock_client
+
+        result = provider.generate_content(prompt="hi", model_name="test-model", stream=True)
+
+        assert result.content == "Hello world"
+        assert "stream_options" not in mock_client.chat.completions.create.call_args.kwargs
+
+    def test_no_retry_after_partial_stream(self):
+        """A stream that fails midway is not retried, so the client never sees duplicated text."""
+        provider = _TestProvider("test-key")
+
+        def broken_stream():
+            yield _chunk("partial")
+            raise Exception("Connection reset")
+
+        mock_client = Mock()
+        mock_client.chat.completions.create.return_value = broken_stream()
+        provider._client = mock_client
+
+        with pytest.raises(RuntimeError, match="Connection reset"):
+            provider.generate_content(prompt="hi", model_name="test-model", stream_callback=lambda text: None)
+
+        assert mock_client.chat.completions.create.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_async_stream_callback_receives_deltas(self):
+        """The native async path consumes the stream with async for."""
+        provider = _TestProvider("test-key")
+        async_client = Mock()
+        async_client.chat.completions.create = AsyncMock(return_value=_AsyncStream(_stream_chunks()))
+        provider._async_clients[asyncio.get_running_loop()] = async_client
+        received = []
+
+        result = await provider.agenerate_content(prompt="hi", model_name="test-model", stream_callback=received.append)
+
+        assert received == ["Hel", "lo", " world"]
+        assert result.content == "Hello world"
+        assert result.usage["total_tokens"] == 8
+
+
+class TestExecutorStreaming:
+    """Test stream_callback handling on the thread-pool path."""
+
+    @pytest.mark.asyncio
+    async def test_callback_runs_on_event_loop_thread(self):
+        """Chunks produced in a worker thread are delivered on the loop thread."""
+        loop_thread = threading.get_ident()
+        callback_threads = []
+        received = []
+
+        def on_chunk(text):
+            callback_threads.append(threading.get_ident())
+            received.append(text)
+
+        def generate(**kwargs):
+            kwargs["stream_callback"]("a")
+            kwargs["stream_callback"]("b")
+            return ModelResponse(content="ab", model_name="m", provider=ProviderType.GOOGLE)
+
+        provider = Mock()
+        provider.get_provider_type.return_value = ProviderType.GOOGLE
+        provider.generate_content.side_effect = generate
+        executor = ProviderExecutor(max_workers=1, per_provider_limit=1)
+
+        result = await executor.run_blocking(provider, prompt="hi", model_name="m", stream_callback=on_chunk)
+        await asyncio.sleep(0)
+
+        assert result.content == "ab"
+        assert received == ["a", "b"]
+        assert set(callback_threads) == {loop_thread}
+        executor.shutdown()
+
+
+class TestProgressReporter:
+    """Test coalescing of streamed text into MCP progress notifications."""
+
+    @pytest.mark.asyncio
+    async def test_chunks_are_coalesced(self):
+        """Chunks arriving within one interval are sent as a single notification."""
+        session = Mock()
+        session.send_progress_notification = AsyncMock()
+        reporter = ProgressReporter(session, "token-1", related_request_id=7, flush_interval=0.01)
+
+        reporter.on_chunk("Hello")
+        reporter.on_chunk(" world")
+        await asyncio.sleep(0.05)
+
+        session.send_progress_notification.assert_awaited_once_with(
+            "token-1", 11.0, message="Hello world", related_request_id=7
+        )
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_remaining_text(self):
+        """aclose sends pending text and ignores later chunks."""
+        session = Mock()
+        session.send_progress_notification = AsyncMock()
+        reporter = ProgressReporter(session, "token-1", flush_interval=10)
+
+        reporter.on_chunk("tail")
+        await reporter.aclose()
+        reporter.on_chunk("ignored")
+
+        session.send_progress_notification.assert_awaited_once()
+        assert session.send_progress_notification.call_args.kwargs["message"] == "tail"
+
+    @pytest.mark.asyncio
+    async def test_notification_errors_are_swallowed(self):
+        """A failing session never breaks the tool call."""
+        session = Mock()
+        session.send_progress_notification = AsyncMock(side_effect=Exception("closed"))
+        reporter = ProgressReporter(session, "token-1", flush_interval=10)
+
+        reporter.on_chunk("text")
+        await reporter.aclose()
+
+    @pytest.mark.asyncio
+    async def test_older_sdk_without_progress_message(self):
+        """Sessions whose send_progress_notification predates message still get progress counts."""
+
+        class _OldSession:
+            def __init__(self):
+                self.calls = []
+
+            async def send_progress_notification(self, progress_token, progress, total=None):
+                self.calls.append((progress_token, progress, total))
+
+        session = _OldSession()
+        reporter = ProgressReporter(session, "token-1", related_request_id=7, flush_interval=10)
+
+        reporter.on_chunk("text")
+        await reporter.aclose()
+
+        assert session.calls == [("token-1", 4.0, None)]
+
+    @pytest.mark.asyncio
+    async def test_progress_reporting_context(self):
+        """The reporter is current only inside progress_reporting."""
+        session = Mock()
+        session.send_progress_notification = AsyncMock()
+        reporter = ProgressReporter(session, "token-1")
+
+        assert get_progress_reporter() is None
+        async with progress_reporting(reporter):
+            assert get_progress_reporter() is reporter
+        assert get_progress_reporter() is None
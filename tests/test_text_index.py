@@ -0,0 +1,85 @@
+"""Tests for memory full-text tokenization and BM25 ranking."""
+
+from utils.enhanced_memory import MemoryItem, ProjectMemoryLayer
+from utils.text_index import InvertedIndex, tokenize, tokenize_query
+
+
+class TestTokenizer:
+    def test_latin_words_are_lowercased_and_filtered(self):
+        assert tokenize("Fixed THE payment-processing bug, v2 a") == ["fixed", "payment", "processing", "bug", "v2"]
+
+    def test_cjk_runs_become_bigrams_and_characters(self):
+        assert tokenize("数据库") == ["数据", "据库", "数", "据", "库"]
+        assert tokenize_query("数据库") == ["数据", "据库"]
+        assert tokenize_query("库") == ["库"]
+
+    def test_mixed_text(self):
+        assert tokenize_query("修复 Redis 连接") == ["修复", "redis", "连接"]
+
+    def test_full_width_characters_are_normalized(self):
+        assert tokenize_query("ＡＰＩ") == ["api"]
+
+
+class TestInvertedIndex:
+    def _index(self):
+        index = InvertedIndex()
+        index.add("a", "修复了数据库连接池泄漏的问题")
+        index.add("b", "payment bug fixed in checkout")
+        index.add("c", "bug bug bug in the parser")
+        index.add("d", "数据库迁移脚本")
+        return index
+
+    def test_all_query_terms_must_match(self):
+        index = self._index()
+
+        assert [key for key, _ in index.search("payment bug")] == ["b"]
+        assert index.search("payment parser") == []
+
+    def test_bm25_prefers_higher_term_frequency(self):
+        assert [key for key, _ in self._index().search("bug")] == ["c", "b"]
+
+    def test_chinese_queries(self):
+        index = self._index()
+
+        assert {key for key, _ in index.search("数据库")} == {"a", "d"}
+        assert [key for key, _ in index.search("连接池")] == ["a"]
+        assert index.search("数据仓库") == []
+
+    def test_incremental_update_and_remove(self):
+        index = self._index()
+        index.add("b", "refund flow rewritten")
+        index.remove("a")
+
+        assert index.search("payment") == []
+        assert [key for key, _ in index.search("refund")] == ["b"]
+        assert [key for key, _ in index.search("数据库")] == ["d"]
+        assert len(index) == 3
+
+    def test_search_restricted_to_keys(self):
+        assert [key for key, _ in self._index().search("bug", keys={"b"})] == ["b"]
+
+
+class TestMemoryLayerSearch:
+    def test_search_items_uses_text_index(self, tmp_path):
+        layer = ProjectMemoryLayer(tmp_path / "project")
+        layer.save_item(MemoryItem(id="m1", content="缓存失效导致接口超时", layer="project"))
+        layer.save_item(MemoryItem(id="m2", content="timeout when cache expires", layer="project"))
+        layer.save_item(MemoryItem(id="m3", content="cache warmup cache cache", layer="project"))
+
+        assert [item.id for item in layer.search_items(query="接口超时")] == ["m1"]
+        assert [item.id for item in layer.search_items(query="cache")] == ["m3", "m2"]
+
+        layer.remove_item("m3")
+        assert [item.id for item in layer.search_items(query="cache")] == ["m2"]
+
+        # The index is rebuilt from the persisted items
+        reloaded = ProjectMemoryLayer(tmp_path / "project")
+        assert [item.id for item in reloaded.search_items(query="缓存")] == ["m1"]
+
+    def test_queries_without_terms_fall_back_to_substring_search(self, tmp_path):
+        layer = ProjectMemoryLayer(tmp_path / "project")
+        layer.save_item(MemoryItem(id="m1", content="Ported the parser to C++", layer="project"))
+        layer.save_item(MemoryItem(id="m2", content="plain python note", layer="project"))
+
+        assert [item.id for item in layer.search_items(query="C++")] == ["m1"]
+        assert {item.id for item in layer.search_items(query="a")} == {"m1", "m2"}
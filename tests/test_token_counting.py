@@ -0,0 +1,88 @@
+"""Tests for tokenizer-backed token counting and its cache."""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from utils import token_utils
+from utils.model_context import ModelContext
+from utils.token_utils import (
+    TokenCounter,
+    count_tokens,
+    count_tokens_batch,
+    estimate_tokens,
+    get_token_counter,
+    register_token_counter,
+)
+
+
+class WordCounter(TokenCounter):
+    """Fake exact tokenizer: one token per whitespace-separated word."""
+
+    name = "words"
+    exact = True
+
+    def __init__(self):
+        self.calls = []
+
+    def count_many(self, texts):
+        self.calls.append(list(texts))
+        return [len(text.split()) for text in texts]
+
+    def count(self, text):
+        return self.count_many([text])[0]
+
+
+@pytest.fixture
+def word_counter():
+    counter = WordCounter()
+    factories = list(token_utils._counter_factories)
+    token_utils._counters.clear()
+    token_utils._token_count_cache.clear()
+    register_token_counter(("fake-",), lambda model_name: counter)
+    yield counter
+    token_utils._counter_factories[:] = factories
+    token_utils._counters.clear()
+    token_utils._token_count_cache.clear()
+
+
+class TestHeuristic:
+    def test_default_and_file_type_ratios(self):
+        assert estimate_tokens("a" * 400) == 100
+        assert estimate_tokens("a" * 250, file_path="data.json") == 100
+        assert count_tokens("a" * 30, model_name="unknown-model", chars_per_token=3) == 10
+
+    def test_openai_models_need_tiktoken(self):
+        token_utils._counters.clear()
+        with patch.dict(sys.modules, {"tiktoken": None}):
+            assert get_token_counter("gpt-4o") is None
+            assert estimate_tokens("a" * 400, model_name="gpt-4o") == 100
+        token_utils._counters.clear()
+
+
+class TestTokenizerCounting:
+    def test_registered_tokenizer_is_used(self, word_counter):
+        assert estimate_tokens("one two three", model_name="fake-1") == 3
+        assert count_tokens("one two", model_name="router/fake-2") == 2
+        assert get_token_counter("other-model") is None
+
+    def test_counts_are_cached_by_content(self, word_counter):
+        assert count_tokens("alpha beta", model_name="fake-1") == 2
+        assert count_tokens("alpha beta", model_name="fake-1") == 2
+
+        assert word_counter.calls == [["alpha beta"]]
+        assert token_utils._token_count_cache.hits == 1
+
+    def test_batch_tokenizes_distinct_misses_once(self, word_counter):
+        count_tokens("cached text", model_name="fake-1")
+
+        counts = count_tokens_batch(["a b c", "cached text", "a b c", "d"], model_name="fake-1")
+
+        assert counts == [3, 2, 3, 1]
+        assert word_counter.calls[-1] == ["a b c", "d"]
+
+    def test_model_context_uses_tokenizer_or_conservative_fallback(self, word_counter):
+        assert ModelContext("fake-model").estimate_tokens("x y z") == 3
+        assert ModelContext("fake-model").estimate_tokens_batch(["x", "y z"]) == [1, 2]
+        assert ModelContext("no-tokenizer").estimate_tokens("a" * 30) == 10
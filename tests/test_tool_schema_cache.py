@@ -0,0 +1,70 @@
+"""Tests for the versioned tool schema cache behind handle_list_tools."""
+
+from unittest.mock import patch
+
+import pytest
+
+from providers.registry import ModelProviderRegistry
+from tools.shared.schema_cache import ToolSchemaCache
+
+
+class FakeTool:
+    def __init__(self, name):
+        self.name = name
+        self.description = f"{name} tool"
+        self.schema_calls = 0
+
+    def get_annotations(self):
+        return {"readOnlyHint": True}
+
+    def get_input_schema(self):
+        self.schema_calls += 1
+        return {"type": "object", "properties": {"model": {"type": "string"}}}
+
+
+@pytest.fixture
+def tools():
+    return {name: FakeTool(name) for name in ["chat", "debug"]}
+
+
+class TestToolSchemaCache:
+    def test_schemas_are_built_once(self, tools):
+        cache = ToolSchemaCache(tools)
+
+        first = cache.get_tools()
+        second = cache.get_tools()
+
+        assert [tool.name for tool in first] == ["chat", "debug"]
+        assert first == second
+        assert first[0].annotations.readOnlyHint is True
+        assert [tool.schema_calls for tool in tools.values()] == [1, 1]
+        assert cache.version == 1
+        assert cache.refresh() is False
+
+    def test_configuration_change_bumps_version(self, tools):
+        cache = ToolSchemaCache(tools)
+        cache.get_tools()
+
+        ModelProviderRegistry.invalidate_routing_table()
+
+        assert cache.is_stale()
+        assert cache.refresh() is True
+        assert cache.version == 2
+        assert tools["chat"].schema_calls == 2
+        assert cache.refresh() is False
+
+    def test_default_model_is_part_of_the_key(self, tools):
+        cache = ToolSchemaCache(tools)
+        cache.get_tools()
+
+        with patch("config.DEFAULT_MODEL", "some-other-model"):
+            assert cache.is_stale()
+
+    @pytest.mark.asyncio
+    async def test_server_lists_cached_tools(self):
+        import server
+
+        tools = await server.handle_list_tools()
+
+        assert [tool.name for tool in tools] == [tool.name for tool in server.TOOLS.values()]
+        assert await server.handle_list_tools() == tools
@@ -200,6 +200,105 @@ class TestFileUtils:
         assert "binary.exe" not in content
         assert "image.jpg" not in content
 
+    def test_read_files_matches_sequential_reading(self, project_path):
+        """Batched ingestion keeps input order and the sequential token budget decisions"""
+        paths = []
+        for i in range(40):
+            # Mixed sizes and multi-line content so size-based planning is only approximate
+            file_path = project_path / f"module_{i:02d}.py"
+            file_path.write_text("\n".join(f"line {j} é" for j in range(i * 7 + 1)), encoding="utf-8")
+            paths.append(str(file_path))
+
+        for include_line_numbers in (False, True):
+            budget = 3_000
+            expected_parts = []
+            used = 0
+            skipped = []
+            for index, path in enumerate(paths):
+                if used >= budget:
+                    skipped.extend(paths[index:])
+                    break
+                content, tokens = read_file_content(path, include_line_numbers=include_line_numbers)
+                if used + tokens <= budget:
+                    expected_parts.append(content)
+                    used += tokens
+                else:
+                    skipped.append(path)
+
+            result = read_files(paths, max_tokens=budget + 50_000, include_line_numbers=include_line_numbers).split(
+                "\n\n\n\n--- SKIPPED FILES"
+            )[0]
+
+            assert result == "\n\n".join(expected_parts)
+            assert skipped
+
+    def test_read_files_reports_unreadable_entries_in_order(self, project_path):
+        """Placeholders for missing files keep their position among real files"""
+        (project_path / "a.py").write_text("a = 1", encoding="utf-8")
+        (project_path / "c.py").write_text("c = 3", encoding="utf-8")
+        missing = str(project_path / "b.py")
+
+        from utils.file_utils import _probe_file
+
+        placeholder = _probe_file(missing, 1_000_000)[2]
+        assert "--- FILE NOT FOUND:" in placeholder[0]
+
+        content = read_files([str(project_path / "a.py"), str(project_path / "c.py")])
+        assert content.index("a = 1") < content.index("c = 3")
+
+
+class TestFormattedFileCache:
+    """Test caching of formatted file blocks"""
+
+    def test_repeated_reads_are_served_from_cache(self, project_path):
+        from unittest.mock import patch
+
+        test_file = project_path / "cached.py"
+        test_file.write_text("print('hi')", encoding="utf-8")
+
+        first = read_file_content(str(test_file))
+        with patch("builtins.open", side_effect=AssertionError("file was re-read")):
+            second = read_file_content(str(test_file))
+
+        assert first == second
+
+    def test_modified_file_is_reformatted(self, project_path):
+        import os
+
+        test_file = project_path / "changing.py"
+        test_file.write_text("old = 1", encoding="utf-8")
+        read_file_content(str(test_file))
+
+        test_file.write_text("new = 22", encoding="utf-8")
+        stat_result = test_file.stat()
+        os.utime(test_file, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+
+        content, _ = read_file_content(str(test_file))
+        assert "new = 22" in content
+
+    def test_line_number_flag_is_part_of_key(self, project_path):
+        test_file = project_path / "numbered.py"
+        test_file.write_text("a = 1\nb = 2", encoding="utf-8")
+
+        plain, _ = read_file_content(str(test_file), include_line_numbers=False)
+        numbered, _ = read_file_content(str(test_file), include_line_numbers=True)
+
+        assert "│" not in plain
+        assert "   1│ a = 1" in numbered
+
+    def test_cache_is_bounded(self):
+        from utils.file_utils import FormattedFileCache
+
+        cache = FormattedFileCache(max_chars=10)
+        cache.put(("a",), ("12345", 1))
+        cache.put(("b",), ("12345", 1))
+        cache.get(("a",))
+        cache.put(("c",), ("12345", 1))
+
+        assert cache.get(("a",)) is not None
+        assert cache.get(("b",)) is None
+        assert cache.get(("c",)) is not None
+
 
 class TestTokenUtils:
     """Test token counting utilities"""
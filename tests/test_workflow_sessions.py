@@ -0,0 +1,195 @@
+"""Tests for per-continuation workflow sessions."""
+
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from tools.planner import PlannerTool
+from tools.workflow.session import SessionField, WorkflowSessionStore, bind_session
+
+
+class _Owner:
+    value = SessionField()
+
+    def __init__(self):
+        self.value = []
+
+
+def _step(step, step_number, continuation_id=None):
+    arguments = {"step": step, "step_number": step_number, "total_steps": 5, "next_step_required": True}
+    if continuation_id:
+        arguments["continuation_id"] = continuation_id
+    return arguments
+
+
+class TestSessionField:
+    """Attribute routing between the instance and the bound session."""
+
+    @pytest.mark.asyncio
+    async def test_session_gets_copy_of_instance_default(self):
+        owner = _Owner()
+        store = WorkflowSessionStore("owner")
+
+        async with bind_session(owner, store, "thread-1", fresh=False):
+            owner.value.append("in session")
+            assert owner.value == ["in session"]
+
+        assert owner.value == []
+        assert store.get("thread-1").state["value"] == ["in session"]
+
+    @pytest.mark.asyncio
+    async def test_other_instances_are_not_routed(self):
+        owner, other = _Owner(), _Owner()
+        store = WorkflowSessionStore("owner")
+
+        async with bind_session(owner, store, "thread-1", fresh=False):
+            other.value.append("instance")
+
+        assert other.value == ["instance"]
+        assert "value" not in store.get("thread-1").state
+
+
+class TestWorkflowSessionStore:
+    """Lifecycle, eviction and memory accounting."""
+
+    def _use(self, store, continuation_id, payload=None):
+        session = store.checkout(continuation_id)
+        if payload is not None:
+            session.state["payload"] = payload
+        store.checkin(session)
+        return session
+
+    def test_lru_eviction_by_count(self):
+        store = WorkflowSessionStore("tool", max_sessions=2)
+        self._use(store, "a")
+        self._use(store, "b")
+        self._use(store, "a")
+        self._use(store, "c")
+
+        assert store.get("a") is not None
+        assert store.get("b") is None
+        assert store.get("c") is not None
+
+    def test_eviction_by_memory_budget(self):
+        store = WorkflowSessionStore("tool", max_bytes=1500)
+        self._use(store, "a", "x" * 1000)
+        self._use(store, "b", "y" * 1000)
+
+        assert store.get("a") is None
+        assert store.get("b") is not None
+        assert 1000 < store.get_stats()["memory_bytes"] <= 1500
+
+    def test_sessions_in_use_are_not_evicted(self):
+        store = WorkflowSessionStore("tool", max_sessions=1)
+        busy = store.checkout("busy")
+        self._use(store, "other")
+
+        assert store.get("busy") is busy
+        store.checkin(busy)
+
+    def test_idle_sessions_expire(self):
+        store = WorkflowSessionStore("tool", ttl_seconds=60)
+        self._use(store, "old")
+
+        with patch("tools.workflow.session.time.monotonic", return_value=store.get("old").last_access + 120):
+            self._use(store, "new")
+
+        assert store.get("old") is None
+        assert store.get("new") is not None
+
+    def test_transient_fields_are_dropped(self):
+        store = WorkflowSessionStore("tool")
+        session = store.checkout("a")
+        session.state["_current_arguments"] = {"step": "big"}
+        session.state["work_history"] = [{"step": 1}]
+        store.checkin(session)
+
+        assert "_current_arguments" not in session.state
+        assert session.state["work_history"] == [{"step": 1}]
+
+    def test_latest_fresh_session_is_anonymous(self):
+        store = WorkflowSessionStore("tool")
+        first = store.checkout(None, fresh=True)
+        store.register(first, "thread-1")
+        store.checkin(first)
+        second = store.checkout(None, fresh=True)
+        store.checkin(second)
+
+        assert store.get(None) is second
+        assert store.checkout(None) is second
+        assert store.get("thread-1") is first
+
+    def test_discard_while_in_use_drops_on_checkin(self):
+        store = WorkflowSessionStore("tool")
+        session = store.checkout("a")
+        session.state["work_history"] = [{"step": 1}]
+
+        store.discard("a")
+        assert store.get("a") is session
+
+        store.checkin(session)
+        assert store.get("a") is None
+        assert store.get_stats()["memory_bytes"] == 0
+
+
+class TestConcurrentWorkflows:
+    """One tool instance serving several workflows."""
+
+    @pytest.mark.asyncio
+    async def test_interleaved_workflows_keep_separate_history(self):
+        tool = PlannerTool()
+
+        async def run(thread_id):
+            for step_number in range(1, 4):
+                await tool.execute(_step(f"{thread_id} step {step_number}", step_number, thread_id))
+                await asyncio.sleep(0)
+
+        with patch("utils.conversation_memory.add_turn"):
+            await asyncio.gather(run("thread-a"), run("thread-b"))
+
+        for thread_id in ("thread-a", "thread-b"):
+            history = tool.get_workflow_session(thread_id).state["work_history"]
+            assert [entry["step"] for entry in history] == [f"{thread_id} step {n}" for n in (1, 2, 3)]
+        assert tool.work_history == []
+
+    @pytest.mark.asyncio
+    async def test_new_workflow_is_keyed_by_created_thread(self):
+        tool = PlannerTool()
+
+        with patch("tools.workflow.workflow_mixin.create_thread", side_effect=["thread-1", "thread-2"]):
+            with patch("utils.conversation_memory.add_turn"):
+                first = json.loads((await tool.execute(_step("first run", 1)))[0].text)
+                second = json.loads((await tool.execute(_step("second run", 1)))[0].text)
+
+        assert first["continuation_id"] == "thread-1"
+        assert second["continuation_id"] == "thread-2"
+        assert len(tool.get_workflow_session("thread-1").state["work_history"]) == 1
+        assert len(tool.get_workflow_session("thread-2").state["work_history"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_steps_without_continuation_id_continue_latest_run(self):
+        tool = PlannerTool()
+
+        with patch("tools.workflow.workflow_mixin.create_thread", return_value="thread-1"):
+            with patch("utils.conversation_memory.add_turn"):
+                first = json.loads((await tool.execute(_step("first", 1)))[0].text)
+                await tool.execute(_step("second", 2))
+
+        assert "continuation_id: thread-1" in first["next_steps"]
+        history = tool.get_workflow_session("thread-1").state["work_history"]
+        assert [entry["step"] for entry in history] == ["first", "second"]
+        assert tool.get_workflow_session(None) is tool.get_workflow_session("thread-1")
+
+    @pytest.mark.asyncio
+    async def test_completed_workflow_releases_session(self):
+        tool = PlannerTool()
+        final = dict(_step("done", 2, "thread-1"), total_steps=2, next_step_required=False)
+
+        with patch("utils.conversation_memory.add_turn"):
+            await tool.execute(_step("start", 1, "thread-1"))
+            assert tool.get_workflow_session("thread-1") is not None
+            await tool.execute(final)
+
+        assert tool.get_workflow_session("thread-1") is None
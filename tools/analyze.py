@@ -30,6 +30,7 @@ from tools.shared.base_models import WorkflowRequest
 
 from .shared.progress_formatter_mixin import ProgressFormatterMixin
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -166,6 +167,11 @@ class AnalyzeTool(WorkflowTool, ProgressFormatterMixin):
     including architectural review, performance analysis, security assessment, and maintainability evaluation.
     """
 
+    # Per-run state, isolated per continuation_id
+    analysis_config = SessionField()
+    _start_time = SessionField()
+    _phase_times = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
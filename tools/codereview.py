@@ -29,6 +29,7 @@ from systemprompts import CODEREVIEW_PROMPT
 from tools.shared.base_models import WorkflowRequest
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -180,6 +181,9 @@ class CodeReviewTool(WorkflowTool):
     including security audits, performance analysis, architectural review, and maintainability assessment.
     """
 
+    # Per-run state, isolated per continuation_id
+    review_config = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
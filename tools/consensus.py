@@ -15,6 +15,7 @@ Key features:
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import TYPE_CHECKING, Any
@@ -26,11 +27,14 @@ if TYPE_CHECKING:
 
 from mcp.types import TextContent
 
-from config import TEMPERATURE_ANALYTICAL
+from config import DEFAULT_CONSENSUS_TIMEOUT, TEMPERATURE_ANALYTICAL
+from providers.executor import get_provider_executor
 from systemprompts import CONSENSUS_PROMPT
 from tools.shared.base_models import WorkflowRequest
+from utils.conversation_memory import create_thread
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +81,15 @@ CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS = {
         "Optional list of image paths or base64 data URLs for visual context. Useful for UI/UX discussions, "
         "architecture diagrams, mockups, or any visual references that help inform the consensus analysis."
     ),
+    "parallel": (
+        "Set to true in step 1 to consult all models at once instead of one per step. The tool returns every "
+        "model response (including failures and timeouts) in a single final step, ready for synthesis. "
+        "Total latency becomes that of the slowest model rather than the sum of all models."
+    ),
+    "model_timeout": (
+        "Per-model timeout in seconds for parallel mode. Models that do not answer in time are reported with "
+        "status 'timeout' while the remaining responses are kept."
+    ),
 }
 
 
@@ -113,6 +126,12 @@ class ConsensusRequest(WorkflowRequest):
     # Optional images for visual debugging
     images: list[str] | None = Field(default=None, description=CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["images"])
 
+    # Opt-in parallel fan-out (step 1 only)
+    parallel: bool | None = Field(default=False, description=CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["parallel"])
+    model_timeout: float | None = Field(
+        default=None, gt=0, description=CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["model_timeout"]
+    )
+
     # Override inherited fields to exclude them from schema
     temperature: float | None = Field(default=None, exclude=True)
     thinking_mode: str | None = Field(default=None, exclude=True)
@@ -158,6 +177,11 @@ class ConsensusTool(WorkflowTool):
     and finally synthesizes all perspectives into a unified recommendation.
     """
 
+    # Per-run state, isolated per continuation_id
+    initial_prompt = SessionField()
+    models_to_consult = SessionField()
+    accumulated_responses = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_prompt: str | None = None
@@ -183,7 +207,8 @@ class ConsensusTool(WorkflowTool):
             "- Total steps = number of models (each step includes consultation + response)\n"
             "- Models can have stances (for/against/neutral) for structured debate\n"
             "- Same model can be used multiple times with different stances\n"
-            "- Each model + stance combination must be unique\n\n"
+            "- Each model + stance combination must be unique\n"
+            "- Set parallel=true in step 1 to consult all models at once and receive every response together\n\n"
             "Perfect for: complex decisions, architectural choices, feature proposals, "
             "technology evaluations, strategic planning."
         )
@@ -286,6 +311,16 @@ of the evidence, even when it strongly points in one direction.""",
                 "items": {"type": "string"},
                 "description": CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["images"],
             },
+            "parallel": {
+                "type": "boolean",
+                "default": False,
+                "description": CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["parallel"],
+            },
+            "model_timeout": {
+                "type": "number",
+                "exclusiveMinimum": 0,
+                "description": CONSENSUS_WORKFLOW_FIELD_DESCRIPTIONS["model_timeout"],
+            },
         }
 
         # Define excluded fields for consensus workflow
@@ -449,6 +484,17 @@ of the evidence, even when it strongly points in one direction.""",
             # Set total steps: len(models) (each step includes consultation + response)
             request.total_steps = len(self.models_to_consult)
 
+            # Parallel mode consults every model in this single step
+            if request.parallel:
+                self._discard_workflow_session()
+                return await self._execute_parallel_consensus(request)
+
+            # Key this run's session by a new thread so follow-up steps don't share state
+            if not request.continuation_id and request.total_steps > 1:
+                clean_args = {k: v for k, v in arguments.items() if k not in ["_model_context", "_resolved_model_name"]}
+                request.continuation_id = create_thread(self.get_name(), clean_args)
+                self._register_workflow_session(request.continuation_id)
+
         # For all steps (1 through total_steps), consult the corresponding model
         if request.step_number <= request.total_steps:
             # Calculate which model to consult for this step
@@ -472,6 +518,8 @@ of the evidence, even when it strongly points in one direction.""",
                     "current_model_index": model_idx + 1,
                     "next_step_required": request.step_number < request.total_steps,
                 }
+                if request.continuation_id:
+                    response_data["continuation_id"] = request.continuation_id
 
                 # Add CLAI Agent's analysis to step 1
                 if request.step_number == 1:
@@ -483,6 +531,7 @@ of the evidence, even when it strongly points in one direction.""",
 
                 # Check if this is the final step
                 if request.step_number == request.total_steps:
+                    self._discard_workflow_session()
                     response_data["status"] = "consensus_workflow_complete"
                     response_data["consensus_complete"] = True
                     response_data["complete_consensus"] = {
@@ -508,26 +557,113 @@ of the evidence, even when it strongly points in one direction.""",
                         f"- step_number: {request.step_number + 1}\n"
                         f"- findings: Summarize key points from this model's response"
                     )
+                    if request.continuation_id:
+                        response_data["next_steps"] += f"\n- continuation_id: {request.continuation_id}"
 
                 # Add accumulated responses for tracking
                 response_data["accumulated_responses"] = self.accumulated_responses
 
                 # Add metadata (since we're bypassing the base class metadata addition)
-                model_name = self.get_request_model_name(request)
-                provider = self.get_model_provider(model_name)
-                response_data["metadata"] = {
-                    "tool_name": self.get_name(),
-                    "model_name": model_name,
-                    "model_used": model_name,
-                    "provider_used": provider.get_provider_type().value,
-                }
+                response_data["metadata"] = self._build_response_metadata(request)
 
                 return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
 
         # Otherwise, use standard workflow execution
         return await super().execute_workflow(arguments)
 
-    async def _consult_model(self, model_config: dict, request) -> dict:
+    async def _execute_parallel_consensus(self, request) -> list:
+        """Consult all model/stance pairs concurrently and return the aggregated final step."""
+        timeout = request.model_timeout or DEFAULT_CONSENSUS_TIMEOUT
+
+        # Embed context files once and share the prompt across all consultations
+        prompt = self._build_consultation_prompt(request)
+
+        results = await asyncio.gather(
+            *(
+                self._consult_model_with_timeout(model_config, request, prompt, timeout)
+                for model_config in self.models_to_consult
+            )
+        )
+        self.accumulated_responses = list(results)
+
+        successful = [r for r in results if r.get("status") == "success"]
+        failed = [r for r in results if r.get("status") != "success"]
+        if failed:
+            logger.warning(f"Parallel consensus: {len(failed)}/{len(results)} model consultations failed or timed out")
+
+        response_data = {
+            "status": "consensus_workflow_complete",
+            "step_number": request.step_number,
+            "total_steps": request.total_steps,
+            "parallel": True,
+            "model_responses": self.accumulated_responses,
+            "current_model_index": len(self.models_to_consult),
+            "next_step_required": False,
+            "agent_analysis": {
+                "initial_analysis": request.step,
+                "findings": request.findings,
+            },
+            "consensus_complete": True,
+            "complete_consensus": {
+                "initial_prompt": self.initial_prompt,
+                "models_consulted": [f"{m['model']}:{m.get('stance', 'neutral')}" for m in self.accumulated_responses],
+                "total_responses": len(self.accumulated_responses),
+                "successful_responses": len(successful),
+                "failed_models": [f"{m['model']}:{m.get('stance', 'neutral')}" for m in failed],
+                "consensus_confidence": "high" if not failed else "partial",
+            },
+            "next_steps": (
+                "CONSENSUS GATHERING IS COMPLETE. Synthesize all perspectives and present:\n"
+                "1. Key points of AGREEMENT across models\n"
+                "2. Key points of DISAGREEMENT and why they differ\n"
+                "3. Your final consolidated recommendation\n"
+                "4. Specific, actionable next steps for implementation\n"
+                "5. Critical risks or concerns that must be addressed"
+            ),
+            "accumulated_responses": self.accumulated_responses,
+            "metadata": self._build_response_metadata(request),
+        }
+
+        return [TextContent(type="text", text=json.dumps(response_data, indent=2, ensure_ascii=False))]
+
+    async def _consult_model_with_timeout(self, model_config: dict, request, prompt: str, timeout: float) -> dict:
+        """Consult a model, reporting a timeout entry instead of raising."""
+        try:
+            return await asyncio.wait_for(self._consult_model(model_config, request, prompt=prompt), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Consensus model {model_config.get('model', 'unknown')} timed out after {timeout}s")
+            return {
+                "model": model_config.get("model", "unknown"),
+                "stance": model_config.get("stance", "neutral"),
+                "status": "timeout",
+                "error": f"Model did not respond within {timeout} seconds",
+            }
+
+    def _build_response_metadata(self, request) -> dict:
+        """Build response metadata (consensus bypasses the base class metadata addition)."""
+        model_name = self.get_request_model_name(request)
+        provider = self.get_model_provider(model_name)
+        return {
+            "tool_name": self.get_name(),
+            "model_name": model_name,
+            "model_used": model_name,
+            "provider_used": provider.get_provider_type().value,
+        }
+
+    def _build_consultation_prompt(self, request) -> str:
+        """Build the prompt sent to consulted models, including any relevant files."""
+        prompt = self.initial_prompt
+        if request.relevant_files:
+            file_content, _ = self._prepare_file_content_for_prompt(
+                request.relevant_files,
+                request.continuation_id,
+                "Context files",
+            )
+            if file_content:
+                prompt = f"{prompt}\n\n=== CONTEXT FILES ===\n{file_content}\n=== END CONTEXT ==="
+        return prompt
+
+    async def _consult_model(self, model_config: dict, request, prompt: str | None = None) -> dict:
         """Consult a single model and return its response."""
         try:
             # Get the provider for this model
@@ -535,23 +671,17 @@ of the evidence, even when it strongly points in one direction.""",
             provider = self.get_model_provider(model_name)
 
             # Prepare the prompt with any relevant files
-            prompt = self.initial_prompt
-            if request.relevant_files:
-                file_content, _ = self._prepare_file_content_for_prompt(
-                    request.relevant_files,
-                    request.continuation_id,
-                    "Context files",
-                )
-                if file_content:
-                    prompt = f"{prompt}\n\n=== CONTEXT FILES ===\n{file_content}\n=== END CONTEXT ==="
+            if prompt is None:
+                prompt = self._build_consultation_prompt(request)
 
             # Get stance-specific system prompt
             stance = model_config.get("stance", "neutral")
             stance_prompt = model_config.get("stance_prompt")
             system_prompt = self._get_stance_enhanced_prompt(stance, stance_prompt)
 
-            # Call the model
-            response = provider.generate_content(
+            # Call the model (off the event loop)
+            response = await get_provider_executor().generate_content(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
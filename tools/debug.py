@@ -29,6 +29,7 @@ from tools.shared.base_models import WorkflowRequest
 from tools.shared.thinking_pattern_mixin import ThinkingPatternMixin
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -157,6 +158,9 @@ class DebugIssueTool(WorkflowTool, ThinkingPatternMixin):
     including race conditions, memory leaks, performance issues, and integration problems.
     """
 
+    # Per-run state, isolated per continuation_id
+    applied_patterns = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_issue = None
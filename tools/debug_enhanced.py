@@ -17,6 +17,7 @@ import logging
 from config_data.thinking_patterns_config import ToolThinkingMode
 from tools.debug import DebugIssueTool, DebugWorkflowRequest
 from tools.shared.deep_thinking_mixin import DeepThinkingMixin, ThinkingModeStrategy
+from tools.workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,11 @@ class EnhancedDebugTool(DebugIssueTool, DeepThinkingMixin):
     提供更深入的问题分析和更准确的根因定位。
     """
 
+    # Per-run state, isolated per continuation_id
+    _applied_patterns = SessionField()
+    _pattern_insights = SessionField()
+    _thinking_start_time = SessionField()
+
     def __init__(self):
         super().__init__()
         # 设置工具的思维模式
@@ -34,6 +34,7 @@ from tools.shared.base_models import WorkflowRequest
 from tools.shared.thinking_pattern_mixin import ThinkingPatternMixin
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -125,6 +126,11 @@ class PlannerTool(WorkflowTool, ThinkingPatternMixin):
     - Self-contained operation (no expert analysis)
     """
 
+    # Per-run state, isolated per continuation_id
+    branches = SessionField()
+    initial_planning_description = SessionField()
+    applied_patterns = SessionField()
+
     def __init__(self):
         super().__init__()
         self.branches = {}
@@ -28,6 +28,7 @@ from systemprompts import PRECOMMIT_PROMPT
 from tools.shared.base_models import WorkflowRequest
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -184,6 +185,9 @@ class PrecommitTool(WorkflowTool):
     multi-repository analysis, security review, performance validation, and integration testing.
     """
 
+    # Per-run state, isolated per continuation_id
+    git_config = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
@@ -29,6 +29,7 @@ from systemprompts import REFACTOR_PROMPT
 from tools.shared.base_models import WorkflowRequest
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -178,6 +179,9 @@ class RefactorTool(WorkflowTool):
     opportunities, and organization improvements.
     """
 
+    # Per-run state, isolated per continuation_id
+    refactor_config = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
@@ -30,6 +30,7 @@ from systemprompts import SECAUDIT_PROMPT
 from tools.shared.base_models import WorkflowRequest
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -206,6 +207,9 @@ class SecauditTool(WorkflowTool):
     security-specific capabilities.
     """
 
+    # Per-run state, isolated per continuation_id
+    security_config = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
@@ -27,6 +27,7 @@ from utils.conversation_memory import (
     get_conversation_file_list,
     get_thread,
 )
+from utils.file_manifest import FileManifest, current_file_manifest
 from utils.file_utils import read_file_content, read_files
 
 # Import models from tools.models for compatibility
@@ -654,7 +655,7 @@ class BaseTool(ABC):
             return []
 
         embedded_files = get_conversation_file_list(thread_context)
-        logger.debug(f"[FILES] {self.name}: Found {len(embedded_files)} embedded files")
+        logger.debug("[FILES] %s: Found %s embedded files", self.name, len(embedded_files))
         return embedded_files
 
     def filter_new_files(self, requested_files: list[str], continuation_id: Optional[str]) -> list[str]:
@@ -673,40 +674,55 @@ class BaseTool(ABC):
         Returns:
             list[str]: List of files that need to be embedded (not already in history)
         """
-        logger.debug(f"[FILES] {self.name}: Filtering {len(requested_files)} requested files")
+        logger.debug("[FILES] %s: Filtering %s requested files", self.name, len(requested_files))
 
         if not continuation_id:
             # New conversation, all files are new
-            logger.debug(f"[FILES] {self.name}: New conversation, all {len(requested_files)} files are new")
+            logger.debug("[FILES] %s: New conversation, all %s files are new", self.name, len(requested_files))
             return requested_files
 
         try:
             embedded_files = set(self.get_conversation_embedded_files(continuation_id))
-            logger.debug(f"[FILES] {self.name}: Found {len(embedded_files)} embedded files in conversation")
+            logger.debug("[FILES] %s: Found %s embedded files in conversation", self.name, len(embedded_files))
 
             # Safety check: If no files are marked as embedded but we have a continuation_id,
             # this might indicate an issue with conversation history. Be conservative.
             if not embedded_files:
-                logger.debug(f"{self.name} tool: No files found in conversation history for thread {continuation_id}")
                 logger.debug(
-                    f"[FILES] {self.name}: No embedded files found, returning all {len(requested_files)} requested files"
+                    "%s tool: No files found in conversation history for thread %s", self.name, continuation_id
+                )
+                logger.debug(
+                    "[FILES] %s: No embedded files found, returning all %s requested files",
+                    self.name,
+                    len(requested_files),
                 )
                 return requested_files
 
             # Return only files that haven't been embedded yet
-            new_files = [f for f in requested_files if f not in embedded_files]
+            manifest = current_file_manifest()
+            if manifest is not None:
+                new_files = self._filter_embedded_with_manifest(requested_files, embedded_files, manifest)
+            else:
+                new_files = [f for f in requested_files if f not in embedded_files]
+            skipped = [f for f in requested_files if f not in new_files]
             logger.debug(
-                f"[FILES] {self.name}: After filtering: {len(new_files)} new files, {len(requested_files) - len(new_files)} already embedded"
+                "[FILES] %s: After filtering: %s new files, %s requested paths already embedded",
+                self.name,
+                len(new_files),
+                len(skipped),
             )
-            logger.debug(f"[FILES] {self.name}: New files to embed: {new_files}")
+            logger.debug("[FILES] %s: New files to embed: %s", self.name, new_files)
 
             # Log filtering results for debugging
-            if len(new_files) < len(requested_files):
-                skipped = [f for f in requested_files if f in embedded_files]
-                logger.debug(
-                    f"{self.name} tool: Filtering {len(skipped)} files already in conversation history: {', '.join(skipped)}"
-                )
-                logger.debug(f"[FILES] {self.name}: Skipped (already embedded): {skipped}")
+            if skipped:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "%s tool: Filtering %s files already in conversation history: %s",
+                        self.name,
+                        len(skipped),
+                        ", ".join(skipped),
+                    )
+                    logger.debug("[FILES] %s: Skipped (already embedded): %s", self.name, skipped)
 
             return new_files
 
@@ -716,10 +732,39 @@ class BaseTool(ABC):
             logger.warning(f"{self.name} tool: Error checking conversation history for {continuation_id}: {e}")
             logger.warning(f"{self.name} tool: Including all requested files as fallback")
             logger.debug(
-                f"[FILES] {self.name}: Exception in filter_new_files, returning all {len(requested_files)} files as fallback"
+                "[FILES] %s: Exception in filter_new_files, returning all %s files as fallback",
+                self.name,
+                len(requested_files),
             )
             return requested_files
 
+    @staticmethod
+    def _filter_embedded_with_manifest(
+        requested_files: list[str], embedded_files: set[str], manifest: FileManifest
+    ) -> list[str]:
+        """
+        Drop embedded files using the expansions and resolved paths of the call's file manifest.
+
+        A path also matches an embedded file spelled differently but resolving to
+        the same file, and a directory is checked file by file: if some of its files
+        are already embedded, only the remaining ones are returned.
+        """
+
+        def resolved(path: str) -> str:
+            entry = manifest.cached_entry(path)
+            return str(entry.path) if entry is not None else path
+
+        embedded = embedded_files | {resolved(f) for f in embedded_files}
+        new_files = []
+        for path in requested_files:
+            if path in embedded or resolved(path) in embedded:
+                continue
+            files = manifest.expansion(path) or [path]
+            remaining = [f for f in files if f not in embedded and resolved(f) not in embedded]
+            # Keep the path as requested unless part of it is already embedded
+            new_files.extend([path] if remaining == files else remaining)
+        return list(dict.fromkeys(new_files))
+
     def format_conversation_turn(self, turn: ConversationTurn) -> list[str]:
         """
         Format a conversation turn for display in conversation history.
@@ -931,8 +976,11 @@ class BaseTool(ABC):
                 # Standardize on `file_tokens` for consistency and correctness.
                 effective_max_tokens = token_allocation.file_tokens - reserve_tokens
                 logger.debug(
-                    f"[FILES] {self.name}: Using model context for {model_context.model_name}: "
-                    f"{token_allocation.file_tokens:,} file tokens from {token_allocation.total_tokens:,} total"
+                    "[FILES] %s: Using model context for %s: %d file tokens from %d total",
+                    self.name,
+                    model_context.model_name,
+                    token_allocation.file_tokens,
+                    token_allocation.total_tokens,
                 )
             except Exception as e:
                 logger.error(
@@ -946,16 +994,20 @@ class BaseTool(ABC):
         effective_max_tokens = max(1000, effective_max_tokens)
 
         files_to_embed = self.filter_new_files(request_files, continuation_id)
-        logger.debug(f"[FILES] {self.name}: Will embed {len(files_to_embed)} files after filtering")
+        logger.debug("[FILES] %s: Will embed %s files after filtering", self.name, len(files_to_embed))
 
         # Log the specific files for debugging/testing
         if files_to_embed:
-            logger.info(
-                f"[FILE_PROCESSING] {self.name} tool will embed new files: {', '.join([os.path.basename(f) for f in files_to_embed])}"
-            )
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "[FILE_PROCESSING] %s tool will embed new files: %s",
+                    self.name,
+                    ", ".join([os.path.basename(f) for f in files_to_embed]),
+                )
         else:
             logger.info(
-                f"[FILE_PROCESSING] {self.name} tool: No new files to embed (all files already in conversation history)"
+                "[FILE_PROCESSING] %s tool: No new files to embed (all files already in conversation history)",
+                self.name,
             )
 
         content_parts = []
@@ -963,9 +1015,14 @@ class BaseTool(ABC):
 
         # Read content of new files only
         if files_to_embed:
-            logger.debug(f"{self.name} tool embedding {len(files_to_embed)} new files: {', '.join(files_to_embed)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s tool embedding %s new files: %s", self.name, len(files_to_embed), ", ".join(files_to_embed)
+                )
             logger.debug(
-                f"[FILES] {self.name}: Starting file embedding with token budget {effective_max_tokens + reserve_tokens:,}"
+                "[FILES] %s: Starting file embedding with token budget %d",
+                self.name,
+                effective_max_tokens + reserve_tokens,
             )
             try:
                 # Before calling read_files, expand directories to get individual file paths
@@ -973,7 +1030,10 @@ class BaseTool(ABC):
 
                 expanded_files = expand_paths(files_to_embed)
                 logger.debug(
-                    f"[FILES] {self.name}: Expanded {len(files_to_embed)} paths to {len(expanded_files)} individual files"
+                    "[FILES] %s: Expanded %s paths to %s individual files",
+                    self.name,
+                    len(files_to_embed),
+                    len(expanded_files),
                 )
 
                 file_content = read_files(
@@ -993,28 +1053,32 @@ class BaseTool(ABC):
 
                 content_tokens = estimate_tokens(file_content)
                 logger.debug(
-                    f"{self.name} tool successfully embedded {len(files_to_embed)} files ({content_tokens:,} tokens)"
+                    "%s tool successfully embedded %s files (%d tokens)", self.name, len(files_to_embed), content_tokens
                 )
-                logger.debug(f"[FILES] {self.name}: Successfully embedded files - {content_tokens:,} tokens used")
+                logger.debug("[FILES] %s: Successfully embedded files - %d tokens used", self.name, content_tokens)
                 logger.debug(
-                    f"[FILES] {self.name}: Actually processed {len(actually_processed_files)} individual files"
+                    "[FILES] %s: Actually processed %s individual files", self.name, len(actually_processed_files)
                 )
             except Exception as e:
                 logger.error(f"{self.name} tool failed to embed files {files_to_embed}: {type(e).__name__}: {e}")
-                logger.debug(f"[FILES] {self.name}: File embedding failed - {type(e).__name__}: {e}")
+                logger.debug("[FILES] %s: File embedding failed - %s: %s", self.name, type(e).__name__, e)
                 raise
         else:
-            logger.debug(f"[FILES] {self.name}: No files to embed after filtering")
+            logger.debug("[FILES] %s: No files to embed after filtering", self.name)
 
         # Generate note about files already in conversation history
         if continuation_id and len(files_to_embed) < len(request_files):
             embedded_files = self.get_conversation_embedded_files(continuation_id)
             skipped_files = [f for f in request_files if f in embedded_files]
             if skipped_files:
-                logger.debug(
-                    f"{self.name} tool skipping {len(skipped_files)} files already in conversation history: {', '.join(skipped_files)}"
-                )
-                logger.debug(f"[FILES] {self.name}: Adding note about {len(skipped_files)} skipped files")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "%s tool skipping %s files already in conversation history: %s",
+                        self.name,
+                        len(skipped_files),
+                        ", ".join(skipped_files),
+                    )
+                logger.debug("[FILES] %s: Adding note about %s skipped files", self.name, len(skipped_files))
                 if content_parts:
                     content_parts.append("\n\n")
                 note_lines = [
@@ -1025,11 +1089,14 @@ class BaseTool(ABC):
                 ]
                 content_parts.append("\n".join(note_lines))
             else:
-                logger.debug(f"[FILES] {self.name}: No skipped files to note")
+                logger.debug("[FILES] %s: No skipped files to note", self.name)
 
         result = "".join(content_parts) if content_parts else ""
         logger.debug(
-            f"[FILES] {self.name}: _prepare_file_content_for_prompt returning {len(result)} chars, {len(actually_processed_files)} processed files"
+            "[FILES] %s: _prepare_file_content_for_prompt returning %s chars, %s processed files",
+            self.name,
+            len(result),
+            len(actually_processed_files),
         )
         return result, actually_processed_files
 
@@ -0,0 +1,92 @@
+"""
+Versioned cache of the tool list returned to MCP clients.
+
+Tool input schemas depend on the model configuration: the model field lists
+every available model and alias with its description, which means querying
+each provider, applying restrictions and walking the OpenRouter registry.
+ToolSchemaCache builds the MCP Tool objects once and reuses them until the
+configuration they were built from changes, bumping its version when it
+rebuilds so the server can tell clients the tool list changed.
+"""
+
+import logging
+import os
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from mcp.types import Tool, ToolAnnotations
+
+logger = logging.getLogger(__name__)
+
+
+def schema_configuration_key() -> tuple:
+    """Everything the generated tool schemas depend on, cheap to compute."""
+    import config
+    from providers.registry import ModelProviderRegistry
+    from utils.model_restrictions import get_restriction_service
+
+    return (
+        id(ModelProviderRegistry()),
+        ModelProviderRegistry.get_configuration_version(),
+        id(get_restriction_service()),
+        config.DEFAULT_MODEL,
+        os.getenv("OPENROUTER_API_KEY"),
+        os.getenv("CUSTOM_API_URL"),
+    )
+
+
+class ToolSchemaCache:
+    """Tool objects of the registered tools, rebuilt when the model configuration changes."""
+
+    def __init__(self, tools: Mapping[str, Any]):
+        self._tools = tools
+        self._tool_list: list[Tool] = []
+        self._key: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def get_tools(self) -> list[Tool]:
+        """Tool list for the current configuration, rebuilding it if needed."""
+        key = schema_configuration_key()
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._tool_list = self._build()
+                    self._key = key
+                    self.version += 1
+                    logger.debug(f"Built schemas for {len(self._tool_list)} tools (version {self.version})")
+        return list(self._tool_list)
+
+    def is_stale(self) -> bool:
+        """True if the cached list was built for a configuration that has since changed."""
+        return self._key is not None and self._key != schema_configuration_key()
+
+    def refresh(self) -> bool:
+        """Rebuild a stale tool list; returns True if the version was bumped."""
+        if not self.is_stale():
+            return False
+        self.get_tools()
+        return True
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next use."""
+        with self._lock:
+            self._key = None
+
+    def _build(self) -> list[Tool]:
+        tools = []
+        for tool in self._tools.values():
+            # Get optional annotations from the tool
+            annotations = tool.get_annotations()
+            tool_annotations = ToolAnnotations(**annotations) if annotations else None
+
+            tools.append(
+                Tool(
+                    name=tool.name,
+                    description=tool.description,
+                    inputSchema=tool.get_input_schema(),
+                    annotations=tool_annotations,
+                )
+            )
+        return tools
@@ -16,11 +16,13 @@ import logging
 from abc import abstractmethod
 from typing import Any, Optional
 
+from providers.executor import get_provider_executor
 from tools.shared.base_models import ToolRequest
 from tools.shared.base_tool import BaseTool
 from tools.shared.document_chunk_mixin import DocumentChunkMixin
 from tools.shared.memory_save_mixin import MemorySaveMixin
 from tools.shared.schema_builders import SchemaBuilder
+from utils.progress import get_progress_reporter
 
 logger = logging.getLogger(__name__)
 
@@ -495,14 +497,22 @@ class SimpleTool(BaseTool, MemorySaveMixin, DocumentChunkMixin):
             estimated_tokens = estimate_tokens(prompt)
             logger.debug(f"Prompt length: {len(prompt)} characters (~{estimated_tokens:,} tokens)")
 
-            # Generate content with provider abstraction
-            model_response = provider.generate_content(
+            # Stream text deltas to the client when it asked for progress
+            stream_kwargs = {}
+            reporter = get_progress_reporter()
+            if reporter is not None:
+                stream_kwargs["stream_callback"] = reporter.on_chunk
+
+            # Generate content with provider abstraction (off the event loop)
+            model_response = await get_provider_executor().generate_content(
+                provider,
                 prompt=prompt,
                 model_name=self._current_model_name,
                 system_prompt=system_prompt,
                 temperature=temperature,
                 thinking_mode=thinking_mode if provider.supports_thinking_mode(self._current_model_name) else None,
                 images=images if images else None,
+                **stream_kwargs,
             )
 
             logger.info(f"Received response from {provider.get_provider_type().value} API for {self.get_name()}")
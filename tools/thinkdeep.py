@@ -27,6 +27,7 @@ from tools.shared.base_models import WorkflowRequest
 from tools.shared.thinking_pattern_mixin import ThinkingPatternMixin
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -152,6 +153,10 @@ class ThinkDeepTool(WorkflowTool, ThinkingPatternMixin):
         "these tools can provide enhanced capabilities."
     )
 
+    # Per-run state, isolated per continuation_id
+    stored_request_params = SessionField()
+    applied_patterns = SessionField()
+
     def __init__(self):
         """Initialize the ThinkDeep workflow tool"""
         super().__init__()
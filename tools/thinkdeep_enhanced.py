@@ -23,6 +23,7 @@ from utils.conversation_memory import recall_memory, save_memory
 from utils.thinking_patterns import thinking_registry
 
 from .thinkdeep import ThinkDeepTool, ThinkDeepWorkflowRequest
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +53,9 @@ class EnhancedThinkDeepTool(ThinkDeepTool):
     and application, creating a more powerful reasoning engine.
     """
 
+    # Per-run state, isolated per continuation_id
+    pattern_insights = SessionField()
+
     def __init__(self):
         super().__init__()
         self.applied_patterns = []
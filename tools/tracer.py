@@ -32,6 +32,7 @@ from systemprompts import TRACER_PROMPT
 from tools.shared.base_models import WorkflowRequest
 
 from .workflow.base import WorkflowTool
+from .workflow.session import SessionField
 
 logger = logging.getLogger(__name__)
 
@@ -172,6 +173,10 @@ class TracerTool(WorkflowTool):
     both precision tracing (execution flow) and dependencies tracing (structural relationships).
     """
 
+    # Per-run state, isolated per continuation_id
+    initial_tracing_description = SessionField()
+    trace_config = SessionField()
+
     def __init__(self):
         super().__init__()
         self.initial_request = None
@@ -411,4 +411,5 @@ class WorkflowTool(BaseTool, BaseWorkflowMixin):
     # Default execute method - delegates to workflow
     async def execute(self, arguments: dict[str, Any]) -> list:
         """Execute the workflow tool - delegates to BaseWorkflowMixin."""
-        return await self.execute_workflow(arguments)
+        async with self.workflow_session(arguments):
+            return await self.execute_workflow(arguments)
@@ -0,0 +1,324 @@
+"""
+Per-continuation workflow sessions
+
+server.TOOLS holds a single instance of every tool, so workflow state kept on
+the instance (work_history, consolidated_findings, initial_request, ...) was
+shared by every conversation using that tool: two concurrent codereview runs
+overwrote each other's findings, and the state of finished runs was never
+released.
+
+Workflow state now lives in a WorkflowSession keyed by continuation_id:
+
+- Attributes declared with SessionField are read from and written to the
+  session bound to the current call (a context variable, so interleaved
+  asyncio tasks each see their own session). Outside a bound call they fall
+  back to the instance, which keeps direct use of tool objects working and
+  provides the per-session defaults (values assigned in __init__).
+- A step 1 call without continuation_id always starts a fresh session and
+  registers it under the thread id created for it. Responses tell the client
+  to pass that id; later calls without one fall back to the tool's anonymous
+  session, which is the run most recently started without an id (as with the
+  shared instance state before).
+- A session is discarded when its workflow completes (next_step_required is
+  false); the call that completes it keeps using it until it returns.
+- Calls on the same session are serialized; different sessions run
+  concurrently.
+- Sessions are evicted least-recently-used first when the store exceeds its
+  session count or approximate memory budget, and after WORKFLOW_SESSION_TTL
+  seconds without use. Sessions currently in use are never evicted.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of sessions kept per tool
+WORKFLOW_SESSION_MAX = int(os.getenv("WORKFLOW_SESSION_MAX", "64"))
+
+# Approximate memory budget for the sessions of one tool (bytes of serialized state)
+WORKFLOW_SESSION_MAX_BYTES = int(os.getenv("WORKFLOW_SESSION_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Idle time after which a session is dropped (defaults to the conversation timeout)
+WORKFLOW_SESSION_TTL = int(
+    os.getenv("WORKFLOW_SESSION_TTL", str(int(os.getenv("CONVERSATION_TIMEOUT_HOURS", "3")) * 3600))
+)
+
+# Per-call fields that are reset when a call finishes instead of being kept in the session
+TRANSIENT_FIELDS = frozenset(
+    {
+        "_current_arguments",
+        "_model_context",
+        "_current_model_name",
+        "_embedded_file_content",
+        "_file_reference_note",
+        "_actually_processed_files",
+        "_referenced_files",
+    }
+)
+
+_MISSING = object()
+
+# (tool instance, session) bound to the running tool call
+_bound_session: ContextVar[Optional[tuple[Any, "WorkflowSession"]]] = ContextVar("workflow_session", default=None)
+
+
+class WorkflowSession:
+    """State of one workflow run (one continuation thread) of one tool."""
+
+    def __init__(self, tool_name: str, continuation_id: Optional[str] = None):
+        self.tool_name = tool_name
+        self.continuation_id = continuation_id
+        self.state: dict[str, Any] = {}
+        self.last_access = time.monotonic()
+        self.size_bytes = 0
+        self.in_use = 0
+        self.discarded = False
+        self.lock = asyncio.Lock()
+
+    def estimate_size(self) -> int:
+        """Approximate memory held by the session (length of its serialized state)."""
+        persistent = {name: value for name, value in self.state.items() if name not in TRANSIENT_FIELDS}
+        try:
+            return len(json.dumps(persistent, default=_json_default, ensure_ascii=False))
+        except (TypeError, ValueError):
+            return len(str(persistent))
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return str(value)
+
+
+class SessionField:
+    """
+    Tool attribute stored in the current workflow session.
+
+    Assignments made while no session is bound (e.g. in __init__) are kept on
+    the instance and used as the initial value for every new session.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            return self
+        bound = _bound_session.get()
+        if bound is None or bound[0] is not obj:
+            try:
+                return obj.__dict__[self.name]
+            except KeyError:
+                raise AttributeError(self.name) from None
+
+        state = bound[1].state
+        value = state.get(self.name, _MISSING)
+        if value is _MISSING:
+            template = obj.__dict__.get(self.name, _MISSING)
+            if template is _MISSING:
+                raise AttributeError(self.name)
+            value = state[self.name] = copy.deepcopy(template)
+        return value
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        bound = _bound_session.get()
+        if bound is None or bound[0] is not obj:
+            obj.__dict__[self.name] = value
+        else:
+            bound[1].state[self.name] = value
+
+    def __delete__(self, obj: Any) -> None:
+        bound = _bound_session.get()
+        if bound is None or bound[0] is not obj:
+            obj.__dict__.pop(self.name, None)
+        else:
+            bound[1].state.pop(self.name, None)
+
+
+class WorkflowSessionStore:
+    """LRU/TTL-bounded sessions of one tool, keyed by continuation_id."""
+
+    def __init__(
+        self,
+        tool_name: str,
+        max_sessions: int = WORKFLOW_SESSION_MAX,
+        max_bytes: int = WORKFLOW_SESSION_MAX_BYTES,
+        ttl_seconds: float = WORKFLOW_SESSION_TTL,
+    ):
+        self.tool_name = tool_name
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # continuation_id -> session
+        self._sessions: OrderedDict[str, WorkflowSession] = OrderedDict()
+        self._total_bytes = 0
+        # Session used by calls after step 1 that carry no continuation_id
+        self._anonymous: Optional[WorkflowSession] = None
+        self._lock = threading.Lock()
+
+    def get(self, continuation_id: Optional[str]) -> Optional[WorkflowSession]:
+        """Look up a session without touching its LRU position (None for the anonymous session)."""
+        with self._lock:
+            if continuation_id is None:
+                return self._anonymous
+            return self._sessions.get(continuation_id)
+
+    def checkout(self, continuation_id: Optional[str], fresh: bool = False) -> WorkflowSession:
+        """
+        Get the session for a call and mark it in use.
+
+        Args:
+            continuation_id: Thread id from the request (None for the anonymous session)
+            fresh: Start a new, not yet registered session (step 1 without continuation_id);
+                it also becomes the anonymous session
+        """
+        with self._lock:
+            self._expire_idle()
+            if fresh:
+                session = self._anonymous = WorkflowSession(self.tool_name)
+            elif continuation_id is None:
+                session = self._anonymous
+                if session is None:
+                    session = self._anonymous = WorkflowSession(self.tool_name)
+            else:
+                session = self._sessions.get(continuation_id)
+                if session is None:
+                    session = WorkflowSession(self.tool_name, continuation_id)
+                    self._sessions[continuation_id] = session
+                else:
+                    self._sessions.move_to_end(continuation_id)
+            session.in_use += 1
+            session.last_access = time.monotonic()
+            return session
+
+    def register(self, session: WorkflowSession, continuation_id: str) -> None:
+        """Key a fresh session by the thread id created for it."""
+        with self._lock:
+            if session.continuation_id is not None and self._sessions.get(session.continuation_id) is session:
+                return
+            session.continuation_id = continuation_id
+            previous = self._sessions.pop(continuation_id, None)
+            if previous is not None and previous is not session:
+                self._total_bytes -= previous.size_bytes
+            self._sessions[continuation_id] = session
+
+    def checkin(self, session: WorkflowSession) -> None:
+        """Release a session after a call, dropping per-call state and enforcing limits."""
+        for name in TRANSIENT_FIELDS:
+            session.state.pop(name, None)
+
+        size = session.estimate_size()
+        with self._lock:
+            session.in_use -= 1
+            session.last_access = time.monotonic()
+            key = session.continuation_id
+            if session.discarded and not session.in_use:
+                self._drop(session)
+                return
+            if key is None or self._sessions.get(key) is not session:
+                # Anonymous session that never got a thread (or a session already dropped)
+                return
+            self._sessions.move_to_end(key)
+            self._total_bytes += size - session.size_bytes
+            session.size_bytes = size
+            self._evict()
+
+    def discard(self, continuation_id: Optional[str]) -> None:
+        """Drop the session of a thread (None for the anonymous session) after its workflow completed."""
+        session = self.get(continuation_id)
+        if session is not None:
+            self.discard_session(session)
+
+    def discard_session(self, session: WorkflowSession) -> None:
+        """
+        Drop a session after its workflow completed.
+
+        A session still in use is dropped when its last call checks it in.
+        """
+        with self._lock:
+            if session.in_use:
+                session.discarded = True
+            else:
+                self._drop(session)
+
+    def _drop(self, session: WorkflowSession) -> None:
+        key = session.continuation_id
+        if key is not None and self._sessions.get(key) is session:
+            del self._sessions[key]
+            self._total_bytes -= session.size_bytes
+        if self._anonymous is session:
+            self._anonymous = None
+
+    def _expire_idle(self) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key, session in list(self._sessions.items()):
+            if session.last_access >= cutoff:
+                # Entries are in LRU order, so everything after this one is newer
+                break
+            if not session.in_use:
+                self._drop(session)
+                logger.debug(f"Expired idle {self.tool_name} workflow session {key}")
+        anonymous = self._anonymous
+        if anonymous is not None and not anonymous.in_use and anonymous.last_access < cutoff:
+            self._anonymous = None
+
+    def _evict(self) -> None:
+        if len(self._sessions) <= self.max_sessions and self._total_bytes <= self.max_bytes:
+            return
+        for key, session in list(self._sessions.items()):
+            if len(self._sessions) <= self.max_sessions and self._total_bytes <= self.max_bytes:
+                break
+            if session.in_use:
+                continue
+            self._drop(session)
+            logger.debug(f"Evicted {self.tool_name} workflow session {key} ({session.size_bytes} bytes)")
+
+    def get_stats(self) -> dict[str, Any]:
+        """Session count and memory accounting for monitoring."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "in_use": sum(1 for session in self._sessions.values() if session.in_use),
+                "memory_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def get_bound_session(owner: Any) -> Optional[WorkflowSession]:
+    """Get the session bound to the current call of owner, if any."""
+    bound = _bound_session.get()
+    if bound is None or bound[0] is not owner:
+        return None
+    return bound[1]
+
+
+@asynccontextmanager
+async def bind_session(owner: Any, store: WorkflowSessionStore, continuation_id: Optional[str], fresh: bool):
+    """Check out a session, bind it to the current call of owner and release it afterwards."""
+    session = store.checkout(continuation_id, fresh=fresh)
+    try:
+        async with session.lock:
+            token = _bound_session.set((owner, session))
+            try:
+                yield session
+            finally:
+                _bound_session.reset(token)
+    finally:
+        store.checkin(session)
@@ -25,18 +25,22 @@ import json
 import logging
 import os
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from typing import Any, Optional
 
 from mcp.types import TextContent
 
 from config import MCP_PROMPT_SIZE_LIMIT
+from providers.executor import get_provider_executor
 from utils.conversation_memory import add_turn, create_thread
+from utils.progress import get_progress_reporter
 from utils.workflow_memory_fix import (
     create_sliding_findings_buffer,
     get_workflow_manager,
 )
 
 from ..shared.base_models import ConsolidatedFindings
+from .session import SessionField, WorkflowSession, WorkflowSessionStore, bind_session, get_bound_session
 
 logger = logging.getLogger(__name__)
 
@@ -67,10 +71,31 @@ class BaseWorkflowMixin(ABC):
     - get_system_prompt()
     - get_default_temperature()
     - _prepare_file_content_for_prompt()
+
+    Workflow state is stored per continuation thread (see tools.workflow.session):
+    attributes declared as SessionField belong to the session bound to the
+    running call, so one tool instance can serve many workflows at once.
+    Subclasses declare their own per-run attributes the same way.
     """
 
+    # Per-run state, isolated per continuation_id
+    work_history = SessionField()
+    consolidated_findings = SessionField()
+    initial_request = SessionField()
+    initial_issue = SessionField()
+
+    # Per-call state, reset after every call
+    _current_arguments = SessionField()
+    _model_context = SessionField()
+    _current_model_name = SessionField()
+    _embedded_file_content = SessionField()
+    _file_reference_note = SessionField()
+    _actually_processed_files = SessionField()
+    _referenced_files = SessionField()
+
     def __init__(self) -> None:
         super().__init__()
+        self._workflow_sessions = WorkflowSessionStore(self.get_name())
         self.work_history: list[dict[str, Any]] = []
         self.consolidated_findings: ConsolidatedFindings = ConsolidatedFindings()
         self.initial_request: Optional[str] = None
@@ -596,6 +621,69 @@ class BaseWorkflowMixin(ABC):
             f"[WORKFLOW_FILES] {self.get_name()}: Referenced {len(request_files)} files without embedding content"
         )
 
+    # ================================================================================
+    # Workflow Sessions
+    # ================================================================================
+
+    @asynccontextmanager
+    async def workflow_session(self, arguments: dict[str, Any]):
+        """
+        Bind the session of the request's continuation thread to the current call.
+
+        Step 1 without continuation_id starts a fresh session; it is keyed by the
+        thread created in execute_workflow and also becomes the anonymous session
+        used by later calls without continuation_id. Calls on the same session are
+        serialized.
+        """
+        try:
+            store = self._workflow_sessions
+        except AttributeError:
+            # Constructed without BaseWorkflowMixin.__init__: state stays on the instance
+            yield None
+            return
+
+        session = get_bound_session(self)
+        if session is not None:
+            # Already inside this tool's call (e.g. execute overridden and delegating)
+            yield session
+            return
+
+        arguments = arguments or {}
+        continuation_id = arguments.get("continuation_id") or None
+        fresh = continuation_id is None and arguments.get("step_number") == 1
+        async with bind_session(self, store, continuation_id, fresh) as session:
+            yield session
+
+    def get_workflow_session(self, continuation_id: Optional[str]) -> Optional[WorkflowSession]:
+        """Get the stored session of a continuation thread (None for the anonymous session)."""
+        try:
+            return self._workflow_sessions.get(continuation_id)
+        except AttributeError:
+            return None
+
+    def _register_workflow_session(self, continuation_id: str) -> None:
+        """Key the session bound to this call by the thread just created for it."""
+        session = get_bound_session(self)
+        if session is not None:
+            self._workflow_sessions.register(session, continuation_id)
+
+    def _discard_workflow_session(self) -> None:
+        """Release the session bound to this call once the call returns (the workflow is complete)."""
+        session = get_bound_session(self)
+        if session is not None:
+            self._workflow_sessions.discard_session(session)
+
+    def _add_continuation_instruction(self, response_data: dict, continuation_id: Optional[str]) -> None:
+        """Tell the client to pass the thread id with the next step so it continues this run's session."""
+        if not continuation_id:
+            return
+        instruction = (
+            f"Pass continuation_id: {continuation_id} with your next {self.get_name()} call "
+            f"to continue this workflow."
+        )
+        next_steps = response_data.get("next_steps")
+        response_data["next_steps"] = f"{next_steps}\n\n{instruction}" if next_steps else instruction
+
     # ================================================================================
     # Main Workflow Orchestration
     # ================================================================================
@@ -685,6 +773,7 @@ class BaseWorkflowMixin(ABC):
             if not continuation_id and request.step_number == 1:
                 clean_args = {k: v for k, v in arguments.items() if k not in ["_model_context", "_resolved_model_name"]}
                 continuation_id = create_thread(self.get_name(), clean_args)
+                self._register_workflow_session(continuation_id)
                 self.initial_request = request.step
                 # Allow tools to store initial description for expert analysis
                 self.store_initial_issue(request.step)
@@ -711,6 +800,7 @@ class BaseWorkflowMixin(ABC):
 
             # If work is complete, handle completion logic
             if not request.next_step_required:
+                self._discard_workflow_session()
                 response_data = await self.handle_work_completion(response_data, request, arguments)
             else:
                 # Force Claude to work before calling tool again
@@ -719,6 +809,9 @@ class BaseWorkflowMixin(ABC):
             # Allow tools to customize the final response
             response_data = self.customize_workflow_response(response_data, request)
 
+            if request.next_step_required:
+                self._add_continuation_instruction(response_data, continuation_id)
+
             # Add metadata (provider_used and model_used) to workflow response
             self._add_workflow_metadata(response_data, arguments)
 
@@ -1479,8 +1572,15 @@ class BaseWorkflowMixin(ABC):
             for warning in temp_warnings:
                 logger.warning(warning)
 
-            # Generate AI response - use request parameters if available
-            model_response = provider.generate_content(
+            # Stream text deltas to the client when it asked for progress
+            stream_kwargs = {}
+            reporter = get_progress_reporter()
+            if reporter is not None:
+                stream_kwargs["stream_callback"] = reporter.on_chunk
+
+            # Generate AI response - use request parameters if available (off the event loop)
+            model_response = await get_provider_executor().generate_content(
+                provider,
                 prompt=prompt,
                 model_name=model_name,
                 system_prompt=system_prompt,
@@ -1488,6 +1588,7 @@ class BaseWorkflowMixin(ABC):
                 thinking_mode=self.get_request_thinking_mode(request),
                 use_websearch=self.get_request_use_websearch(request),
                 images=list(set(self.consolidated_findings.images)) if self.consolidated_findings.images else None,
+                **stream_kwargs,
             )
 
             if model_response.content:
@@ -1543,8 +1644,9 @@ class BaseWorkflowMixin(ABC):
                 error_data["metadata"] = {"tool_name": self.get_name()}
                 return [TextContent(type="text", text=json.dumps(error_data, ensure_ascii=False))]
 
-            # Delegate to execute_workflow
-            return await self.execute_workflow(arguments)
+            # Delegate to execute_workflow with the continuation's session bound
+            async with self.workflow_session(arguments):
+                return await self.execute_workflow(arguments)
 
         except Exception as e:
             logger.error(f"Error in {self.get_name()} tool execution: {e}", exc_info=True)
@@ -6,7 +6,6 @@ Xtool Advisor - 智能工具推荐系统
 """
 
 import logging
-import re
 from typing import Any, Optional
 
 from pydantic import Field
@@ -15,6 +14,7 @@ from config import TEMPERATURE_ANALYTICAL
 from tools.models import ToolModelCategory
 from tools.shared.base_models import ToolRequest
 from tools.simple.base import SimpleTool
+from utils.keyword_matcher import KeywordMatcher, PatternSet
 
 logger = logging.getLogger(__name__)
 
@@ -110,12 +110,85 @@ class XtoolAdvisorTool(SimpleTool):
         },
     }
 
+    # 代码开发关键词
+    CODE_DEV_KEYWORDS = [
+        "代码", "编程", "开发", "实现", "编写代码", "写代码",
+        "code", "develop", "programming", "implement", "coding",
+        "函数", "方法", "类", "模块", "API", "接口",
+        "function", "method", "class", "module", "api", "interface",
+        "算法", "数据结构", "逻辑", "业务逻辑",
+        "algorithm", "data structure", "logic", "business logic",
+        "脚本", "程序", "应用", "系统实现",
+        "script", "program", "application", "system implementation"
+    ]
+
+    # 编程语言关键词
+    LANGUAGE_KEYWORDS = [
+        "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust",
+        "php", "ruby", "swift", "kotlin", "scala", "dart", "r", "matlab",
+        "html", "css", "sql", "bash", "shell", "powershell"
+    ]
+
+    # 开发框架关键词
+    FRAMEWORK_KEYWORDS = [
+        "django", "flask", "fastapi", "spring", "springboot",
+        "react", "vue", "angular", "nodejs", "express",
+        "laravel", "rails", "asp.net", "gin", "echo",
+        "pandas", "numpy", "tensorflow", "pytorch"
+    ]
+
+    # 开发活动关键词
+    DEV_ACTIVITY_KEYWORDS = [
+        "写", "编写", "开发", "实现", "构建", "创建",
+        "write", "develop", "implement", "build", "create",
+        "新增功能", "添加功能", "功能实现", "业务实现",
+        "add feature", "implement feature", "feature development",
+        "重构代码", "优化代码", "修改代码", "改进代码",
+        "refactor", "optimize code", "modify code", "improve code"
+    ]
+
+    # 代码开发组合模式（更精确的检测）
+    DEV_PATTERNS = [
+        ("写", "代码"), ("编写", "程序"), ("开发", "功能"),
+        ("实现", "逻辑"), ("创建", "类"), ("定义", "函数"),
+        ("构建", "API"), ("设计", "接口"), ("编程", "实现")
+    ]
+
     # 初始化标志
     _initialized = False
 
+    # TOOL_PATTERNS 和代码开发检测的关键词自动机及正则（首次实例化时编译）
+    _keyword_matcher: Optional[KeywordMatcher] = None
+    _pattern_sets: dict[str, PatternSet] = {}
+    _code_dev_terms: frozenset[str] = frozenset()
+
     def __init__(self):
         super().__init__()
         self._initialize_thinking_modes()
+        self._compile_tool_patterns()
+
+    @classmethod
+    def _compile_tool_patterns(cls):
+        """把所有工具的关键词、正则所需的字面量和代码开发关键词编译进一个自动机（只执行一次）"""
+        if cls._keyword_matcher is not None:
+            return
+
+        pattern_sets = {tool: PatternSet(config["patterns"]) for tool, config in cls.TOOL_PATTERNS.items()}
+        terms = set()
+        for tool, config in cls.TOOL_PATTERNS.items():
+            terms.update(config["keywords"])
+            terms |= pattern_sets[tool].required_literals()
+
+        code_dev_terms = frozenset(
+            cls.CODE_DEV_KEYWORDS + cls.LANGUAGE_KEYWORDS + cls.FRAMEWORK_KEYWORDS + cls.DEV_ACTIVITY_KEYWORDS
+        )
+        terms |= code_dev_terms
+        for pattern in cls.DEV_PATTERNS:
+            terms.update(pattern)
+
+        cls._pattern_sets = pattern_sets
+        cls._code_dev_terms = code_dev_terms
+        cls._keyword_matcher = KeywordMatcher(terms)
 
     @classmethod
     def _initialize_thinking_modes(cls):
@@ -217,69 +290,28 @@ class XtoolAdvisorTool(SimpleTool):
 
         cls._initialized = True
 
-    def _detect_code_development(self, query_lower: str) -> bool:
+    def _detect_code_development(self, query_lower: str, found: Optional[set[str]] = None) -> bool:
         """
         检测查询是否涉及代码开发，需要使用 context7 规范
 
         Args:
             query_lower: 小写查询文本
+            found: 自动机在 query_lower 中找到的关键词（省略时重新扫描）
 
         Returns:
             bool: 是否需要 context7 规范
         """
-        # 代码开发关键词
-        code_dev_keywords = [
-            "代码", "编程", "开发", "实现", "编写代码", "写代码",
-            "code", "develop", "programming", "implement", "coding",
-            "函数", "方法", "类", "模块", "API", "接口",
-            "function", "method", "class", "module", "api", "interface",
-            "算法", "数据结构", "逻辑", "业务逻辑",
-            "algorithm", "data structure", "logic", "business logic",
-            "脚本", "程序", "应用", "系统实现",
-            "script", "program", "application", "system implementation"
-        ]
-
-        # 编程语言关键词
-        language_keywords = [
-            "python", "java", "javascript", "typescript", "c++", "c#", "go", "rust",
-            "php", "ruby", "swift", "kotlin", "scala", "dart", "r", "matlab",
-            "html", "css", "sql", "bash", "shell", "powershell"
-        ]
-
-        # 开发框架关键词
-        framework_keywords = [
-            "django", "flask", "fastapi", "spring", "springboot",
-            "react", "vue", "angular", "nodejs", "express",
-            "laravel", "rails", "asp.net", "gin", "echo",
-            "pandas", "numpy", "tensorflow", "pytorch"
-        ]
-
-        # 开发活动关键词
-        dev_activity_keywords = [
-            "写", "编写", "开发", "实现", "构建", "创建",
-            "write", "develop", "implement", "build", "create",
-            "新增功能", "添加功能", "功能实现", "业务实现",
-            "add feature", "implement feature", "feature development",
-            "重构代码", "优化代码", "修改代码", "改进代码",
-            "refactor", "optimize code", "modify code", "improve code"
-        ]
+        if found is None:
+            self._compile_tool_patterns()
+            found = self._keyword_matcher.find(query_lower)
 
         # 检查是否包含代码开发相关关键词
-        all_keywords = code_dev_keywords + language_keywords + framework_keywords + dev_activity_keywords
-
-        for keyword in all_keywords:
-            if keyword in query_lower:
-                return True
+        if not found.isdisjoint(self._code_dev_terms):
+            return True
 
         # 检查组合模式（更精确的检测）
-        dev_patterns = [
-            ("写", "代码"), ("编写", "程序"), ("开发", "功能"),
-            ("实现", "逻辑"), ("创建", "类"), ("定义", "函数"),
-            ("构建", "API"), ("设计", "接口"), ("编程", "实现")
-        ]
-
-        for pattern in dev_patterns:
-            if all(word in query_lower for word in pattern):
+        for pattern in self.DEV_PATTERNS:
+            if all(word in found for word in pattern):
                 return True
 
         return False
@@ -346,8 +378,12 @@ class XtoolAdvisorTool(SimpleTool):
         if context:
             query_lower += " " + context.lower()
 
+        # 一次扫描找出所有关键词和正则字面量
+        self._compile_tool_patterns()
+        found = self._keyword_matcher.find(query_lower)
+
         # 检查是否需要 context7 规范（代码开发相关）
-        needs_context7 = self._detect_code_development(query_lower)
+        needs_context7 = self._detect_code_development(query_lower, found)
 
         # 工具匹配得分
         tool_scores = {}
@@ -357,13 +393,11 @@ class XtoolAdvisorTool(SimpleTool):
 
             # 关键词匹配
             for keyword in config["keywords"]:
-                if keyword in query_lower:
+                if keyword in found:
                     score += 2
 
-            # 模式匹配
-            for pattern in config["patterns"]:
-                if re.search(pattern, query_lower):
-                    score += 3
+            # 模式匹配（只对字面量都出现的正则执行搜索）
+            score += 3 * len(self._pattern_sets[tool].search(query_lower, found))
 
             if score > 0:
                 tool_scores[tool] = score
@@ -168,12 +168,17 @@ LLM看到自然的对话流程："轮次1 → 轮次2 → 轮次3..."
 import json
 import logging
 import os
+import threading
 import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from .memory_store import MemoryLayerStore, get_memory_store
 
 logger = logging.getLogger(__name__)
 
@@ -206,6 +211,15 @@ except ValueError:
 
 CONVERSATION_TIMEOUT_SECONDS = CONVERSATION_TIMEOUT_HOURS * 3600
 
+# Maximum number of threads followed through parent links
+MAX_THREAD_CHAIN_DEPTH = 20
+
+# Number of validated threads kept in the per-process cache (0 disables it)
+try:
+    THREAD_CACHE_SIZE = max(0, int(os.getenv("THREAD_CACHE_SIZE", "128")))
+except ValueError:
+    THREAD_CACHE_SIZE = 128
+
 # Enhanced Memory Configuration
 ENABLE_ENHANCED_MEMORY = os.getenv("ENABLE_ENHANCED_MEMORY", "true").lower() == "true"
 MEMORY_STORAGE_PATH = Path(os.getenv("MEMORY_STORAGE_PATH", ".XTOOL_memory"))
@@ -274,6 +288,15 @@ class ThreadContext(BaseModel):
         tool_name: Name of the tool that initiated this thread
         turns: List of all conversation turns in chronological order
         initial_context: Original request data that started the conversation
+        ancestor_thread_ids: Parent chain, nearest first (lets get_thread_chain batch its reads)
+        logged_turns: Number of turns kept in the thread's append-only turn log
+
+    Storage layout:
+        thread:{id} holds the thread header (this model without the logged turns)
+        and thread_turns:{id} is an append-only list with one serialized turn per
+        entry. add_turn appends one entry and rewrites only the small header, so
+        its cost no longer grows with the length of the conversation. Threads
+        written before the turn log existed keep their turns inline in the header.
     """
 
     thread_id: str
@@ -283,14 +306,74 @@ class ThreadContext(BaseModel):
     tool_name: str  # Tool that created this thread (preserved for attribution)
     turns: list[ConversationTurn]
     initial_context: dict[str, Any]  # Original request parameters
+    ancestor_thread_ids: list[str] = Field(default_factory=list)  # Parent chain, nearest first
+    logged_turns: int = 0  # Turns stored in the append-only turn log
+
+
+def _turn_log_key(thread_id: str) -> str:
+    """Storage key of a thread's append-only turn log"""
+    return f"thread_turns:{thread_id}"
+
+
+def _parse_logged_turns(entries: list[str]) -> list[ConversationTurn]:
+    """Deserialize turn log entries"""
+    return [ConversationTurn.model_validate_json(entry) for entry in entries]
+
+
+# Per-process LRU of validated threads: thread_id -> (version stamp, context).
+# The version stamp is the stored header JSON, which changes on every write
+# (last_updated_at and logged_turns), so a write from any process makes the
+# cached entry stale without extra bookkeeping.
+_thread_cache: "OrderedDict[str, tuple[str, ThreadContext]]" = OrderedDict()
+_thread_cache_lock = threading.Lock()
+
+
+def _cache_get(thread_id: str, version: str) -> Optional[ThreadContext]:
+    """Get a copy-on-write view of a cached thread if its version still matches"""
+    with _thread_cache_lock:
+        entry = _thread_cache.get(thread_id)
+        if entry is None or entry[0] != version:
+            return None
+        _thread_cache.move_to_end(thread_id)
+        context = entry[1]
+    # Fresh turns list so callers can append without touching the cached object
+    return context.model_copy(update={"turns": list(context.turns)})
+
+
+def _cache_put(thread_id: str, version: str, context: ThreadContext) -> None:
+    """Remember a validated thread under its version stamp"""
+    if THREAD_CACHE_SIZE <= 0:
+        return
+    cached = context.model_copy(update={"turns": list(context.turns)})
+    with _thread_cache_lock:
+        _thread_cache[thread_id] = (version, cached)
+        _thread_cache.move_to_end(thread_id)
+        while len(_thread_cache) > THREAD_CACHE_SIZE:
+            _thread_cache.popitem(last=False)
+
+
+def invalidate_thread_cache(thread_id: Optional[str] = None) -> None:
+    """
+    Drop cached threads.
+
+    Args:
+        thread_id: Thread to drop, or None to clear the whole cache
+    """
+    with _thread_cache_lock:
+        if thread_id is None:
+            _thread_cache.clear()
+        else:
+            _thread_cache.pop(thread_id, None)
 
 
 def get_storage():
     """
-    Get in-memory storage backend for conversation persistence.
+    Get the configured storage backend for conversation persistence.
+
+    The backend is selected by CONVERSATION_STORAGE_BACKEND (memory, sqlite or redis).
 
     Returns:
-        InMemoryStorage: Thread-safe in-memory storage backend
+        StorageBackend: Thread-safe storage backend
     """
     from .storage_backend import get_storage_backend
 
@@ -322,6 +405,14 @@ def create_thread(tool_name: str, initial_request: dict[str, Any], parent_thread
     thread_id = str(uuid.uuid4())
     now = datetime.now(timezone.utc).isoformat()
 
+    # Record the parent chain up front so get_thread_chain can fetch it in one batch
+    ancestor_thread_ids = []
+    if parent_thread_id:
+        parent = get_thread(parent_thread_id)
+        ancestor_thread_ids = [parent_thread_id]
+        if parent:
+            ancestor_thread_ids.extend(parent.ancestor_thread_ids[: MAX_THREAD_CHAIN_DEPTH - 1])
+
     # Filter out non-serializable parameters to avoid JSON encoding issues
     filtered_context = {
         k: v
@@ -337,25 +428,47 @@ def create_thread(tool_name: str, initial_request: dict[str, Any], parent_thread
         tool_name=tool_name,  # Track which tool initiated this conversation
         turns=[],  # Empty initially, turns added via add_turn()
         initial_context=filtered_context,
+        ancestor_thread_ids=ancestor_thread_ids,
     )
 
     # Store in memory with configurable TTL to prevent indefinite accumulation
     storage = get_storage()
     key = f"thread:{thread_id}"
     storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())
+    invalidate_thread_cache(thread_id)
 
     logger.debug(f"[THREAD] Created new thread {thread_id} with parent {parent_thread_id}")
 
     return thread_id
 
 
+def _get_thread_header(thread_id: str) -> Optional[ThreadContext]:
+    """Load a thread's header without reading its turn log"""
+    if not thread_id or not _is_valid_uuid(thread_id):
+        return None
+
+    try:
+        data = get_storage().get(f"thread:{thread_id}")
+        if data:
+            return ThreadContext.model_validate_json(data)
+        return None
+    except Exception:
+        return None
+
+
 def get_thread(thread_id: str) -> Optional[ThreadContext]:
     """
-    Retrieve thread context from in-memory storage
+    Retrieve thread context from storage
 
     Fetches complete conversation context for cross-tool continuation.
     This is the core function that enables tools to access conversation
-    history from previous interactions.
+    history from previous interactions. The header and the full turn log
+    are combined into one ThreadContext.
+
+    Validated threads are cached per process and reused while the stored
+    header is unchanged. The returned object has its own turns list, but the
+    ConversationTurn objects are shared with the cache and must be treated as
+    read-only.
 
     Args:
         thread_id: UUID of the conversation thread
@@ -378,13 +491,69 @@ def get_thread(thread_id: str) -> Optional[ThreadContext]:
         data = storage.get(key)
 
         if data:
-            return ThreadContext.model_validate_json(data)
+            cached = _cache_get(thread_id, data)
+            if cached is not None:
+                return cached
+
+            context = ThreadContext.model_validate_json(data)
+            if context.logged_turns:
+                context.turns.extend(_parse_logged_turns(storage.lrange(_turn_log_key(thread_id))))
+            _cache_put(thread_id, data, context)
+            return context
         return None
     except Exception:
         # Silently handle errors to avoid exposing storage details
         return None
 
 
+def get_thread_turns(
+    thread_id: str, last_n: Optional[int] = None, max_bytes: Optional[int] = None
+) -> list[ConversationTurn]:
+    """
+    Retrieve only the most recent turns of a thread.
+
+    Reads the tail of the append-only turn log without deserializing older
+    turns, for callers that do not need the complete history.
+
+    Args:
+        thread_id: UUID of the conversation thread
+        last_n: Return at most this many turns (newest last)
+        max_bytes: Return the longest tail whose serialized size fits in this many bytes
+
+    Returns:
+        list[ConversationTurn]: Turns in chronological order (empty if the thread is missing)
+    """
+    header = _get_thread_header(thread_id)
+    if not header:
+        return []
+
+    try:
+        if header.logged_turns and last_n is not None and max_bytes is None and len(header.turns) == 0:
+            # Only the requested tail is read from storage
+            entries = get_storage().lrange(_turn_log_key(thread_id), -last_n, -1) if last_n > 0 else []
+        else:
+            entries = [turn.model_dump_json() for turn in header.turns]
+            if header.logged_turns:
+                entries.extend(get_storage().lrange(_turn_log_key(thread_id)))
+            if last_n is not None:
+                entries = entries[-last_n:] if last_n > 0 else []
+
+        if max_bytes is not None:
+            tail_start = len(entries)
+            used = 0
+            for entry in reversed(entries):
+                used += len(entry.encode("utf-8"))
+                if used > max_bytes:
+                    break
+                tail_start -= 1
+            entries = entries[tail_start:]
+
+        return _parse_logged_turns(entries)
+    except Exception as e:
+        logger.debug(f"[THREAD] Failed to read turns for {thread_id}: {type(e).__name__}")
+        return []
+
+
 def add_turn(
     thread_id: str,
     role: str,
@@ -423,6 +592,7 @@ def add_turn(
         - Storage connection failure
 
     Note:
+        - Only the new turn and the thread header are serialized (append-only turn log)
         - Refreshes thread TTL to configured timeout on successful update
         - Turn limits prevent runaway conversations
         - File references are preserved for cross-tool access with atomic ordering
@@ -431,13 +601,13 @@ def add_turn(
     """
     logger.debug(f"[FLOW] Adding {role} turn to {thread_id} ({tool_name})")
 
-    context = get_thread(thread_id)
+    context = _get_thread_header(thread_id)
     if not context:
         logger.debug(f"[FLOW] Thread {thread_id} not found for turn addition")
         return False
 
     # Check turn limit to prevent runaway conversations
-    if len(context.turns) >= MAX_CONVERSATION_TURNS:
+    if len(context.turns) + context.logged_turns >= MAX_CONVERSATION_TURNS:
         logger.debug(f"[FLOW] Thread {thread_id} at max turns ({MAX_CONVERSATION_TURNS})")
         return False
 
@@ -454,13 +624,15 @@ def add_turn(
         model_metadata=model_metadata,  # Additional model info
     )
 
-    context.turns.append(turn)
+    context.logged_turns += 1
     context.last_updated_at = datetime.now(timezone.utc).isoformat()
 
-    # Save back to storage and refresh TTL
+    # Append the turn, then save the header back to storage and refresh TTL
     try:
         storage = get_storage()
         key = f"thread:{thread_id}"
+        invalidate_thread_cache(thread_id)
+        storage.rpush_with_ttl(_turn_log_key(thread_id), CONVERSATION_TIMEOUT_SECONDS, turn.model_dump_json())
         storage.setex(key, CONVERSATION_TIMEOUT_SECONDS, context.model_dump_json())  # Refresh TTL to configured timeout
         return True
     except Exception as e:
@@ -468,12 +640,63 @@ def add_turn(
         return False
 
 
-def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]:
+def _get_recorded_chain(context: ThreadContext, max_depth: int) -> Optional[list[ThreadContext]]:
+    """
+    Fetch a thread's recorded ancestors with batched reads (headers, then turn logs).
+
+    Returns:
+        list[ThreadContext]: Chain newest first, or None if the recorded ancestors
+        do not match the stored parent links (the caller then walks the links)
+    """
+    ancestor_ids = context.ancestor_thread_ids[: max_depth - 1]
+    if not ancestor_ids or ancestor_ids[0] != context.parent_thread_id:
+        return None
+
+    try:
+        storage = get_storage()
+        values = storage.mget([f"thread:{ancestor_id}" for ancestor_id in ancestor_ids])
+        if len(values) != len(ancestor_ids):
+            return None
+        chain = [context]
+        uncached = []
+        for ancestor_id, data in zip(ancestor_ids, values):
+            if not data:
+                # Expired ancestor ends the chain, same as a failed lookup during the walk
+                logger.debug(f"[THREAD] Thread {ancestor_id} not found in chain traversal")
+                break
+            ancestor = _cache_get(ancestor_id, data)
+            if ancestor is None:
+                ancestor = ThreadContext.model_validate_json(data)
+                uncached.append((ancestor, data))
+            if ancestor.thread_id != ancestor_id or chain[-1].parent_thread_id != ancestor_id:
+                return None
+            chain.append(ancestor)
+
+        # Turn logs of uncached ancestors are fetched in one more batch
+        logged = [thread for thread, _ in uncached if thread.logged_turns]
+        if logged:
+            logs = storage.mlrange([_turn_log_key(thread.thread_id) for thread in logged])
+            for thread, entries in zip(logged, logs):
+                thread.turns.extend(_parse_logged_turns(entries))
+        for thread, data in uncached:
+            _cache_put(thread.thread_id, data, thread)
+    except Exception:
+        return None
+
+    seen_ids = {thread.thread_id for thread in chain}
+    if len(seen_ids) != len(chain):
+        return None
+    return chain
+
+
+def get_thread_chain(thread_id: str, max_depth: int = MAX_THREAD_CHAIN_DEPTH) -> list[ThreadContext]:
     """
     Traverse the parent chain to get all threads in conversation sequence.
 
     Retrieves the complete conversation chain by following parent_thread_id
-    links. Returns threads in chronological order (oldest first).
+    links. Returns threads in chronological order (oldest first). Threads that
+    recorded their ancestors at creation are fetched with one batched mget;
+    older threads fall back to following the links one read at a time.
 
     Args:
         thread_id: Starting thread ID
@@ -482,6 +705,14 @@ def get_thread_chain(thread_id: str, max_depth: int = 20) -> list[ThreadContext]
     Returns:
         list[ThreadContext]: All threads in chain, oldest first
     """
+    start = get_thread(thread_id)
+    if start and max_depth > 1:
+        recorded_chain = _get_recorded_chain(start, max_depth)
+        if recorded_chain is not None:
+            recorded_chain.reverse()
+            logger.debug(f"[THREAD] Retrieved chain of {len(recorded_chain)} threads for {thread_id} in one batch")
+            return recorded_chain
+
     chain = []
     current_id = thread_id
     seen_ids = set()
@@ -559,7 +790,7 @@ def get_conversation_file_list(context: ThreadContext) -> list[str]:
     seen_files = set()
     file_list = []
 
-    logger.debug(f"[FILES] Collecting files from {len(context.turns)} turns (newest first)")
+    logger.debug("[FILES] Collecting files from %s turns (newest first)", len(context.turns))
 
     # Process turns in reverse order (newest first) - this is the CORE of newest-first prioritization
     # By iterating from len-1 down to 0, we encounter newer turns before older turns
@@ -567,18 +798,18 @@ def get_conversation_file_list(context: ThreadContext) -> list[str]:
     for i in range(len(context.turns) - 1, -1, -1):  # REVERSE: newest turn first
         turn = context.turns[i]
         if turn.files:
-            logger.debug(f"[FILES] Turn {i + 1} has {len(turn.files)} files: {turn.files}")
+            logger.debug("[FILES] Turn %s has %s files: %s", i + 1, len(turn.files), turn.files)
             for file_path in turn.files:
                 if file_path not in seen_files:
                     # First time seeing this file - add it (this is the NEWEST reference)
                     seen_files.add(file_path)
                     file_list.append(file_path)
-                    logger.debug(f"[FILES] Added new file: {file_path} (from turn {i + 1})")
+                    logger.debug("[FILES] Added new file: %s (from turn %s)", file_path, i + 1)
                 else:
                     # File already seen from a NEWER turn - skip this older reference
-                    logger.debug(f"[FILES] Skipping duplicate file: {file_path} (newer version already included)")
+                    logger.debug("[FILES] Skipping duplicate file: %s (newer version already included)", file_path)
 
-    logger.debug(f"[FILES] Final file list ({len(file_list)}): {file_list}")
+    logger.debug("[FILES] Final file list (%s): %s", len(file_list), file_list)
     return file_list
 
 
@@ -838,7 +1069,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
             initial_context=context.initial_context,
         )
         all_files = get_conversation_file_list(temp_context)  # Applies newest-first logic to entire chain
-        logger.debug(f"[THREAD] Built history from {len(chain)} threads with {total_turns} total turns")
+        logger.debug("[THREAD] Built history from %s threads with %s total turns", len(chain), total_turns)
     else:
         # Single thread, no parent chain
         all_turns = context.turns
@@ -848,7 +1079,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     if not all_turns:
         return "", 0
 
-    logger.debug(f"[FILES] Found {len(all_files)} unique files in conversation history")
+    logger.debug("[FILES] Found %s unique files in conversation history", len(all_files))
 
     # Get model-specific token allocation early (needed for both files and turns)
     if model_context is None:
@@ -870,9 +1101,9 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     max_file_tokens = token_allocation.file_tokens
     max_history_tokens = token_allocation.history_tokens
 
-    logger.debug(f"[HISTORY] Using model-specific limits for {model_context.model_name}:")
-    logger.debug(f"[HISTORY]   Max file tokens: {max_file_tokens:,}")
-    logger.debug(f"[HISTORY]   Max history tokens: {max_history_tokens:,}")
+    logger.debug("[HISTORY] Using model-specific limits for %s:", model_context.model_name)
+    logger.debug("[HISTORY]   Max file tokens: %d", max_file_tokens)
+    logger.debug("[HISTORY]   Max history tokens: %d", max_history_tokens)
 
     history_parts = [
         "=== CONVERSATION HISTORY (CONTINUATION) ===",
@@ -885,7 +1116,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
 
     # Embed files referenced in this conversation with size-aware selection
     if all_files:
-        logger.debug(f"[FILES] Starting embedding for {len(all_files)} files")
+        logger.debug("[FILES] Starting embedding for %s files", len(all_files))
 
         # Plan file inclusion based on size constraints
         # CRITICAL: all_files is already ordered by newest-first prioritization from get_conversation_file_list()
@@ -894,7 +1125,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         files_to_include, files_to_skip, estimated_tokens = _plan_file_inclusion_by_size(all_files, max_file_tokens)
 
         if files_to_skip:
-            logger.info(f"[FILES] Excluding {len(files_to_skip)} files from conversation history: {files_to_skip}")
+            logger.info("[FILES] Excluding %s files from conversation history: %s", len(files_to_skip), files_to_skip)
             logger.debug("[FILES] Files excluded for various reasons (size constraints, missing files, access issues)")
 
         if files_to_include:
@@ -922,23 +1153,24 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
 
                 for file_path in files_to_include:
                     try:
-                        logger.debug(f"[FILES] Processing file {file_path}")
+                        logger.debug("[FILES] Processing file %s", file_path)
                         formatted_content, content_tokens = read_file_content(file_path)
                         if formatted_content:
                             file_contents.append(formatted_content)
                             total_tokens += content_tokens
                             files_included += 1
                             logger.debug(
-                                f"File embedded in conversation history: {file_path} ({content_tokens:,} tokens)"
+                                "File embedded in conversation history: %s (%d tokens)", file_path, content_tokens
                             )
                         else:
-                            logger.debug(f"File skipped (empty content): {file_path}")
+                            logger.debug("File skipped (empty content): %s", file_path)
                     except Exception as e:
                         # More descriptive error handling for missing files
                         try:
                             if not os.path.exists(file_path):
                                 logger.info(
-                                    f"File no longer accessible for conversation history: {file_path} - file was moved/deleted since conversation (marking as excluded)"
+                                    "File no longer accessible for conversation history: %s - file was moved/deleted since conversation (marking as excluded)",
+                                    file_path,
                                 )
                             else:
                                 logger.warning(
@@ -960,11 +1192,14 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
                         )
                     history_parts.append(files_content)
                     logger.debug(
-                        f"Conversation history file embedding complete: {files_included} files embedded, {len(files_to_skip)} omitted, {total_tokens:,} total tokens"
+                        "Conversation history file embedding complete: %s files embedded, %s omitted, %d total tokens",
+                        files_included,
+                        len(files_to_skip),
+                        total_tokens,
                     )
                 else:
                     history_parts.append("(No accessible files found)")
-                    logger.debug(f"[FILES] No accessible files found from {len(files_to_include)} planned files")
+                    logger.debug("[FILES] No accessible files found from %s planned files", len(files_to_include))
             else:
                 # Fallback to original read_files function
                 files_content = read_files_func(all_files)
@@ -1034,12 +1269,12 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
         # Check if adding this turn would exceed history budget
         if file_embedding_tokens + total_turn_tokens + turn_tokens > max_history_tokens:
             # Stop adding turns - we've reached the limit
-            logger.debug(f"[HISTORY] Stopping at turn {turn_num} - would exceed history budget")
-            logger.debug(f"[HISTORY]   File tokens: {file_embedding_tokens:,}")
-            logger.debug(f"[HISTORY]   Turn tokens so far: {total_turn_tokens:,}")
-            logger.debug(f"[HISTORY]   This turn: {turn_tokens:,}")
-            logger.debug(f"[HISTORY]   Would total: {file_embedding_tokens + total_turn_tokens + turn_tokens:,}")
-            logger.debug(f"[HISTORY]   Budget: {max_history_tokens:,}")
+            logger.debug("[HISTORY] Stopping at turn %s - would exceed history budget", turn_num)
+            logger.debug("[HISTORY]   File tokens: %d", file_embedding_tokens)
+            logger.debug("[HISTORY]   Turn tokens so far: %d", total_turn_tokens)
+            logger.debug("[HISTORY]   This turn: %d", turn_tokens)
+            logger.debug("[HISTORY]   Would total: %d", file_embedding_tokens + total_turn_tokens + turn_tokens)
+            logger.debug("[HISTORY]   Budget: %d", max_history_tokens)
             break
 
         # Add this turn to our collection (we'll reverse it later for chronological presentation)
@@ -1062,7 +1297,7 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     included_turns = len(turn_entries)
     total_turns = len(all_turns)
     if included_turns < total_turns:
-        logger.info(f"[HISTORY] Included {included_turns}/{total_turns} turns due to token limit")
+        logger.info("[HISTORY] Included %s/%s turns due to token limit", included_turns, total_turns)
         history_parts.append(f"\n[Note: Showing {included_turns} most recent turns out of {total_turns} total]")
 
     history_parts.extend(
@@ -1091,7 +1326,11 @@ def build_conversation_history(context: ThreadContext, model_context=None, read_
     user_turns = len([t for t in all_turns if t.role == "user"])
     assistant_turns = len([t for t in all_turns if t.role == "assistant"])
     logger.debug(
-        f"[FLOW] Built conversation history: {user_turns} user + {assistant_turns} assistant turns, {len(all_files)} files, {total_conversation_tokens:,} tokens"
+        "[FLOW] Built conversation history: %s user + %s assistant turns, %s files, %d tokens",
+        user_turns,
+        assistant_turns,
+        len(all_files),
+        total_conversation_tokens,
     )
 
     return complete_history, total_conversation_tokens
@@ -1197,30 +1436,67 @@ def _get_memory_storage_path(layer: str) -> Optional[Path]:
     return MEMORY_STORAGE_PATH / file_name
 
 
-def _load_memory_layer(layer: str) -> dict[str, Any]:
-    """Load persisted memory from disk."""
+def _get_memory_store(layer: str) -> Optional[MemoryLayerStore]:
+    """
+    Get the key-level store of a persisted memory layer.
+
+    Layers are kept in <layer>_memory.db next to the former JSON file, which is
+    imported on first use.
+    """
     storage_path = _get_memory_storage_path(layer)
-    if not storage_path or not storage_path.exists():
+    if not storage_path:
+        return None
+
+    return get_memory_store(storage_path.with_suffix(".db"), legacy_json_path=storage_path)
+
+
+def _load_memory_layer(layer: str) -> dict[str, Any]:
+    """Load all persisted memories of a layer."""
+    try:
+        store = _get_memory_store(layer)
+        return dict(store.items()) if store else {}
+    except Exception as e:
+        logger.warning(f"Failed to load {layer} memory: {e}")
         return {}
 
+
+def _load_memory_items(layer: str, keys: Iterable[str]) -> dict[str, Any]:
+    """Load only the given keys of a persisted layer."""
     try:
-        with open(storage_path, encoding="utf-8") as f:
-            return json.load(f)
+        store = _get_memory_store(layer)
+        return store.get_many(keys) if store else {}
     except Exception as e:
         logger.warning(f"Failed to load {layer} memory: {e}")
         return {}
 
 
+def _search_memory_layer(layer: str, query: str, keys: Optional[set[str]] = None) -> list[tuple[str, float]]:
+    """Full-text search of a persisted layer: (key, BM25 score) pairs, best first."""
+    try:
+        store = _get_memory_store(layer)
+        return store.search(query, keys) if store else []
+    except Exception as e:
+        logger.warning(f"Failed to search {layer} memory: {e}")
+        return []
+
+
 def _save_memory_layer(layer: str, data: dict[str, Any]) -> bool:
-    """Save memory layer to disk."""
-    storage_path = _get_memory_storage_path(layer)
-    if not storage_path:
+    """
+    Replace the persisted contents of a layer with data.
+
+    Only entries that were added, changed or removed are written; callers
+    updating single entries should use the store from _get_memory_store.
+    """
+    if not isinstance(data, dict):
+        logger.error(f"Failed to save {layer} memory: expected a dict, got {type(data).__name__}")
         return False
 
     try:
-        with open(storage_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        logger.info(f"Memory saved to file: {storage_path}")
+        store = _get_memory_store(layer)
+        if not store:
+            return False
+        changed = store.replace_all(data)
+        logger.info(f"Memory saved to {store.db_path} ({changed} entries changed)")
         return True
     except Exception as e:
         logger.error(f"Failed to save {layer} memory: {e}")
@@ -1254,9 +1530,6 @@ def save_memory(
     if not key:
         key = f"mem_{datetime.now(timezone.utc).isoformat()}_{uuid.uuid4().hex[:8]}"
 
-    # Load existing memory for the layer
-    memory_data = _load_memory_layer(layer) if layer != "session" else {}
-
     # Create memory entry
     memory_entry = {
         "content": content,
@@ -1265,21 +1538,16 @@ def save_memory(
         "layer": layer,
     }
 
-    # Add new entry first
-    memory_data[key] = memory_entry
-
-    # Check max items limit after adding
-    max_items = MEMORY_LAYERS[layer]["max_items"]
-    if len(memory_data) > max_items:
-        # Remove oldest entries (FIFO)
-        sorted_keys = sorted(memory_data.keys(), key=lambda k: memory_data[k].get("timestamp", ""))
-        # Remove the oldest entries to stay within limit
-        for old_key in sorted_keys[: len(memory_data) - max_items]:
-            del memory_data[old_key]
-
     # Persist if needed
     if MEMORY_LAYERS[layer]["persist"]:
-        _save_memory_layer(layer, memory_data)
+        try:
+            store = _get_memory_store(layer)
+            if store:
+                store.put(key, memory_entry)
+                # Remove oldest entries (FIFO) beyond the layer limit
+                store.trim(MEMORY_LAYERS[layer]["max_items"])
+        except Exception as e:
+            logger.error(f"Failed to save {layer} memory: {e}")
     else:
         # For session layer, store in the current thread's metadata
         storage = get_storage()
@@ -1302,7 +1570,7 @@ def recall_memory(
         limit: Maximum number of results
 
     Returns:
-        List of matching memories, newest first
+        List of matching memories, newest first (best BM25 match first when querying)
     """
     if not ENABLE_ENHANCED_MEMORY:
         return []
@@ -1315,12 +1583,17 @@ def recall_memory(
             continue
 
         # Load layer data
+        scores = {}
         if search_layer == "session":
             # For session layer, we would need to scan storage for session memories
             # This is a simplified approach - in production, you might want
             # to maintain an index of session memory keys
             # For now, we just use an empty dict as session memories are transient
             layer_memories = {}
+        elif query:
+            # Only entries containing every query term are loaded
+            scores = dict(_search_memory_layer(search_layer, query))
+            layer_memories = _load_memory_items(search_layer, scores)
         else:
             layer_memories = _load_memory_layer(search_layer)
 
@@ -1332,18 +1605,12 @@ def recall_memory(
                 if not all(metadata.get(k) == v for k, v in filters.items()):
                     continue
 
-            # Check query match (simple substring search)
-            if query:
-                content_str = str(memory.get("content", ""))
-                if query.lower() not in content_str.lower():
-                    continue
-
             # Add to results
-            all_memories.append({"key": key, "layer": search_layer, **memory})
+            all_memories.append((scores.get(key, 0.0), {"key": key, "layer": search_layer, **memory}))
 
-    # Sort by timestamp (newest first) and limit
-    all_memories.sort(key=lambda m: m.get("timestamp", ""), reverse=True)
-    return all_memories[:limit]
+    # Sort by text relevance (when querying), then timestamp (newest first) and limit
+    all_memories.sort(key=lambda m: (m[0], m[1].get("timestamp", "")), reverse=True)
+    return [memory for _, memory in all_memories[:limit]]
 
 
 def detect_environment(project_root: str) -> dict[str, Any]:
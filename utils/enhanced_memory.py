@@ -13,18 +13,42 @@
 - 协调机制：层级间信息流转和冲突解决
 """
 
+import atexit
 import json
 import logging
 import os
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping
 from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional, Union
 from uuid import uuid4
 
+from .memory_segments import SegmentStore
+from .text_index import InvertedIndex, substring_matches, tokenize_query
+
 logger = logging.getLogger(__name__)
 
+# 访问统计（access_count / last_accessed）的持久化级别：
+# - immediate: 每次读取都立即写回记忆项文件
+# - batched: 在内存中累积，按间隔或累积数量批量写回（默认）
+# - shutdown: 仅在显式 flush 或关闭时写回
+ACCESS_DURABILITY_LEVELS = ("immediate", "batched", "shutdown")
+MEMORY_ACCESS_DURABILITY = os.getenv("MEMORY_ACCESS_DURABILITY", "batched").lower()
+MEMORY_ACCESS_FLUSH_INTERVAL = float(os.getenv("MEMORY_ACCESS_FLUSH_INTERVAL", "30"))
+MEMORY_ACCESS_FLUSH_BATCH = int(os.getenv("MEMORY_ACCESS_FLUSH_BATCH", "256"))
+
+# 每层常驻内存的完整记忆项数量上限（其余只保留元数据，按需从段文件读取）
+MEMORY_RESIDENT_ITEMS = int(os.getenv("MEMORY_RESIDENT_ITEMS", "1024"))
+
+# 存放在段文件载荷中的大字段，其余字段作为元数据常驻内存
+PAYLOAD_FIELDS = ("content", "embedding", "embedding_model", "related_items")
+
 
 @dataclass
 class MemoryItem:
@@ -129,6 +153,35 @@ class MemoryItem:
             return self.quality_score
 
 
+def _split_item(item: MemoryItem) -> tuple[dict[str, Any], dict[str, Any]]:
+    """拆分记忆项为 (元数据, 载荷)"""
+    data = item.to_dict()
+    payload = {field: data.pop(field) for field in PAYLOAD_FIELDS}
+    return data, payload
+
+
+class _LazyMemoryItems(Mapping):
+    """记忆层的只读映射视图：按需物化记忆项，而不是全部常驻内存"""
+
+    def __init__(self, layer: "MemoryLayer"):
+        self._layer = layer
+
+    def __getitem__(self, item_id: str) -> MemoryItem:
+        item = self._layer._materialize(item_id)
+        if item is None:
+            raise KeyError(item_id)
+        return item
+
+    def __iter__(self):
+        return iter(list(self._layer._item_meta))
+
+    def __len__(self) -> int:
+        return len(self._layer._item_meta)
+
+    def __contains__(self, item_id: object) -> bool:
+        return item_id in self._layer._item_meta
+
+
 class MemoryLayer(ABC):
     """
     记忆层抽象基类
@@ -137,16 +190,41 @@ class MemoryLayer(ABC):
     - 存储和检索操作
     - 索引管理
     - 衰减和清理
+
+    存储：记忆项保存在层目录下的段文件中（见 memory_segments.SegmentStore）。
+    启动时只加载元数据并据此建立过滤索引；content/embedding 等载荷在读取时
+    才物化，常驻的完整记忆项数量受 MEMORY_RESIDENT_ITEMS 限制（LRU）。
+    全文索引需要内容，在第一次文本查询时扫描一遍段文件建立。
     """
 
-    def __init__(self, layer_name: str, storage_path: Path):
+    def __init__(self, layer_name: str, storage_path: Path, access_durability: Optional[str] = None):
         self.layer_name = layer_name
         self.storage_path = storage_path
         self.storage_path.mkdir(parents=True, exist_ok=True)
-        self._memory_items: dict[str, MemoryItem] = {}
+        self._store = SegmentStore(storage_path)
+        self._item_meta: dict[str, dict[str, Any]] = {}  # 记忆项ID -> 元数据（常驻）
+        self._resident: OrderedDict[str, MemoryItem] = OrderedDict()  # 已物化的记忆项（LRU）
+        self._resident_limit = max(1, MEMORY_RESIDENT_ITEMS)
+        self._items_lock = threading.RLock()
         self._indexes: dict[str, dict[str, set[str]]] = {"type": {}, "tags": {}, "category": {}, "importance": {}}
+        self._text_index: Optional[InvertedIndex] = None  # 内容全文索引（BM25），首次文本查询时建立
+
+        # 待写回的访问统计
+        self.access_durability = (access_durability or MEMORY_ACCESS_DURABILITY).lower()
+        if self.access_durability not in ACCESS_DURABILITY_LEVELS:
+            logger.warning(f"未知的访问统计持久化级别 {self.access_durability}，使用 batched")
+            self.access_durability = "batched"
+        self._dirty_access: set[str] = set()
+        self._access_lock = threading.Lock()
+        self._last_access_flush = time.monotonic()
+
         self.load_all()
 
+    @property
+    def _memory_items(self) -> Mapping[str, MemoryItem]:
+        """按需物化的记忆项视图"""
+        return _LazyMemoryItems(self)
+
     @abstractmethod
     def get_retention_policy(self) -> dict[str, Any]:
         """获取层级特定的保留策略"""
@@ -162,26 +240,81 @@ class MemoryLayer(ABC):
         item.layer = self.layer_name
         item.updated_at = datetime.now(timezone.utc).isoformat()
 
-        # 更新内存存储
-        self._memory_items[item.id] = item
+        with self._items_lock:
+            # 重新保存时先移除旧元数据对应的索引
+            if item.id in self._item_meta:
+                self._remove_from_indexes(self._stub(item.id))
 
-        # 更新索引
-        self._update_indexes(item)
+            # 更新内存存储
+            self._item_meta[item.id] = _split_item(item)[0]
+            self._make_resident(item)
 
-        # 持久化到文件
-        self._persist_item(item)
+            # 更新索引
+            self._update_indexes(item)
+            if self._text_index is not None:
+                self._text_index.add(item.id, str(item.content))
+
+            # 持久化到段文件（包含尚未写回的访问统计）
+            with self._access_lock:
+                self._dirty_access.discard(item.id)
+            self._persist_item(item)
 
         logger.debug(f"保存记忆项 {item.id} 到 {self.layer_name} 层")
         return item.id
 
     def get_item(self, item_id: str) -> Optional[MemoryItem]:
         """获取记忆项"""
-        item = self._memory_items.get(item_id)
+        with self._items_lock:
+            item = self._materialize(item_id)
+            if item:
+                item.update_access()
+                self._item_meta[item_id] = {
+                    **self._item_meta[item_id],
+                    "last_accessed": item.last_accessed,
+                    "access_count": item.access_count,
+                    "updated_at": item.updated_at,
+                }
         if item:
-            item.update_access()
-            self._persist_item(item)  # 更新访问信息
+            if self.access_durability == "immediate":
+                self._persist_access([item_id])  # 更新访问信息
+            else:
+                # 读路径只记录脏标记，访问信息稍后批量写回
+                with self._access_lock:
+                    self._dirty_access.add(item_id)
+                if self.access_durability == "batched" and self._access_flush_due():
+                    self.flush_access_stats()
         return item
 
+    def _access_flush_due(self) -> bool:
+        """是否到了批量写回访问统计的时机"""
+        return (
+            len(self._dirty_access) >= MEMORY_ACCESS_FLUSH_BATCH
+            or time.monotonic() - self._last_access_flush >= MEMORY_ACCESS_FLUSH_INTERVAL
+        )
+
+    def flush_access_stats(self) -> int:
+        """
+        批量写回累积的访问统计
+
+        Returns:
+            写回的记忆项数量
+        """
+        with self._access_lock:
+            dirty_ids, self._dirty_access = self._dirty_access, set()
+            self._last_access_flush = time.monotonic()
+
+        item_ids = [item_id for item_id in dirty_ids if item_id in self._item_meta]
+        if not item_ids:
+            return 0
+        if not self._persist_access(item_ids):
+            # 写回失败的项保留脏标记，下次重试
+            with self._access_lock:
+                self._dirty_access.update(item_ids)
+            return 0
+
+        logger.debug(f"{self.layer_name} 层批量写回了 {len(item_ids)} 个记忆项的访问统计")
+        return len(item_ids)
+
     def search_items(
         self,
         query: Optional[str] = None,
@@ -193,61 +326,80 @@ class MemoryLayer(ABC):
         limit: int = 50,
     ) -> list[MemoryItem]:
         """搜索记忆项"""
-        candidates = set(self._memory_items.keys())
+        with self._items_lock:
+            candidates = set(self._item_meta)
 
-        # 应用过滤器
-        if type_filter:
-            candidates &= self._indexes["type"].get(type_filter, set())
+            # 应用过滤器
+            if type_filter:
+                candidates &= self._indexes["type"].get(type_filter, set())
 
-        if category:
-            candidates &= self._indexes["category"].get(category, set())
+            if category:
+                candidates &= self._indexes["category"].get(category, set())
 
-        if importance:
-            candidates &= self._indexes["importance"].get(importance, set())
+            if importance:
+                candidates &= self._indexes["importance"].get(importance, set())
 
-        if tags:
-            tag_matches = set()
-            for tag in tags:
-                tag_matches |= self._indexes["tags"].get(tag, set())
-            candidates &= tag_matches
-
-        # 获取候选项并过滤
-        results = []
-        for item_id in candidates:
-            item = self._memory_items[item_id]
-
-            # 质量过滤
-            if item.calculate_decay_score() < min_quality:
-                continue
+            if tags:
+                tag_matches = set()
+                for tag in tags:
+                    tag_matches |= self._indexes["tags"].get(tag, set())
+                candidates &= tag_matches
 
-            # 文本搜索
+            # 文本搜索：通过倒排索引只保留包含全部查询词的候选项
+            text_scores: dict[str, float] = {}
             if query:
-                content_str = str(item.content).lower()
-                if query.lower() not in content_str:
+                if tokenize_query(query):
+                    text_scores = dict(self._get_text_index().search(query, candidates))
+                else:
+                    # 查询中没有可索引的词（单字母、停用词、符号）：回退为子串匹配
+                    text_scores = dict(
+                        substring_matches(
+                            query,
+                            ((item_id, self._content_text(item_id)) for item_id in candidates),
+                        )
+                    )
+                candidates = set(text_scores)
+
+            # 过滤和排序只需要元数据，不读取载荷
+            ranked = []
+            for item_id in candidates:
+                stub = self._stub(item_id)
+                decay_score = stub.calculate_decay_score()
+
+                # 质量过滤
+                if decay_score < min_quality:
                     continue
 
-            results.append(item)
+                # 排序：文本相关度（BM25）> 相关度 > 质量 > 访问时间
+                ranked.append(
+                    ((text_scores.get(item_id, 0.0), stub.relevance_score, decay_score, stub.last_accessed), item_id)
+                )
 
-        # 排序：相关度 > 质量 > 访问时间
-        results.sort(key=lambda x: (x.relevance_score, x.calculate_decay_score(), x.last_accessed), reverse=True)
+            ranked.sort(key=lambda entry: entry[0], reverse=True)
 
-        return results[:limit]
+            # 只物化返回的记忆项
+            return [self._materialize(item_id) for _, item_id in ranked[:limit]]
 
     def remove_item(self, item_id: str) -> bool:
         """删除记忆项"""
-        if item_id in self._memory_items:
-            item = self._memory_items[item_id]
-            self._remove_from_indexes(item)
-            del self._memory_items[item_id]
+        with self._items_lock:
+            if item_id not in self._item_meta:
+                return False
+            self._remove_from_indexes(self._stub(item_id))
+            del self._item_meta[item_id]
+            self._resident.pop(item_id, None)
+            with self._access_lock:
+                self._dirty_access.discard(item_id)
+
+            # 删除存储记录
+            try:
+                self._store.delete(item_id)
+                self._maybe_compact()
+            except Exception as e:
+                logger.error(f"删除记忆项 {item_id} 的存储记录时出错: {e}")
 
-            # 删除文件
-            item_file = self.storage_path / f"{item_id}.json"
-            if item_file.exists():
-                item_file.unlink()
-
-            logger.debug(f"删除记忆项 {item_id} 从 {self.layer_name} 层")
-            return True
-        return False
+        logger.debug(f"删除记忆项 {item_id} 从 {self.layer_name} 层")
+        return True
 
     def cleanup_expired_items(self) -> int:
         """清理过期记忆项"""
@@ -258,7 +410,9 @@ class MemoryLayer(ABC):
         now = datetime.now(timezone.utc)
         expired_items = []
 
-        for item in self._memory_items.values():
+        for item_id in list(self._item_meta):
+            item = self._stub(item_id)
+
             # 检查衰减分数
             if item.calculate_decay_score() < min_score and item.auto_cleanup:
                 expired_items.append(item.id)
@@ -286,12 +440,13 @@ class MemoryLayer(ABC):
 
     def get_statistics(self) -> dict[str, Any]:
         """获取层级统计信息"""
-        total_items = len(self._memory_items)
+        total_items = len(self._item_meta)
         if total_items == 0:
             return {"total_items": 0, "avg_quality": 0.0, "types": {}, "categories": {}, "importance_levels": {}}
 
-        # 计算统计
-        total_quality = sum(item.calculate_decay_score() for item in self._memory_items.values())
+        # 计算统计（只用元数据）
+        stubs = [self._stub(item_id) for item_id in list(self._item_meta)]
+        total_quality = sum(item.calculate_decay_score() for item in stubs)
         avg_quality = total_quality / total_items
 
         # 分类统计
@@ -299,7 +454,7 @@ class MemoryLayer(ABC):
         category_counts = {}
         importance_counts = {}
 
-        for item in self._memory_items.values():
+        for item in stubs:
             type_counts[item.type] = type_counts.get(item.type, 0) + 1
             category_counts[item.category] = category_counts.get(item.category, 0) + 1
             importance_counts[item.importance] = importance_counts.get(item.importance, 0) + 1
@@ -311,42 +466,146 @@ class MemoryLayer(ABC):
             "categories": category_counts,
             "importance_levels": importance_counts,
             "storage_path": str(self.storage_path),
+            "pending_access_updates": len(self._dirty_access),
+            "resident_items": len(self._resident),
+            "storage": self._store.get_stats(),
         }
 
     def load_all(self):
-        """加载所有记忆项"""
+        """加载所有记忆项的元数据（载荷按需读取）"""
         if not self.storage_path.exists():
             return
 
-        for item_file in self.storage_path.glob("*.json"):
+        with self._items_lock:
+            self._item_meta = self._store.load()
+            self._migrate_legacy_files()
+            for item_id in self._item_meta:
+                self._update_indexes(self._stub(item_id))
+
+        logger.debug(f"从 {self.layer_name} 层加载了 {len(self._item_meta)} 个记忆项的元数据")
+
+    def _migrate_legacy_files(self):
+        """把旧版每项一个 JSON 文件的存储导入段文件"""
+        legacy_files = list(self.storage_path.glob("*.json"))
+        if not legacy_files:
+            return
+
+        records = {}
+        migrated_files = []
+        for item_file in legacy_files:
             try:
                 with open(item_file, encoding="utf-8") as f:
-                    data = json.load(f)
-                    item = MemoryItem.from_dict(data)
-                    self._memory_items[item.id] = item
-                    self._update_indexes(item)
+                    item = MemoryItem.from_dict(json.load(f))
+                records[item.id] = _split_item(item)
+                migrated_files.append(item_file)
             except Exception as e:
+                # 无法解析的文件保留在磁盘上，不删除
                 logger.warning(f"加载记忆项 {item_file} 时出错: {e}")
 
-        logger.debug(f"从 {self.layer_name} 层加载了 {len(self._memory_items)} 个记忆项")
+        self._store.put_many(records)
+        self._item_meta.update({item_id: meta for item_id, (meta, _) in records.items()})
+        # 段文件写入成功后才删除旧文件，且只删除已导入的
+        for item_file in migrated_files:
+            item_file.unlink(missing_ok=True)
+        logger.info(f"{self.layer_name} 层从旧版 JSON 文件迁移了 {len(records)} 个记忆项")
 
     def save_all(self):
         """保存所有记忆项"""
-        for item in self._memory_items.values():
-            self._persist_item(item)
+        with self._access_lock:
+            dirty_ids, self._dirty_access = self._dirty_access, set()
+        with self._items_lock:
+            # 未常驻的记忆项自上次写入后只可能有访问统计变化
+            records = {item_id: (self._item_meta[item_id], None) for item_id in dirty_ids if item_id in self._item_meta}
+            records.update({item_id: _split_item(item) for item_id, item in self._resident.items()})
+            try:
+                self._store.put_many(records)
+                self._maybe_compact()
+            except Exception as e:
+                logger.error(f"保存 {self.layer_name} 层记忆项时出错: {e}")
         logger.debug(f"保存了 {self.layer_name} 层的所有记忆项")
 
-    def _persist_item(self, item: MemoryItem):
-        """持久化记忆项到文件"""
-        item_file = self.storage_path / f"{item.id}.json"
+    def _persist_item(self, item: MemoryItem) -> bool:
+        """持久化记忆项（元数据和载荷）到段文件"""
         try:
-            with open(item_file, "w", encoding="utf-8") as f:
-                json.dump(item.to_dict(), f, ensure_ascii=False, indent=2)
+            meta, payload = _split_item(item)
+            self._store.put(item.id, meta, payload)
+            self._maybe_compact()
+            return True
         except Exception as e:
             logger.error(f"持久化记忆项 {item.id} 时出错: {e}")
+            return False
+
+    def _persist_access(self, item_ids: list[str]) -> bool:
+        """只写回记忆项的元数据（访问统计），不重写载荷"""
+        try:
+            with self._items_lock:
+                self._store.put_many(
+                    {item_id: (self._item_meta[item_id], None) for item_id in item_ids if item_id in self._item_meta}
+                )
+                self._maybe_compact()
+            return True
+        except Exception as e:
+            logger.error(f"写回 {self.layer_name} 层访问统计时出错: {e}")
+            return False
+
+    def _maybe_compact(self):
+        if self._store.needs_compaction():
+            self._store.compact()
+
+    def _stub(self, item_id: str) -> MemoryItem:
+        """只含元数据的记忆项（content 为 None），用于过滤、评分和统计"""
+        item = self._resident.get(item_id)
+        if item is not None:
+            return item
+        return MemoryItem(content=None, **self._item_meta[item_id])
+
+    def _materialize(self, item_id: str) -> Optional[MemoryItem]:
+        """读取完整记忆项，并放入常驻 LRU"""
+        with self._items_lock:
+            item = self._resident.get(item_id)
+            if item is not None:
+                self._resident.move_to_end(item_id)
+                return item
+
+            meta = self._item_meta.get(item_id)
+            if meta is None:
+                return None
+            try:
+                payload = self._store.read_payload(item_id)
+            except Exception as e:
+                logger.error(f"读取记忆项 {item_id} 时出错: {e}")
+                return None
+            if payload is None:
+                return None
+            item = MemoryItem.from_dict({**meta, **payload})
+            self._make_resident(item)
+            return item
+
+    def _content_text(self, item_id: str) -> str:
+        """记忆项内容文本（优先使用常驻项，不放入常驻 LRU）"""
+        item = self._resident.get(item_id)
+        if item is not None:
+            return str(item.content)
+        payload = self._store.read_payload(item_id) or {}
+        return str(payload.get("content"))
+
+    def _make_resident(self, item: MemoryItem):
+        self._resident[item.id] = item
+        self._resident.move_to_end(item.id)
+        while len(self._resident) > self._resident_limit:
+            self._resident.popitem(last=False)
+
+    def _get_text_index(self) -> InvertedIndex:
+        """全文索引，首次使用时扫描段文件建立"""
+        if self._text_index is None:
+            text_index = InvertedIndex()
+            for item_id, payload in self._store.iter_payloads():
+                text_index.add(item_id, str(payload.get("content")))
+            self._text_index = text_index
+        return self._text_index
 
     def _update_indexes(self, item: MemoryItem):
-        """更新索引"""
+        """更新元数据索引"""
         # 类型索引
         if item.type not in self._indexes["type"]:
             self._indexes["type"][item.type] = set()
@@ -387,6 +646,10 @@ class MemoryLayer(ABC):
         if item.importance in self._indexes["importance"]:
             self._indexes["importance"][item.importance].discard(item.id)
 
+        # 移除全文索引
+        if self._text_index is not None:
+            self._text_index.remove(item.id)
+
 
 class GlobalMemoryLayer(MemoryLayer):
     """
@@ -398,8 +661,8 @@ class GlobalMemoryLayer(MemoryLayer):
     - 通用模式和最佳实践
     """
 
-    def __init__(self, storage_path: Path):
-        super().__init__("global", storage_path)
+    def __init__(self, storage_path: Path, access_durability: Optional[str] = None):
+        super().__init__("global", storage_path, access_durability)
 
     def get_retention_policy(self) -> dict[str, Any]:
         """全局层保留策略：长期存储，高质量要求"""
@@ -425,8 +688,8 @@ class ProjectMemoryLayer(MemoryLayer):
     - 项目特定信息
     """
 
-    def __init__(self, storage_path: Path):
-        super().__init__("project", storage_path)
+    def __init__(self, storage_path: Path, access_durability: Optional[str] = None):
+        super().__init__("project", storage_path, access_durability)
 
     def get_retention_policy(self) -> dict[str, Any]:
         """项目层保留策略：中期存储，中等质量要求"""
@@ -461,8 +724,8 @@ class SessionMemoryLayer(MemoryLayer):
     - 对话上下文和临时状态
     """
 
-    def __init__(self, storage_path: Path):
-        super().__init__("session", storage_path)
+    def __init__(self, storage_path: Path, access_durability: Optional[str] = None):
+        super().__init__("session", storage_path, access_durability)
 
     def get_retention_policy(self) -> dict[str, Any]:
         """会话层保留策略：短期存储，低质量要求"""
@@ -497,17 +760,20 @@ class EnhancedMemorySystem:
     - 统一接口
     """
 
-    def __init__(self, base_storage_path: Union[str, Path]):
+    def __init__(self, base_storage_path: Union[str, Path], access_durability: Optional[str] = None):
         self.base_path = Path(base_storage_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
 
         # 初始化三层记忆
-        self.global_layer = GlobalMemoryLayer(self.base_path / "global")
-        self.project_layer = ProjectMemoryLayer(self.base_path / "project")
-        self.session_layer = SessionMemoryLayer(self.base_path / "session")
+        self.global_layer = GlobalMemoryLayer(self.base_path / "global", access_durability)
+        self.project_layer = ProjectMemoryLayer(self.base_path / "project", access_durability)
+        self.session_layer = SessionMemoryLayer(self.base_path / "session", access_durability)
 
         self.layers = {"global": self.global_layer, "project": self.project_layer, "session": self.session_layer}
 
+        # 进程退出时写回尚未持久化的访问统计（弱引用，不延长系统实例的生命周期）
+        atexit.register(_flush_access_stats_at_exit, weakref.ref(self))
+
         logger.info(f"增强记忆系统初始化完成，存储路径: {self.base_path}")
 
     def save_memory(
@@ -644,6 +910,10 @@ class EnhancedMemorySystem:
 
         return stats
 
+    def flush_access_stats(self) -> int:
+        """批量写回所有层累积的访问统计"""
+        return sum(memory_layer.flush_access_stats() for memory_layer in self.layers.values())
+
     def save_all(self):
         """保存所有层的记忆"""
         for memory_layer in self.layers.values():
@@ -656,6 +926,12 @@ class EnhancedMemorySystem:
         logger.info("增强记忆系统已关闭")
 
 
+def _flush_access_stats_at_exit(system_ref: "weakref.ref[EnhancedMemorySystem]"):
+    system = system_ref()
+    if system is not None:
+        system.flush_access_stats()
+
+
 # 全局实例（可选，用于简化使用）
 _global_memory_system: Optional[EnhancedMemorySystem] = None
 
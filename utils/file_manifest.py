@@ -0,0 +1,129 @@
+"""
+Request-scoped manifest of the files named by a tool call
+
+A single tool call used to expand and stat the same paths several times:
+check_total_file_size sized every file at the MCP boundary, then the tool's
+file preparation expanded the paths, and read_files expanded and validated
+them again before reading. For directory arguments in large repositories
+each of those passes re-walked the whole tree.
+
+server.handle_call_tool now builds a FileManifest once for the call's file
+arguments and makes it current through a context variable for the rest of
+the call. expand_paths, estimate_file_tokens and read_files consult the
+current manifest, so the tree is walked and every file validated and
+stat'ed once per request. Paths not seen yet are recorded as they are
+expanded or probed. The manifest only lives for one request, so it never
+serves stale results across calls.
+
+Context variables do not propagate into thread pool workers; code that
+fans out file I/O passes the manifest explicitly (see file_utils._map_io).
+"""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_current_manifest: ContextVar[Optional["FileManifest"]] = ContextVar("file_manifest", default=None)
+
+
+@dataclass(frozen=True)
+class FileManifestEntry:
+    """Validated path and stat result of one requested or expanded file."""
+
+    path: Path
+    stat_result: os.stat_result
+    token_ratio: float
+
+    @property
+    def size(self) -> int:
+        return self.stat_result.st_size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.stat_result.st_mtime_ns
+
+    @property
+    def estimated_tokens(self) -> int:
+        """Size-based token estimate (same as file_utils.estimate_file_tokens)."""
+        return int(self.size / self.token_ratio)
+
+
+class FileManifest:
+    """Expansions and stat results for the file arguments of one tool call."""
+
+    def __init__(self):
+        self._expansions: dict[str, list[str]] = {}
+        self._entries: dict[str, FileManifestEntry] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, paths: list[str]) -> "FileManifest":
+        """Expand paths and stat every requested and expanded file (concurrently)."""
+        from .file_utils import _map_io, expand_paths
+
+        manifest = cls()
+        files = expand_paths(paths, manifest=manifest)
+        _map_io(manifest.entry, list(dict.fromkeys([*paths, *files])))
+        logger.debug(f"[FILES] Manifest built for {len(paths)} paths: {len(files)} files")
+        return manifest
+
+    def expansion(self, path: str) -> Optional[list[str]]:
+        """Recorded expansion of one requested path."""
+        return self._expansions.get(path)
+
+    def record_expansion(self, path: str, files: list[str]) -> None:
+        with self._lock:
+            self._expansions[path] = files
+
+    def entry(self, file_path: str) -> Optional[FileManifestEntry]:
+        """
+        Validated path and stat result of a file, probing it on first use.
+
+        Returns None for paths that fail validation or cannot be stat'ed;
+        those are not recorded so callers report the error themselves.
+        """
+        entry = self._entries.get(file_path)
+        if entry is not None:
+            return entry
+
+        from .file_types import get_token_estimation_ratio
+        from .file_utils import resolve_and_validate_path
+
+        try:
+            path = resolve_and_validate_path(file_path)
+            stat_result = path.stat()
+        except (OSError, ValueError):
+            return None
+        entry = FileManifestEntry(path, stat_result, get_token_estimation_ratio(file_path))
+        with self._lock:
+            self._entries[file_path] = entry
+        return entry
+
+    def cached_entry(self, file_path: str) -> Optional[FileManifestEntry]:
+        """Recorded entry of a file, without probing it."""
+        return self._entries.get(file_path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def current_file_manifest() -> Optional[FileManifest]:
+    """The manifest of the running tool call, if any."""
+    return _current_manifest.get()
+
+
+@contextmanager
+def file_manifest_scope(manifest: Optional[FileManifest]):
+    """Make manifest current for the duration of a tool call."""
+    token = _current_manifest.set(manifest)
+    try:
+        yield manifest
+    finally:
+        _current_manifest.reset(token)
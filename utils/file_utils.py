@@ -37,13 +37,26 @@ multi-turn file handling:
    - Error handling preserves conversation flow when files become unavailable
 """
 
+import functools
 import json
 import logging
 import os
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from .file_types import BINARY_EXTENSIONS, CODE_EXTENSIONS, IMAGE_EXTENSIONS, TEXT_EXTENSIONS
+from .file_types import (
+    BINARY_EXTENSIONS,
+    CODE_EXTENSIONS,
+    IMAGE_EXTENSIONS,
+    TEXT_EXTENSIONS,
+    get_token_estimation_ratio,
+)
+from .file_manifest import FileManifest, current_file_manifest
+from .file_walker import walk_files
 from .security_config import EXCLUDED_DIRS, is_dangerous_path
 from .token_utils import DEFAULT_CONTEXT_WINDOW, estimate_tokens
 
@@ -79,6 +92,71 @@ def _is_builtin_custom_models_config(path_str: str) -> bool:
 
 logger = logging.getLogger(__name__)
 
+# Worker threads used by read_files to stat and read files concurrently
+FILE_IO_WORKERS = max(1, int(os.getenv("FILE_IO_WORKERS", "16")))
+
+# Largest file read_files will embed (same default as read_file_content)
+FILE_MAX_READ_SIZE = 1_000_000
+
+# Characters of the BEGIN/END FILE delimiters, excluding the two copies of the path
+_FILE_DELIMITER_CHARS = len("\n--- BEGIN FILE:  ---\n\n--- END FILE:  ---\n")
+
+# Upper bound on formatted file content kept in memory (characters)
+FILE_CACHE_MAX_CHARS = max(0, int(os.getenv("FILE_CACHE_MAX_CHARS", str(64 * 1024 * 1024))))
+
+
+class FormattedFileCache:
+    """
+    Bounded LRU of formatted file blocks and their token counts.
+
+    Keys include the file's mtime and size, so an edited file is never served
+    from the cache; stale entries simply age out.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._entries: OrderedDict[tuple, tuple[str, int]] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[tuple[str, int]]:
+        """Get a cached (formatted_content, tokens) pair"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, value: tuple[str, int]) -> None:
+        """Cache a (formatted_content, tokens) pair, evicting least recently used blocks"""
+        size = len(value[0])
+        if size > self.max_chars:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous[0])
+            self._entries[key] = value
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted[0])
+
+    def clear(self) -> None:
+        """Drop all cached blocks"""
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+_formatted_file_cache = FormattedFileCache(FILE_CACHE_MAX_CHARS)
+
+
+@functools.lru_cache(maxsize=1)
+def _mcp_server_dir() -> str:
+    """Resolved MCP server root (__file__ is utils/file_utils.py, so parent.parent)"""
+    return str(Path(__file__).parent.parent.resolve())
+
 
 def is_mcp_directory(path: Path) -> bool:
     """
@@ -97,8 +175,7 @@ def is_mcp_directory(path: Path) -> bool:
         return False
 
     # Get the directory where the MCP server is running from
-    # __file__ is utils/file_utils.py, so parent.parent is the MCP root
-    mcp_server_dir = Path(__file__).parent.parent.resolve()
+    mcp_server_dir = Path(_mcp_server_dir())
 
     # Check if the given path is the MCP server directory or a subdirectory
     try:
@@ -323,93 +400,67 @@ def resolve_and_validate_path(path_str: str) -> Path:
     return resolved_path
 
 
-def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> list[str]:
+def _skip_walk_directory(name: str, dir_path: str) -> bool:
+    """Directory filter for walk_files: prune excluded and MCP directories before descending"""
+    # Skip excluded directories (.git, .venv, __pycache__, node_modules, etc.)
+    if name in EXCLUDED_DIRS:
+        return True
+    # Skip MCP directories found during traversal. The walk root is resolved and
+    # symlinked directories are not descended, so dir_path is already resolved
+    # and a string comparison replaces is_mcp_directory's stat and resolve calls
+    mcp_server_dir = _mcp_server_dir()
+    if dir_path == mcp_server_dir or dir_path.startswith(mcp_server_dir + os.sep):
+        logger.debug(f"Skipping MCP directory during traversal: {dir_path}")
+        return True
+    return False
+
+
+def expand_paths(
+    paths: list[str], extensions: Optional[set[str]] = None, *, manifest: Optional[FileManifest] = None
+) -> list[str]:
     """
     Expand paths to individual files, handling both files and directories.
 
     This function recursively walks directories to find all matching files.
-    It automatically filters out hidden files and common non-code directories
-    like __pycache__ to avoid including generated or system files.
+    It automatically filters out hidden files, common non-code directories
+    like __pycache__ and paths ignored by .gitignore/.ignore files to avoid
+    including generated or system files. Paths passed explicitly are always
+    included, even if an ignore file matches them.
+
+    With the default extensions, expansions are memoized in the request's
+    file manifest (the current one unless manifest is given), so a tool call
+    walks each directory once.
 
     Args:
         paths: List of file or directory paths (must be absolute)
         extensions: Optional set of file extensions to include (defaults to CODE_EXTENSIONS)
+        manifest: File manifest to record expansions in (defaults to the current one)
 
     Returns:
         List of individual file paths, sorted for consistent ordering
     """
     if extensions is None:
         extensions = CODE_EXTENSIONS
+        if manifest is None:
+            manifest = current_file_manifest()
+    else:
+        manifest = None
 
     expanded_files = []
     seen = set()
 
     for path in paths:
-        try:
-            # Validate each path for security before processing
-            path_obj = resolve_and_validate_path(path)
-        except (ValueError, PermissionError):
-            # Skip invalid paths silently to allow partial success
-            continue
-
-        if not path_obj.exists():
-            continue
-
-        # Safety checks for directory scanning
-        if path_obj.is_dir():
-            # Check 1: Prevent scanning user's home directory root
-            if is_home_directory_root(path_obj):
-                logger.warning(f"Skipping home directory root: {path}. Please specify a project subdirectory instead.")
-                continue
-
-            # Check 2: Skip if this is the MCP's own directory
-            if is_mcp_directory(path_obj):
-                logger.info(
-                    f"Skipping MCP server directory: {path}. The MCP server code is excluded from project scans."
-                )
-                continue
-
-        if path_obj.is_file():
-            # Add file directly
-            if str(path_obj) not in seen:
-                expanded_files.append(str(path_obj))
-                seen.add(str(path_obj))
-
-        elif path_obj.is_dir():
-            # Walk directory recursively to find all files
-            for root, dirs, files in os.walk(path_obj):
-                # Filter directories in-place to skip hidden and excluded directories
-                # This prevents descending into .git, .venv, __pycache__, node_modules, etc.
-                original_dirs = dirs[:]
-                dirs[:] = []
-                for d in original_dirs:
-                    # Skip hidden directories
-                    if d.startswith("."):
-                        continue
-                    # Skip excluded directories
-                    if d in EXCLUDED_DIRS:
-                        continue
-                    # Skip MCP directories found during traversal
-                    dir_path = Path(root) / d
-                    if is_mcp_directory(dir_path):
-                        logger.debug(f"Skipping MCP directory during traversal: {dir_path}")
-                        continue
-                    dirs.append(d)
-
-                for file in files:
-                    # Skip hidden files (e.g., .DS_Store, .gitignore)
-                    if file.startswith("."):
-                        continue
-
-                    file_path = Path(root) / file
-
-                    # Filter by extension if specified
-                    if not extensions or file_path.suffix.lower() in extensions:
-                        full_path = str(file_path)
-                        # Use set to prevent duplicates
-                        if full_path not in seen:
-                            expanded_files.append(full_path)
-                            seen.add(full_path)
+        files = manifest.expansion(path) if manifest is not None else None
+        if files is None:
+            files = _expand_path(path, extensions)
+            if manifest is not None:
+                manifest.record_expansion(path, files)
+
+        for full_path in files:
+            # Use set to prevent duplicates
+            if full_path not in seen:
+                expanded_files.append(full_path)
+                seen.add(full_path)
 
     # Sort for consistent ordering across different runs
     # This makes output predictable and easier to debug
@@ -417,75 +468,148 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
     return expanded_files
 
 
-def read_file_content(
-    file_path: str, max_size: int = 1_000_000, *, include_line_numbers: Optional[bool] = None
-) -> tuple[str, int]:
+def _expand_path(path: str, extensions: set[str]) -> list[str]:
+    """Files of one path passed to expand_paths, in walk order"""
+    try:
+        # Validate each path for security before processing
+        path_obj = resolve_and_validate_path(path)
+    except (ValueError, PermissionError):
+        # Skip invalid paths silently to allow partial success
+        return []
+
+    if not path_obj.exists():
+        return []
+
+    # Safety checks for directory scanning
+    if path_obj.is_dir():
+        # Check 1: Prevent scanning user's home directory root
+        if is_home_directory_root(path_obj):
+            logger.warning(f"Skipping home directory root: {path}. Please specify a project subdirectory instead.")
+            return []
+
+        # Check 2: Skip if this is the MCP's own directory
+        if is_mcp_directory(path_obj):
+            logger.info(f"Skipping MCP server directory: {path}. The MCP server code is excluded from project scans.")
+            return []
+
+    if path_obj.is_file():
+        # Add file directly
+        return [str(path_obj)]
+
+    if path_obj.is_dir():
+        # Walk directory recursively to find all files, skipping hidden files and
+        # directories, EXCLUDED_DIRS, nested MCP directories and .gitignore'd paths
+        return list(walk_files(str(path_obj), extensions, _skip_walk_directory))
+
+    return []
+
+
+def _probe_file(
+    file_path: str, max_size: int, manifest: Optional[FileManifest] = None
+) -> tuple[Optional[Path], Optional[os.stat_result], Optional[tuple[str, int]]]:
     """
-    Read a single file and format it for inclusion in AI prompts.
-
-    This function handles various error conditions gracefully and always
-    returns formatted content, even for errors. This ensures the AI model
-    gets context about what files were attempted but couldn't be read.
+    Validate and stat a file without reading it.
 
     Args:
         file_path: Path to file (must be absolute)
-        max_size: Maximum file size to read (default 1MB to prevent memory issues)
-        include_line_numbers: Whether to add line numbers. If None, auto-detects based on file type
+        max_size: Maximum file size that will be read
+        manifest: Request file manifest holding already validated and stat'ed files
 
     Returns:
-        Tuple of (formatted_content, estimated_tokens)
-        Content is wrapped with clear delimiters for AI parsing
+        Tuple of (resolved_path, stat_result, placeholder). placeholder is the final
+        (formatted_content, estimated_tokens) for files that will not be read
+        (invalid path, missing, not a file, too large) and None otherwise.
     """
-    logger.debug(f"[FILES] read_file_content called for: {file_path}")
-    try:
-        # Validate path security before any file operations
-        path = resolve_and_validate_path(file_path)
-        logger.debug(f"[FILES] Path validated and resolved: {path}")
-    except (ValueError, PermissionError) as e:
-        # Return error in a format that provides context to the AI
-        logger.debug(f"[FILES] Path validation failed for {file_path}: {type(e).__name__}: {e}")
-        error_msg = str(e)
-        content = f"\n--- ERROR ACCESSING FILE: {file_path} ---\nError: {error_msg}\n--- END FILE ---\n"
-        tokens = estimate_tokens(content)
-        logger.debug(f"[FILES] Returning error content for {file_path}: {tokens} tokens")
-        return content, tokens
+    entry = manifest.entry(file_path) if manifest is not None else None
+    if entry is not None:
+        path = entry.path
+    else:
+        try:
+            # Validate path security before any file operations
+            path = resolve_and_validate_path(file_path)
+            logger.debug("[FILES] Path validated and resolved: %s", path)
+        except (ValueError, PermissionError) as e:
+            # Return error in a format that provides context to the AI
+            logger.debug("[FILES] Path validation failed for %s: %s: %s", file_path, type(e).__name__, e)
+            error_msg = str(e)
+            content = f"\n--- ERROR ACCESSING FILE: {file_path} ---\nError: {error_msg}\n--- END FILE ---\n"
+            tokens = estimate_tokens(content)
+            logger.debug("[FILES] Returning error content for %s: %s tokens", file_path, tokens)
+            return None, None, (content, tokens)
 
     try:
-        # Validate file existence and type
-        if not path.exists():
-            logger.debug(f"[FILES] File does not exist: {file_path}")
+        # A single stat answers existence, type and size
+        try:
+            stat_result = entry.stat_result if entry is not None else path.stat()
+        except FileNotFoundError:
+            logger.debug("[FILES] File does not exist: %s", file_path)
             content = f"\n--- FILE NOT FOUND: {file_path} ---\nError: File does not exist\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return path, None, (content, estimate_tokens(content))
 
-        if not path.is_file():
-            logger.debug(f"[FILES] Path is not a file: {file_path}")
+        if not stat.S_ISREG(stat_result.st_mode):
+            logger.debug("[FILES] Path is not a file: %s", file_path)
             content = f"\n--- NOT A FILE: {file_path} ---\nError: Path is not a file\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return path, None, (content, estimate_tokens(content))
 
         # Check file size to prevent memory exhaustion
-        file_size = path.stat().st_size
-        logger.debug(f"[FILES] File size for {file_path}: {file_size:,} bytes")
+        file_size = stat_result.st_size
+        logger.debug("[FILES] File size for %s: %d bytes", file_path, file_size)
         if file_size > max_size:
-            logger.debug(f"[FILES] File too large: {file_path} ({file_size:,} > {max_size:,} bytes)")
+            logger.debug("[FILES] File too large: %s (%d > %d bytes)", file_path, file_size, max_size)
             content = f"\n--- FILE TOO LARGE: {file_path} ---\nFile size: {file_size:,} bytes (max: {max_size:,})\n--- END FILE ---\n"
-            return content, estimate_tokens(content)
+            return path, stat_result, (content, estimate_tokens(content))
+
+        return path, stat_result, None
+
+    except Exception as e:
+        logger.debug("[FILES] Exception reading file %s: %s: %s", file_path, type(e).__name__, e)
+        content = f"\n--- ERROR READING FILE: {file_path} ---\nError: {str(e)}\n--- END FILE ---\n"
+        tokens = estimate_tokens(content)
+        logger.debug("[FILES] Returning error content for %s: %s tokens", file_path, tokens)
+        return None, None, (content, tokens)
+
+
+def _read_validated_file(
+    file_path: str, path: Path, stat_result: os.stat_result, include_line_numbers: Optional[bool]
+) -> tuple[str, int]:
+    """
+    Read and format a file that already passed _probe_file.
+
+    Formatted blocks are served from the shared formatted-file cache while the
+    file's mtime and size are unchanged.
+
+    Args:
+        file_path: Path as given by the caller (used in the delimiters)
+        path: Resolved path returned by _probe_file
+        stat_result: stat() of the file returned by _probe_file
+        include_line_numbers: Whether to add line numbers. If None, auto-detects based on file type
 
+    Returns:
+        Tuple of (formatted_content, estimated_tokens)
+    """
+    try:
         # Determine if we should add line numbers
         add_line_numbers = should_add_line_numbers(file_path, include_line_numbers)
-        logger.debug(f"[FILES] Line numbers for {file_path}: {'enabled' if add_line_numbers else 'disabled'}")
+        logger.debug("[FILES] Line numbers for %s: %s", file_path, "enabled" if add_line_numbers else "disabled")
+
+        cache_key = (file_path, str(path), stat_result.st_mtime_ns, stat_result.st_size, add_line_numbers)
+        cached = _formatted_file_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("[FILES] Using cached formatted content for %s", file_path)
+            return cached
 
         # Read the file with UTF-8 encoding, replacing invalid characters
         # This ensures we can handle files with mixed encodings
-        logger.debug(f"[FILES] Reading file content for {file_path}")
+        logger.debug("[FILES] Reading file content for %s", file_path)
         with open(path, encoding="utf-8", errors="replace") as f:
             file_content = f.read()
 
-        logger.debug(f"[FILES] Successfully read {len(file_content)} characters from {file_path}")
+        logger.debug("[FILES] Successfully read %s characters from %s", len(file_content), file_path)
 
         # Add line numbers if requested or auto-detected
         if add_line_numbers:
             file_content = _add_line_numbers(file_content)
-            logger.debug(f"[FILES] Added line numbers to {file_path}")
+            logger.debug("[FILES] Added line numbers to %s", file_path)
         else:
             # Still normalize line endings for consistency
             file_content = _normalize_line_endings(file_content)
@@ -496,18 +620,85 @@ def read_file_content(
         # ("--- BEGIN DIFF: ... ---") to allow AI to distinguish between complete file content
         # vs. partial diff content when files appear in both sections
         formatted = f"\n--- BEGIN FILE: {file_path} ---\n{file_content}\n--- END FILE: {file_path} ---\n"
-        tokens = estimate_tokens(formatted)
-        logger.debug(f"[FILES] Formatted content for {file_path}: {len(formatted)} chars, {tokens} tokens")
+        tokens = estimate_tokens(formatted, file_path=file_path)
+        logger.debug("[FILES] Formatted content for %s: %s chars, %s tokens", file_path, len(formatted), tokens)
+        _formatted_file_cache.put(cache_key, (formatted, tokens))
         return formatted, tokens
 
     except Exception as e:
-        logger.debug(f"[FILES] Exception reading file {file_path}: {type(e).__name__}: {e}")
+        logger.debug("[FILES] Exception reading file %s: %s: %s", file_path, type(e).__name__, e)
         content = f"\n--- ERROR READING FILE: {file_path} ---\nError: {str(e)}\n--- END FILE ---\n"
         tokens = estimate_tokens(content)
-        logger.debug(f"[FILES] Returning error content for {file_path}: {tokens} tokens")
+        logger.debug("[FILES] Returning error content for %s: %s tokens", file_path, tokens)
         return content, tokens
 
 
+def read_file_content(
+    file_path: str, max_size: int = 1_000_000, *, include_line_numbers: Optional[bool] = None
+) -> tuple[str, int]:
+    """
+    Read a single file and format it for inclusion in AI prompts.
+
+    This function handles various error conditions gracefully and always
+    returns formatted content, even for errors. This ensures the AI model
+    gets context about what files were attempted but couldn't be read.
+
+    Args:
+        file_path: Path to file (must be absolute)
+        max_size: Maximum file size to read (default 1MB to prevent memory issues)
+        include_line_numbers: Whether to add line numbers. If None, auto-detects based on file type
+
+    Returns:
+        Tuple of (formatted_content, estimated_tokens)
+        Content is wrapped with clear delimiters for AI parsing
+    """
+    logger.debug("[FILES] read_file_content called for: %s", file_path)
+    path, stat_result, placeholder = _probe_file(file_path, max_size, current_file_manifest())
+    if placeholder is not None:
+        return placeholder
+    return _read_validated_file(file_path, path, stat_result, include_line_numbers)
+
+
+def _map_io(func, items: list) -> list:
+    """Run an I/O-bound function over items on a thread pool, keeping input order."""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(FILE_IO_WORKERS, len(items)), thread_name_prefix="file-io") as pool:
+        return list(pool.map(func, items))
+
+
+def _plan_file_reads(
+    file_paths: list[str],
+    probes: list[tuple[Optional[Path], Optional[os.stat_result], Optional[tuple[str, int]]]],
+    budget: int,
+) -> list[int]:
+    """
+    Predict which files will fit the token budget from their sizes alone.
+
+    Mirrors the sequential budgeting in read_files using a size-based estimate
+    (a UTF-8 file never decodes to more characters than it has bytes), so the
+    predicted files can be read concurrently before the budget is applied.
+
+    Returns:
+        Indices of files worth reading, in input order
+    """
+    planned = []
+    used = 0
+    for index, (file_path, (_, stat_result, placeholder)) in enumerate(zip(file_paths, probes)):
+        if used >= budget:
+            break
+        if placeholder is not None:
+            tokens = placeholder[1]
+        else:
+            chars = stat_result.st_size + _FILE_DELIMITER_CHARS + 2 * len(file_path)
+            tokens = int(chars / get_token_estimation_ratio(file_path))
+        if used + tokens <= budget:
+            used += tokens
+            if placeholder is None:
+                planned.append(index)
+    return planned
+
+
 def read_files(
     file_paths: list[str],
     code: Optional[str] = None,
@@ -524,6 +715,11 @@ def read_files(
     within token limits. It prioritizes direct code and reads files until
     the token budget is exhausted.
 
+    Files are ingested in batches: all candidates are validated and stat'ed in
+    parallel, the budget is planned from file sizes, and the planned files are
+    read concurrently. The budget is then applied in input order to the real
+    contents, so the result is identical to reading the files one by one.
+
     Args:
         file_paths: List of file or directory paths (absolute paths required)
         code: Optional direct code to include (prioritized over files)
@@ -537,9 +733,12 @@ def read_files(
     if max_tokens is None:
         max_tokens = DEFAULT_CONTEXT_WINDOW
 
-    logger.debug(f"[FILES] read_files called with {len(file_paths)} paths")
+    logger.debug("[FILES] read_files called with %s paths", len(file_paths))
     logger.debug(
-        f"[FILES] Token budget: max={max_tokens:,}, reserve={reserve_tokens:,}, available={max_tokens - reserve_tokens:,}"
+        "[FILES] Token budget: max=%d, reserve=%d, available=%d",
+        max_tokens,
+        reserve_tokens,
+        max_tokens - reserve_tokens,
     )
 
     content_parts = []
@@ -562,42 +761,68 @@ def read_files(
     # Priority 2: Process file paths
     if file_paths:
         # Expand directories to get all individual files
-        logger.debug(f"[FILES] Expanding {len(file_paths)} file paths")
+        logger.debug("[FILES] Expanding %s file paths", len(file_paths))
         all_files = expand_paths(file_paths)
-        logger.debug(f"[FILES] After expansion: {len(all_files)} individual files")
+        logger.debug("[FILES] After expansion: %s individual files", len(all_files))
 
         if not all_files and file_paths:
             # No files found but paths were provided
             logger.debug("[FILES] No files found from provided paths")
             content_parts.append(f"\n--- NO FILES FOUND ---\nProvided paths: {', '.join(file_paths)}\n--- END ---\n")
         else:
-            # Read files sequentially until token limit is reached
-            logger.debug(f"[FILES] Reading {len(all_files)} files with token budget {available_tokens:,}")
+            # Validate and stat every candidate in parallel, then plan the budget from sizes
+            # (worker threads do not see the request's context, so hand them the manifest)
+            manifest = current_file_manifest()
+            probes = _map_io(lambda file_path: _probe_file(file_path, FILE_MAX_READ_SIZE, manifest), all_files)
+            planned = _plan_file_reads(all_files, probes, available_tokens - total_tokens)
+            logger.debug("[FILES] Reading %s of %s files concurrently", len(planned), len(all_files))
+            prefetched = dict(
+                zip(
+                    planned,
+                    _map_io(
+                        lambda index: _read_validated_file(all_files[index], *probes[index][:2], include_line_numbers),
+                        planned,
+                    ),
+                )
+            )
+
+            # Apply the token budget in input order to the actual contents
+            logger.debug("[FILES] Reading %s files with token budget %d", len(all_files), available_tokens)
             for i, file_path in enumerate(all_files):
                 if total_tokens >= available_tokens:
-                    logger.debug(f"[FILES] Token budget exhausted, skipping remaining {len(all_files) - i} files")
+                    logger.debug("[FILES] Token budget exhausted, skipping remaining %s files", len(all_files) - i)
                     files_skipped.extend(all_files[i:])
                     break
 
-                file_content, file_tokens = read_file_content(file_path, include_line_numbers=include_line_numbers)
-                logger.debug(f"[FILES] File {file_path}: {file_tokens:,} tokens")
+                path, stat_result, placeholder = probes[i]
+                if placeholder is not None:
+                    file_content, file_tokens = placeholder
+                elif i in prefetched:
+                    file_content, file_tokens = prefetched[i]
+                else:
+                    # Size estimate was off; read the file now
+                    file_content, file_tokens = _read_validated_file(file_path, path, stat_result, include_line_numbers)
+                logger.debug("[FILES] File %s: %d tokens", file_path, file_tokens)
 
                 # Check if adding this file would exceed limit
                 if total_tokens + file_tokens <= available_tokens:
                     content_parts.append(file_content)
                     total_tokens += file_tokens
-                    logger.debug(f"[FILES] Added file {file_path}, total tokens: {total_tokens:,}")
+                    logger.debug("[FILES] Added file %s, total tokens: %d", file_path, total_tokens)
                 else:
                     # File too large for remaining budget
                     logger.debug(
-                        f"[FILES] File {file_path} too large for remaining budget ({file_tokens:,} tokens, {available_tokens - total_tokens:,} remaining)"
+                        "[FILES] File %s too large for remaining budget (%d tokens, %d remaining)",
+                        file_path,
+                        file_tokens,
+                        available_tokens - total_tokens,
                     )
                     files_skipped.append(file_path)
 
     # Add informative note about skipped files to help users understand
     # what was omitted and why
     if files_skipped:
-        logger.debug(f"[FILES] {len(files_skipped)} files skipped due to token limits")
+        logger.debug("[FILES] %s files skipped due to token limits", len(files_skipped))
         skip_note = "\n\n--- SKIPPED FILES (TOKEN LIMIT) ---\n"
         skip_note += f"Total skipped: {len(files_skipped)}\n"
         # Show first 10 skipped files as examples
@@ -609,7 +834,7 @@ def read_files(
         content_parts.append(skip_note)
 
     result = "\n\n".join(content_parts) if content_parts else ""
-    logger.debug(f"[FILES] read_files complete: {len(result)} chars, {total_tokens:,} tokens used")
+    logger.debug("[FILES] read_files complete: %s chars, %d tokens used", len(result), total_tokens)
     return result
 
 
@@ -624,6 +849,12 @@ def estimate_file_tokens(file_path: str) -> int:
         Estimated token count for the file
     """
     try:
+        # Files of the current tool call were already stat'ed by its manifest
+        manifest = current_file_manifest()
+        entry = manifest.entry(file_path) if manifest is not None else None
+        if entry is not None:
+            return entry.estimated_tokens if stat.S_ISREG(entry.stat_result.st_mode) else 0
+
         if not os.path.exists(file_path) or not os.path.isfile(file_path):
             return 0
 
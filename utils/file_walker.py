@@ -0,0 +1,377 @@
+"""
+Directory walker with .gitignore support and a cached tree index
+
+expand_paths used os.walk, which lists every directory from scratch on every
+call and ignores .gitignore, so vendored and generated trees that are not in
+EXCLUDED_DIRS were walked and sent to the model. This module provides the
+replacement walker:
+
+- os.scandir based, pruning hidden, excluded and ignored directories before
+  descending into them
+- honors .gitignore and .ignore files in the walked tree and in its ancestors
+  up to the repository root (the first directory containing .git)
+- keeps a per-root index of directory listings and compiled ignore rules;
+  each entry is revalidated with one stat of the directory (plus its ignore
+  files), so repeated expansions of the same root skip all scandir calls.
+  Directories changed within RACY_WINDOW_NS of being scanned are not trusted
+  and are rescanned, like git's racy index entries.
+
+Supported .gitignore syntax: comments, blank lines, escaped leading '#'/'!',
+negation with '!', directory-only patterns ending in '/', anchored patterns
+containing '/', '*', '?', character classes and '**' path components.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ignore files honored in every directory, applied in this order
+IGNORE_FILE_NAMES = (".gitignore", ".ignore")
+
+# Number of walk roots whose index is kept in memory
+TREE_INDEX_MAX_ROOTS = 16
+
+# Listings of directories modified this recently are rescanned on the next walk,
+# since a change within the filesystem's timestamp granularity keeps the same mtime
+RACY_WINDOW_NS = 2_000_000_000
+
+# Whether directory walks honor .gitignore/.ignore files
+RESPECT_GITIGNORE = os.getenv("FILE_WALK_RESPECT_GITIGNORE", "true").lower() == "true"
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) into a regex fragment"""
+    regex = []
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        if char == "*":
+            if pattern[i : i + 2] == "**":
+                at_component_start = i == 0 or pattern[i - 1] == "/"
+                followed_by_slash = pattern[i + 2 : i + 3] == "/"
+                at_end = i + 2 == length
+                if at_component_start and followed_by_slash:
+                    # "**/" matches zero or more directories
+                    regex.append("(?:.*/)?")
+                    i += 3
+                    continue
+                if at_component_start and at_end:
+                    # trailing "**" matches everything inside
+                    regex.append(".*")
+                    i += 2
+                    continue
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif char == "\\" and i + 1 < length:
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return "".join(regex)
+
+
+class IgnoreRules:
+    """Compiled rules of one ignore file, matched against paths relative to its directory"""
+
+    def __init__(self, lines: list[str]):
+        self._rules: list[tuple[re.Pattern, bool, bool]] = []
+        for raw_line in lines:
+            rule = self._parse_line(raw_line)
+            if rule is not None:
+                self._rules.append(rule)
+
+    @staticmethod
+    def _parse_line(raw_line: str) -> Optional[tuple[re.Pattern, bool, bool]]:
+        """Parse one line into (regex, negated, directory_only)"""
+        line = raw_line.rstrip("\n").rstrip("\r")
+        # Trailing spaces are ignored unless escaped
+        while line.endswith(" ") and not line.endswith("\\ "):
+            line = line[:-1]
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\#") or line.startswith("\\!"):
+            line = line[1:]
+
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        # A slash anywhere but the end anchors the pattern to the ignore file's directory
+        anchored = "/" in line
+        line = line.lstrip("/")
+        body = _translate_glob(line)
+        prefix = "" if anchored else "(?:.*/)?"
+        try:
+            return re.compile(f"^{prefix}{body}$"), negated, directory_only
+        except re.error:
+            logger.debug(f"Skipping invalid ignore pattern: {raw_line!r}")
+            return None
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Match a path against the rules (last matching rule wins).
+
+        Returns:
+            True if ignored, False if re-included by a negated rule, None if no rule matches
+        """
+        result = None
+        for regex, negated, directory_only in self._rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+def _read_ignore_rules(directory: str) -> tuple[tuple, Optional[IgnoreRules]]:
+    """
+    Load the ignore files of a directory.
+
+    Returns:
+        Tuple of (stamp, rules). stamp identifies the ignore files' versions
+        and rules is None when the directory has no non-empty ignore file.
+    """
+    stamp = []
+    lines = []
+    for name in IGNORE_FILE_NAMES:
+        path = os.path.join(directory, name)
+        try:
+            stat_result = os.stat(path)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                lines.extend(f.read().splitlines())
+            stamp.append((name, stat_result.st_mtime_ns, stat_result.st_size))
+        except OSError:
+            continue
+    rules = IgnoreRules(lines) if lines else None
+    return tuple(stamp), rules if rules else None
+
+
+def _ignore_stamp(directory: str, names: tuple[str, ...]) -> tuple:
+    """Current version stamp of the ignore files listed in names"""
+    stamp = []
+    for name in names:
+        try:
+            stat_result = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        stamp.append((name, stat_result.st_mtime_ns, stat_result.st_size))
+    return tuple(stamp)
+
+
+class _DirListing:
+    """Cached listing of one directory"""
+
+    __slots__ = ("mtime_ns", "subdirs", "files", "ignore_names", "ignore_stamp", "rules", "racy")
+
+    def __init__(self, mtime_ns, subdirs, files, ignore_names, ignore_stamp, rules, racy):
+        self.mtime_ns = mtime_ns
+        self.racy = racy
+        self.subdirs = subdirs
+        self.files = files
+        self.ignore_names = ignore_names
+        self.ignore_stamp = ignore_stamp
+        self.rules = rules
+
+
+class TreeIndex:
+    """Directory listings under one walk root, revalidated by directory mtimes"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._listings: dict[str, _DirListing] = {}
+        self._lock = threading.Lock()
+
+    def listing(self, directory: str) -> Optional[_DirListing]:
+        """Get the listing of a directory, rescanning it only if it changed"""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._listings.get(directory)
+        if cached is not None and not cached.racy and cached.mtime_ns == mtime_ns:
+            if cached.ignore_names and _ignore_stamp(directory, cached.ignore_names) != cached.ignore_stamp:
+                # An ignore file was edited in place (the directory mtime does not change)
+                cached.ignore_stamp, cached.rules = _read_ignore_rules(directory)
+            return cached
+
+        scanned_at_ns = time.time_ns()
+        subdirs = []
+        files = []
+        ignore_names = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name in IGNORE_FILE_NAMES:
+                        ignore_names.append(name)
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # Like os.walk(followlinks=False): symlinked directories are not descended
+                        if not entry.is_symlink():
+                            subdirs.append(name)
+                    else:
+                        files.append(name)
+        except OSError as e:
+            logger.debug(f"Cannot list directory {directory}: {e}")
+            return None
+
+        stamp, rules = _read_ignore_rules(directory) if ignore_names else ((), None)
+        newest_ns = max([mtime_ns] + [entry[1] for entry in stamp])
+        racy = scanned_at_ns - newest_ns < RACY_WINDOW_NS
+        listing = _DirListing(mtime_ns, subdirs, files, tuple(ignore_names), stamp, rules, racy)
+        with self._lock:
+            self._listings[directory] = listing
+        return listing
+
+
+_tree_indexes: "OrderedDict[str, TreeIndex]" = OrderedDict()
+_tree_indexes_lock = threading.Lock()
+
+
+def get_tree_index(root: str) -> TreeIndex:
+    """Get the cached index for a walk root, creating it on first use"""
+    with _tree_indexes_lock:
+        index = _tree_indexes.get(root)
+        if index is None:
+            index = TreeIndex(root)
+            _tree_indexes[root] = index
+            while len(_tree_indexes) > TREE_INDEX_MAX_ROOTS:
+                _tree_indexes.popitem(last=False)
+        _tree_indexes.move_to_end(root)
+        return index
+
+
+def clear_tree_indexes() -> None:
+    """Drop all cached directory listings"""
+    with _tree_indexes_lock:
+        _tree_indexes.clear()
+
+
+def _ancestor_ignore_rules(root: str) -> list[tuple[str, IgnoreRules]]:
+    """Ignore rules from the root's ancestors up to the enclosing repository root"""
+    ancestors = []
+    current = os.path.dirname(root)
+    child = root
+    if os.path.isdir(os.path.join(root, ".git")):
+        return []
+    while current and current != child:
+        ancestors.append(current)
+        if os.path.isdir(os.path.join(current, ".git")):
+            break
+        child, current = current, os.path.dirname(current)
+    else:
+        # No enclosing repository: only the walked tree's own ignore files apply
+        return []
+
+    rules = []
+    for directory in reversed(ancestors):
+        _, directory_rules = _read_ignore_rules(directory)
+        if directory_rules:
+            rules.append((directory, directory_rules))
+    return rules
+
+
+def _is_ignored(path: str, is_dir: bool, rule_stack: list[tuple[str, IgnoreRules]]) -> bool:
+    """Apply ignore rules from outermost to innermost; deeper files override parents"""
+    ignored = False
+    for base, rules in rule_stack:
+        rel_path = os.path.relpath(path, base).replace(os.sep, "/")
+        result = rules.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def walk_files(
+    root: str,
+    extensions: Optional[set[str]] = None,
+    skip_dir: Optional[Callable[[str, str], bool]] = None,
+    respect_ignore_files: Optional[bool] = None,
+) -> list[str]:
+    """
+    List the files under root, pruning skipped and ignored directories early.
+
+    Hidden files and directories (names starting with '.') are always skipped.
+
+    Args:
+        root: Directory to walk (absolute, already validated)
+        extensions: Lower-case file suffixes to keep (None or empty keeps all files)
+        skip_dir: Optional callback (name, full_path) -> True to prune a directory
+        respect_ignore_files: Honor .gitignore/.ignore (defaults to FILE_WALK_RESPECT_GITIGNORE)
+
+    Returns:
+        Full paths of matching files in walk order
+    """
+    if respect_ignore_files is None:
+        respect_ignore_files = RESPECT_GITIGNORE
+
+    index = get_tree_index(root)
+    base_rules = _ancestor_ignore_rules(root) if respect_ignore_files else []
+    results = []
+
+    # Depth-first, mirroring os.walk's top-down order
+    stack = [(root, base_rules)]
+    while stack:
+        directory, rule_stack = stack.pop()
+        listing = index.listing(directory)
+        if listing is None:
+            continue
+
+        if respect_ignore_files and listing.rules:
+            rule_stack = rule_stack + [(directory, listing.rules)]
+
+        for name in listing.files:
+            if name.startswith("."):
+                continue
+            if extensions and os.path.splitext(name)[1].lower() not in extensions:
+                continue
+            full_path = os.path.join(directory, name)
+            if rule_stack and _is_ignored(full_path, False, rule_stack):
+                continue
+            results.append(full_path)
+
+        children = []
+        for name in listing.subdirs:
+            if name.startswith("."):
+                continue
+            full_path = os.path.join(directory, name)
+            if skip_dir is not None and skip_dir(name, full_path):
+                continue
+            if rule_stack and _is_ignored(full_path, True, rule_stack):
+                continue
+            children.append((full_path, rule_stack))
+        stack.extend(reversed(children))
+
+    return results
@@ -13,15 +13,19 @@ This module implements advanced memory management features including:
 import json
 import logging
 import os
+import threading
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any, Optional
 
 from .conversation_memory import (
     ENABLE_ENHANCED_MEMORY,
     MEMORY_STORAGE_PATH,
+    _get_memory_store,
+    _load_memory_items,
     _load_memory_layer,
-    _save_memory_layer,
+    _search_memory_layer,
 )
 from .conversation_memory import (
     save_memory as base_save_memory,
@@ -33,6 +37,9 @@ logger = logging.getLogger(__name__)
 # Enhanced memory configuration
 MEMORY_INDEX_VERSION = "1.0"
 MEMORY_INDEX_FILE = "memory_index.json"
+MEMORY_INDEX_JOURNAL_FILE = "memory_index.journal"
+# Journal entries after which the index is compacted into a new snapshot
+MEMORY_INDEX_COMPACT_OPS = int(os.getenv("MEMORY_INDEX_COMPACT_OPS", "1000"))
 MEMORY_DECAY_ENABLED = os.getenv("MEMORY_DECAY_ENABLED", "true").lower() == "true"
 MEMORY_DECAY_DAYS = int(os.getenv("MEMORY_DECAY_DAYS", "30"))
 MEMORY_QUALITY_THRESHOLD = float(os.getenv("MEMORY_QUALITY_THRESHOLD", "0.3"))
@@ -71,8 +78,15 @@ class MemoryIndex:
         # Reverse lookup
         self.memory_metadata: dict[str, dict[str, Any]] = {}  # key -> metadata
 
+        # Changes not yet written to the journal, and the snapshot generation they apply to
+        self._pending: list[dict[str, Any]] = []
+        self._generation: Optional[int] = None
+
     def add_memory(self, key: str, layer: str, metadata: dict[str, Any], timestamp: str):
-        """Add a memory entry to all relevant indexes."""
+        """Add (or replace) a memory entry in all relevant indexes."""
+        # Drop a previous entry for the key so no stale tag/time/quality entries remain
+        self._remove(key)
+
         # Layer index
         self.layer_index[layer].add(key)
 
@@ -108,12 +122,17 @@ class MemoryIndex:
             "timestamp": timestamp,
             "quality_score": quality,
         }
+        self._pending.append({"op": "add", "key": key, **self.memory_metadata[key]})
 
     def remove_memory(self, key: str):
         """Remove a memory entry from all indexes."""
+        if self._remove(key):
+            self._pending.append({"op": "remove", "key": key})
+
+    def _remove(self, key: str) -> bool:
         metadata = self.memory_metadata.get(key)
         if not metadata:
-            return
+            return False
 
         # Remove from all indexes
         self.layer_index[metadata["layer"]].discard(key)
@@ -137,6 +156,16 @@ class MemoryIndex:
 
         # Remove metadata
         del self.memory_metadata[key]
+        return True
+
+    def replay(self, entries: list[dict[str, Any]]):
+        """Apply journal entries (as recorded by add_memory/remove_memory) without re-journaling them."""
+        for entry in entries:
+            if entry.get("op") == "add":
+                self.add_memory(entry["key"], entry["layer"], entry, entry["timestamp"])
+            elif entry.get("op") == "remove":
+                self._remove(entry["key"])
+        self._pending.clear()
 
     def search_by_tags(self, tags: list[str], match_all: bool = False) -> set[str]:
         """Search memories by tags."""
@@ -256,6 +285,11 @@ class MemoryIndex:
 # Global memory index instance
 _memory_index: Optional[MemoryIndex] = None
 
+# Snapshot generation on disk and number of entries journaled on top of it
+_index_io_lock = threading.Lock()
+_persisted_generation: Optional[int] = None
+_journal_ops = 0
+
 
 def get_memory_index() -> MemoryIndex:
     """Get or create the global memory index."""
@@ -268,14 +302,24 @@ def get_memory_index() -> MemoryIndex:
 
 
 def load_memory_index() -> MemoryIndex:
-    """Load memory index from disk."""
+    """Load memory index from disk: the last snapshot plus the changes journaled since."""
+    global _persisted_generation, _journal_ops
+
     index_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_FILE
 
     if index_path.exists():
         try:
             with open(index_path, encoding="utf-8") as f:
                 data = json.load(f)
-                return MemoryIndex.from_dict(data)
+            index = MemoryIndex.from_dict(data)
+            index._generation = data.get("generation", 0)
+
+            entries = _read_index_journal(index._generation)
+            index.replay(entries)
+            with _index_io_lock:
+                _persisted_generation = index._generation
+                _journal_ops = len(entries)
+            return index
         except Exception as e:
             logger.warning(f"Failed to load memory index: {e}")
 
@@ -283,31 +327,132 @@ def load_memory_index() -> MemoryIndex:
     return MemoryIndex()
 
 
+def _read_index_journal(generation: int) -> list[dict[str, Any]]:
+    """Journal entries recorded on top of the snapshot with the given generation."""
+    journal_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_JOURNAL_FILE
+    if not journal_path.exists():
+        return []
+
+    entries = []
+    with open(journal_path, "rb") as f:
+        header_line = f.readline()
+        try:
+            header = json.loads(header_line or b"{}")
+        except ValueError:
+            return []
+        if header.get("generation") != generation:
+            # Journal of an older snapshot (compaction was interrupted): already contained in the snapshot
+            return []
+        valid_bytes = len(header_line)
+        for line in f:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("missing newline")
+                entries.append(json.loads(line))
+            except ValueError:
+                # Partial line from an interrupted append; nothing after it was acknowledged
+                logger.warning("Ignoring truncated memory index journal entry")
+                break
+            valid_bytes += len(line)
+
+    if valid_bytes < journal_path.stat().st_size:
+        # Cut the partial entry off, or later appends would follow it and be unreadable too
+        with open(journal_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return entries
+
+
 def save_memory_index(index: Optional[MemoryIndex] = None) -> bool:
-    """Save memory index to disk."""
+    """
+    Persist index changes to disk.
+
+    Changes made since the last save are appended to the journal; the whole
+    index is only rewritten (as a new snapshot, which also resets the journal)
+    for an index that was not loaded from the current snapshot or once the
+    journal exceeds MEMORY_INDEX_COMPACT_OPS entries.
+    """
     if index is None:
         index = get_memory_index()
 
     try:
         MEMORY_STORAGE_PATH.mkdir(exist_ok=True)
-        index_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_FILE
-
-        with open(index_path, "w", encoding="utf-8") as f:
-            json.dump(index.to_dict(), f, indent=2, ensure_ascii=False)
+        journal_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_JOURNAL_FILE
+
+        with _index_io_lock:
+            if (
+                index._generation is None
+                or index._generation != _persisted_generation
+                or _journal_ops + len(index._pending) > MEMORY_INDEX_COMPACT_OPS
+                or not journal_path.exists()
+            ):
+                _write_index_snapshot(index)
+            elif index._pending:
+                _append_index_journal(index, journal_path)
 
-        logger.debug(f"Memory index saved to {index_path}")
         return True
     except Exception as e:
         logger.error(f"Failed to save memory index: {e}")
         return False
 
 
-def rebuild_memory_index() -> MemoryIndex:
-    """Rebuild the entire memory index from stored memories."""
-    logger.info("Rebuilding memory index...")
-    index = MemoryIndex()
+def compact_memory_index(index: Optional[MemoryIndex] = None) -> bool:
+    """Write a fresh snapshot of the index and truncate the journal."""
+    if index is None:
+        index = get_memory_index()
+
+    try:
+        MEMORY_STORAGE_PATH.mkdir(exist_ok=True)
+        with _index_io_lock:
+            _write_index_snapshot(index)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to compact memory index: {e}")
+        return False
+
+
+def _append_index_journal(index: MemoryIndex, journal_path: Path):
+    global _journal_ops
+
+    entries = list(index._pending)
+    with open(journal_path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+    # Only drop the changes once they are on disk; a failed write retries them on the next save
+    del index._pending[: len(entries)]
+    _journal_ops += len(entries)
+    logger.debug(f"Journaled {len(entries)} memory index changes")
+
+
+def _write_index_snapshot(index: MemoryIndex):
+    global _persisted_generation, _journal_ops
+
+    generation = max(index._generation or 0, _persisted_generation or 0) + 1
+    pending = len(index._pending)
+    data = index.to_dict()
+    data["generation"] = generation
+
+    # Write-then-rename so a crash leaves either the old or the new snapshot; the old journal
+    # is ignored once the new snapshot is in place because its generation no longer matches
+    index_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_FILE
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, index_path)
+
+    journal_path = MEMORY_STORAGE_PATH / MEMORY_INDEX_JOURNAL_FILE
+    tmp_path = journal_path.with_name(journal_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"generation": generation}) + "\n")
+    os.replace(tmp_path, journal_path)
 
-    # Process each memory layer
+    del index._pending[:pending]
+    index._generation = generation
+    _persisted_generation = generation
+    _journal_ops = 0
+    logger.debug(f"Memory index snapshot {generation} saved to {index_path}")
+
+
+def _build_index_from_layers() -> MemoryIndex:
+    index = MemoryIndex()
     for layer in ["global", "project"]:
         layer_data = _load_memory_layer(layer)
 
@@ -315,8 +460,70 @@ def rebuild_memory_index() -> MemoryIndex:
             metadata = memory.get("metadata", {})
             timestamp = memory.get("timestamp", datetime.now(timezone.utc).isoformat())
             index.add_memory(key, layer, metadata, timestamp)
+    return index
+
+
+def _diff_indexes(expected: MemoryIndex, actual: MemoryIndex) -> dict[str, list[str]]:
+    missing = []
+    mismatched = []
+    for key, record in expected.memory_metadata.items():
+        indexed = actual.memory_metadata.get(key)
+        if indexed is None:
+            missing.append(key)
+        elif (indexed["layer"], indexed["type"], sorted(indexed["tags"])) != (
+            record["layer"],
+            record["type"],
+            sorted(record["tags"]),
+        ):
+            mismatched.append(key)
+
+    # Session memories are indexed but never persisted in a layer
+    orphaned = [
+        key
+        for key, record in actual.memory_metadata.items()
+        if key not in expected.memory_metadata and record["layer"] != "session"
+    ]
+    return {"missing": sorted(missing), "orphaned": sorted(orphaned), "mismatched": sorted(mismatched)}
+
+
+def verify_memory_index(index: Optional[MemoryIndex] = None) -> dict[str, list[str]]:
+    """
+    Check an index (default: the loaded one) against the stored layer data.
+
+    Returns:
+        Keys stored in a layer but not indexed ("missing"), indexed but no
+        longer stored ("orphaned"), and indexed with a different layer, type or
+        tags than stored ("mismatched")
+    """
+    if index is None:
+        index = get_memory_index()
+    return _diff_indexes(_build_index_from_layers(), index)
+
+
+def rebuild_memory_index(verify: bool = False) -> MemoryIndex:
+    """
+    Rebuild the entire memory index from stored memories.
+
+    Args:
+        verify: Log how the previously loaded index differed from the layer data
+    """
+    global _memory_index
+
+    logger.info("Rebuilding memory index...")
+    index = _build_index_from_layers()
+
+    if verify:
+        differences = _diff_indexes(index, get_memory_index())
+        if any(differences.values()):
+            logger.warning(
+                "Memory index differed from layer data: "
+                + ", ".join(f"{len(keys)} {kind}" for kind, keys in differences.items())
+            )
+        else:
+            logger.info("Memory index matched layer data")
 
-    # Save the rebuilt index
+    # Save the rebuilt index and make it the active one
+    _memory_index = index
     save_memory_index(index)
 
     logger.info(f"Memory index rebuilt with {len(index.memory_metadata)} entries")
@@ -550,23 +757,21 @@ def intelligent_recall_memory(
     layers_to_search = [layer] if layer else ["global", "project"]
 
     for search_layer in layers_to_search:
-        layer_data = _load_memory_layer(search_layer)
-
-        for key in candidate_keys:
-            if key not in layer_data:
-                continue
-
-            memory = layer_data[key]
+        if query:
+            # Full-text index lookup: only candidates containing every query term are loaded
+            text_scores = dict(_search_memory_layer(search_layer, str(query), candidate_keys))
+            layer_data = _load_memory_items(search_layer, text_scores)
+        else:
+            text_scores = {}
+            layer_data = _load_memory_items(search_layer, candidate_keys)
+        best_text_score = max(text_scores.values(), default=0.0) or 1.0
 
-            # Text search if query provided
-            if query:
-                content_str = str(memory.get("content", ""))
-                query_str = str(query) if query is not None else ""
-                if query_str and query_str.lower() not in content_str.lower():
-                    continue
+        for key, memory in layer_data.items():
+            # BM25 score normalized to 0-1 within the layer
+            text_score = text_scores[key] / best_text_score if query else None
 
             # Calculate relevance score
-            relevance = calculate_relevance_score(memory, query, tags, mem_type)
+            relevance = calculate_relevance_score(memory, query, tags, mem_type, text_score=text_score)
 
             # Prepare result
             result = {
@@ -577,6 +782,9 @@ def intelligent_recall_memory(
                 "relevance_score": relevance,
             }
 
+            if text_score is not None:
+                result["text_score"] = text_score
+
             if include_metadata:
                 result["metadata"] = memory.get("metadata", {})
 
@@ -594,8 +802,15 @@ def calculate_relevance_score(
     query: Optional[str],
     tags: Optional[list[str]],
     mem_type: Optional[str],
+    text_score: Optional[float] = None,
 ) -> float:
-    """Calculate relevance score for a memory based on search criteria."""
+    """
+    Calculate relevance score for a memory based on search criteria.
+
+    text_score is the memory's normalized BM25 score for the query (0-1) when
+    it was found through the full-text index; without it the query is matched
+    as a substring of the content.
+    """
     score = 0.0
     metadata = memory.get("metadata", {})
 
@@ -603,7 +818,9 @@ def calculate_relevance_score(
     score += metadata.get("quality_score", 0.5) * 0.3
 
     # Query match scoring
-    if query:
+    if text_score is not None:
+        score += 0.4 * text_score
+    elif query:
         content_str = str(memory.get("content", "")).lower()
         query_str = str(query) if query is not None else ""
         query_lower = query_str.lower()
@@ -654,9 +871,9 @@ def calculate_relevance_score(
 def update_memory_access(key: str, layer: str):
     """Update access count for a memory."""
     try:
-        layer_data = _load_memory_layer(layer)
-        if key in layer_data:
-            memory = layer_data[key]
+        store = _get_memory_store(layer)
+        memory = store.get(key) if store else None
+        if memory is not None:
             metadata = memory.get("metadata", {})
             metadata["access_count"] = metadata.get("access_count", 0) + 1
             metadata["last_accessed"] = datetime.now(timezone.utc).isoformat()
@@ -672,7 +889,7 @@ def update_memory_access(key: str, layer: str):
             index.add_memory(key, layer, metadata, memory.get("timestamp"))
 
             # Save updates
-            _save_memory_layer(layer, layer_data)
+            store.put(key, memory)
             save_memory_index(index)
     except Exception as e:
         logger.debug(f"Failed to update memory access: {e}")
@@ -706,14 +923,12 @@ def cleanup_old_memories(days: int = MEMORY_DECAY_DAYS * 2):
                 continue
 
         # Remove old memories
+        if keys_to_remove:
+            _get_memory_store(layer).delete_many(keys_to_remove)
         for key in keys_to_remove:
-            del layer_data[key]
             index.remove_memory(key)
             removed_count += 1
 
-        if keys_to_remove:
-            _save_memory_layer(layer, layer_data)
-
     if removed_count > 0:
         save_memory_index(index)
         logger.info(f"Removed {removed_count} old memories with low quality scores")
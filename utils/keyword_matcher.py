@@ -0,0 +1,109 @@
+"""
+Multi-keyword matching with a precompiled Aho-Corasick automaton
+
+The thinking pattern registry, the thinking mode manager and the xtool
+advisor route a prompt by checking which of a few hundred keywords occur in
+it. Testing each keyword with ``in`` rescans the whole prompt once per
+keyword; KeywordMatcher compiles the keywords into one automaton and finds
+every occurring keyword in a single pass over the text, so the cost grows
+with the text length only.
+
+Matching is on characters, not words, so mixed Chinese/English keywords
+work the same way and overlapping or nested keywords are all reported,
+exactly like ``keyword in text``. Matching is case-sensitive; callers
+lowercase keywords and text as they did for the substring tests.
+"""
+
+import re
+from collections import deque
+from collections.abc import Iterable
+
+
+class KeywordMatcher:
+    """Finds which of a fixed set of keywords occur in a text."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = frozenset(keywords)
+
+        # Trie of the keywords
+        transitions: list[dict[str, int]] = [{}]
+        outputs: list[set[str]] = [set()]
+        for keyword in self.keywords:
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    transitions.append({})
+                    outputs.append(set())
+                    next_state = len(transitions) - 1
+                    transitions[state][char] = next_state
+                state = next_state
+            outputs[state].add(keyword)
+
+        # Breadth-first over the trie: compute failure links and complete the
+        # transitions of every state from its (shallower, already complete)
+        # failure state, so matching never has to follow failure links
+        failure = [0] * len(transitions)
+        queue = deque(transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in list(transitions[state].items()):
+                if state:
+                    failure[next_state] = transitions[failure[state]].get(char, 0)
+                    outputs[next_state] |= outputs[failure[next_state]]
+                queue.append(next_state)
+            if state:
+                for char, next_state in transitions[failure[state]].items():
+                    transitions[state].setdefault(char, next_state)
+
+        self._transitions = transitions
+        self._outputs = [frozenset(output) if output else None for output in outputs]
+        # "" in text is always true
+        self._always = {""} if "" in self.keywords else set()
+
+    def find(self, text: str) -> set[str]:
+        """Return the keywords that occur in text."""
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set(self._always)
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            output = outputs[state]
+            if output is not None:
+                found |= output
+        return found
+
+
+class PatternSet:
+    """
+    Regex patterns gated by the literals they require.
+
+    Each pattern is only searched for when all of its literal parts occur in
+    the text (as reported by a KeywordMatcher built with required_literals),
+    so texts that cannot match skip the regex entirely.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = [(pattern, re.compile(pattern), self._literals(pattern)) for pattern in patterns]
+
+    @staticmethod
+    def _literals(pattern: str) -> tuple[str, ...]:
+        # Patterns are literal fragments joined by ".*"; anything else is always searched
+        parts = pattern.split(".*")
+        if any(re.escape(part) != part for part in parts):
+            return ()
+        return tuple(part for part in parts if part)
+
+    def required_literals(self) -> set[str]:
+        return {literal for _, _, literals in self.patterns for literal in literals}
+
+    def search(self, text: str, found: set[str]) -> list[str]:
+        """Return the patterns that match text, given the literals found in it."""
+        return [
+            pattern
+            for pattern, compiled, literals in self.patterns
+            if all(literal in found for literal in literals) and compiled.search(text)
+        ]
@@ -0,0 +1,160 @@
+"""
+Non-blocking logging pipeline for the server
+
+The server used to attach its stderr and rotating file handlers directly to
+the root logger, so every log call wrote (and occasionally rotated) the log
+files on the thread that made it, including the event loop. The pipeline
+installs a single QueueHandler on the root logger instead; a QueueListener
+thread owns the real handlers and does their formatting and disk I/O. The
+QueueHandler still merges each record's message and arguments on the calling
+thread (QueueHandler.prepare), so mutable arguments cannot change before the
+record is written.
+
+Verbosity is configured per subsystem rather than globally:
+
+- LOG_LEVEL sets the root level (INFO by default)
+- LOG_LEVELS overrides it for logger prefixes, e.g.
+  "utils.file_utils=DEBUG,providers=WARNING"
+- LOG_DEBUG_SAMPLING keeps only one in N DEBUG records for logger prefixes,
+  e.g. "utils.file_utils=10", for subsystems too chatty to log in full
+
+Dropped records are filtered before the QueueHandler formats them, so they
+cost a level check and nothing else.
+"""
+
+import atexit
+import itertools
+import logging
+import queue
+from collections.abc import Iterable, Mapping
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_logger_settings(value: Optional[str]) -> dict[str, str]:
+    """Parse "name=value,name=value" into a dict, skipping malformed entries."""
+    settings = {}
+    for item in (value or "").split(","):
+        name, sep, setting = item.partition("=")
+        name, setting = name.strip(), setting.strip()
+        if not sep or not name or not setting:
+            if item.strip():
+                logger.warning("Ignoring malformed logger setting: %r", item.strip())
+            continue
+        settings[name] = setting
+    return settings
+
+
+def parse_level(value: str) -> Optional[int]:
+    """Numeric level for a level name such as "debug", or None if unknown."""
+    level = logging.getLevelName(value.strip().upper())
+    return level if isinstance(level, int) else None
+
+
+def parse_log_levels(value: Optional[str]) -> dict[str, int]:
+    """Per-logger levels from a LOG_LEVELS value."""
+    levels = {}
+    for name, setting in parse_logger_settings(value).items():
+        level = parse_level(setting)
+        if level is None:
+            logger.warning("Ignoring unknown log level %r for logger %s", setting, name)
+            continue
+        levels[name] = level
+    return levels
+
+
+def parse_sampling_rates(value: Optional[str]) -> dict[str, int]:
+    """Per-logger DEBUG sampling rates (keep 1 in N) from a LOG_DEBUG_SAMPLING value."""
+    rates = {}
+    for name, setting in parse_logger_settings(value).items():
+        try:
+            rate = int(setting)
+        except ValueError:
+            logger.warning("Ignoring invalid sampling rate %r for logger %s", setting, name)
+            continue
+        if rate > 1:
+            rates[name] = rate
+    return rates
+
+
+def apply_logger_levels(levels: Mapping[str, int]) -> None:
+    """Set the level of each named logger."""
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keeps one in N DEBUG records of the configured logger prefixes.
+
+    The most specific configured prefix of a logger's name decides its rate;
+    records at INFO and above always pass.
+    """
+
+    def __init__(self, rates: Mapping[str, int]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+        self._prefix_cache: dict[str, Optional[str]] = {}
+
+    def _prefix_for(self, name: str) -> Optional[str]:
+        try:
+            return self._prefix_cache[name]
+        except KeyError:
+            pass
+        prefix = None
+        candidate = name
+        while candidate:
+            if candidate in self.rates:
+                prefix = candidate
+                break
+            candidate = candidate.rpartition(".")[0]
+        self._prefix_cache[name] = prefix
+        return prefix
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.INFO or not self.rates:
+            return True
+        prefix = self._prefix_for(record.name)
+        if prefix is None:
+            return True
+        # next() on itertools.count is atomic under the GIL
+        return next(self._counters[prefix]) % self.rates[prefix] == 0
+
+
+class LoggingPipeline:
+    """Root QueueHandler plus the listener thread that drives the real handlers."""
+
+    def __init__(self, handlers: Iterable[logging.Handler], filters: Iterable[logging.Filter] = ()):
+        self.handlers = list(handlers)
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.queue_handler = QueueHandler(self.queue)
+        for log_filter in filters:
+            self.queue_handler.addFilter(log_filter)
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self._installed_on: Optional[logging.Logger] = None
+
+    def install(self, target: Optional[logging.Logger] = None) -> "LoggingPipeline":
+        """Attach the queue handler to target (the root logger by default) and start the listener."""
+        target = target or logging.getLogger()
+        self.listener.start()
+        target.addHandler(self.queue_handler)
+        self._installed_on = target
+        atexit.register(self.stop)
+        return self
+
+    def stop(self) -> None:
+        """Detach the queue handler and flush everything queued so far."""
+        if self._installed_on is None:
+            return
+        self._installed_on.removeHandler(self.queue_handler)
+        self._installed_on = None
+        self.listener.stop()
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except (ValueError, OSError):
+                # The stream may already be closed at interpreter exit
+                pass
@@ -14,9 +14,9 @@ import logging
 import math
 import os
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
-from .conversation_memory import _load_memory_layer, _save_memory_layer
+from .conversation_memory import _get_memory_store, _load_memory_layer, _save_memory_layer
 from .intelligent_memory_retrieval import (
     MEMORY_DECAY_DAYS,
     MEMORY_QUALITY_THRESHOLD,
@@ -70,7 +70,7 @@ class MemoryLifecycleManager:
         self.archive_threshold = float(os.getenv("MEMORY_ARCHIVE_THRESHOLD", "0.2"))
         self.resurrection_boost = float(os.getenv("MEMORY_RESURRECTION_BOOST", "0.3"))
 
-    def calculate_advanced_quality(self, memory: dict[str, Any]) -> float:
+    def calculate_advanced_quality(self, memory: dict[str, Any], current_time: Optional[datetime] = None) -> float:
         """
         计算高级质量分数
 
@@ -95,7 +95,7 @@ class MemoryLifecycleManager:
         relevance_score = self._evaluate_relevance(memory)
 
         # 5. 使用频率评分
-        usage_score = self._evaluate_usage(memory.get("metadata", {}))
+        usage_score = self._evaluate_usage(memory.get("metadata", {}), current_time)
 
         # 6. 用户反馈评分（如果有）
         feedback_score = self._evaluate_feedback(memory.get("metadata", {}))
@@ -127,39 +127,7 @@ class MemoryLifecycleManager:
         if current_time is None:
             current_time = datetime.now(timezone.utc)
 
-        try:
-            timestamp = memory.get("timestamp", "")
-            created_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-            age_days = (current_time - created_time).days
-        except Exception:
-            # 无法解析时间，返回默认值
-            return 0.5
-
-        # 获取重要性系数
-        metadata = memory.get("metadata", {})
-        importance = metadata.get("importance", "medium")
-        importance_factor = MEMORY_IMPORTANCE_BOOST.get(importance, 1.0)
-
-        # 调整年龄（考虑重要性）
-        adjusted_age = age_days / importance_factor
-
-        # 应用不同的衰减曲线
-        if self.decay_curve == DecayCurve.LINEAR:
-            decay_value = self._linear_decay(adjusted_age)
-        elif self.decay_curve == DecayCurve.EXPONENTIAL:
-            decay_value = self._exponential_decay(adjusted_age)
-        elif self.decay_curve == DecayCurve.LOGARITHMIC:
-            decay_value = self._logarithmic_decay(adjusted_age)
-        elif self.decay_curve == DecayCurve.STEP:
-            decay_value = self._step_decay(adjusted_age)
-        else:
-            decay_value = 1.0
-
-        # 应用类型权重
-        mem_type = metadata.get("type", "general")
-        type_weight = MEMORY_TYPE_WEIGHTS.get(mem_type, 1.0)
-
-        return min(1.0, decay_value * type_weight)
+        return self._decay_from_age(_age_days(memory, current_time), memory.get("metadata", {}), self._decay_function())
 
     def evaluate_memory_value(self, memory: dict[str, Any]) -> dict[str, float]:
         """
@@ -167,35 +135,55 @@ class MemoryLifecycleManager:
 
         返回多维度的价值评分
         """
-        quality = self.calculate_advanced_quality(memory)
-        decay = self.apply_decay(memory)
-
-        # 计算综合价值
-        overall_value = quality * decay
-
-        # 特殊价值指标
-        metadata = memory.get("metadata", {})
-
-        # 历史价值（老记忆可能有历史价值）
-        historical_value = self._calculate_historical_value(memory)
-
-        # 参考价值（被引用次数）
-        reference_value = metadata.get("reference_count", 0) / 10.0
-        reference_value = min(1.0, reference_value)
+        return self.evaluate_memories([memory])[0]
 
-        # 独特性价值
-        uniqueness_value = self._calculate_uniqueness(memory)
+    def evaluate_memories(
+        self, memories: list[dict[str, Any]], current_time: Optional[datetime] = None
+    ) -> list[dict[str, Any]]:
+        """
+        批量评估记忆的综合价值
 
-        return {
-            "overall": overall_value,
-            "quality": quality,
-            "decay": decay,
-            "historical": historical_value,
-            "reference": reference_value,
-            "uniqueness": uniqueness_value,
-            "should_archive": overall_value < self.archive_threshold,
-            "should_delete": overall_value < MEMORY_QUALITY_THRESHOLD * 0.5,
-        }
+        按列计算：先一次性取出所有记忆的年龄和元数据，再逐列计算衰减、质量等
+        分数。当前时间、衰减曲线和阈值对整批只确定一次，每条记忆的时间戳
+        只解析一次。结果与逐条调用 evaluate_memory_value 相同。
+        """
+        if current_time is None:
+            current_time = datetime.now(timezone.utc)
+        decay_function = self._decay_function()
+        delete_threshold = MEMORY_QUALITY_THRESHOLD * 0.5
+
+        metadata_column = [memory.get("metadata", {}) for memory in memories]
+        age_column = [_age_days(memory, current_time) for memory in memories]
+
+        decay_column = [
+            self._decay_from_age(age, metadata, decay_function) for age, metadata in zip(age_column, metadata_column)
+        ]
+        quality_column = [self.calculate_advanced_quality(memory, current_time) for memory in memories]
+        historical_column = [_historical_value(age) for age in age_column]
+
+        results = []
+        for metadata, quality, decay, historical in zip(
+            metadata_column, quality_column, decay_column, historical_column
+        ):
+            # 计算综合价值
+            overall_value = quality * decay
+
+            results.append(
+                {
+                    "overall": overall_value,
+                    "quality": quality,
+                    "decay": decay,
+                    # 历史价值（老记忆可能有历史价值）
+                    "historical": historical,
+                    # 参考价值（被引用次数）
+                    "reference": min(1.0, metadata.get("reference_count", 0) / 10.0),
+                    # 独特性价值
+                    "uniqueness": self._calculate_uniqueness_from_tags(metadata.get("tags", [])),
+                    "should_archive": overall_value < self.archive_threshold,
+                    "should_delete": overall_value < delete_threshold,
+                }
+            )
+        return results
 
     def resurrect_memory(self, memory: dict[str, Any]) -> dict[str, Any]:
         """
@@ -245,12 +233,12 @@ class MemoryLifecycleManager:
 
         layers = [layer] if layer else ["global", "project"]
 
+        current_time = datetime.now(timezone.utc)
         for current_layer in layers:
             layer_data = _load_memory_layer(current_layer)
+            assessments = self.evaluate_memories(list(layer_data.values()), current_time)
 
-            for key, memory in layer_data.items():
-                value_assessment = self.evaluate_memory_value(memory)
-
+            for (key, memory), value_assessment in zip(layer_data.items(), assessments):
                 memory_info = {"key": key, "layer": current_layer, "memory": memory, "assessment": value_assessment}
 
                 if value_assessment["should_delete"]:
@@ -281,13 +269,13 @@ class MemoryLifecycleManager:
             index = get_memory_index()
 
             # 删除低价值记忆
-            for item in evaluation["delete"]:
-                layer_data = _load_memory_layer(item["layer"])
-                if item["key"] in layer_data:
-                    del layer_data[item["key"]]
-                    index.remove_memory(item["key"])
-                    stats["deleted"] += 1
-                    _save_memory_layer(item["layer"], layer_data)
+            for current_layer in {item["layer"] for item in evaluation["delete"]}:
+                keys = [item["key"] for item in evaluation["delete"] if item["layer"] == current_layer]
+                store = _get_memory_store(current_layer)
+                if store:
+                    stats["deleted"] += store.delete_many(keys)
+                    for key in keys:
+                        index.remove_memory(key)
 
             # TODO: 实现归档功能
             # for item in evaluation["archive"]:
@@ -357,7 +345,7 @@ class MemoryLifecycleManager:
 
         return ref_score * 0.7 + related_score * 0.3
 
-    def _evaluate_usage(self, metadata: dict[str, Any]) -> float:
+    def _evaluate_usage(self, metadata: dict[str, Any], current_time: Optional[datetime] = None) -> float:
         """评估使用频率"""
         access_count = metadata.get("access_count", 0)
 
@@ -372,7 +360,7 @@ class MemoryLifecycleManager:
         if last_accessed:
             try:
                 last_time = datetime.fromisoformat(last_accessed.replace("Z", "+00:00"))
-                days_since_access = (datetime.now(timezone.utc) - last_time).days
+                days_since_access = ((current_time or datetime.now(timezone.utc)) - last_time).days
                 recency_score = max(0.0, 1.0 - days_since_access / 30)  # 30天内线性衰减
             except Exception:
                 recency_score = 0.0
@@ -398,25 +386,14 @@ class MemoryLifecycleManager:
 
     def _calculate_historical_value(self, memory: dict[str, Any]) -> float:
         """计算历史价值"""
-        try:
-            timestamp = memory.get("timestamp", "")
-            created_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-            age_days = (datetime.now(timezone.utc) - created_time).days
-
-            # 超过一定时间的记忆可能有历史价值
-            if age_days > 365:  # 1年以上
-                return min(1.0, (age_days - 365) / 365)  # 每额外一年增加价值
-            else:
-                return 0.0
-        except Exception:
-            return 0.0
+        return _historical_value(_age_days(memory, datetime.now(timezone.utc)))
 
     def _calculate_uniqueness(self, memory: dict[str, Any]) -> float:
         """计算独特性价值"""
-        metadata = memory.get("metadata", {})
+        return self._calculate_uniqueness_from_tags(memory.get("metadata", {}).get("tags", []))
 
+    def _calculate_uniqueness_from_tags(self, tags: list[str]) -> float:
         # 基于标签的独特性（罕见标签价值更高）
-        tags = metadata.get("tags", [])
         if not tags:
             return 0.5
 
@@ -424,6 +401,32 @@ class MemoryLifecycleManager:
         # 暂时使用标签数量作为简单指标
         return min(1.0, len(tags) / 10)
 
+    def _decay_function(self) -> Callable[[float], float]:
+        """当前配置的衰减曲线"""
+        return {
+            DecayCurve.LINEAR: self._linear_decay,
+            DecayCurve.EXPONENTIAL: self._exponential_decay,
+            DecayCurve.LOGARITHMIC: self._logarithmic_decay,
+            DecayCurve.STEP: self._step_decay,
+        }.get(self.decay_curve, lambda age_days: 1.0)
+
+    def _decay_from_age(
+        self, age_days: Optional[int], metadata: dict[str, Any], decay_function: Callable[[float], float]
+    ) -> float:
+        """根据年龄、重要性和类型计算衰减值"""
+        if age_days is None:
+            # 无法解析时间，返回默认值
+            return 0.5
+
+        # 调整年龄（考虑重要性）
+        importance_factor = MEMORY_IMPORTANCE_BOOST.get(metadata.get("importance", "medium"), 1.0)
+        decay_value = decay_function(age_days / importance_factor)
+
+        # 应用类型权重
+        type_weight = MEMORY_TYPE_WEIGHTS.get(metadata.get("type", "general"), 1.0)
+
+        return min(1.0, decay_value * type_weight)
+
     # 衰减函数实现
 
     def _linear_decay(self, age_days: float) -> float:
@@ -465,6 +468,23 @@ class MemoryLifecycleManager:
             return 0.1
 
 
+def _age_days(memory: dict[str, Any], current_time: datetime) -> Optional[int]:
+    """记忆创建至今的天数，时间戳无法解析时返回 None"""
+    try:
+        timestamp = memory.get("timestamp", "")
+        created_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        return (current_time - created_time).days
+    except Exception:
+        return None
+
+
+def _historical_value(age_days: Optional[int]) -> float:
+    # 超过一定时间的记忆可能有历史价值
+    if age_days is not None and age_days > 365:  # 1年以上
+        return min(1.0, (age_days - 365) / 365)  # 每额外一年增加价值
+    return 0.0
+
+
 # 全局实例
 _lifecycle_manager: Optional[MemoryLifecycleManager] = None
 
@@ -10,9 +10,10 @@
 
 import logging
 import re
+from collections.abc import Iterable
 from datetime import datetime
 from difflib import SequenceMatcher
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from .intelligent_memory_retrieval import get_memory_index
 from .intelligent_memory_retrieval import intelligent_recall_memory as base_recall
@@ -20,6 +21,60 @@ from .thinking_patterns import thinking_registry
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\w+")
+STOP_WORDS = frozenset({"the", "a", "an", "is", "are", "was", "were", "in", "on", "at", "to", "for"})
+
+# 模糊匹配的相似度阈值
+FUZZY_MATCH_THRESHOLD = 0.8
+
+# 一些简单的语义相关词组
+SEMANTIC_GROUPS = {
+    "bug": ["error", "issue", "problem", "fault", "defect", "bug", "crash"],
+    "feature": ["feature", "function", "capability", "enhancement", "addition"],
+    "performance": ["performance", "speed", "optimization", "efficient", "fast", "slow"],
+    "security": ["security", "auth", "authentication", "permission", "access", "vulnerability"],
+    "test": ["test", "testing", "unit", "integration", "coverage", "assertion"],
+    "refactor": ["refactor", "cleanup", "reorganize", "restructure", "improve"],
+    "database": ["database", "db", "sql", "query", "table", "schema"],
+    "api": ["api", "endpoint", "request", "response", "rest", "graphql"],
+}
+
+# 反向索引：词 -> 所属语义组
+_WORD_TO_GROUPS: dict[str, list[str]] = {}
+for _group, _words in SEMANTIC_GROUPS.items():
+    for _word in _words:
+        _WORD_TO_GROUPS.setdefault(_word, []).append(_group)
+
+# 思维模式的特征词
+THINKING_PATTERN_KEYWORDS = {
+    "first_principles": ["first principle", "基本原理", "fundamental", "本质"],
+    "dialectical": ["dialectic", "辩证", "contradiction", "矛盾", "synthesis"],
+    "systems_thinking": ["system", "系统", "interconnect", "相互关联", "holistic"],
+    "critical_analysis": ["critical", "批判", "analyze", "分析", "evaluate"],
+    "creative_exploration": ["creative", "创造", "innovative", "创新", "brainstorm"],
+    "meta_cognitive": ["meta", "元认知", "think about thinking", "思考的思考"],
+    "analogical": ["analogy", "类比", "similar to", "相似", "like"],
+    "empirical": ["empirical", "实证", "evidence", "证据", "data"],
+    "pragmatic": ["pragmatic", "实用", "practical", "实际", "actionable"],
+    "holistic": ["holistic", "整体", "comprehensive", "全面", "complete"],
+}
+
+IMPORTANCE_LEVELS = {"high": 3, "medium": 2, "low": 1}
+
+LAYER_AFFINITY = {
+    ("global", "global"): 1.0,
+    ("project", "project"): 1.0,
+    ("session", "session"): 1.0,
+    ("global", "project"): 0.7,
+    ("project", "global"): 0.7,
+    ("global", "session"): 0.3,
+    ("session", "global"): 0.3,
+    ("project", "session"): 0.5,
+    ("session", "project"): 0.5,
+}
+
+CONTEXT_WEIGHTS = {"time": 0.2, "tags": 0.3, "type": 0.2, "layer": 0.1, "importance": 0.2}
+
 
 class MemoryRecallEngine:
     """
@@ -47,6 +102,10 @@ class MemoryRecallEngine:
         - 上下文权重
         """
         query_lower = query.lower()
+        return self._semantic_match(query_lower, self._tokenize(query_lower), content)
+
+    def _semantic_match(self, query_lower: str, query_words: list[str], content: str) -> float:
+        """semantic_keyword_match 的实现，查询只需预处理一次"""
         content_lower = content.lower()
 
         # 1. 精确匹配
@@ -57,28 +116,17 @@ class MemoryRecallEngine:
             return 0.8 * position_weight
 
         # 2. 分词匹配
-        query_words = self._tokenize(query_lower)
-        content_words = self._tokenize(content_lower)
-
         if not query_words:
             return 0.0
+        content_words = set(self._tokenize(content_lower))
 
         # 计算词汇覆盖率
         matched_words = sum(1 for word in query_words if word in content_words)
         word_coverage = matched_words / len(query_words)
 
         # 3. 模糊匹配（编辑距离）
-        fuzzy_score = 0.0
-        for q_word in query_words:
-            best_match = 0.0
-            for c_word in content_words:
-                similarity = SequenceMatcher(None, q_word, c_word).ratio()
-                if similarity > 0.8:  # 80%相似度阈值
-                    best_match = max(best_match, similarity)
-            fuzzy_score += best_match
-
-        if query_words:
-            fuzzy_score /= len(query_words)
+        fuzzy_score = sum(self._best_fuzzy_match(q_word, content_words) for q_word in query_words)
+        fuzzy_score /= len(query_words)
 
         # 4. 语义相关性（基于预定义的相关词表）
         semantic_score = self._calculate_semantic_relevance(query_words, content_words)
@@ -92,6 +140,23 @@ class MemoryRecallEngine:
 
         return min(1.0, final_score)
 
+    def _best_fuzzy_match(self, q_word: str, content_words: set[str]) -> float:
+        """查询词与内容词的最高相似度（低于阈值记为 0）"""
+        if q_word in content_words:
+            return 1.0
+
+        best_match = 0.0
+        matcher = SequenceMatcher(None, q_word)
+        for c_word in content_words:
+            matcher.set_seq2(c_word)
+            # real_quick_ratio / quick_ratio 是 ratio 的上界，先用它们排除不可能超过阈值的词
+            if matcher.real_quick_ratio() <= FUZZY_MATCH_THRESHOLD or matcher.quick_ratio() <= FUZZY_MATCH_THRESHOLD:
+                continue
+            similarity = matcher.ratio()
+            if similarity > FUZZY_MATCH_THRESHOLD:
+                best_match = max(best_match, similarity)
+        return best_match
+
     def thinking_pattern_match(self, memory_content: str, target_patterns: Optional[list[str]] = None) -> float:
         """
         思维模式匹配算法
@@ -126,77 +191,77 @@ class MemoryRecallEngine:
         - 层级相关性
         - 重要性对齐
         """
-        score = 0.0
-        weights = {"time": 0.2, "tags": 0.3, "type": 0.2, "layer": 0.1, "importance": 0.2}
+        return self._context_scorer(context)(memory)
 
-        memory_meta = memory.get("metadata", {})
+    def _context_scorer(self, context: dict[str, Any]) -> Callable[[dict[str, Any]], float]:
+        """预处理上下文（时间、标签、重要性只解析一次），返回给单条记忆打分的函数"""
+        weights = CONTEXT_WEIGHTS
 
-        # 1. 时间接近度
-        if context.get("timestamp") and memory.get("timestamp"):
+        ctx_time = None
+        if context.get("timestamp"):
             try:
                 ctx_time = datetime.fromisoformat(context["timestamp"].replace("Z", "+00:00"))
-                mem_time = datetime.fromisoformat(memory["timestamp"].replace("Z", "+00:00"))
-
-                # 计算时间差（小时）
-                time_diff = abs((ctx_time - mem_time).total_seconds()) / 3600
-
-                # 使用指数衰减函数
-                if time_diff < 24:  # 24小时内
-                    time_score = 1.0
-                elif time_diff < 168:  # 1周内
-                    time_score = 0.8
-                elif time_diff < 720:  # 1月内
-                    time_score = 0.5
-                else:
-                    time_score = 0.2
-
-                score += weights["time"] * time_score
             except Exception:
                 pass
-
-        # 2. 标签重叠度（Jaccard相似系数）
         ctx_tags = set(context.get("tags", []))
-        mem_tags = set(memory_meta.get("tags", []))
-
-        if ctx_tags and mem_tags:
-            tag_similarity = len(ctx_tags & mem_tags) / len(ctx_tags | mem_tags)
-            score += weights["tags"] * tag_similarity
-        elif not ctx_tags and not mem_tags:
-            # 都没有标签也算一种匹配
-            score += weights["tags"] * 0.5
-
-        # 3. 类型匹配度
-        if context.get("type") and memory_meta.get("type"):
-            type_match = 1.0 if context["type"] == memory_meta["type"] else 0.3
-            score += weights["type"] * type_match
-
-        # 4. 层级相关性
-        if context.get("layer") and memory.get("layer"):
-            layer_scores = {
-                ("global", "global"): 1.0,
-                ("project", "project"): 1.0,
-                ("session", "session"): 1.0,
-                ("global", "project"): 0.7,
-                ("project", "global"): 0.7,
-                ("global", "session"): 0.3,
-                ("session", "global"): 0.3,
-                ("project", "session"): 0.5,
-                ("session", "project"): 0.5,
-            }
-            layer_match = layer_scores.get((context["layer"], memory["layer"]), 0.5)
-            score += weights["layer"] * layer_match
-
-        # 5. 重要性对齐
-        importance_map = {"high": 3, "medium": 2, "low": 1}
-        ctx_importance = importance_map.get(context.get("importance", "medium"), 2)
-        mem_importance = importance_map.get(memory_meta.get("importance", "medium"), 2)
-
-        # 重要性差异越小，得分越高
-        importance_diff = abs(ctx_importance - mem_importance)
-        importance_score = 1.0 - (importance_diff / 2)
-        score += weights["importance"] * importance_score
-
-        return min(1.0, score)
+        ctx_type = context.get("type")
+        ctx_layer = context.get("layer")
+        ctx_importance = IMPORTANCE_LEVELS.get(context.get("importance", "medium"), 2)
+
+        def score_memory(memory: dict[str, Any]) -> float:
+            score = 0.0
+            memory_meta = memory.get("metadata", {})
+
+            # 1. 时间接近度
+            if ctx_time is not None and memory.get("timestamp"):
+                try:
+                    mem_time = datetime.fromisoformat(memory["timestamp"].replace("Z", "+00:00"))
+
+                    # 计算时间差（小时）
+                    time_diff = abs((ctx_time - mem_time).total_seconds()) / 3600
+
+                    # 使用指数衰减函数
+                    if time_diff < 24:  # 24小时内
+                        time_score = 1.0
+                    elif time_diff < 168:  # 1周内
+                        time_score = 0.8
+                    elif time_diff < 720:  # 1月内
+                        time_score = 0.5
+                    else:
+                        time_score = 0.2
+
+                    score += weights["time"] * time_score
+                except Exception:
+                    pass
+
+            # 2. 标签重叠度（Jaccard相似系数）
+            mem_tags = set(memory_meta.get("tags", []))
+
+            if ctx_tags and mem_tags:
+                tag_similarity = len(ctx_tags & mem_tags) / len(ctx_tags | mem_tags)
+                score += weights["tags"] * tag_similarity
+            elif not ctx_tags and not mem_tags:
+                # 都没有标签也算一种匹配
+                score += weights["tags"] * 0.5
+
+            # 3. 类型匹配度
+            if ctx_type and memory_meta.get("type"):
+                type_match = 1.0 if ctx_type == memory_meta["type"] else 0.3
+                score += weights["type"] * type_match
+
+            # 4. 层级相关性
+            if ctx_layer and memory.get("layer"):
+                layer_match = LAYER_AFFINITY.get((ctx_layer, memory["layer"]), 0.5)
+                score += weights["layer"] * layer_match
+
+            # 5. 重要性对齐：差异越小，得分越高
+            mem_importance = IMPORTANCE_LEVELS.get(memory_meta.get("importance", "medium"), 2)
+            importance_score = 1.0 - (abs(ctx_importance - mem_importance) / 2)
+            score += weights["importance"] * importance_score
+
+            return min(1.0, score)
+
+        return score_memory
 
     def advanced_recall(
         self,
@@ -229,32 +294,41 @@ class MemoryRecallEngine:
         if not candidates:
             return []
 
-        # 2. 对每个候选记忆进行高级评分
+        # 2. 按列计算各维度分数：查询和上下文只预处理一次
+        base_scores = [memory.get("relevance_score", 0.5) for memory in candidates]
+
+        # 语义匹配分数：优先使用全文索引的 BM25 分数（已归一化到 0-1）
+        semantic_scores = [0.0] * len(candidates)
+        if query:
+            query_lower = query.lower()
+            query_words = self._tokenize(query_lower)
+            semantic_scores = [
+                (
+                    memory["text_score"]
+                    if memory.get("text_score") is not None
+                    else self._semantic_match(query_lower, query_words, str(memory.get("content", "")))
+                )
+                for memory in candidates
+            ]
+
+        # 思维模式匹配分数
+        pattern_scores = [0.0] * len(candidates)
+        if thinking_patterns:
+            pattern_scores = [
+                self.thinking_pattern_match(str(memory.get("content", "")), thinking_patterns) for memory in candidates
+            ]
+
+        # 上下文相似度分数
+        context_scores = [0.0] * len(candidates)
+        if context:
+            score_context = self._context_scorer(context)
+            context_scores = [score_context(memory) for memory in candidates]
+
+        # 综合评分（按各分数是否超过阈值动态调整权重）
         scored_memories = []
-
-        for memory in candidates:
-            # 基础相关性分数
-            base_score = memory.get("relevance_score", 0.5)
-
-            # 语义匹配分数
-            semantic_score = 0.0
-            if query:
-                content = str(memory.get("content", ""))
-                semantic_score = self.semantic_keyword_match(query, content)
-
-            # 思维模式匹配分数
-            pattern_score = 0.0
-            if thinking_patterns:
-                content = str(memory.get("content", ""))
-                pattern_score = self.thinking_pattern_match(content, thinking_patterns)
-
-            # 上下文相似度分数
-            context_score = 0.0
-            if context:
-                context_score = self.context_similarity(memory, context)
-
-            # 综合评分
-            # 动态调整权重
+        for memory, base_score, semantic_score, pattern_score, context_score in zip(
+            candidates, base_scores, semantic_scores, pattern_scores, context_scores
+        ):
             total_weight = 1.0
             weights = {"base": 0.4}
 
@@ -302,39 +376,15 @@ class MemoryRecallEngine:
     def _tokenize(self, text: str) -> list[str]:
         """分词处理"""
         # 简单的分词实现，可以根据需要扩展
-        # 去除标点符号，按空格分词
-        words = re.findall(r"\w+", text.lower())
-        # 过滤停用词
-        stop_words = {"the", "a", "an", "is", "are", "was", "were", "in", "on", "at", "to", "for"}
-        return [w for w in words if w not in stop_words and len(w) > 2]
+        # 去除标点符号，按空格分词，过滤停用词
+        return [w for w in _WORD_RE.findall(text.lower()) if w not in STOP_WORDS and len(w) > 2]
 
-    def _calculate_semantic_relevance(self, query_words: list[str], content_words: list[str]) -> float:
+    def _calculate_semantic_relevance(self, query_words: list[str], content_words: Iterable[str]) -> float:
         """计算语义相关性"""
-        # 定义一些简单的语义相关词组
-        semantic_groups = {
-            "bug": ["error", "issue", "problem", "fault", "defect", "bug", "crash"],
-            "feature": ["feature", "function", "capability", "enhancement", "addition"],
-            "performance": ["performance", "speed", "optimization", "efficient", "fast", "slow"],
-            "security": ["security", "auth", "authentication", "permission", "access", "vulnerability"],
-            "test": ["test", "testing", "unit", "integration", "coverage", "assertion"],
-            "refactor": ["refactor", "cleanup", "reorganize", "restructure", "improve"],
-            "database": ["database", "db", "sql", "query", "table", "schema"],
-            "api": ["api", "endpoint", "request", "response", "rest", "graphql"],
-        }
-
-        # 反向索引
-        word_to_group = {}
-        for group, words in semantic_groups.items():
-            for word in words:
-                if word not in word_to_group:
-                    word_to_group[word] = []
-                word_to_group[word].append(group)
-
         # 查找查询词所属的语义组
         query_groups = set()
         for word in query_words:
-            if word in word_to_group:
-                query_groups.update(word_to_group[word])
+            query_groups.update(_WORD_TO_GROUPS.get(word, ()))
 
         if not query_groups:
             return 0.0
@@ -342,33 +392,19 @@ class MemoryRecallEngine:
         # 计算内容词与查询语义组的匹配度
         matched_groups = set()
         for word in content_words:
-            if word in word_to_group:
-                groups = word_to_group[word]
+            groups = _WORD_TO_GROUPS.get(word)
+            if groups:
                 matched_groups.update(g for g in groups if g in query_groups)
 
-        return len(matched_groups) / len(query_groups) if query_groups else 0.0
+        return len(matched_groups) / len(query_groups)
 
     def _extract_thinking_patterns(self, content: str) -> set[str]:
         """从内容中提取思维模式特征"""
         detected_patterns = set()
         content_lower = content.lower()
 
-        # 定义思维模式的特征词
-        pattern_keywords = {
-            "first_principles": ["first principle", "基本原理", "fundamental", "本质"],
-            "dialectical": ["dialectic", "辩证", "contradiction", "矛盾", "synthesis"],
-            "systems_thinking": ["system", "系统", "interconnect", "相互关联", "holistic"],
-            "critical_analysis": ["critical", "批判", "analyze", "分析", "evaluate"],
-            "creative_exploration": ["creative", "创造", "innovative", "创新", "brainstorm"],
-            "meta_cognitive": ["meta", "元认知", "think about thinking", "思考的思考"],
-            "analogical": ["analogy", "类比", "similar to", "相似", "like"],
-            "empirical": ["empirical", "实证", "evidence", "证据", "data"],
-            "pragmatic": ["pragmatic", "实用", "practical", "实际", "actionable"],
-            "holistic": ["holistic", "整体", "comprehensive", "全面", "complete"],
-        }
-
         # 检查每种模式的特征词
-        for pattern, keywords in pattern_keywords.items():
+        for pattern, keywords in THINKING_PATTERN_KEYWORDS.items():
             if any(keyword in content_lower for keyword in keywords):
                 detected_patterns.add(pattern)
 
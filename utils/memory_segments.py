@@ -0,0 +1,303 @@
+"""
+记忆层分段文件存储
+
+MemoryLayer 原先每个记忆项一个 JSON 文件，启动时 glob 并解析全部文件，
+冷启动时间和常驻内存都随记忆总量增长。SegmentStore 把一个记忆层存为：
+
+- 段文件 seg-XXXXXX.dat：只追加的记录（每条为一行 JSON 的大字段载荷，
+  如 content/embedding），通过 mmap 按 (段号, 偏移, 长度) 直接切片读取；
+- 索引日志 index.log：只追加的 JSON 行，每行记录一个记忆项的元数据
+  （类型、标签、时间、访问统计等小字段）及其载荷位置，或删除标记。
+
+启动时只重放索引日志（最后一条生效），载荷在需要时才读取。仅元数据变化
+（如访问统计）只追加一行索引，不重写载荷。被覆盖或删除的数据在垃圾超过
+阈值时通过压缩回收：存活载荷写入新段，再原子替换索引日志。
+
+崩溃安全：先写载荷再写索引行；未写完的末尾索引行在重放时被忽略并截掉，
+孤立的载荷字节只占空间，在下次压缩时回收。
+"""
+
+import json
+import logging
+import mmap
+import os
+import threading
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 单个段文件的最大字节数，超过后开启新段
+MEMORY_SEGMENT_MAX_BYTES = int(os.getenv("MEMORY_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# 垃圾字节超过该值且超过存活字节时触发压缩
+COMPACT_MIN_GARBAGE_BYTES = 1024 * 1024
+
+INDEX_FILE = "index.log"
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".dat"
+
+
+class SegmentRef(NamedTuple):
+    """载荷在段文件中的位置"""
+
+    segment: int
+    offset: int
+    length: int
+
+
+class SegmentStore:
+    """一个记忆层的段文件 + 索引日志存储"""
+
+    def __init__(self, directory: Path, max_segment_bytes: int = MEMORY_SEGMENT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+
+        self._lock = threading.RLock()
+        self._entries: dict[str, tuple[dict[str, Any], SegmentRef]] = {}
+        self._maps: dict[int, mmap.mmap] = {}
+        self._active_segment = 1
+        self._segment_bytes = 0  # 所有段文件的总字节数
+        self._live_bytes = 0  # 被索引引用的载荷字节数
+        self._index_lines = 0
+
+    # ------------------------------------------------------------------ 加载
+
+    def load(self) -> dict[str, dict[str, Any]]:
+        """重放索引日志，返回 {记忆项ID: 元数据}（不读取任何载荷）"""
+        with self._lock:
+            self._entries.clear()
+            self._index_lines = 0
+            index_path = self.directory / INDEX_FILE
+            if index_path.exists():
+                valid_bytes = 0
+                with open(index_path, "rb") as f:
+                    for line in f:
+                        try:
+                            if not line.endswith(b"\n"):
+                                raise ValueError("未写完的记录")
+                            record = json.loads(line)
+                        except ValueError:
+                            # 中断的追加写入：之后的内容都未确认
+                            logger.warning(f"忽略索引日志 {index_path} 中未写完的记录")
+                            break
+                        valid_bytes += len(line)
+                        self._index_lines += 1
+                        if record.get("deleted"):
+                            self._entries.pop(record["id"], None)
+                        else:
+                            self._entries[record["id"]] = (record["meta"], SegmentRef(*record["ref"]))
+                if valid_bytes < index_path.stat().st_size:
+                    # 截掉残缺的末尾，否则之后追加的记录会接在残行后面而无法解析
+                    with open(index_path, "r+b") as f:
+                        f.truncate(valid_bytes)
+
+            segments = self._segment_numbers()
+            self._active_segment = segments[-1] if segments else 1
+            self._segment_bytes = sum(self._segment_path(number).stat().st_size for number in segments)
+            self._live_bytes = sum(ref.length for _, ref in self._entries.values())
+            return {item_id: meta for item_id, (meta, _) in self._entries.items()}
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------ 读取
+
+    def read_payload(self, item_id: str) -> Optional[dict[str, Any]]:
+        """通过 mmap 读取记忆项的载荷"""
+        with self._lock:
+            entry = self._entries.get(item_id)
+            if entry is None:
+                return None
+            ref = entry[1]
+            data = self._map(ref.segment, ref.offset + ref.length)[ref.offset : ref.offset + ref.length]
+        return json.loads(data)
+
+    def iter_payloads(self) -> Iterable[tuple[str, dict[str, Any]]]:
+        """按ID遍历全部载荷（用于构建全文索引等一次性扫描）"""
+        for item_id in list(self._entries):
+            payload = self.read_payload(item_id)
+            if payload is not None:
+                yield item_id, payload
+
+    def _map(self, segment: int, min_size: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < min_size:
+            # 段文件在映射后又追加了数据：重新映射
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    # ------------------------------------------------------------------ 写入
+
+    def put_many(self, records: Mapping[str, tuple[dict[str, Any], Optional[dict[str, Any]]]]) -> None:
+        """
+        批量写入记忆项
+
+        Args:
+            records: {记忆项ID: (元数据, 载荷)}；载荷为 None 表示仅更新元数据
+        """
+        if not records:
+            return
+        with self._lock:
+            payload_blobs = []
+            index_records = []
+            offset = self._active_size()
+            segment = self._active_segment
+            for item_id, (meta, payload) in records.items():
+                if payload is None:
+                    entry = self._entries.get(item_id)
+                    if entry is None:
+                        raise KeyError(item_id)
+                    ref = entry[1]
+                else:
+                    blob = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+                    if offset and offset + len(blob) > self.max_segment_bytes:
+                        self._append_segment(segment, payload_blobs)
+                        payload_blobs = []
+                        segment += 1
+                        offset = 0
+                    ref = SegmentRef(segment, offset, len(blob) - 1)
+                    payload_blobs.append(blob)
+                    offset += len(blob)
+                index_records.append({"id": item_id, "meta": meta, "ref": list(ref)})
+
+            # 先写载荷，再写引用它的索引行
+            self._append_segment(segment, payload_blobs)
+            self._active_segment = segment
+            self._append_index(index_records)
+
+            for record in index_records:
+                previous = self._entries.get(record["id"])
+                ref = SegmentRef(*record["ref"])
+                if previous is not None:
+                    self._live_bytes -= previous[1].length
+                self._live_bytes += ref.length
+                self._entries[record["id"]] = (record["meta"], ref)
+
+    def put(self, item_id: str, meta: dict[str, Any], payload: Optional[dict[str, Any]] = None) -> None:
+        self.put_many({item_id: (meta, payload)})
+
+    def delete(self, item_id: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(item_id, None)
+            if entry is None:
+                return False
+            self._append_index([{"id": item_id, "deleted": True}])
+            self._live_bytes -= entry[1].length
+            return True
+
+    def _append_segment(self, segment: int, blobs: list[bytes]) -> None:
+        if not blobs:
+            return
+        data = b"".join(blobs)
+        with open(self._segment_path(segment), "ab") as f:
+            f.write(data)
+        self._segment_bytes += len(data)
+
+    def _append_index(self, records: list[dict[str, Any]]) -> None:
+        with open(self.directory / INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._index_lines += len(records)
+
+    def _active_size(self) -> int:
+        path = self._segment_path(self._active_segment)
+        return path.stat().st_size if path.exists() else 0
+
+    # ------------------------------------------------------------------ 压缩
+
+    def needs_compaction(self) -> bool:
+        garbage = self._segment_bytes - self._live_bytes
+        stale_index_lines = self._index_lines - len(self._entries)
+        return (garbage > COMPACT_MIN_GARBAGE_BYTES and garbage > self._live_bytes) or stale_index_lines > max(
+            1000, 2 * len(self._entries)
+        )
+
+    def compact(self) -> None:
+        """把存活载荷写入新段，并用只含存活记录的索引日志原子替换旧日志"""
+        with self._lock:
+            old_segments = self._segment_numbers()
+            segment = (old_segments[-1] if old_segments else 0) + 1
+            first_new_segment = segment
+            offset = 0
+            blobs: list[bytes] = []
+            new_entries = {}
+            for item_id, (meta, ref) in self._entries.items():
+                data = self._map(ref.segment, ref.offset + ref.length)[ref.offset : ref.offset + ref.length] + b"\n"
+                if offset and offset + len(data) > self.max_segment_bytes:
+                    self._write_new_segment(segment, blobs)
+                    blobs = []
+                    segment += 1
+                    offset = 0
+                new_entries[item_id] = (meta, SegmentRef(segment, offset, len(data) - 1))
+                blobs.append(data)
+                offset += len(data)
+            self._write_new_segment(segment, blobs)
+
+            index_path = self.directory / INDEX_FILE
+            tmp_path = index_path.with_name(index_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for item_id, (meta, ref) in new_entries.items():
+                    f.write(json.dumps({"id": item_id, "meta": meta, "ref": list(ref)}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, index_path)
+
+            # 新索引生效后旧段不再被引用
+            self._close_maps()
+            for number in old_segments:
+                if number < first_new_segment:
+                    self._segment_path(number).unlink(missing_ok=True)
+
+            self._entries = new_entries
+            self._active_segment = segment
+            self._segment_bytes = sum(self._segment_path(number).stat().st_size for number in self._segment_numbers())
+            self._live_bytes = sum(ref.length for _, ref in new_entries.values())
+            self._index_lines = len(new_entries)
+            logger.debug(f"压缩记忆段存储 {self.directory}: {len(new_entries)} 个记忆项")
+
+    def _write_new_segment(self, segment: int, blobs: list[bytes]) -> None:
+        with open(self._segment_path(segment), "wb") as f:
+            f.write(b"".join(blobs))
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ------------------------------------------------------------------ 其他
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def _segment_numbers(self) -> list[int]:
+        numbers = []
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                numbers.append(int(path.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+        return sorted(numbers)
+
+    def _close_maps(self) -> None:
+        for mapped in self._maps.values():
+            mapped.close()
+        self._maps.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        return {
+            "items": len(self._entries),
+            "segments": len(self._segment_numbers()),
+            "segment_bytes": self._segment_bytes,
+            "live_bytes": self._live_bytes,
+            "index_lines": self._index_lines,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_maps()
@@ -0,0 +1,377 @@
+"""
+Key-level persistent store for memory layers
+
+Persisted memory layers used to be a single JSON file per layer: every
+save_memory() call and every recall hit (access-count update) parsed the whole
+file, changed one entry and rewrote the whole file, so each write cost
+O(total memory size) in I/O and a crash mid-write could truncate the layer.
+
+MemoryLayerStore keeps one layer in an embedded SQLite database instead:
+
+- get/put/delete touch a single row; get_many/put_many/delete_many run in one
+  transaction, so a batch is applied completely or not at all.
+- The database runs in WAL mode, so an interrupted write never corrupts
+  entries that were already committed.
+- Entries are stored as JSON text together with their timestamp, which is
+  indexed so FIFO trimming (trim) does not need to load the layer.
+- An existing <layer>_memory.json file is imported on first open and renamed
+  to <name>.json.migrated.
+- Entry content is kept in an inverted index (postings table) updated in the
+  same transaction as the entry, and search() ranks matches with BM25
+  (see text_index).
+
+Stores are shared per database path (get_memory_store) and are safe to use
+from several threads.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from collections import Counter
+from collections.abc import Iterable, Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+from .text_index import document_text, rank_postings, substring_matches, tokenize, tokenize_query
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    key TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_memories_timestamp ON memories(timestamp);
+CREATE TABLE IF NOT EXISTS store_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_key ON postings(key);
+CREATE TABLE IF NOT EXISTS doc_lengths (
+    key TEXT PRIMARY KEY,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS index_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    doc_count INTEGER NOT NULL,
+    total_length INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO index_stats (id, doc_count, total_length) VALUES (0, 0, 0);
+"""
+
+_UPSERT_SQL = """
+INSERT INTO memories (key, timestamp, data) VALUES (?, ?, ?)
+ON CONFLICT(key) DO UPDATE SET timestamp = excluded.timestamp, data = excluded.data
+"""
+
+_POSTINGS_SQL = """
+SELECT p.term, p.key, p.tf, d.length FROM postings p JOIN doc_lengths d ON d.key = p.key
+WHERE p.term IN ({placeholders})
+"""
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+# Bump when tokenization changes so existing databases are re-indexed on open
+TEXT_INDEX_VERSION = "1"
+
+
+def _encode(key: str, entry: Any) -> tuple[str, str, str]:
+    timestamp = entry.get("timestamp", "") if isinstance(entry, Mapping) else ""
+    return key, str(timestamp or ""), json.dumps(entry, ensure_ascii=False)
+
+
+def _chunks(keys: list[str]) -> Iterable[list[str]]:
+    for start in range(0, len(keys), _MAX_PARAMS):
+        yield keys[start : start + _MAX_PARAMS]
+
+
+class MemoryLayerStore:
+    """SQLite-backed key/value store holding the entries of one memory layer."""
+
+    def __init__(self, db_path: Path, legacy_json_path: Optional[Path] = None):
+        self.db_path = Path(db_path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._ensure_text_index()
+        if legacy_json_path is not None:
+            self._import_legacy_json(Path(legacy_json_path))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the enclosed statements as one atomic write."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _import_legacy_json(self, json_path: Path) -> None:
+        with self._lock:
+            imported = self._conn.execute("SELECT value FROM store_meta WHERE name = 'legacy_json'").fetchone()
+        if imported or not json_path.exists():
+            return
+
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to import legacy memory file {json_path}: {e}")
+            return
+        if not isinstance(data, Mapping):
+            logger.warning(f"Ignoring legacy memory file {json_path}: expected an object")
+            return
+
+        with self._transaction() as conn:
+            # Entries written to the store since take precedence over the legacy file
+            existing = set()
+            for chunk in _chunks(list(data)):
+                placeholders = ",".join("?" * len(chunk))
+                existing.update(
+                    row[0] for row in conn.execute(f"SELECT key FROM memories WHERE key IN ({placeholders})", chunk)
+                )
+            self._write_entries(conn, {key: entry for key, entry in data.items() if key not in existing})
+            conn.execute("INSERT OR REPLACE INTO store_meta (name, value) VALUES ('legacy_json', ?)", (str(json_path),))
+
+        try:
+            json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        except OSError as e:
+            logger.debug(f"Could not rename migrated memory file {json_path}: {e}")
+        logger.info(f"Imported {len(data)} memories from {json_path} into {self.db_path}")
+
+    def _ensure_text_index(self) -> None:
+        """Build the full-text index of databases created before it existed (or by an older tokenizer)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM store_meta WHERE name = 'text_index'").fetchone()
+        if row and row[0] == TEXT_INDEX_VERSION:
+            return
+
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM postings")
+            conn.execute("DELETE FROM doc_lengths")
+            conn.execute("UPDATE index_stats SET doc_count = 0, total_length = 0")
+            cursor = conn.execute("SELECT key, data FROM memories")
+            while batch := cursor.fetchmany(_MAX_PARAMS):
+                self._index(conn, {key: json.loads(data) for key, data in batch})
+            conn.execute(
+                "INSERT OR REPLACE INTO store_meta (name, value) VALUES ('text_index', ?)", (TEXT_INDEX_VERSION,)
+            )
+
+    def _write_entries(self, conn: sqlite3.Connection, entries: Mapping[str, Any]) -> None:
+        """Upsert entries and re-index their text (inside a transaction)."""
+        if not entries:
+            return
+        conn.executemany(_UPSERT_SQL, [_encode(key, entry) for key, entry in entries.items()])
+        self._unindex(conn, list(entries))
+        self._index(conn, entries)
+
+    def _delete_keys(self, conn: sqlite3.Connection, keys: list[str]) -> int:
+        """Delete entries and their postings (inside a transaction)."""
+        deleted = 0
+        for chunk in _chunks(keys):
+            placeholders = ",".join("?" * len(chunk))
+            deleted += conn.execute(f"DELETE FROM memories WHERE key IN ({placeholders})", chunk).rowcount
+        self._unindex(conn, keys)
+        return deleted
+
+    @staticmethod
+    def _index(conn: sqlite3.Connection, entries: Mapping[str, Any]) -> None:
+        postings = []
+        lengths = []
+        for key, entry in entries.items():
+            counts = Counter(tokenize(document_text(entry)))
+            postings.extend((term, key, tf) for term, tf in counts.items())
+            lengths.append((key, sum(counts.values())))
+        conn.executemany("INSERT INTO postings (term, key, tf) VALUES (?, ?, ?)", postings)
+        conn.executemany("INSERT INTO doc_lengths (key, length) VALUES (?, ?)", lengths)
+        conn.execute(
+            "UPDATE index_stats SET doc_count = doc_count + ?, total_length = total_length + ?",
+            (len(lengths), sum(length for _, length in lengths)),
+        )
+
+    @staticmethod
+    def _unindex(conn: sqlite3.Connection, keys: list[str]) -> None:
+        for chunk in _chunks(keys):
+            placeholders = ",".join("?" * len(chunk))
+            count, total = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM doc_lengths WHERE key IN ({placeholders})", chunk
+            ).fetchone()
+            if not count:
+                continue
+            conn.execute(f"DELETE FROM postings WHERE key IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM doc_lengths WHERE key IN ({placeholders})", chunk)
+            conn.execute(
+                "UPDATE index_stats SET doc_count = doc_count - ?, total_length = total_length - ?", (count, total)
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get one entry, or None if the key does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM memories WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Get the existing entries among keys."""
+        keys = list(keys)
+        result = {}
+        with self._lock:
+            for chunk in _chunks(keys):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, data FROM memories WHERE key IN ({placeholders})", chunk)
+                result.update((key, json.loads(data)) for key, data in rows)
+        return result
+
+    def put(self, key: str, entry: Any) -> None:
+        """Insert or replace one entry."""
+        self.apply({key: entry}, ())
+
+    def put_many(self, entries: Mapping[str, Any]) -> None:
+        """Insert or replace several entries in one transaction."""
+        self.apply(entries, ())
+
+    def delete(self, key: str) -> bool:
+        """Delete one entry. Returns True if it existed."""
+        return self.apply({}, [key]) > 0
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several entries in one transaction. Returns the number deleted."""
+        return self.apply({}, keys)
+
+    def apply(self, puts: Mapping[str, Any], deletes: Iterable[str]) -> int:
+        """
+        Apply a batch of writes atomically.
+
+        Args:
+            puts: Entries to insert or replace
+            deletes: Keys to delete
+
+        Returns:
+            Number of entries deleted
+        """
+        deletes = list(deletes)
+        with self._transaction() as conn:
+            self._write_entries(conn, puts)
+            return self._delete_keys(conn, deletes)
+
+    def replace_all(self, data: Mapping[str, Any]) -> int:
+        """
+        Make the store hold exactly data, writing only entries that changed.
+
+        Returns:
+            Number of rows inserted, updated or deleted
+        """
+        with self._lock:
+            current = dict(self._conn.execute("SELECT key, data FROM memories"))
+            puts = {}
+            for key, entry in data.items():
+                if current.pop(key, None) != _encode(key, entry)[2]:
+                    puts[key] = entry
+            self.apply(puts, current.keys())
+        return len(puts) + len(current)
+
+    def items(self) -> list[tuple[str, Any]]:
+        """All entries, oldest first."""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, data FROM memories ORDER BY timestamp, rowid").fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT key FROM memories ORDER BY timestamp, rowid")]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def trim(self, max_items: int) -> list[str]:
+        """Delete the oldest entries (by timestamp) beyond max_items. Returns the deleted keys."""
+        with self._transaction() as conn:
+            excess = conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0] - max_items
+            if excess <= 0:
+                return []
+            removed = [
+                row[0] for row in conn.execute("SELECT key FROM memories ORDER BY timestamp, rowid LIMIT ?", (excess,))
+            ]
+            self._delete_keys(conn, removed)
+        return removed
+
+    def search(self, query: str, keys: Optional[set[str]] = None) -> list[tuple[str, float]]:
+        """
+        Full-text search over entry content.
+
+        Only the postings of the query terms are read, so the cost grows with
+        the number of documents containing those terms, not with the layer size.
+        Queries without index terms fall back to a substring scan of every entry.
+
+        Args:
+            query: Search text
+            keys: Optional set of keys to restrict results to
+
+        Returns:
+            (key, BM25 score) of entries containing every query term, best first
+            (or (key, 1.0) of entries containing the query, for the fallback)
+        """
+        terms = tokenize_query(query)
+        if not terms:
+            # Nothing indexable in the query: scan the entries like recall used to
+            entries = self.get_many(keys) if keys is not None else dict(self.items())
+            return substring_matches(query, ((key, document_text(entry)) for key, entry in entries.items()))
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                "SELECT doc_count, total_length FROM index_stats WHERE id = 0"
+            ).fetchone()
+            if not doc_count:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            postings = self._conn.execute(_POSTINGS_SQL.format(placeholders=placeholders), terms).fetchall()
+        return rank_postings(terms, postings, doc_count, total_length / doc_count, keys)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_stores: dict[Path, MemoryLayerStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_memory_store(db_path: Path, legacy_json_path: Optional[Path] = None) -> MemoryLayerStore:
+    """
+    Get the shared store for a database path, opening it on first use.
+
+    A store whose database file was removed (e.g. the memory directory was
+    deleted) is reopened so later writes are not lost in an unlinked file.
+    """
+    db_path = Path(db_path).resolve()
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is not None and not db_path.exists():
+            store.close()
+            store = None
+        if store is None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            store = _stores[db_path] = MemoryLayerStore(db_path, legacy_json_path)
+        return store
+
+
+def close_memory_stores() -> None:
+    """Close every open store."""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
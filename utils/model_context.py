@@ -32,9 +32,13 @@ from typing import Any, Optional
 
 from config import DEFAULT_MODEL
 from providers import ModelCapabilities, ModelProviderRegistry
+from utils.token_utils import count_tokens, count_tokens_batch
 
 logger = logging.getLogger(__name__)
 
+# Heuristic used for models without an available tokenizer (errs on the high side)
+CONSERVATIVE_CHARS_PER_TOKEN = 3
+
 
 @dataclass
 class TokenAllocation:
@@ -157,12 +161,14 @@ class ModelContext:
         """
         Estimate token count for text using model-specific tokenizer.
 
-        For now, uses simple estimation. Can be enhanced with model-specific
-        tokenizers (tiktoken for OpenAI, etc.) in the future.
+        Uses the model's tokenizer when one is available (see
+        utils.token_utils); otherwise a conservative 3 characters per token.
         """
-        # TODO: Integrate model-specific tokenizers
-        # For now, use conservative estimation
-        return len(text) // 3  # Conservative estimate
+        return count_tokens(text, model_name=self.model_name, chars_per_token=CONSERVATIVE_CHARS_PER_TOKEN)
+
+    def estimate_tokens_batch(self, texts: list[str]) -> list[int]:
+        """Estimate token counts for several texts, tokenizing each distinct text once."""
+        return count_tokens_batch(texts, model_name=self.model_name, chars_per_token=CONSERVATIVE_CHARS_PER_TOKEN)
 
     @classmethod
     def from_arguments(cls, arguments: dict[str, Any]) -> "ModelContext":
@@ -3,16 +3,22 @@
 
 为工作流系统提供持久化存储功能，解决状态在进程重启后丢失的问题。
 支持多种存储后端：SQLite、Redis、文件系统等。
+
+写入采用 write-behind 策略：save_state 只更新内存缓存并标记为脏（版本号递增），
+后台同步线程每隔 WORKFLOW_STATE_FLUSH_INTERVAL 秒把发生变化的工作流在一个事务中
+批量写入后端，未变化的工作流不会被重复写入。关闭时会执行最后一次刷新。
 """
 
 import asyncio
+import atexit
 import json
 import logging
+import os
 import sqlite3
 import threading
 import time
 from abc import ABC, abstractmethod
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Optional
 
@@ -20,6 +26,9 @@ from utils.workflow_memory_fix import ThreadSafeWorkflowState
 
 logger = logging.getLogger(__name__)
 
+# 后台刷新间隔（秒）
+WORKFLOW_STATE_FLUSH_INTERVAL = float(os.getenv("WORKFLOW_STATE_FLUSH_INTERVAL", "5"))
+
 
 class PersistentStateBackend(ABC):
     """持久化状态后端抽象基类"""
@@ -29,6 +38,13 @@ class PersistentStateBackend(ABC):
         """保存工作流状态"""
         pass
 
+    async def save_states(self, states: dict[str, dict[str, Any]]) -> bool:
+        """批量保存工作流状态，默认逐个保存，后端可覆盖为单事务实现"""
+        success = True
+        for workflow_id, state in states.items():
+            success = await self.save_state(workflow_id, state) and success
+        return success
+
     @abstractmethod
     async def load_state(self, workflow_id: str) -> Optional[dict[str, Any]]:
         """加载工作流状态"""
@@ -49,19 +65,74 @@ class PersistentStateBackend(ABC):
         """清理过期状态，返回清理数量"""
         pass
 
+    def close(self) -> None:
+        """释放后端资源（连接、线程等）"""
+        pass
+
 
 class SQLiteStateBackend(PersistentStateBackend):
-    """SQLite 持久化后端"""
-
-    def __init__(self, db_path: str = ".XTOOL_memory/workflow_states.db"):
+    """
+    SQLite 持久化后端
+
+    连接复用：所有写操作由一个专用写线程（单线程执行器，相当于带队列的写线程）
+    通过同一个长连接串行执行；读操作在读线程池中执行，每个读线程持有自己的长连接，
+    在 WAL 模式下可以与写并发。连接只在创建时设置一次 PRAGMA，语句使用固定 SQL，
+    由 sqlite3 的语句缓存保持预编译。所有异步方法通过 run_in_executor 执行，不阻塞事件循环。
+    """
+
+    # UPSERT 保留 created_at 并递增 access_count，无需相关子查询
+    _UPSERT_SQL = """
+        INSERT INTO workflow_states (workflow_id, state_data, created_at, updated_at, access_count)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT(workflow_id) DO UPDATE SET
+            state_data = excluded.state_data,
+            updated_at = excluded.updated_at,
+            access_count = workflow_states.access_count + 1
+    """
+    _SELECT_SQL = "SELECT state_data FROM workflow_states WHERE workflow_id = ?"
+    _TOUCH_SQL = "UPDATE workflow_states SET access_count = access_count + 1, updated_at = ? WHERE workflow_id = ?"
+    _DELETE_SQL = "DELETE FROM workflow_states WHERE workflow_id = ?"
+    _LIST_SQL = "SELECT workflow_id FROM workflow_states ORDER BY updated_at DESC"
+    _EXPIRE_SQL = "DELETE FROM workflow_states WHERE updated_at < ?"
+    _STATS_SQL = """
+        SELECT
+            COUNT(*) as total_workflows,
+            AVG(LENGTH(state_data)) as avg_state_size,
+            MAX(LENGTH(state_data)) as max_state_size,
+            MIN(updated_at) as oldest_update,
+            MAX(updated_at) as newest_update
+        FROM workflow_states
+    """
+
+    def __init__(self, db_path: str = ".XTOOL_memory/workflow_states.db", reader_threads: int = 4):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._lock = threading.Lock()
-        self._init_database()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workflow-db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix="workflow-db-reader")
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        self._writer.submit(self._init_database).result()
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的长连接（首次使用时创建并设置 PRAGMA）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30.0, check_same_thread=False)
+            # 启用 WAL 模式以支持并发读写
+            conn.execute("PRAGMA journal_mode=WAL")
+            # 设置同步模式为 NORMAL 以平衡性能和安全性
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
 
     def _init_database(self):
         """初始化数据库表"""
-        with self._get_connection() as conn:
+        conn = self._connection()
+        with conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS workflow_states (
                     workflow_id TEXT PRIMARY KEY,
@@ -77,80 +148,73 @@ class SQLiteStateBackend(PersistentStateBackend):
                 CREATE INDEX IF NOT EXISTS idx_updated_at
                 ON workflow_states(updated_at)
             """)
-            conn.commit()
 
-    @contextmanager
-    def _get_connection(self):
-        """获取数据库连接"""
-        conn = sqlite3.connect(str(self.db_path), timeout=30.0)
-        try:
-            # 启用 WAL 模式以支持并发读写
-            conn.execute("PRAGMA journal_mode=WAL")
-            # 设置同步模式为 NORMAL 以平衡性能和安全性
-            conn.execute("PRAGMA synchronous=NORMAL")
-            yield conn
-        finally:
-            conn.close()
+    def _call_write(self, func, *args):
+        conn = self._connection()
+        with conn:
+            return func(conn, *args)
+
+    def _call_read(self, func, *args):
+        return func(self._connection(), *args)
+
+    async def _write(self, func, *args):
+        """在写线程中执行（串行，单事务）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self._call_write, func, *args)
+
+    async def _read(self, func, *args):
+        """在读线程池中执行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._call_read, func, *args)
 
     async def save_state(self, workflow_id: str, state: dict[str, Any]) -> bool:
         """保存工作流状态"""
+        return await self.save_states({workflow_id: state})
+
+    async def save_states(self, states: dict[str, dict[str, Any]]) -> bool:
+        """在一个事务中批量保存工作流状态"""
+        if not states:
+            return True
         try:
-            state_json = json.dumps(state, ensure_ascii=False, separators=(",", ":"))
             current_time = time.time()
+            rows = [
+                (
+                    workflow_id,
+                    json.dumps(state, ensure_ascii=False, separators=(",", ":")),
+                    current_time,
+                    current_time,
+                )
+                for workflow_id, state in states.items()
+            ]
 
-            with self._lock:
-                with self._get_connection() as conn:
-                    conn.execute(
-                        """
-                        INSERT OR REPLACE INTO workflow_states
-                        (workflow_id, state_data, created_at, updated_at, access_count)
-                        VALUES (?, ?,
-                               COALESCE((SELECT created_at FROM workflow_states WHERE workflow_id = ?), ?),
-                               ?,
-                               COALESCE((SELECT access_count FROM workflow_states WHERE workflow_id = ?), 0) + 1)
-                    """,
-                        (workflow_id, state_json, workflow_id, current_time, current_time, workflow_id),
-                    )
-                    conn.commit()
+            await self._write(lambda conn: conn.executemany(self._UPSERT_SQL, rows))
 
-            logger.debug(f"已保存工作流状态: {workflow_id}")
+            logger.debug(f"已保存 {len(rows)} 个工作流状态")
             return True
 
         except Exception as e:
-            logger.error(f"保存工作流状态失败 {workflow_id}: {e}")
+            logger.error(f"保存工作流状态失败 {list(states)}: {e}")
             return False
 
     async def load_state(self, workflow_id: str) -> Optional[dict[str, Any]]:
         """加载工作流状态"""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    cursor = conn.execute(
-                        """
-                        SELECT state_data FROM workflow_states
-                        WHERE workflow_id = ?
-                    """,
-                        (workflow_id,),
+            row = await self._read(lambda conn: conn.execute(self._SELECT_SQL, (workflow_id,)).fetchone())
+            if not row:
+                return None
+
+            # 更新访问计数（进入写队列，不等待完成）；只是统计信息，失败不影响已读到的状态
+            if not self._closed:
+                try:
+                    self._writer.submit(
+                        self._call_write, lambda conn: conn.execute(self._TOUCH_SQL, (time.time(), workflow_id))
                     )
-                    row = cursor.fetchone()
-
-                    if row:
-                        # 更新访问计数
-                        conn.execute(
-                            """
-                            UPDATE workflow_states
-                            SET access_count = access_count + 1, updated_at = ?
-                            WHERE workflow_id = ?
-                        """,
-                            (time.time(), workflow_id),
-                        )
-                        conn.commit()
-
-                        state = json.loads(row[0])
-                        logger.debug(f"已加载工作流状态: {workflow_id}")
-                        return state
+                except RuntimeError as e:
+                    logger.debug(f"跳过工作流访问计数更新 {workflow_id}: {e}")
 
-            return None
+            state = json.loads(row[0])
+            logger.debug(f"已加载工作流状态: {workflow_id}")
+            return state
 
         except Exception as e:
             logger.error(f"加载工作流状态失败 {workflow_id}: {e}")
@@ -159,20 +223,12 @@ class SQLiteStateBackend(PersistentStateBackend):
     async def delete_state(self, workflow_id: str) -> bool:
         """删除工作流状态"""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    cursor = conn.execute(
-                        """
-                        DELETE FROM workflow_states WHERE workflow_id = ?
-                    """,
-                        (workflow_id,),
-                    )
-                    conn.commit()
+            rowcount = await self._write(lambda conn: conn.execute(self._DELETE_SQL, (workflow_id,)).rowcount)
 
-                    deleted = cursor.rowcount > 0
-                    if deleted:
-                        logger.debug(f"已删除工作流状态: {workflow_id}")
-                    return deleted
+            deleted = rowcount > 0
+            if deleted:
+                logger.debug(f"已删除工作流状态: {workflow_id}")
+            return deleted
 
         except Exception as e:
             logger.error(f"删除工作流状态失败 {workflow_id}: {e}")
@@ -181,13 +237,8 @@ class SQLiteStateBackend(PersistentStateBackend):
     async def list_workflows(self) -> list[str]:
         """列出所有工作流ID"""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    cursor = conn.execute("""
-                        SELECT workflow_id FROM workflow_states
-                        ORDER BY updated_at DESC
-                    """)
-                    return [row[0] for row in cursor.fetchall()]
+            rows = await self._read(lambda conn: conn.execute(self._LIST_SQL).fetchall())
+            return [row[0] for row in rows]
 
         except Exception as e:
             logger.error(f"列出工作流失败: {e}")
@@ -196,21 +247,11 @@ class SQLiteStateBackend(PersistentStateBackend):
     async def cleanup_expired(self, expire_before: float) -> int:
         """清理过期状态"""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    cursor = conn.execute(
-                        """
-                        DELETE FROM workflow_states
-                        WHERE updated_at < ?
-                    """,
-                        (expire_before,),
-                    )
-                    conn.commit()
+            deleted_count = await self._write(lambda conn: conn.execute(self._EXPIRE_SQL, (expire_before,)).rowcount)
 
-                    deleted_count = cursor.rowcount
-                    if deleted_count > 0:
-                        logger.info(f"清理了 {deleted_count} 个过期工作流状态")
-                    return deleted_count
+            if deleted_count > 0:
+                logger.info(f"清理了 {deleted_count} 个过期工作流状态")
+            return deleted_count
 
         except Exception as e:
             logger.error(f"清理过期状态失败: {e}")
@@ -219,27 +260,16 @@ class SQLiteStateBackend(PersistentStateBackend):
     async def get_stats(self) -> dict[str, Any]:
         """获取数据库统计信息"""
         try:
-            with self._lock:
-                with self._get_connection() as conn:
-                    cursor = conn.execute("""
-                        SELECT
-                            COUNT(*) as total_workflows,
-                            AVG(LENGTH(state_data)) as avg_state_size,
-                            MAX(LENGTH(state_data)) as max_state_size,
-                            MIN(updated_at) as oldest_update,
-                            MAX(updated_at) as newest_update
-                        FROM workflow_states
-                    """)
-                    row = cursor.fetchone()
-
-                    if row:
-                        return {
-                            "total_workflows": row[0],
-                            "avg_state_size_bytes": int(row[1] or 0),
-                            "max_state_size_bytes": int(row[2] or 0),
-                            "oldest_update": row[3],
-                            "newest_update": row[4],
-                        }
+            row = await self._read(lambda conn: conn.execute(self._STATS_SQL).fetchone())
+
+            if row:
+                return {
+                    "total_workflows": row[0],
+                    "avg_state_size_bytes": int(row[1] or 0),
+                    "max_state_size_bytes": int(row[2] or 0),
+                    "oldest_update": row[3],
+                    "newest_update": row[4],
+                }
 
             return {}
 
@@ -247,6 +277,21 @@ class SQLiteStateBackend(PersistentStateBackend):
             logger.error(f"获取统计信息失败: {e}")
             return {}
 
+    def close(self) -> None:
+        """等待写队列完成并关闭所有连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+
 
 class FileSystemStateBackend(PersistentStateBackend):
     """文件系统持久化后端（备用方案）"""
@@ -396,7 +441,7 @@ class FileSystemStateBackend(PersistentStateBackend):
 class PersistentWorkflowStateManager:
     """持久化工作流状态管理器"""
 
-    def __init__(self, backend: Optional[PersistentStateBackend] = None):
+    def __init__(self, backend: Optional[PersistentStateBackend] = None, flush_interval: Optional[float] = None):
         # 优先使用 SQLite，失败时回退到文件系统
         if backend is None:
             try:
@@ -413,66 +458,147 @@ class PersistentWorkflowStateManager:
         self.memory_cache = ThreadSafeWorkflowState()
         self._lock = threading.Lock()
 
+        # 脏标记与版本号：只有版本号高于已持久化版本的工作流才需要写入
+        self._versions: dict[str, int] = {}
+        self._persisted_versions: dict[str, int] = {}
+        self._dirty: set[str] = set()
+
+        # 同步指标
+        self._metrics = {
+            "flush_count": 0,
+            "failed_flushes": 0,
+            "states_written": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_latency_ms": 0.0,
+            "max_flush_latency_ms": 0.0,
+            "total_flush_latency_ms": 0.0,
+            "last_flush_at": None,
+        }
+
+        self.flush_interval = WORKFLOW_STATE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._stop_event = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+
         # 启动后台同步任务
         self._start_sync_task()
+        atexit.register(self.shutdown)
 
     def _start_sync_task(self):
         """启动后台同步任务"""
 
-        async def sync_worker():
-            while True:
-                try:
-                    await self._sync_to_persistent()
-                    await asyncio.sleep(60)  # 每分钟同步一次
-                except Exception as e:
-                    logger.error(f"后台同步任务出错: {e}")
-                    await asyncio.sleep(5)  # 出错时短暂等待
-
         def run_sync_worker():
             loop = asyncio.new_event_loop()
             asyncio.set_event_loop(loop)
-            loop.run_until_complete(sync_worker())
-
-        sync_thread = threading.Thread(target=run_sync_worker, daemon=True)
-        sync_thread.start()
+            try:
+                while not self._stop_event.wait(self.flush_interval):
+                    try:
+                        loop.run_until_complete(self._sync_to_persistent())
+                    except Exception as e:
+                        logger.error(f"后台同步任务出错: {e}")
+                # 停止前最后刷新一次
+                loop.run_until_complete(self._sync_to_persistent())
+            finally:
+                loop.close()
+
+        self._sync_thread = threading.Thread(target=run_sync_worker, daemon=True)
+        self._sync_thread.start()
         logger.info("持久化同步任务已启动")
 
-    async def _sync_to_persistent(self):
-        """同步内存状态到持久化存储"""
+    def _mark_dirty(self, workflow_id: str) -> None:
+        """递增版本号并标记为脏"""
+        with self._lock:
+            self._versions[workflow_id] = self._versions.get(workflow_id, 0) + 1
+            self._dirty.add(workflow_id)
+
+    async def _sync_to_persistent(self) -> int:
+        """把脏工作流在一个事务中批量写入持久化存储，返回写入数量"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            batch_versions = {workflow_id: self._versions.get(workflow_id, 0) for workflow_id in self._dirty}
+
+        # 直接读取缓存（get_state 会刷新访问时间，刷新不应算作访问）
+        batch = {}
+        with self.memory_cache._lock:
+            for workflow_id in batch_versions:
+                state = self.memory_cache._states.get(workflow_id)
+                if state is not None:
+                    batch[workflow_id] = state
+
+        start = time.perf_counter()
         try:
-            # 获取内存中的所有状态
-            memory_stats = self.memory_cache.get_stats()
-            if memory_stats["total_workflows"] == 0:
-                return
+            success = await self.backend.save_states(batch) if batch else True
+        except Exception as e:
+            logger.error(f"同步到持久化存储失败: {e}")
+            success = False
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            if success:
+                for workflow_id, version in batch_versions.items():
+                    self._persisted_versions[workflow_id] = version
+                    # 刷新期间再次被修改的工作流保持脏标记
+                    if self._versions.get(workflow_id, 0) == version:
+                        self._dirty.discard(workflow_id)
+                self._metrics["flush_count"] += 1
+                self._metrics["states_written"] += len(batch)
+                self._metrics["last_batch_size"] = len(batch)
+                self._metrics["max_batch_size"] = max(self._metrics["max_batch_size"], len(batch))
+                self._metrics["last_flush_latency_ms"] = latency_ms
+                self._metrics["max_flush_latency_ms"] = max(self._metrics["max_flush_latency_ms"], latency_ms)
+                self._metrics["total_flush_latency_ms"] += latency_ms
+                self._metrics["last_flush_at"] = time.time()
+            else:
+                self._metrics["failed_flushes"] += 1
 
-            # 这里我们假设内存缓存中的状态都需要持久化
-            # 在实际实现中，可以添加"脏标记"来优化
-            with self._lock:
-                for workflow_id in list(self.memory_cache._states.keys()):
-                    state = self.memory_cache.get_state(workflow_id)
-                    if state:
-                        await self.backend.save_state(workflow_id, state)
+        return len(batch) if success else 0
+
+    async def flush(self) -> int:
+        """立即刷新所有脏工作流，返回写入数量"""
+        return await self._sync_to_persistent()
 
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """停止后台同步，刷新剩余的脏工作流并关闭后端"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self._sync_thread is not None and self._sync_thread.is_alive():
+            self._sync_thread.join(timeout)
+        try:
+            self.backend.close()
         except Exception as e:
-            logger.error(f"同步到持久化存储失败: {e}")
+            logger.warning(f"关闭持久化后端失败: {e}")
+        try:
+            atexit.unregister(self.shutdown)
+        except Exception:
+            pass
+
+    def get_sync_metrics(self) -> dict[str, Any]:
+        """获取写回同步指标：刷新延迟、批量大小与积压数量"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["backlog"] = len(self._dirty)
+            flushes = metrics["flush_count"]
+            metrics["avg_flush_latency_ms"] = metrics["total_flush_latency_ms"] / flushes if flushes else 0.0
+        return metrics
 
     async def save_state(self, workflow_id: str, state: dict[str, Any]) -> bool:
-        """保存工作流状态（双写：内存+持久化）"""
+        """保存工作流状态（写内存并标记为脏，由后台同步批量持久化）"""
         try:
             # 先写内存（快速访问）
             memory_success = self.memory_cache.update_state(workflow_id, state)
 
-            # 异步写持久化存储
-            persistent_success = await self.backend.save_state(workflow_id, state)
-
-            if not memory_success:
-                logger.warning(f"内存状态更新失败: {workflow_id}")
+            if memory_success:
+                self._mark_dirty(workflow_id)
+                return True
 
+            # 内存状态超出限制时直接写持久化存储
+            logger.warning(f"内存状态更新失败: {workflow_id}")
+            persistent_success = await self.backend.save_state(workflow_id, state)
             if not persistent_success:
                 logger.warning(f"持久化状态保存失败: {workflow_id}")
-
-            # 只要有一个成功就认为操作成功
-            return memory_success or persistent_success
+            return persistent_success
 
         except Exception as e:
             logger.error(f"保存工作流状态失败 {workflow_id}: {e}")
@@ -503,6 +629,10 @@ class PersistentWorkflowStateManager:
         """删除工作流状态（双删：内存+持久化）"""
         try:
             memory_success = self.memory_cache.remove_state(workflow_id)
+            with self._lock:
+                self._dirty.discard(workflow_id)
+                self._versions.pop(workflow_id, None)
+                self._persisted_versions.pop(workflow_id, None)
             persistent_success = await self.backend.delete_state(workflow_id)
 
             return memory_success or persistent_success
@@ -560,6 +690,7 @@ class PersistentWorkflowStateManager:
             return {
                 "memory_stats": memory_stats,
                 "persistent_stats": persistent_stats,
+                "sync_metrics": self.get_sync_metrics(),
                 "backend_type": type(self.backend).__name__,
                 "total_unique_workflows": len(await self.list_workflows()),
             }
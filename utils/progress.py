@@ -0,0 +1,133 @@
+"""
+Request-scoped progress reporting for streamed model output
+
+When an MCP client sends a progressToken with a tool call, server.handle_call_tool
+creates a ProgressReporter and makes it available to the running tool through a
+context variable. Tools hand reporter.on_chunk to the provider as stream_callback,
+so text deltas reach the client as MCP progress notifications while the model is
+still generating. The final ModelResponse is assembled as usual.
+
+Chunks are coalesced and sent at most every PROGRESS_FLUSH_INTERVAL seconds to
+avoid one notification per token.
+
+The message and related_request_id arguments of send_progress_notification
+only exist in newer MCP SDKs. They are passed only when the session supports
+them; on older SDKs the client still receives progress counts, without text.
+"""
+
+import asyncio
+import inspect
+import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Minimum delay between two progress notifications
+PROGRESS_FLUSH_INTERVAL = 0.25
+
+_current_reporter: ContextVar[Optional["ProgressReporter"]] = ContextVar("progress_reporter", default=None)
+
+# Optional send_progress_notification arguments, by session class
+_OPTIONAL_PROGRESS_ARGS = ("message", "related_request_id")
+_supported_progress_args: dict[type, frozenset[str]] = {}
+
+
+def _progress_args_for(session: Any) -> frozenset[str]:
+    """Optional arguments the session's send_progress_notification accepts."""
+    session_type = type(session)
+    supported = _supported_progress_args.get(session_type)
+    if supported is None:
+        try:
+            parameters = inspect.signature(session.send_progress_notification).parameters
+        except (TypeError, ValueError):
+            parameters = {}
+        accepts_any = any(param.kind is inspect.Parameter.VAR_KEYWORD for param in parameters.values())
+        supported = frozenset(name for name in _OPTIONAL_PROGRESS_ARGS if accepts_any or name in parameters)
+        if "message" not in supported:
+            logger.info("MCP SDK does not support progress messages; streamed text will not be forwarded")
+        _supported_progress_args[session_type] = supported
+    return supported
+
+
+class ProgressReporter:
+    """Forwards streamed text to the MCP client as progress notifications."""
+
+    def __init__(
+        self,
+        session: Any,
+        progress_token: Union[str, int],
+        related_request_id: Optional[Union[str, int]] = None,
+        flush_interval: float = PROGRESS_FLUSH_INTERVAL,
+    ):
+        self.session = session
+        self.progress_token = progress_token
+        self.related_request_id = related_request_id
+        self.flush_interval = flush_interval
+        self.chars_received = 0
+        self._pending: list[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    def on_chunk(self, text: str) -> None:
+        """Record a streamed text delta (must be called on the event loop thread)."""
+        if not text or self._closed:
+            return
+        self._pending.append(text)
+        self.chars_received += len(text)
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.flush_interval, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        task = asyncio.ensure_future(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self) -> None:
+        """Send all pending text as one progress notification."""
+        if not self._pending:
+            return
+        message = "".join(self._pending)
+        self._pending.clear()
+        optional = {"message": message, "related_request_id": self.related_request_id}
+        supported = _progress_args_for(self.session)
+        try:
+            await self.session.send_progress_notification(
+                self.progress_token,
+                float(self.chars_received),
+                **{name: value for name, value in optional.items() if name in supported},
+            )
+        except Exception as e:
+            # Progress is best effort; never fail the tool call because of it
+            logger.debug(f"Failed to send progress notification: {e}")
+
+    async def aclose(self) -> None:
+        """Flush remaining text and stop accepting chunks."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+        self._closed = True
+
+
+def get_progress_reporter() -> Optional[ProgressReporter]:
+    """Get the progress reporter for the current tool call, if the client asked for progress."""
+    return _current_reporter.get()
+
+
+@asynccontextmanager
+async def progress_reporting(reporter: Optional[ProgressReporter]):
+    """Make reporter current for the duration of a tool call and flush it on exit."""
+    token = _current_reporter.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current_reporter.reset(token)
+        if reporter is not None:
+            await reporter.aclose()
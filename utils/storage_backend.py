@@ -1,37 +1,101 @@
 """
-In-memory storage backend for conversation threads
+Storage backends for conversation threads
 
-This module provides a thread-safe, in-memory alternative to Redis for storing
-conversation contexts. It's designed for ephemeral MCP server sessions where
-conversations only need to persist during a single Claude session.
+This module provides the key/value storage used by conversation memory. All
+backends expose the same Redis-style interface (setex/get plus batched
+mget/mset), and CONVERSATION_STORAGE_BACKEND selects which one is used:
 
-⚠️  PROCESS-SPECIFIC STORAGE: This storage is confined to a single Python process.
+- "memory" (default): InMemoryStorage, a thread-safe dict with TTLs
+- "sqlite": SQLiteStorage, a durable WAL database with an indexed expiry column
+- "redis": RedisStorage, any Redis-protocol server (requires the redis package)
+
+⚠️  PROCESS-SPECIFIC STORAGE: InMemoryStorage is confined to a single Python process.
     Data stored in one process is NOT accessible from other processes or subprocesses.
     This is why simulator tests that run server.py as separate subprocesses cannot
-    share conversation state between tool calls.
+    share conversation state between tool calls. Use the sqlite or redis backend
+    when several server processes must share threads or threads must survive restarts.
 
 Key Features:
 - Thread-safe operations using locks
 - TTL support with automatic expiration
 - Background cleanup thread for memory management
+- Batched mget/mset so chain lookups need a single round-trip
+- Append-only lists (rpush/lrange) so thread turns are written one at a time
 - Singleton pattern for consistent state within a single process
-- Drop-in replacement for Redis storage (for single-process scenarios)
+- Drop-in replacement for Redis storage
 """
 
 import logging
 import os
+import sqlite3
 import threading
 import time
+from abc import ABC, abstractmethod
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
-class InMemoryStorage:
+class StorageBackend(ABC):
+    """Interface shared by all conversation storage backends"""
+
+    @abstractmethod
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+
+    def setex(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Redis-compatible setex method"""
+        self.set_with_ttl(key, ttl_seconds, value)
+
+    def mget(self, keys: list[str]) -> list[Optional[str]]:
+        """Retrieve several values at once (None for missing or expired keys)"""
+        return [self.get(key) for key in keys]
+
+    def mset(self, mapping: dict[str, str], ttl_seconds: int) -> None:
+        """Store several values with the same expiration time"""
+        for key, value in mapping.items():
+            self.set_with_ttl(key, ttl_seconds, value)
+
+    @abstractmethod
+    def rpush_with_ttl(self, key: str, ttl_seconds: int, value: str) -> int:
+        """Append value to the list at key and refresh its expiration time
+
+        Returns:
+            Length of the list after the append
+        """
+
+    @abstractmethod
+    def lrange(self, key: str, start: int = 0, end: int = -1) -> list[str]:
+        """Get list items from start to end inclusive (negative indices count from the end)"""
+
+    def mlrange(self, keys: list[str]) -> list[list[str]]:
+        """Get several complete lists at once (empty for missing or expired keys)"""
+        return [self.lrange(key) for key in keys]
+
+    def shutdown(self) -> None:
+        """Release background threads and connections"""
+
+
+def _range_slice(items: list[str], start: int, end: int) -> list[str]:
+    """Apply Redis LRANGE semantics (inclusive end) to a Python list"""
+    stop = end + 1 if end != -1 else None
+    return items[start:stop]
+
+
+class InMemoryStorage(StorageBackend):
     """Thread-safe in-memory storage for conversation threads"""
 
     def __init__(self):
         self._store: dict[str, tuple[str, float]] = {}
+        self._lists: dict[str, tuple[list[str], float]] = {}
         self._lock = threading.Lock()
         # Match Redis behavior: cleanup interval based on conversation timeout
         # Run cleanup at 1/10th of timeout interval (e.g., 18 mins for 3 hour timeout)
@@ -69,9 +133,54 @@ class InMemoryStorage:
                     logger.debug(f"Key {key} expired and removed")
         return None
 
-    def setex(self, key: str, ttl_seconds: int, value: str) -> None:
-        """Redis-compatible setex method"""
-        self.set_with_ttl(key, ttl_seconds, value)
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            self._store.pop(key, None)
+            self._lists.pop(key, None)
+
+    def mget(self, keys: list[str]) -> list[Optional[str]]:
+        """Retrieve several values under a single lock acquisition"""
+        now = time.time()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._store.get(key)
+                if entry and now < entry[1]:
+                    values.append(entry[0])
+                else:
+                    if entry:
+                        del self._store[key]
+                    values.append(None)
+        return values
+
+    def mset(self, mapping: dict[str, str], ttl_seconds: int) -> None:
+        """Store several values under a single lock acquisition"""
+        with self._lock:
+            expires_at = time.time() + ttl_seconds
+            for key, value in mapping.items():
+                self._store[key] = (value, expires_at)
+
+    def rpush_with_ttl(self, key: str, ttl_seconds: int, value: str) -> int:
+        """Append value to the list at key and refresh its expiration time"""
+        with self._lock:
+            now = time.time()
+            entry = self._lists.get(key)
+            items = entry[0] if entry and now < entry[1] else []
+            items.append(value)
+            self._lists[key] = (items, now + ttl_seconds)
+            return len(items)
+
+    def lrange(self, key: str, start: int = 0, end: int = -1) -> list[str]:
+        """Get list items from start to end inclusive"""
+        with self._lock:
+            entry = self._lists.get(key)
+            if not entry:
+                return []
+            if time.time() >= entry[1]:
+                del self._lists[key]
+                return []
+            return _range_slice(entry[0], start, end)
 
     def _cleanup_worker(self):
         """Background thread that periodically cleans up expired entries"""
@@ -86,6 +195,9 @@ class InMemoryStorage:
             expired_keys = [k for k, (_, exp) in self._store.items() if exp < current_time]
             for key in expired_keys:
                 del self._store[key]
+            expired_lists = [k for k, (_, exp) in self._lists.items() if exp < current_time]
+            for key in expired_lists:
+                del self._lists[key]
 
             if expired_keys:
                 logger.debug(f"Cleaned up {len(expired_keys)} expired conversation threads")
@@ -97,17 +209,303 @@ class InMemoryStorage:
             self._cleanup_thread.join(timeout=1)
 
 
+class SQLiteStorage(StorageBackend):
+    """Durable storage in a SQLite database shared by every process on the host
+
+    The database runs in WAL mode so readers never block the writer, and the
+    expires_at column is indexed so expired rows are purged without a scan.
+    """
+
+    # SQLite limits the number of bound parameters per statement
+    _MGET_BATCH_SIZE = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS kv_expires_at ON kv (expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lists (key TEXT PRIMARY KEY, length INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS lists_expires_at ON lists (expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS list_items "
+            "(key TEXT NOT NULL, idx INTEGER NOT NULL, value TEXT NOT NULL, PRIMARY KEY (key, idx))"
+        )
+
+        timeout_hours = int(os.getenv("CONVERSATION_TIMEOUT_HOURS", "3"))
+        self._cleanup_interval = max(300, (timeout_hours * 3600) // 10)
+        self._shutdown = threading.Event()
+        self._cleanup_thread = threading.Thread(target=self._cleanup_worker, daemon=True)
+        self._cleanup_thread.start()
+
+        logger.info(f"SQLite conversation storage initialized at {path}")
+
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl_seconds),
+            )
+        logger.debug(f"Stored key {key} with TTL {ttl_seconds}s")
+
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM lists WHERE key = ?", (key,))
+                self._conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def mget(self, keys: list[str]) -> list[Optional[str]]:
+        """Retrieve several values with one query per batch of keys"""
+        found: dict[str, str] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), self._MGET_BATCH_SIZE):
+                batch = keys[start : start + self._MGET_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM kv WHERE key IN ({placeholders}) AND expires_at > ?", (*batch, now)
+                ).fetchall()
+                found.update(rows)
+        return [found.get(key) for key in keys]
+
+    def mset(self, mapping: dict[str, str], ttl_seconds: int) -> None:
+        """Store several values in a single transaction"""
+        expires_at = time.time() + ttl_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in mapping.items()],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def rpush_with_ttl(self, key: str, ttl_seconds: int, value: str) -> int:
+        """Append value to the list at key in one transaction and refresh its expiration time"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT length, expires_at FROM lists WHERE key = ?", (key,)).fetchone()
+                length = 0
+                if row and row[1] > now:
+                    length = row[0]
+                elif row:
+                    # Expired list that cleanup has not reached yet: start over
+                    self._conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+                self._conn.execute("INSERT INTO list_items (key, idx, value) VALUES (?, ?, ?)", (key, length, value))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lists (key, length, expires_at) VALUES (?, ?, ?)",
+                    (key, length + 1, now + ttl_seconds),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return length + 1
+
+    def lrange(self, key: str, start: int = 0, end: int = -1) -> list[str]:
+        """Get list items from start to end inclusive, reading only the requested rows"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT length FROM lists WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if not row:
+                return []
+            indices = _range_slice(list(range(row[0])), start, end)
+            if not indices:
+                return []
+            rows = self._conn.execute(
+                "SELECT value FROM list_items WHERE key = ? AND idx BETWEEN ? AND ? ORDER BY idx",
+                (key, indices[0], indices[-1]),
+            ).fetchall()
+        return [value for (value,) in rows]
+
+    def mlrange(self, keys: list[str]) -> list[list[str]]:
+        """Get several complete lists with one query per batch of keys"""
+        found: dict[str, list[str]] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), self._MGET_BATCH_SIZE):
+                batch = keys[start : start + self._MGET_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT i.key, i.value FROM lists l JOIN list_items i ON i.key = l.key "
+                    f"WHERE l.key IN ({placeholders}) AND l.expires_at > ? ORDER BY i.key, i.idx",
+                    (*batch, now),
+                ).fetchall()
+                for key, value in rows:
+                    found.setdefault(key, []).append(value)
+        return [found.get(key, []) for key in keys]
+
+    def _cleanup_worker(self):
+        """Background thread that periodically purges expired rows"""
+        while not self._shutdown.wait(self._cleanup_interval):
+            try:
+                self._cleanup_expired()
+            except sqlite3.Error as e:
+                logger.debug(f"SQLite storage cleanup failed: {e}")
+
+    def _cleanup_expired(self):
+        """Remove all expired rows"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute("DELETE FROM kv WHERE expires_at <= ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM list_items WHERE key IN (SELECT key FROM lists WHERE expires_at <= ?)", (now,)
+                )
+                self._conn.execute("DELETE FROM lists WHERE expires_at <= ?", (now,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if cursor.rowcount:
+            logger.debug(f"Cleaned up {cursor.rowcount} expired conversation threads")
+
+    def shutdown(self):
+        """Stop the cleanup thread and close the database"""
+        self._shutdown.set()
+        if self._cleanup_thread.is_alive():
+            self._cleanup_thread.join(timeout=1)
+        with self._lock:
+            self._conn.close()
+
+
+class RedisStorage(StorageBackend):
+    """Storage on a Redis-protocol server (Redis, Valkey, KeyDB, ...)
+
+    Expiry is handled natively by the server. A pre-built client can be passed
+    in, which is how tests run against a local stand-in.
+    """
+
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("The redis storage backend requires the 'redis' package: pip install redis") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self._client = client
+        logger.info("Redis conversation storage initialized")
+
+    @staticmethod
+    def _decode(value) -> Optional[str]:
+        if isinstance(value, bytes):
+            return value.decode("utf-8")
+        return value
+
+    def set_with_ttl(self, key: str, ttl_seconds: int, value: str) -> None:
+        """Store value with expiration time"""
+        self._client.setex(key, ttl_seconds, value)
+
+    def get(self, key: str) -> Optional[str]:
+        """Retrieve value if not expired"""
+        return self._decode(self._client.get(key))
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        self._client.delete(key)
+
+    def mget(self, keys: list[str]) -> list[Optional[str]]:
+        """Retrieve several values with a single MGET"""
+        if not keys:
+            return []
+        return [self._decode(value) for value in self._client.mget(keys)]
+
+    def mset(self, mapping: dict[str, str], ttl_seconds: int) -> None:
+        """Store several values in one pipelined round-trip"""
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.setex(key, ttl_seconds, value)
+        pipe.execute()
+
+    def rpush_with_ttl(self, key: str, ttl_seconds: int, value: str) -> int:
+        """RPUSH and EXPIRE in one atomic round-trip"""
+        pipe = self._client.pipeline(transaction=True)
+        pipe.rpush(key, value)
+        pipe.expire(key, ttl_seconds)
+        length, _ = pipe.execute()
+        return length
+
+    def lrange(self, key: str, start: int = 0, end: int = -1) -> list[str]:
+        """Get list items from start to end inclusive"""
+        return [self._decode(value) for value in self._client.lrange(key, start, end)]
+
+    def mlrange(self, keys: list[str]) -> list[list[str]]:
+        """Get several complete lists in one pipelined round-trip"""
+        if not keys:
+            return []
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.lrange(key, 0, -1)
+        return [[self._decode(value) for value in values] for values in pipe.execute()]
+
+    def shutdown(self):
+        """Close the client connection pool"""
+        close = getattr(self._client, "close", None)
+        if close:
+            close()
+
+
+def _create_storage_backend(backend: str) -> StorageBackend:
+    """Instantiate the configured backend, falling back to memory if it cannot start"""
+    from config import CONVERSATION_REDIS_URL, CONVERSATION_STORAGE_PATH
+
+    try:
+        if backend == "sqlite":
+            return SQLiteStorage(CONVERSATION_STORAGE_PATH)
+        if backend == "redis":
+            return RedisStorage(CONVERSATION_REDIS_URL)
+        if backend != "memory":
+            logger.warning(f"Unknown CONVERSATION_STORAGE_BACKEND '{backend}', using in-memory storage")
+    except Exception as e:
+        logger.error(f"Failed to initialize {backend} conversation storage, using in-memory storage: {e}")
+    return InMemoryStorage()
+
+
 # Global singleton instance
 _storage_instance = None
 _storage_lock = threading.Lock()
 
 
-def get_storage_backend() -> InMemoryStorage:
+def get_storage_backend() -> StorageBackend:
     """Get the global storage instance (singleton pattern)"""
     global _storage_instance
     if _storage_instance is None:
         with _storage_lock:
             if _storage_instance is None:
-                _storage_instance = InMemoryStorage()
-                logger.info("Initialized in-memory conversation storage")
+                from config import CONVERSATION_STORAGE_BACKEND
+
+                _storage_instance = _create_storage_backend(CONVERSATION_STORAGE_BACKEND)
+                logger.info(f"Initialized {type(_storage_instance).__name__} conversation storage")
     return _storage_instance
@@ -0,0 +1,216 @@
+"""
+Tokenization and BM25 ranking for memory text search
+
+Memory recall used to answer text queries by lowercasing every candidate's
+content and checking for a substring, so each query cost O(total memory
+size) and ranking relied on ad-hoc position bonuses. Text search now goes
+through an inverted index (term -> documents with term frequency) and ranks
+matches with Okapi BM25.
+
+Tokenization:
+- Text is NFKC-normalized and lowercased.
+- Latin/digit words are split on non-word characters; a few English stop
+  words and single letters are dropped.
+- Runs of CJK characters have no word boundaries, so they are indexed as
+  overlapping character bigrams plus single characters. Queries use bigrams
+  (or the single character for one-character runs), which makes a Chinese
+  query match documents containing it as a contiguous run.
+
+A query matches a document when the document contains every query term.
+This is word matching, not the substring matching recall used before: a
+query only matches whole words (or CJK runs) of a document, so a partial
+word such as "pars" no longer matches "parser". Queries that yield no terms
+at all (single letters, stop words or symbols, e.g. "a", "C++", "R") fall
+back to the old case-insensitive substring scan, see substring_matches.
+
+InvertedIndex is the in-memory variant used by enhanced_memory.MemoryLayer.
+The persisted memory layers keep the same postings in their SQLite store
+(see memory_store.MemoryLayerStore.search), sharing the scoring below.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any, Optional
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Hiragana, katakana, CJK ideographs (incl. extension A and compatibility) and hangul
+_CJK_RANGES = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_TOKEN_RE = re.compile(f"([{_CJK_RANGES}]+)|([^\\W{_CJK_RANGES}]+)")
+
+STOP_WORDS = frozenset(
+    {"the", "a", "an", "is", "are", "was", "were", "in", "on", "at", "to", "for", "of", "and", "or", "with"}
+)
+
+
+def _tokens(text: str, for_query: bool) -> list[str]:
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(unicodedata.normalize("NFKC", text).lower()):
+        if word:
+            if len(word) > 1 and word not in STOP_WORDS:
+                tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i : i + 2] for i in range(len(cjk) - 1))
+            if not for_query:
+                tokens.extend(cjk)
+    return tokens
+
+
+def tokenize(text: str) -> list[str]:
+    """Tokens of a document, with repetitions (term frequencies)."""
+    return _tokens(text, for_query=False)
+
+
+def tokenize_query(text: str) -> list[str]:
+    """Distinct terms of a query, in order of appearance."""
+    return list(dict.fromkeys(_tokens(text, for_query=True)))
+
+
+def substring_matches(query: str, documents: Iterable[tuple[str, str]]) -> list[tuple[str, float]]:
+    """
+    Fallback for queries without index terms: case-insensitive substring scan.
+
+    Every match scores 1.0, since there is nothing to rank by.
+
+    Args:
+        query: Search text (tokenize_query returned no terms for it)
+        documents: (key, text) pairs to scan
+
+    Returns:
+        (key, 1.0) for every document containing the query
+    """
+    needle = query.lower()
+    if not needle.strip():
+        return []
+    return [(key, 1.0) for key, text in documents if needle in text.lower()]
+
+
+def document_text(entry: Any) -> str:
+    """Text indexed for a stored memory entry (its content)."""
+    if isinstance(entry, dict):
+        entry = entry.get("content", "")
+    return entry if isinstance(entry, str) else str(entry)
+
+
+def bm25_idf(doc_count: int, doc_freq: int) -> float:
+    """BM25 inverse document frequency (never negative)."""
+    return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+
+def bm25_term_score(idf: float, tf: int, doc_length: int, avg_length: float) -> float:
+    """Contribution of one query term to a document's BM25 score."""
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / avg_length) if avg_length else BM25_K1
+    return idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+
+def rank_postings(
+    terms: list[str],
+    postings: list[tuple[str, str, int, int]],
+    doc_count: int,
+    avg_length: float,
+    keys: Optional[set[str]] = None,
+) -> list[tuple[str, float]]:
+    """
+    Rank documents containing every query term.
+
+    Args:
+        terms: Distinct query terms
+        postings: (term, key, tf, doc_length) for every posting of the query terms
+        doc_count: Number of indexed documents
+        avg_length: Average document length in tokens
+        keys: Optional set of keys to restrict results to
+
+    Returns:
+        (key, score) pairs, best first
+    """
+    # Document frequency is taken over the whole index, not only the restricted keys
+    idf = {term: bm25_idf(doc_count, freq) for term, freq in Counter(posting[0] for posting in postings).items()}
+
+    scores: dict[str, float] = {}
+    matched: Counter = Counter()
+    for term, key, tf, length in postings:
+        if keys is not None and key not in keys:
+            continue
+        scores[key] = scores.get(key, 0.0) + bm25_term_score(idf[term], tf, length, avg_length)
+        matched[key] += 1
+
+    ranked = [(key, score) for key, score in scores.items() if matched[key] == len(terms)]
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked
+
+
+class InvertedIndex:
+    """In-memory inverted index with incremental add/remove and BM25 search."""
+
+    def __init__(self):
+        self._postings: dict[str, dict[str, int]] = {}
+        self._doc_terms: dict[str, tuple[str, ...]] = {}
+        self._doc_lengths: dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, key: str, text: str) -> None:
+        """Index (or re-index) a document."""
+        self.remove(key)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[key] = tf
+        self._doc_terms[key] = tuple(counts)
+        length = sum(counts.values())
+        self._doc_lengths[key] = length
+        self._total_length += length
+
+    def remove(self, key: str) -> None:
+        """Drop a document from the index."""
+        terms = self._doc_terms.pop(key, None)
+        if terms is None:
+            return
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(key, None)
+                if not docs:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(key)
+
+    def search(self, query: str, keys: Optional[set[str]] = None) -> list[tuple[str, float]]:
+        """(key, BM25 score) of documents containing every query term, best first."""
+        terms = tokenize_query(query)
+        if not terms or not self._doc_lengths:
+            return []
+        if any(term not in self._postings for term in terms):
+            return []
+
+        doc_count = len(self._doc_lengths)
+        avg_length = self._total_length / doc_count
+        # Start from the rarest term so the candidate set stays small
+        terms.sort(key=lambda term: len(self._postings[term]))
+        candidates = set(self._postings[terms[0]])
+        if keys is not None:
+            candidates &= keys
+        for term in terms[1:]:
+            candidates &= self._postings[term].keys()
+            if not candidates:
+                return []
+
+        ranked = []
+        for key in candidates:
+            length = self._doc_lengths[key]
+            score = sum(
+                bm25_term_score(
+                    bm25_idf(doc_count, len(self._postings[term])), self._postings[term][key], length, avg_length
+                )
+                for term in terms
+            )
+            ranked.append((key, score))
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        return ranked
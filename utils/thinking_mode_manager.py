@@ -9,6 +9,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from .keyword_matcher import KeywordMatcher
+
 
 class ThinkingModeType(Enum):
     """思维模式类型枚举"""
@@ -100,8 +102,10 @@ class ThinkingModeManager:
         self._stage_mapping: dict[DevelopmentStage, dict[str, list[ThinkingModeType]]] = {}
         self._problem_mapping: dict[ProblemType, list[ThinkingModeType]] = {}
         self._combinations: dict[str, dict[str, any]] = {}
+        self._keyword_matcher: Optional[KeywordMatcher] = None
 
         self._initialize_thinking_modes()
+        self._get_keyword_matcher()
         self._initialize_mappings()
         self._initialize_combinations()
 
@@ -393,6 +397,15 @@ class ThinkingModeManager:
     def _register_mode(self, mode: ThinkingMode):
         """注册思维模式"""
         self._modes[mode.type] = mode
+        self._keyword_matcher = None
+
+    def _get_keyword_matcher(self) -> KeywordMatcher:
+        """所有模式关键词的自动机（注册新模式后重建）"""
+        if self._keyword_matcher is None:
+            self._keyword_matcher = KeywordMatcher(
+                keyword for mode in self._modes.values() for keyword in mode.keywords
+            )
+        return self._keyword_matcher
 
     def _initialize_mappings(self):
         """初始化映射关系"""
@@ -606,13 +619,14 @@ class ThinkingModeManager:
 
     def get_modes_by_keywords(self, text: str) -> list[ThinkingMode]:
         """根据关键词匹配思维模式"""
-        text_lower = text.lower()
+        # 一次扫描找出文本中出现的所有关键词
+        found = self._get_keyword_matcher().find(text.lower())
         scores = {}
 
         for mode_type, mode in self._modes.items():
             score = 0
             for keyword in mode.keywords:
-                if keyword in text_lower:
+                if keyword in found:
                     score += 1
 
             if score > 0:
@@ -18,6 +18,8 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional
 
+from .keyword_matcher import KeywordMatcher
+
 
 class ThinkingCategory(Enum):
     """Categories of thinking patterns"""
@@ -51,16 +53,30 @@ class ThinkingPattern:
         Returns a score between 0 and 1
         """
         context_lower = context.lower()
+        return self.score_matches({term for term in self.match_terms() if term in context_lower})
+
+    def match_terms(self) -> set[str]:
+        """Lowercase trigger keywords and use case words looked for in a context"""
+        terms = {keyword.lower() for keyword in self.trigger_keywords}
+        for use_case in self.use_cases:
+            terms.update(use_case.lower().split())
+        return terms
+
+    def score_matches(self, found: set[str]) -> float:
+        """
+        Match score given the match terms found in a context
+        Returns a score between 0 and 1
+        """
         match_score = 0.0
 
         # Check keyword matches
         for keyword in self.trigger_keywords:
-            if keyword.lower() in context_lower:
+            if keyword.lower() in found:
                 match_score += 0.2
 
         # Check use case relevance
         for use_case in self.use_cases:
-            if any(word in context_lower for word in use_case.lower().split()):
+            if any(word in found for word in use_case.lower().split()):
                 match_score += 0.1
 
         return min(match_score, 1.0)
@@ -73,7 +89,9 @@ class ThinkingPatternRegistry:
 
     def __init__(self):
         self.patterns: dict[str, ThinkingPattern] = {}
+        self._matcher: Optional[KeywordMatcher] = None
         self._initialize_patterns()
+        self._get_matcher()
 
     def _initialize_patterns(self):
         """Initialize all 27 thinking patterns"""
@@ -716,6 +734,16 @@ class ThinkingPatternRegistry:
     def register_pattern(self, pattern: ThinkingPattern):
         """Register a thinking pattern"""
         self.patterns[pattern.name] = pattern
+        self._matcher = None
+
+    def _get_matcher(self) -> KeywordMatcher:
+        """Automaton over the match terms of all patterns, rebuilt after registrations"""
+        if self._matcher is None:
+            terms = set()
+            for pattern in self.patterns.values():
+                terms |= pattern.match_terms()
+            self._matcher = KeywordMatcher(terms)
+        return self._matcher
 
     def get_pattern(self, name: str) -> Optional[ThinkingPattern]:
         """Get a specific pattern by name"""
@@ -735,9 +763,12 @@ class ThinkingPatternRegistry:
         """
         pattern_scores = []
 
+        # Find the match terms of all patterns in one pass over the context
+        found = self._get_matcher().find(context.lower())
+
         for pattern in self.patterns.values():
             # Calculate context match score
-            context_score = pattern.matches_context(context)
+            context_score = pattern.score_matches(found)
 
             # Get effectiveness score for problem type
             effectiveness = pattern.effectiveness_scores.get(problem_type, 0.5)
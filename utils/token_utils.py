@@ -2,35 +2,275 @@
 Token counting utilities for managing API context limits
 
 This module provides functions for estimating token counts to ensure
-requests stay within the Gemini API's context window limits.
+requests stay within the model's context window limits.
 
-Note: The estimation uses a simple character-to-token ratio which is
-approximate. For production systems requiring precise token counts,
-consider using the actual tokenizer for the specific model.
+Two kinds of counters are used:
+- Tokenizer-backed counters give exact counts for models whose tokenizer is
+  available offline. OpenAI-compatible models use tiktoken's BPE encodings
+  when the optional ``tiktoken`` package is installed, and other tokenizers
+  can be plugged in with register_token_counter(). Exact counts are memoized
+  per content hash, since the same files and history turns are counted
+  again on every request of a conversation.
+- Everything else falls back to a character-based heuristic, calibrated per
+  file type (see file_types.TOKEN_ESTIMATION_RATIOS) when the caller knows
+  which file the text came from.
 """
 
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
 # Default fallback for token limit (conservative estimate)
 DEFAULT_CONTEXT_WINDOW = 200_000  # Conservative fallback for unknown models
 
+# Characters per token of the generic heuristic
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# Number of exact token counts memoized by content hash
+TOKEN_COUNT_CACHE_SIZE = max(0, int(os.getenv("TOKEN_COUNT_CACHE_SIZE", "8192")))
+
+# Model name prefixes served by tiktoken (OpenAI-compatible models)
+TIKTOKEN_MODEL_PREFIXES = ("gpt-", "chatgpt-", "o1", "o3", "o4", "text-embedding-")
+
+
+class TokenCounter:
+    """Counts tokens of text for one tokenizer."""
+
+    name = "heuristic"
+    exact = False
+
+    def count(self, text: str) -> int:
+        raise NotImplementedError
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        return [self.count(text) for text in texts]
+
+
+class HeuristicTokenCounter(TokenCounter):
+    """Character-ratio approximation used when no tokenizer is available."""
+
+    def __init__(self, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN):
+        self.chars_per_token = chars_per_token
+        self.name = f"heuristic:{chars_per_token}"
+
+    def count(self, text: str) -> int:
+        return int(len(text) / self.chars_per_token)
+
+
+class TiktokenCounter(TokenCounter):
+    """Exact counts with a tiktoken BPE encoding."""
 
-def estimate_tokens(text: str) -> int:
+    exact = True
+
+    def __init__(self, encoding):
+        self._encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        return [len(tokens) for tokens in self._encoding.encode_ordinary_batch(texts)]
+
+
+def _tiktoken_counter(model_name: str) -> Optional[TokenCounter]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Newer OpenAI models not yet known to the installed tiktoken
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; stay on the heuristic when offline
+        logger.debug(f"tiktoken encoding unavailable for {model_name}: {e}")
+        return None
+    return TiktokenCounter(encoding)
+
+
+_counter_factories: list[tuple[tuple[str, ...], Callable[[str], Optional[TokenCounter]]]] = [
+    (TIKTOKEN_MODEL_PREFIXES, _tiktoken_counter)
+]
+_counters: dict[str, Optional[TokenCounter]] = {}
+_counters_lock = threading.Lock()
+
+
+def register_token_counter(prefixes: tuple[str, ...], factory: Callable[[str], Optional[TokenCounter]]) -> None:
+    """
+    Plug in a tokenizer for models whose name starts with one of the prefixes.
+
+    factory(model_name) returns a TokenCounter, or None when the tokenizer
+    cannot be loaded (the heuristic is used then). Later registrations take
+    precedence over earlier ones.
     """
-    Estimate token count using a character-based approximation.
+    with _counters_lock:
+        _counter_factories.insert(0, (tuple(prefix.lower() for prefix in prefixes), factory))
+        _counters.clear()
+
+
+def get_token_counter(model_name: Optional[str]) -> Optional[TokenCounter]:
+    """Tokenizer-backed counter for a model, or None when only the heuristic applies."""
+    if not model_name:
+        return None
+    with _counters_lock:
+        if model_name in _counters:
+            return _counters[model_name]
+        # Routed names such as "openai/gpt-4o" use the tokenizer of the underlying model
+        base_name = model_name.rsplit("/", 1)[-1].lower()
+        counter = None
+        for prefixes, factory in _counter_factories:
+            if base_name.startswith(prefixes):
+                counter = factory(base_name)
+                if counter is not None:
+                    break
+        _counters[model_name] = counter
+        return counter
+
 
-    This uses a rough heuristic where 1 token ≈ 4 characters, which is
-    a reasonable approximation for English text. The actual token count
-    may vary based on:
+class TokenCountCache:
+    """Bounded LRU of exact token counts keyed by tokenizer and content hash."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(counter: TokenCounter, text: str) -> tuple[str, bytes]:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        return counter.name, digest
+
+    def get(self, key: tuple[str, bytes]) -> Optional[int]:
+        with self._lock:
+            count = self._entries.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key: tuple[str, bytes], count: int) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = count
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_token_count_cache = TokenCountCache(TOKEN_COUNT_CACHE_SIZE)
+
+
+def _heuristic_counter(file_path: Optional[str], chars_per_token: Optional[float]) -> TokenCounter:
+    if chars_per_token is None:
+        if file_path:
+            from .file_types import get_token_estimation_ratio
+
+            chars_per_token = get_token_estimation_ratio(file_path)
+        else:
+            chars_per_token = DEFAULT_CHARS_PER_TOKEN
+    return HeuristicTokenCounter(chars_per_token)
+
+
+def count_tokens_batch(
+    texts: Iterable[str],
+    model_name: Optional[str] = None,
+    file_path: Optional[str] = None,
+    chars_per_token: Optional[float] = None,
+) -> list[int]:
+    """
+    Count tokens for several texts at once.
+
+    Uses the model's tokenizer when one is available, memoizing counts per
+    content hash and tokenizing each distinct uncached text once. Otherwise
+    falls back to the character heuristic: chars_per_token if given, else the
+    ratio for file_path's type, else DEFAULT_CHARS_PER_TOKEN.
+
+    Args:
+        texts: The texts to count
+        model_name: Model whose tokenizer should be used
+        file_path: File the texts came from (selects the heuristic ratio)
+        chars_per_token: Explicit heuristic ratio
+
+    Returns:
+        list[int]: Token count of each text, in order
+    """
+    texts = list(texts)
+    counter = get_token_counter(model_name)
+    if counter is None:
+        return _heuristic_counter(file_path, chars_per_token).count_many(texts)
+
+    counts: list[Optional[int]] = [None] * len(texts)
+    missing: dict[tuple[str, bytes], list[int]] = {}
+    for position, text in enumerate(texts):
+        key = _token_count_cache.key(counter, text)
+        count = _token_count_cache.get(key)
+        if count is None:
+            missing.setdefault(key, []).append(position)
+        else:
+            counts[position] = count
+
+    if missing:
+        keys = list(missing)
+        for key, count in zip(keys, counter.count_many([texts[missing[key][0]] for key in keys])):
+            _token_count_cache.put(key, count)
+            for position in missing[key]:
+                counts[position] = count
+    return counts
+
+
+def count_tokens(
+    text: str,
+    model_name: Optional[str] = None,
+    file_path: Optional[str] = None,
+    chars_per_token: Optional[float] = None,
+) -> int:
+    """Count tokens for one text (see count_tokens_batch)."""
+    return count_tokens_batch([text], model_name, file_path, chars_per_token)[0]
+
+
+def estimate_tokens(text: str, model_name: Optional[str] = None, file_path: Optional[str] = None) -> int:
+    """
+    Estimate token count for text.
+
+    Without a model or file this uses a rough heuristic where 1 token ≈ 4
+    characters, which is a reasonable approximation for English text. The
+    actual token count may vary based on:
     - Language (non-English text may have different ratios)
     - Code vs prose (code often has more tokens per character)
     - Special characters and formatting
 
+    Passing model_name counts with the model's tokenizer when one is
+    available; passing file_path uses the calibrated ratio for that file type.
+
     Args:
         text: The text to estimate tokens for
+        model_name: Optional model whose tokenizer should be used
+        file_path: Optional file the text came from
 
     Returns:
         int: Estimated number of tokens
     """
-    return len(text) // 4
+    return count_tokens(text, model_name=model_name, file_path=file_path)
 
 
 def check_token_limit(text: str, context_window: int = DEFAULT_CONTEXT_WINDOW) -> tuple[bool, int]: